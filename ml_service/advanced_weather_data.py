@@ -9,18 +9,130 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, mean_squared_error
 import joblib
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import random
 import requests
 import sqlite3
+import time
 from datetime import datetime, timedelta
 
+from historical_averages import (
+    HistoricalAverageStore, init_statistics_tables, read_statistics, window_statistics, window_years,
+    write_statistics
+)
+from sqlite_access import sqlite_access
+from toll_tariffs import DEFAULT_VEHICLE_CLASS, load_tariff
+from training_set import TRAINING_QUERY, build_training_set, city_table, featurize_chunk, fit_forests
+from traffic_multipliers import TrafficMultiplierTable, calculate_traffic_multipliers
+from weather_ingestion import (
+    ConcurrentWeatherIngestor, IngestionJob, build_current_weather_params, parse_current_weather_response
+)
+from collection_checkpoint import (
+    JOURNAL_DDL_SQLITE, STATUS_FAILED, STATUS_NO_DATA, date_range, find_missing_days,
+    print_plan, record_journal_entries, summarize_missing
+)
+
+# Türkiye şehirlerinin coğrafi ve iklim verileri (iklim bölgesi: "climate")
+CITIES_GEOGRAPHIC_DATA = {
+    # Marmara 
+    "İstanbul": {"lat": 41.0082, "lon": 28.9784, "elevation": 100, "climate": "Marmara", "population": 15520000},
+    "Bursa": {"lat": 40.1885, "lon": 29.0610, "elevation": 100, "climate": "Marmara", "population": 3101833},
+    "Sakarya": {"lat": 40.7569, "lon": 30.3781, "elevation": 31, "climate": "Marmara", "population": 1025278},
+    "Kocaeli": {"lat": 40.8533, "lon": 29.8815, "elevation": 100, "climate": "Marmara", "population": 1994442},
+    "Tekirdağ": {"lat": 40.9780, "lon": 27.5110, "elevation": 28, "climate": "Marmara", "population": 1111915},
+    "Edirne": {"lat": 41.6771, "lon": 26.5557, "elevation": 42, "climate": "Marmara", "population": 411528},
+    "Kırklareli": {"lat": 41.7351, "lon": 27.2250, "elevation": 203, "climate": "Marmara", "population": 361737},
+    "Balıkesir": {"lat": 39.6484, "lon": 27.8826, "elevation": 70, "climate": "Marmara", "population": 1240285},
+    "Çanakkale": {"lat": 40.1553, "lon": 26.4142, "elevation": 2, "climate": "Marmara", "population": 540662},
+            
+    # İç Anadolu 
+    "Ankara": {"lat": 39.9334, "lon": 32.8597, "elevation": 938, "climate": "İç Anadolu", "population": 5639076},
+    "Konya": {"lat": 37.8667, "lon": 32.4833, "elevation": 1016, "climate": "İç Anadolu", "population": 2232374},
+    "Kayseri": {"lat": 38.7205, "lon": 35.4826, "elevation": 1050, "climate": "İç Anadolu", "population": 1404276},
+    "Sivas": {"lat": 39.7477, "lon": 37.0179, "elevation": 1285, "climate": "İç Anadolu", "population": 638956},
+    "Yozgat": {"lat": 39.8181, "lon": 34.8147, "elevation": 800, "climate": "İç Anadolu", "population": 424981},
+    "Çorum": {"lat": 40.5499, "lon": 34.9537, "elevation": 801, "climate": "İç Anadolu", "population": 527863},
+    "Amasya": {"lat": 40.6539, "lon": 35.8336, "elevation": 400, "climate": "İç Anadolu", "population": 337508},
+    "Tokat": {"lat": 40.3167, "lon": 36.5544, "elevation": 623, "climate": "İç Anadolu", "population": 602567},
+    "Nevşehir": {"lat": 38.6244, "lon": 34.7236, "elevation": 1224, "climate": "İç Anadolu", "population": 303010},
+    "Kırşehir": {"lat": 39.1458, "lon": 34.1606, "elevation": 985, "climate": "İç Anadolu", "population": 243042},
+    "Aksaray": {"lat": 38.3726, "lon": 34.0254, "elevation": 980, "climate": "İç Anadolu", "population": 423011},
+    "Niğde": {"lat": 37.9667, "lon": 34.6833, "elevation": 1229, "climate": "İç Anadolu", "population": 362861},
+    "Kırıkkale": {"lat": 39.8468, "lon": 33.5153, "elevation": 746, "climate": "İç Anadolu", "population": 278749},
+    "Çankırı": {"lat": 40.6013, "lon": 33.6134, "elevation": 800, "climate": "İç Anadolu", "population": 195789},
+    "Karabük": {"lat": 41.2061, "lon": 32.6208, "elevation": 725, "climate": "İç Anadolu", "population": 248458},
+    "Zonguldak": {"lat": 41.4564, "lon": 31.7987, "elevation": 135, "climate": "İç Anadolu", "population": 596053},
+    "Bolu": {"lat": 40.7397, "lon": 31.6083, "elevation": 725, "climate": "İç Anadolu", "population": 311810},
+    "Düzce": {"lat": 40.8438, "lon": 31.1565, "elevation": 135, "climate": "İç Anadolu", "population": 395679},
+    "Kastamonu": {"lat": 41.3887, "lon": 33.7767, "elevation": 678, "climate": "İç Anadolu", "population": 376945},
+    "Sinop": {"lat": 42.0231, "lon": 35.1531, "elevation": 0, "climate": "İç Anadolu", "population": 220799},
+            
+    # Doğu Anadolu 
+    "Kars": {"lat": 40.6013, "lon": 43.0975, "elevation": 1768, "climate": "Doğu Anadolu", "population": 284923},
+    "Erzurum": {"lat": 39.9055, "lon": 41.2658, "elevation": 1756, "climate": "Doğu Anadolu", "population": 762321},
+    "Van": {"lat": 38.4891, "lon": 43.4089, "elevation": 1727, "climate": "Doğu Anadolu", "population": 1148637},
+    "Ağrı": {"lat": 39.7191, "lon": 43.0503, "elevation": 1646, "climate": "Doğu Anadolu", "population": 536199},
+    "Iğdır": {"lat": 39.9237, "lon": 44.0450, "elevation": 850, "climate": "Doğu Anadolu", "population": 199442},
+    "Ardahan": {"lat": 41.1105, "lon": 42.7022, "elevation": 1067, "climate": "Doğu Anadolu", "population": 98335},
+    "Erzincan": {"lat": 39.7500, "lon": 39.5000, "elevation": 1150, "climate": "Doğu Anadolu", "population": 234747},
+    "Tunceli": {"lat": 39.1081, "lon": 39.5483, "elevation": 1727, "climate": "Doğu Anadolu", "population": 83443},
+    "Bingöl": {"lat": 38.8856, "lon": 40.4989, "elevation": 1727, "climate": "Doğu Anadolu", "population": 281205},
+    "Muş": {"lat": 38.9462, "lon": 41.7539, "elevation": 1727, "climate": "Doğu Anadolu", "population": 408809},
+    "Bitlis": {"lat": 38.4011, "lon": 42.1078, "elevation": 1727, "climate": "Doğu Anadolu", "population": 350994},
+    "Hakkari": {"lat": 37.5744, "lon": 43.7408, "elevation": 1727, "climate": "Doğu Anadolu", "population": 278775},
+    "Şırnak": {"lat": 37.4187, "lon": 42.4918, "elevation": 1727, "climate": "Doğu Anadolu", "population": 537762},
+            
+    # Karadeniz 
+    "Trabzon": {"lat": 41.0015, "lon": 39.7178, "elevation": 0, "climate": "Karadeniz", "population": 811901},
+    "Rize": {"lat": 41.0201, "lon": 40.5234, "elevation": 5, "climate": "Karadeniz", "population": 344359},
+    "Ordu": {"lat": 40.9839, "lon": 37.8764, "elevation": 5, "climate": "Karadeniz", "population": 761165},
+    "Giresun": {"lat": 40.9128, "lon": 38.3895, "elevation": 5, "climate": "Karadeniz", "population": 448721},
+    "Artvin": {"lat": 41.1828, "lon": 41.8183, "elevation": 5, "climate": "Karadeniz", "population": 168068},
+    "Gümüşhane": {"lat": 40.4603, "lon": 39.4814, "elevation": 5, "climate": "Karadeniz", "population": 141702},
+    "Bayburt": {"lat": 40.2567, "lon": 40.2249, "elevation": 5, "climate": "Karadeniz", "population": 78550},
+    "Bartın": {"lat": 41.6358, "lon": 32.3375, "elevation": 5, "climate": "Karadeniz", "population": 198249},
+            
+    # Akdeniz 
+    "Antalya": {"lat": 36.8969, "lon": 30.7133, "elevation": 30, "climate": "Akdeniz", "population": 2548308},
+    "Mersin": {"lat": 36.8000, "lon": 34.6333, "elevation": 10, "climate": "Akdeniz", "population": 1854472},
+    "Adana": {"lat": 37.0000, "lon": 35.3213, "elevation": 23, "climate": "Akdeniz", "population": 2258718},
+    "Hatay": {"lat": 36.2021, "lon": 36.1600, "elevation": 89, "climate": "Akdeniz", "population": 1658400},
+    "Kahramanmaraş": {"lat": 37.5858, "lon": 36.9228, "elevation": 518, "climate": "Akdeniz", "population": 1161634},
+    "Osmaniye": {"lat": 37.0742, "lon": 36.2478, "elevation": 518, "climate": "Akdeniz", "population": 538759},
+    "Burdur": {"lat": 37.7203, "lon": 30.2908, "elevation": 518, "climate": "Akdeniz", "population": 267092},
+    "Isparta": {"lat": 37.7648, "lon": 30.5566, "elevation": 518, "climate": "Akdeniz", "population": 441412},
+            
+    # Güneydoğu Anadolu 
+    "Diyarbakır": {"lat": 37.9144, "lon": 40.2306, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 1754247},
+    "Mardin": {"lat": 37.3212, "lon": 40.7245, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 854716},
+    "Batman": {"lat": 37.8812, "lon": 41.1351, "elevation": 540, "climate": "Güneydoğu Anadolu", "population": 620278},
+    "Şanlıurfa": {"lat": 37.1674, "lon": 38.7955, "elevation": 518, "climate": "Güneydoğu Anadolu", "population": 2143020},
+    "Gaziantep": {"lat": 37.0662, "lon": 37.3833, "elevation": 838, "climate": "Güneydoğu Anadolu", "population": 2130254},
+    "Siirt": {"lat": 37.9274, "lon": 41.9456, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 331980},
+    "Kilis": {"lat": 36.7184, "lon": 37.1212, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 142792},
+    "Adıyaman": {"lat": 37.7648, "lon": 38.2786, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 632459},
+            
+    # Ege 
+    "İzmir": {"lat": 38.4192, "lon": 27.1287, "elevation": 25, "climate": "Ege", "population": 4367251},
+    "Manisa": {"lat": 38.6191, "lon": 27.4289, "elevation": 71, "climate": "Ege", "population": 1443426},
+    "Aydın": {"lat": 37.8561, "lon": 27.8413, "elevation": 65, "climate": "Ege", "population": 1110972},
+    "Muğla": {"lat": 37.2154, "lon": 28.3636, "elevation": 2, "climate": "Ege", "population": 1008567},
+    "Denizli": {"lat": 37.7765, "lon": 29.0864, "elevation": 354, "climate": "Ege", "population": 1055562},
+    "Afyonkarahisar": {"lat": 38.7500, "lon": 30.5500, "elevation": 1014, "climate": "Ege", "population": 736912},
+    "Kütahya": {"lat": 39.4167, "lon": 29.9833, "elevation": 930, "climate": "Ege", "population": 576688},
+    "Uşak": {"lat": 38.6742, "lon": 29.4058, "elevation": 750, "climate": "Ege", "population": 369433},
+    "Bilecik": {"lat": 40.1506, "lon": 29.9792, "elevation": 850, "climate": "Ege", "population": 228334}
+}
+
+
 #ML hava durumu veritabanı sınıfı
 class MLWeatherDatabase:
     def __init__(self):
         self.weather_model = None #Hava durumu modeli
         self.temperature_model = None #Sıcaklık modeli
         self.traffic_model = None #Trafik modeli
+        self.traffic_table = None #Önceden hesaplanmış trafik çarpanı tablosu
+        self.training_report = None #Son eğitimin süre/satır özeti
         self.scaler = StandardScaler() #Ölçekleyici
         self.weather_encoder = LabelEncoder() #Hava durumu kodlayıcı
         
@@ -29,7 +141,9 @@ class MLWeatherDatabase:
         
         # Tarihsel veri veritabanı
         self.db_path = "historical_weather.db"
+        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
         self._init_database()
+        self.historical_averages = HistoricalAverageStore(self.db_path)
         
         # Modelleri yükle veya eğit
         self.load_or_train_models()
@@ -37,277 +151,141 @@ class MLWeatherDatabase:
         print("🤖 ML Tabanlı Hava Durumu Sistemi Başlatıldı")
         print(f"📊 {len(self.cities_data)} şehir için ML modelleri hazır")
     
+    @property
+    def sqlite(self):
+        """historical_weather.db erişim katmanı (WAL, iş parçacığı başına okuyucu, tek yazıcı)"""
+        return sqlite_access(self.db_path)
+    
     def _load_cities_geographic_data(self) -> Dict:
         """Türkiye şehirlerinin coğrafi ve iklim verileri"""
-        return {
-            # Marmara 
-            "İstanbul": {"lat": 41.0082, "lon": 28.9784, "elevation": 100, "climate": "Marmara", "population": 15520000},
-            "Bursa": {"lat": 40.1885, "lon": 29.0610, "elevation": 100, "climate": "Marmara", "population": 3101833},
-            "Sakarya": {"lat": 40.7569, "lon": 30.3781, "elevation": 31, "climate": "Marmara", "population": 1025278},
-            "Kocaeli": {"lat": 40.8533, "lon": 29.8815, "elevation": 100, "climate": "Marmara", "population": 1994442},
-            "Tekirdağ": {"lat": 40.9780, "lon": 27.5110, "elevation": 28, "climate": "Marmara", "population": 1111915},
-            "Edirne": {"lat": 41.6771, "lon": 26.5557, "elevation": 42, "climate": "Marmara", "population": 411528},
-            "Kırklareli": {"lat": 41.7351, "lon": 27.2250, "elevation": 203, "climate": "Marmara", "population": 361737},
-            "Balıkesir": {"lat": 39.6484, "lon": 27.8826, "elevation": 70, "climate": "Marmara", "population": 1240285},
-            "Çanakkale": {"lat": 40.1553, "lon": 26.4142, "elevation": 2, "climate": "Marmara", "population": 540662},
-            
-            # İç Anadolu 
-            "Ankara": {"lat": 39.9334, "lon": 32.8597, "elevation": 938, "climate": "İç Anadolu", "population": 5639076},
-            "Konya": {"lat": 37.8667, "lon": 32.4833, "elevation": 1016, "climate": "İç Anadolu", "population": 2232374},
-            "Kayseri": {"lat": 38.7205, "lon": 35.4826, "elevation": 1050, "climate": "İç Anadolu", "population": 1404276},
-            "Sivas": {"lat": 39.7477, "lon": 37.0179, "elevation": 1285, "climate": "İç Anadolu", "population": 638956},
-            "Yozgat": {"lat": 39.8181, "lon": 34.8147, "elevation": 800, "climate": "İç Anadolu", "population": 424981},
-            "Çorum": {"lat": 40.5499, "lon": 34.9537, "elevation": 801, "climate": "İç Anadolu", "population": 527863},
-            "Amasya": {"lat": 40.6539, "lon": 35.8336, "elevation": 400, "climate": "İç Anadolu", "population": 337508},
-            "Tokat": {"lat": 40.3167, "lon": 36.5544, "elevation": 623, "climate": "İç Anadolu", "population": 602567},
-            "Nevşehir": {"lat": 38.6244, "lon": 34.7236, "elevation": 1224, "climate": "İç Anadolu", "population": 303010},
-            "Kırşehir": {"lat": 39.1458, "lon": 34.1606, "elevation": 985, "climate": "İç Anadolu", "population": 243042},
-            "Aksaray": {"lat": 38.3726, "lon": 34.0254, "elevation": 980, "climate": "İç Anadolu", "population": 423011},
-            "Niğde": {"lat": 37.9667, "lon": 34.6833, "elevation": 1229, "climate": "İç Anadolu", "population": 362861},
-            "Kırıkkale": {"lat": 39.8468, "lon": 33.5153, "elevation": 746, "climate": "İç Anadolu", "population": 278749},
-            "Çankırı": {"lat": 40.6013, "lon": 33.6134, "elevation": 800, "climate": "İç Anadolu", "population": 195789},
-            "Karabük": {"lat": 41.2061, "lon": 32.6208, "elevation": 725, "climate": "İç Anadolu", "population": 248458},
-            "Zonguldak": {"lat": 41.4564, "lon": 31.7987, "elevation": 135, "climate": "İç Anadolu", "population": 596053},
-            "Bolu": {"lat": 40.7397, "lon": 31.6083, "elevation": 725, "climate": "İç Anadolu", "population": 311810},
-            "Düzce": {"lat": 40.8438, "lon": 31.1565, "elevation": 135, "climate": "İç Anadolu", "population": 395679},
-            "Kastamonu": {"lat": 41.3887, "lon": 33.7767, "elevation": 678, "climate": "İç Anadolu", "population": 376945},
-            "Sinop": {"lat": 42.0231, "lon": 35.1531, "elevation": 0, "climate": "İç Anadolu", "population": 220799},
-            
-            # Doğu Anadolu 
-            "Kars": {"lat": 40.6013, "lon": 43.0975, "elevation": 1768, "climate": "Doğu Anadolu", "population": 284923},
-            "Erzurum": {"lat": 39.9055, "lon": 41.2658, "elevation": 1756, "climate": "Doğu Anadolu", "population": 762321},
-            "Van": {"lat": 38.4891, "lon": 43.4089, "elevation": 1727, "climate": "Doğu Anadolu", "population": 1148637},
-            "Ağrı": {"lat": 39.7191, "lon": 43.0503, "elevation": 1646, "climate": "Doğu Anadolu", "population": 536199},
-            "Iğdır": {"lat": 39.9237, "lon": 44.0450, "elevation": 850, "climate": "Doğu Anadolu", "population": 199442},
-            "Ardahan": {"lat": 41.1105, "lon": 42.7022, "elevation": 1067, "climate": "Doğu Anadolu", "population": 98335},
-            "Erzincan": {"lat": 39.7500, "lon": 39.5000, "elevation": 1150, "climate": "Doğu Anadolu", "population": 234747},
-            "Tunceli": {"lat": 39.1081, "lon": 39.5483, "elevation": 1727, "climate": "Doğu Anadolu", "population": 83443},
-            "Bingöl": {"lat": 38.8856, "lon": 40.4989, "elevation": 1727, "climate": "Doğu Anadolu", "population": 281205},
-            "Muş": {"lat": 38.9462, "lon": 41.7539, "elevation": 1727, "climate": "Doğu Anadolu", "population": 408809},
-            "Bitlis": {"lat": 38.4011, "lon": 42.1078, "elevation": 1727, "climate": "Doğu Anadolu", "population": 350994},
-            "Hakkari": {"lat": 37.5744, "lon": 43.7408, "elevation": 1727, "climate": "Doğu Anadolu", "population": 278775},
-            "Şırnak": {"lat": 37.4187, "lon": 42.4918, "elevation": 1727, "climate": "Doğu Anadolu", "population": 537762},
-            
-            # Karadeniz 
-            "Trabzon": {"lat": 41.0015, "lon": 39.7178, "elevation": 0, "climate": "Karadeniz", "population": 811901},
-            "Rize": {"lat": 41.0201, "lon": 40.5234, "elevation": 5, "climate": "Karadeniz", "population": 344359},
-            "Ordu": {"lat": 40.9839, "lon": 37.8764, "elevation": 5, "climate": "Karadeniz", "population": 761165},
-            "Giresun": {"lat": 40.9128, "lon": 38.3895, "elevation": 5, "climate": "Karadeniz", "population": 448721},
-            "Artvin": {"lat": 41.1828, "lon": 41.8183, "elevation": 5, "climate": "Karadeniz", "population": 168068},
-            "Gümüşhane": {"lat": 40.4603, "lon": 39.4814, "elevation": 5, "climate": "Karadeniz", "population": 141702},
-            "Bayburt": {"lat": 40.2567, "lon": 40.2249, "elevation": 5, "climate": "Karadeniz", "population": 78550},
-            "Bartın": {"lat": 41.6358, "lon": 32.3375, "elevation": 5, "climate": "Karadeniz", "population": 198249},
-            
-            # Akdeniz 
-            "Antalya": {"lat": 36.8969, "lon": 30.7133, "elevation": 30, "climate": "Akdeniz", "population": 2548308},
-            "Mersin": {"lat": 36.8000, "lon": 34.6333, "elevation": 10, "climate": "Akdeniz", "population": 1854472},
-            "Adana": {"lat": 37.0000, "lon": 35.3213, "elevation": 23, "climate": "Akdeniz", "population": 2258718},
-            "Hatay": {"lat": 36.2021, "lon": 36.1600, "elevation": 89, "climate": "Akdeniz", "population": 1658400},
-            "Kahramanmaraş": {"lat": 37.5858, "lon": 36.9228, "elevation": 518, "climate": "Akdeniz", "population": 1161634},
-            "Osmaniye": {"lat": 37.0742, "lon": 36.2478, "elevation": 518, "climate": "Akdeniz", "population": 538759},
-            "Burdur": {"lat": 37.7203, "lon": 30.2908, "elevation": 518, "climate": "Akdeniz", "population": 267092},
-            "Isparta": {"lat": 37.7648, "lon": 30.5566, "elevation": 518, "climate": "Akdeniz", "population": 441412},
-            
-            # Güneydoğu Anadolu 
-            "Diyarbakır": {"lat": 37.9144, "lon": 40.2306, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 1754247},
-            "Mardin": {"lat": 37.3212, "lon": 40.7245, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 854716},
-            "Batman": {"lat": 37.8812, "lon": 41.1351, "elevation": 540, "climate": "Güneydoğu Anadolu", "population": 620278},
-            "Şanlıurfa": {"lat": 37.1674, "lon": 38.7955, "elevation": 518, "climate": "Güneydoğu Anadolu", "population": 2143020},
-            "Gaziantep": {"lat": 37.0662, "lon": 37.3833, "elevation": 838, "climate": "Güneydoğu Anadolu", "population": 2130254},
-            "Siirt": {"lat": 37.9274, "lon": 41.9456, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 331980},
-            "Kilis": {"lat": 36.7184, "lon": 37.1212, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 142792},
-            "Adıyaman": {"lat": 37.7648, "lon": 38.2786, "elevation": 660, "climate": "Güneydoğu Anadolu", "population": 632459},
-            
-            # Ege 
-            "İzmir": {"lat": 38.4192, "lon": 27.1287, "elevation": 25, "climate": "Ege", "population": 4367251},
-            "Manisa": {"lat": 38.6191, "lon": 27.4289, "elevation": 71, "climate": "Ege", "population": 1443426},
-            "Aydın": {"lat": 37.8561, "lon": 27.8413, "elevation": 65, "climate": "Ege", "population": 1110972},
-            "Muğla": {"lat": 37.2154, "lon": 28.3636, "elevation": 2, "climate": "Ege", "population": 1008567},
-            "Denizli": {"lat": 37.7765, "lon": 29.0864, "elevation": 354, "climate": "Ege", "population": 1055562},
-            "Afyonkarahisar": {"lat": 38.7500, "lon": 30.5500, "elevation": 1014, "climate": "Ege", "population": 736912},
-            "Kütahya": {"lat": 39.4167, "lon": 29.9833, "elevation": 930, "climate": "Ege", "population": 576688},
-            "Uşak": {"lat": 38.6742, "lon": 29.4058, "elevation": 750, "climate": "Ege", "population": 369433},
-            "Bilecik": {"lat": 40.1506, "lon": 29.9792, "elevation": 850, "climate": "Ege", "population": 228334}
-        }
+        return dict(CITIES_GEOGRAPHIC_DATA)
     
     def _init_database(self):
         """Tarihsel veri veritabanını başlat"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Hava durumu verileri tablosu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weather_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                city TEXT NOT NULL,
-                date TEXT NOT NULL,
-                weather_condition TEXT NOT NULL,
-                temperature REAL NOT NULL,
-                humidity REAL,
-                wind_speed REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(city, date)
-            )
-        ''')
-        
-        # Şehir istatistikleri tablosu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS city_statistics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                city TEXT NOT NULL,
-                month INTEGER NOT NULL,
-                day INTEGER NOT NULL,
-                avg_temperature REAL,
-                avg_humidity REAL,
-                avg_wind_speed REAL,
-                weather_probabilities TEXT,
-                sample_count INTEGER,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(city, month, day)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def collect_historical_data(self, city: str, start_date: str, end_date: str):
-        """Belirli bir şehir için tarihsel veri topla"""
-        try:
-            # OpenWeatherMap API'den veri al (ücretsiz plan)
-            from dotenv import load_dotenv
-            import os
-            load_dotenv()
-            api_key = os.getenv("OPENWEATHER_API_KEY")
+        with self.sqlite.writer() as conn:
+            cursor = conn.cursor()
             
-            if not api_key:
-                raise ValueError("OPENWEATHER_API_KEY .env dosyasında bulunamadı!")
-                
-            base_url = "http://api.openweathermap.org/data/2.5/weather"
+            # Hava durumu verileri tablosu
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS weather_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    city TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    weather_condition TEXT NOT NULL,
+                    temperature REAL NOT NULL,
+                    humidity REAL,
+                    wind_speed REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(city, date)
+                )
+            ''')
             
-            start = datetime.strptime(start_date, "%Y-%m-%d")
-            end = datetime.strptime(end_date, "%Y-%m-%d")
+            # Şehir istatistikleri tablosu
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS city_statistics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    city TEXT NOT NULL,
+                    month INTEGER NOT NULL,
+                    day INTEGER NOT NULL,
+                    avg_temperature REAL,
+                    avg_humidity REAL,
+                    avg_wind_speed REAL,
+                    weather_probabilities TEXT,
+                    sample_count INTEGER,
+                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    most_likely_weather TEXT,
+                    confidence REAL,
+                    UNIQUE(city, month, day)
+                )
+            ''')
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # Olasılıklar normalize tabloda (weather_probabilities JSON kolonu artık yazılmıyor)
+            init_statistics_tables(cursor)
             
-            current_date = start
-            while current_date <= end:
-                # Unix timestamp
-                timestamp = int(current_date.timestamp())
-                
-                # API çağrısı
-                params = {
-                    'q': f"{city},TR",
-                    'appid': api_key,
-                    'units': 'metric',
-                    'dt': timestamp
-                }
-                
-                response = requests.get(base_url, params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    weather_condition = data['weather'][0]['main'].lower()
-                    temperature = data['main']['temp']
-                    humidity = data['main']['humidity']
-                    wind_speed = data['wind']['speed']
-                    
-                    # Veritabanına kaydet
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO weather_data 
-                        (city, date, weather_condition, temperature, humidity, wind_speed)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (city, current_date.strftime("%Y-%m-%d"), weather_condition, 
-                          temperature, humidity, wind_speed))
-                
-                current_date += timedelta(days=1)
+            # Kaldığı yerden devam için toplama günlüğü
+            cursor.execute(JOURNAL_DDL_SQLITE)
+    
+    def collect_historical_data(self, city: str, start_date: str, end_date: str,
+                                dates: List[str] = None, checkpoint_every: int = 30,
+                                requests_per_minute: float = 60.0, max_concurrency: int = 8):
+        """Belirli bir şehir için tarihsel veri topla
+        
+        dates verilirse yalnızca bu günler çekilir. Her checkpoint_every satırda bir
+        toplu yazım yapılır; kesinti durumunda kaydedilen günler kaybolmaz.
+        """
+        try:
+            if dates is None:
+                dates = date_range(start_date, end_date)
             
-            conn.commit()
-            conn.close()
+            self._collect_days([(city, date) for date in dates], requests_per_minute=requests_per_minute,
+                               max_concurrency=max_concurrency, batch_size=checkpoint_every)
             print(f"✅ {city} için tarihsel veri toplandı: {start_date} - {end_date}")
             
         except Exception as e:
             print(f"❌ {city} için veri toplama hatası: {e}")
     
-    def get_historical_average(self, city: str, month: int, day: int) -> Dict:
-        """Belirli bir gün için son 3 yıllık ortalama verileri al"""
+    def _collect_days(self, pairs: List[Tuple[str, str]], requests_per_minute: float = 60.0,
+                      max_concurrency: int = 8, batch_size: int = 500) -> Dict:
+        """(şehir, gün) çiftlerini tek keep-alive oturumla, dakika kotası altında eşzamanlı çek"""
+        # OpenWeatherMap API'den veri al (ücretsiz plan)
+        from dotenv import load_dotenv
+        load_dotenv()
+        api_key = os.getenv("OPENWEATHER_API_KEY")
+        
+        if not api_key:
+            raise ValueError("OPENWEATHER_API_KEY .env dosyasında bulunamadı!")
+        
+        failures = []
+        
+        def on_failure(job: IngestionJob, status: str, error: str):
+            failures.append((job.city, job.date, status, error[:400]))
+        
+        ingestor = ConcurrentWeatherIngestor(
+            base_url=self.base_url,
+            api_key=api_key,
+            write_batch=self._save_weather_batch,
+            requests_per_second=requests_per_minute / 60.0,
+            # Patlama yok: herhangi bir 60 sn'lik pencerede en fazla requests_per_minute + 1 istek
+            burst=1,
+            max_concurrency=max_concurrency,
+            batch_size=batch_size,
+            build_params=build_current_weather_params,
+            parse_response=parse_current_weather_response,
+            on_failure=on_failure,
+            no_data_status_codes=(404,)
+        )
+        
+        jobs = (IngestionJob(city, date, self.cities_data.get(city, {}).get("lat", 0.0),
+                             self.cities_data.get(city, {}).get("lon", 0.0))
+                for city, date in pairs)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Son 3 yılın aynı günü için verileri al
-            current_year = datetime.now().year
-            years = [current_year - 3, current_year - 2, current_year - 1]
-            
-            temperatures = []
-            humidities = []
-            wind_speeds = []
-            weather_conditions = []
-            
-            for year in years:
-                date_str = f"{year}-{month:02d}-{day:02d}"
-                cursor.execute('''
-                    SELECT temperature, humidity, wind_speed, weather_condition
-                    FROM weather_data 
-                    WHERE city = ? AND date = ?
-                ''', (city, date_str))
-                
-                result = cursor.fetchone()
-                if result:
-                    temperatures.append(result[0])
-                    humidities.append(result[1])
-                    wind_speeds.append(result[2])
-                    weather_conditions.append(result[3])
-            
-            conn.close()
-            
-            if temperatures:
-                # Hava durumu olasılıklarını hesapla
-                weather_counts = {}
-                for condition in weather_conditions:
-                    weather_counts[condition] = weather_counts.get(condition, 0) + 1
-                
-                total_samples = len(weather_conditions)
-                weather_probabilities = {
-                    condition: count / total_samples 
-                    for condition, count in weather_counts.items()
-                }
-                
-                # En olası hava durumu
-                most_likely_weather = max(weather_probabilities, key=weather_probabilities.get)
-                
-                return {
-                    'avg_temperature': np.mean(temperatures),
-                    'avg_humidity': np.mean(humidities),
-                    'avg_wind_speed': np.mean(wind_speeds),
-                    'weather_probabilities': weather_probabilities,
-                    'most_likely_weather': most_likely_weather,
-                    'confidence': weather_probabilities[most_likely_weather],
-                    'sample_count': total_samples
-                }
-            else:
-                # Veri yoksa boş döndür - fallback yok
-                return {
-                    'avg_temperature': 0.0,
-                    'avg_humidity': 0.0,
-                    'avg_wind_speed': 0.0,
-                    'weather_probabilities': {},
-                    'most_likely_weather': 'veri_yok',
-                    'confidence': 0.0,
-                    'sample_count': 0
-                }
-                
-        except Exception as e:
-            print(f"❌ {city} için tarihsel ortalama hatası: {e}")
-            return {
-                'avg_temperature': 0.0,
-                'avg_humidity': 0.0,
-                'avg_wind_speed': 0.0,
-                'weather_probabilities': {},
-                'most_likely_weather': 'veri_yok',
-                'confidence': 0.0,
-                'sample_count': 0
-            }
+            stats = ingestor.run(jobs)
+        finally:
+            ingestor.close()
+            # Veri dönmeyen / hata veren günleri günlüğe yaz (kesintide bile)
+            with self.sqlite.writer() as conn:
+                record_journal_entries(conn, failures)
+            self.historical_averages.invalidate()
+        
+        return stats
+    
+    def _save_weather_batch(self, rows: List[Dict]) -> int:
+        """Hava durumu verilerini tek transaction içinde toplu olarak kaydet"""
+        if not rows:
+            return 0
+        
+        with self.sqlite.writer() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO weather_data 
+                (city, date, weather_condition, temperature, humidity, wind_speed)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(row['city'], row['date'], row['weather_condition'], row['temperature'],
+                   row['humidity'], row['wind_speed']) for row in rows])
+        return len(rows)
+    
+    def get_historical_average(self, city: str, month: int, day: int) -> Dict:
+        """Belirli bir gün için son 3 yıllık ortalama verileri al (önbellek → city_statistics → tek sorgu)"""
+        return self.historical_averages.get(city, month, day)
     
     def _get_rule_based_fallback(self, city: str, month: int, day: int) -> Dict:
         """Veri yoksa kural tabanlı fallback"""
@@ -363,37 +341,83 @@ class MLWeatherDatabase:
         else:
             print("🤖 Yeni modeller eğitiliyor...")
             self.train_models()
+        self.build_traffic_table()
+    
+    def build_traffic_table(self):
+        """Şehir × yılın günü × haftanın günü trafik çarpanlarını önceden hesapla (WEATHER_TRAFFIC_TABLE=0 kapatır)"""
+        self.traffic_table = None
+        if os.getenv("WEATHER_TRAFFIC_TABLE", "1") == "0" or self.traffic_model is None:
+            return
+        try:
+            start = time.perf_counter()
+            self.traffic_table = TrafficMultiplierTable.build(self.cities_data, self.scaler, self.traffic_model)
+            print(f"🚦 Trafik çarpanı tablosu hazır: {self.traffic_table.nbytes / 1024 / 1024:.1f} MB, "
+                  f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"⚠️ Trafik çarpanı tablosu oluşturulamadı, canlı model kullanılacak: {e}")
+    
+    def generate_training_data(self, chunksize: Optional[int] = None):
+        """weather_data'dan eğitim verisi (train_models kolonları)
+        
+        chunksize verilirse tek bir DataFrame yerine en fazla chunksize satırlık
+        ham parçaları özelliklere çeviren bir iterator döner.
+        """
+        cities, static = city_table(self.cities_data)
+        if chunksize is None:
+            return featurize_chunk(pd.read_sql_query(TRAINING_QUERY, self.sqlite.reader()), cities, static)
+        return (featurize_chunk(chunk, cities, static)
+                for chunk in pd.read_sql_query(TRAINING_QUERY, self.sqlite.reader(), chunksize=chunksize))
     
-    def train_models(self):
-        """ML modellerini eğit"""
+    def train_models(self, chunksize: int = 200_000, workers: Optional[int] = None):
+        """ML modellerini eğit (parçalı vektörel eğitim verisi, ormanlar birlikte eğitilir)"""
         # Eğitim verisi oluştur
-        df = self.generate_training_data()
+        started = time.perf_counter()
+        chunks = pd.read_sql_query(TRAINING_QUERY, self.sqlite.reader(), chunksize=chunksize)
+        training = build_training_set(chunks, self.cities_data)
+        X, classes, weather_encoded, temperature, traffic = training.arrays()
+        build_seconds = time.perf_counter() - started
         
-        # Özellikler ve hedefler
-        features = ['latitude', 'longitude', 'elevation', 'population', 'month', 'day_of_week', 'day_of_year']
-        X = df[features].values
+        if training.rows == 0:
+            print("❌ Eğitim verisi bulunamadı! weather_data boş; önce collect_all_cities_data çalıştırılmalı")
+            return
+        
+        # Özellikler: enlem, boylam, rakım, nüfus, ay, haftanın günü, yılın günü
         X_scaled = self.scaler.fit_transform(X)
+        self.weather_encoder.fit(classes)
         
-        # Hava durumu modeli (çok küçük model) Classifier modeli yapıldı (Kategorik değerler için)
-        weather_encoded = self.weather_encoder.fit_transform(df['weather'])
+        # Çok küçük modeller: hava durumu Classifier (kategorik), sıcaklık ve trafik Regressor (sayısal)
         self.weather_model = RandomForestClassifier(n_estimators=10, max_depth=5, min_samples_split=50, random_state=42)
-        self.weather_model.fit(X_scaled, weather_encoded)
-        
-        # Sıcaklık modeli (çok küçük model) Regressor modeli yapıldı (Sayısal değerler için)
         self.temperature_model = RandomForestRegressor(n_estimators=10, max_depth=5, min_samples_split=50, random_state=42)
-        self.temperature_model.fit(X_scaled, df['temperature'])
-        
-        # Trafik modeli (çok küçük model) Regressor modeli yapıldı (Sayısal değerler için)
         self.traffic_model = RandomForestRegressor(n_estimators=10, max_depth=5, min_samples_split=50, random_state=42)
-        self.traffic_model.fit(X_scaled, df['traffic_multiplier'])
+        started = time.perf_counter()
+        fit_seconds = fit_forests({
+            "weather": (self.weather_model, weather_encoded),
+            "temperature": (self.temperature_model, temperature),
+            "traffic": (self.traffic_model, traffic),
+        }, X_scaled, workers)
+        fit_wall = time.perf_counter() - started
         
         # Modelleri kaydet
+        os.makedirs("../models", exist_ok=True)
         joblib.dump(self.weather_model, "../models/weather_model.pkl")
         joblib.dump(self.temperature_model, "../models/temperature_model.pkl")
         joblib.dump(self.traffic_model, "../models/traffic_model.pkl")
         joblib.dump(self.scaler, "../models/scaler.pkl")
         joblib.dump(self.weather_encoder, "../models/weather_encoder.pkl")
         
+        self.training_report = {
+            "rows": training.rows,
+            "skipped_rows": training.skipped_rows,
+            "classes": [str(name) for name in classes],
+            "build_seconds": round(build_seconds, 2),
+            "fit_seconds": round(fit_wall, 2),
+            "model_fit_seconds": {name: round(seconds, 2) for name, seconds in fit_seconds.items()},
+        }
+        print(f"📊 Eğitim verisi: {training.rows} kayıt"
+              + (f" ({training.skipped_rows} kayıt bilinmeyen şehir/tarih nedeniyle atlandı)" if training.skipped_rows else "")
+              + f", oluşturma {build_seconds:.2f} sn")
+        print(f"⏱️ Model eğitimi {fit_wall:.2f} sn ("
+              + ", ".join(f"{name} {seconds:.2f} sn" for name, seconds in fit_seconds.items()) + ")")
         print("✅ Modeller eğitildi ve kaydedildi")
     
     def get_weather_prediction(self, city: str, month: int, day: int = None) -> Dict:
@@ -467,158 +491,108 @@ class MLWeatherDatabase:
     
     def calculate_traffic_multiplier(self, city: str, date_str: str) -> float:
         """ML tabanlı trafik yoğunluğu tahmini (tatil kontrolü HolidayService'e bırakıldı)"""
-        city_normalized = city.title()
-        if city_normalized not in self.cities_data:
-            return 1.0
-        
-        try:
-            #Tarih formatını kontrol et
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            city_data = self.cities_data[city_normalized]
-            
-            # Özellik vektörü
-            features = np.array([[
-                city_data["lat"],
-                city_data["lon"],
-                city_data["elevation"],
-                city_data["population"],
-                date_obj.month,
-                date_obj.weekday(), 
-                date_obj.timetuple().tm_yday 
-            ]])
-            
-            features_scaled = self.scaler.transform(features) #Özellikleri ölçeklendir
-            multiplier = self.traffic_model.predict(features_scaled)[0] #Trafik modeli
-            
-            # Tatil etkisi artık HolidayService tarafından hesaplanıyor
-            # Burada sadece coğrafi ve mevsimsel etkileri hesaplıyoruz
-            
-            return round(multiplier, 2)
-            
-        except:
-            return 1.0
+        return self.calculate_traffic_multipliers([(city, date_str)])[0]
     
-    def calculate_toll_cost(self, route_distance: float, route_highways: List[str]) -> Dict:
-        """Rota ücreti hesaplama (basitleştirilmiş)"""
-        total_cost = 0
-        toll_details = []
-        
-        # Basit ücret hesaplama
-        for highway in route_highways:
-            if "köprü" in highway.lower() or "bridge" in highway.lower():
-                cost = 200
-                total_cost += cost
-                toll_details.append({
-                    "name": highway,
-                    "cost": cost,
-                    "type": "köprü"
-                })
-            elif "otoyol" in highway.lower() or "highway" in highway.lower():
-                cost = route_distance * 0.15
-                total_cost += cost
-                toll_details.append({
-                    "name": highway,
-                    "cost": round(cost, 2),
-                    "type": "otoyol"
-                })
-        
-        return {
-            "total_cost": round(total_cost, 2),
-            "toll_details": toll_details,
-            "cost_per_km": round(total_cost / route_distance, 2) if route_distance > 0 else 0
-        }
+    def calculate_traffic_multipliers(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """(şehir, tarih) çiftleri için trafik çarpanları: tablo indekslemesi veya tek model çağrısı"""
+        # Tatil etkisi artık HolidayService tarafından hesaplanıyor
+        # Burada sadece coğrafi ve mevsimsel etkileri hesaplıyoruz
+        return calculate_traffic_multipliers(self.cities_data, self.scaler, self.traffic_model, pairs,
+                                             getattr(self, "traffic_table", None))
+    
+    def calculate_toll_cost(self, route_distance: float, route_highways: List[str],
+                            vehicle_class: int = DEFAULT_VEHICLE_CLASS) -> Dict:
+        """Rota ücreti hesaplama (köprü/otoyol tarifesi, araç sınıfına göre)"""
+        return load_tariff().route_cost(route_distance, route_highways, vehicle_class)
 
-    def collect_all_cities_data(self, start_date: str, end_date: str):
-        """Tüm Türkiye şehirleri için tarihsel veri topla"""
+    def collect_all_cities_data(self, start_date: str, end_date: str, dry_run: bool = False,
+                                max_attempts: int = 3, requests_per_minute: float = 60.0,
+                                max_concurrency: int = 8, batch_size: int = 500):
+        """Tüm Türkiye şehirleri için tarihsel veri topla (yalnızca eksik günler)
+        
+        Tüm şehirler tek bir toplama çalıştırmasında, ortak keep-alive oturumla ve
+        requests_per_minute kotası altında eşzamanlı çekilir; satırlar toplu yazılır.
+        """
         print(f"📊 Tüm şehirler için tarihsel veri toplanıyor: {start_date} - {end_date}")
         
-        total_cities = len(self.cities_data)
-        current = 0
+        # Eksik gün tespiti geçici tablo kullanır: salt okunur okuyucu yerine ayrı bağlantı
+        conn = self.sqlite.open()
+        try:
+            missing = find_missing_days(conn, "weather_data", self.cities_data.keys(),
+                                        start_date, end_date, max_attempts=max_attempts)
+        finally:
+            conn.close()
         
-        for city_name in self.cities_data.keys():
-            current += 1
-            print(f"🔄 [{current}/{total_cities}] {city_name} için veri toplanıyor...")
-            
-            try:
-                self.collect_historical_data(city_name, start_date, end_date)
-                
-                # API limit aşımını önlemek için bekle
-                import time
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"❌ {city_name} için veri toplama hatası: {e}")
-                continue
+        plan = summarize_missing(missing, len(self.cities_data) * len(date_range(start_date, end_date)))
+        print_plan(plan)
+        if dry_run or not missing:
+            return plan
         
+        # Gün sırasıyla ilerle: eşzamanlı istekler ve her yazım birden fazla şehri kapsar
+        pairs = sorted(missing, key=lambda pair: (pair[1], pair[0]))
+        print(f"🔄 {len(pairs)} eksik gün toplanıyor (dakikada en fazla {requests_per_minute:g} istek, "
+              f"{max_concurrency} eşzamanlı)...")
+        
+        try:
+            stats = self._collect_days(pairs, requests_per_minute=requests_per_minute,
+                                       max_concurrency=max_concurrency, batch_size=batch_size)
+        except Exception as e:
+            print(f"❌ Veri toplama hatası: {e}")
+            return plan
+        
+        print(f"✅ {stats['saved']}/{stats['jobs']} gün kaydedildi "
+              f"({stats['requests']} istek, {stats['retries']} yeniden deneme, "
+              f"{stats['failed']} hata, {stats['no_data']} veri yok, {stats['elapsed_seconds']} sn)")
         print("✅ Tüm şehirler için tarihsel veri toplama tamamlandı!")
+        return plan
     
     def update_city_statistics(self):
-        """Şehir istatistiklerini güncelle"""
+        """Şehir istatistiklerini güncelle (tek okuma, vektörel gruplama, tek transaction)
+        
+        weather_data'nın son 3 yılı bir kez okunur; her şehir × takvim günü (29 Şubat ve
+        29–31 dahil) için ortalamalar gruplanarak hesaplanır ve tek seferde yazılır.
+        Olasılıklar city_statistics_probabilities tablosuna, en olası sınıf özet satırına yazılır.
+        """
         print("📈 Şehir istatistikleri güncelleniyor...")
+        started = time.perf_counter()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Okuma okuyucu bağlantısında; yazıcı kilidi yalnızca toplu yazım süresince tutulur
+        statistics, probabilities = window_statistics(self.sqlite.reader(), self.cities_data.keys(), window_years())
+        with self.sqlite.writer() as conn:
+            write_statistics(conn, statistics, probabilities)
         
-        for city_name in self.cities_data.keys():
-            print(f"🔄 {city_name} istatistikleri hesaplanıyor...")
-            
-            # Her gün için istatistik hesapla
-            for month in range(1, 13):
-                for day in range(1, 29):  # Her ayın 28 günü
-                    historical_data = self.get_historical_average(city_name, month, day)
-                    
-                    # İstatistikleri veritabanına kaydet
-                    weather_probs_json = json.dumps(historical_data['weather_probabilities'])
-                    
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO city_statistics 
-                        (city, month, day, avg_temperature, avg_humidity, avg_wind_speed, 
-                         weather_probabilities, sample_count)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (city_name, month, day, historical_data['avg_temperature'],
-                          historical_data['avg_humidity'], historical_data['avg_wind_speed'],
-                          weather_probs_json, historical_data['sample_count']))
-        
-        conn.commit()
-        conn.close()
-        print("✅ Şehir istatistikleri güncellendi!")
+        self.historical_averages.invalidate()
+        print(f"✅ Şehir istatistikleri güncellendi! ({len(statistics)} gün, {time.perf_counter() - started:.1f} sn)")
     
     def get_city_statistics(self, city: str, month: int, day: int) -> Dict:
-        """Veritabanından şehir istatistiklerini al"""
+        """Veritabanından şehir istatistiklerini al (normalize olasılıklar, JSON ayrıştırma yok)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT avg_temperature, avg_humidity, avg_wind_speed, 
-                       weather_probabilities, sample_count
-                FROM city_statistics 
-                WHERE city = ? AND month = ? AND day = ?
-            ''', (city, month, day))
+            result = read_statistics(self.sqlite.reader().cursor(), city, month, day)
             
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                weather_probabilities = json.loads(result[3])
-                most_likely_weather = max(weather_probabilities, key=weather_probabilities.get)
-                
-                return {
-                    'avg_temperature': result[0],
-                    'avg_humidity': result[1],
-                    'avg_wind_speed': result[2],
-                    'weather_probabilities': weather_probabilities,
-                    'most_likely_weather': most_likely_weather,
-                    'confidence': weather_probabilities[most_likely_weather],
-                    'sample_count': result[4]
-                }
-            else:
-                # Veritabanında yoksa hesapla
-                return self.get_historical_average(city, month, day)
+            if result is not None:
+                return result
+            # Veritabanında yoksa hesapla
+            return self.get_historical_average(city, month, day)
                 
         except Exception as e:
             print(f"❌ {city} istatistik hatası: {e}")
             return self.get_historical_average(city, month, day)
+    
+    def get_days_with_weather_probability(self, weather: str, min_probability: float,
+                                          city: str = None) -> List[Dict]:
+        """Hava durumu olasılığı eşiği aşan günler (ör. P(kar) > 0.3), indeksli tek sorgu"""
+        cursor = self.sqlite.reader().cursor()
+        cursor.execute(f'''
+            SELECT p.city, p.month, p.day, p.probability
+            FROM city_statistics_probabilities p
+            JOIN weather_classes c ON c.id = p.class_id
+            WHERE c.name = ? AND p.probability > ? {"AND p.city = ?" if city else ""}
+            ORDER BY p.city, p.month, p.day
+        ''', (weather, min_probability, city) if city else (weather, min_probability))
+        return [
+            {"city": row[0], "month": row[1], "day": row[2], "probability": row[3]}
+            for row in cursor.fetchall()
+        ]
 
 # Test fonksiyonu
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 from advanced_weather_data import MLWeatherDatabase
+from toll_tariffs import DEFAULT_VEHICLE_CLASS
 import json
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
@@ -26,6 +27,10 @@ class AdvancedWeatherPredictor:
             
             predictions = []
             
+            # Rotadaki tüm şehirlerin trafik çarpanları tek çağrıda
+            traffic_multipliers = dict(zip(cities, self.db.calculate_traffic_multipliers(
+                [(city, date_str) for city in cities])))
+            
             for city in cities:
                 try:
                     # Kullanıcının istediği hava durumu varsa onu kullan
@@ -75,7 +80,7 @@ class AdvancedWeatherPredictor:
                     is_holiday, holiday_name = self._check_holiday_simple(date_str)
                     
                     # Trafik çarpanı hesaplama
-                    traffic_multiplier = self.db.calculate_traffic_multiplier(city, date_str)
+                    traffic_multiplier = traffic_multipliers[city]
                     
                     # Trafik açıklaması
                     traffic_explanation = self._get_traffic_explanation(city, traffic_multiplier, is_holiday, holiday_name)
@@ -325,9 +330,10 @@ class AdvancedWeatherPredictor:
             }
         }
     
-    def calculate_route_cost(self, route_distance: float, route_highways: List[str]) -> Dict:
+    def calculate_route_cost(self, route_distance: float, route_highways: List[str],
+                             vehicle_class: int = DEFAULT_VEHICLE_CLASS) -> Dict:
         """Rota maliyeti hesaplama"""
-        return self.db.calculate_toll_cost(route_distance, route_highways)
+        return self.db.calculate_toll_cost(route_distance, route_highways, vehicle_class)
     
     def get_optimal_route_recommendations(self, cities: List[str], date_str: str, 
                                         preferences: Dict = None) -> Dict:
@@ -397,6 +403,7 @@ def health_check():
         "service": "ML-Based Weather Predictor",
         "cities_loaded": len(predictor.db.cities_data),
         "models_loaded": True,  # ML modelleri yüklü
+        "historical_average_cache": predictor.db.historical_averages.stats(),
         "features": [
             "ML tabanlı hava durumu tahmini",
             "Coğrafi veri analizi",
@@ -445,10 +452,13 @@ def calculate_route_cost():
         data = request.json
         distance = data.get('distance', 0)
         highways = data.get('highways', [])
+        vehicle_class = data.get('vehicle_class', DEFAULT_VEHICLE_CLASS)
         
-        result = predictor.calculate_route_cost(distance, highways)
+        result = predictor.calculate_route_cost(distance, highways, vehicle_class)
         return jsonify(result)
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -7,6 +7,8 @@ import joblib
 import json
 import os
 
+from toll_tariffs import DEFAULT_VEHICLE_CLASS, load_tariff
+
 # from traffic_ai_model import TrafficPredictionAI  # TensorFlow bağımlı olduğu için kaldırıyoruz
 # from route_optimization_ai import RouteOptimizationAI  # TensorFlow bağımlı olduğu için kaldırıyoruz
 
@@ -397,11 +399,12 @@ def calculate_cost():
         
         distance = data['distance']
         highways = data.get('highways', [])
+        vehicle_class = data.get('vehicle_class', DEFAULT_VEHICLE_CLASS)
         
-        # Basit maliyet hesaplama
-        fuel_cost = distance * 2.5  # km başına 2.5 TL
-        toll_cost = len(highways) * 25  # Her otoyol 25 TL
-        total_cost = fuel_cost + toll_cost
+        # Yakıt km başına 2.5 TL; köprü/otoyol ücreti tarife dosyasından
+        fuel_cost = distance * 2.5
+        toll_cost = float(load_tariff().costs([distance], [highways], [vehicle_class])[0, 0].round(2))
+        total_cost = round(fuel_cost + toll_cost, 2)
         
         return jsonify({
             'total_cost': total_cost,
@@ -409,9 +412,12 @@ def calculate_cost():
             'toll_cost': toll_cost,
             'distance': distance,
             'highways': highways,
+            'vehicle_class': vehicle_class,
             'currency': 'TRY'
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,366 @@
+"""
+Bellek İçi Materyalize Şehir İstatistikleri
+
+Bu modül, historical_weather tablosunu tek bir taramayla (GROUP BY) okuyup
+şehir × ay boyutlarında özet dizilere yükler. /statistics/<city> istekleri
+veritabanına hiç gitmeden bu dizilerden yanıtlanır.
+
+Özellikler:
+- Şehir × ay kayıt sayıları, hava durumu dağılımları ve sıcaklık toplamları
+- Kesin min/max sıcaklıklar; 0.1 °C çözünürlüklü histogram yalnızca yüzdelikler için (p10/p25/p50/p75/p90)
+- Toplayıcının yazdığı her batch ile artımlı güncelleme (yeniden tarama yok)
+- Başka süreçlerin yazımları için parmak izi kontrolü ile yeniden yükleme
+- Güncel bir Parquet anlık görüntüsü varsa yükleme SQL yerine sütunlu dosyalardan
+"""
+
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from weather_snapshot import OBSERVATIONS, category_ids
+
+# Sıcaklık histogramı: -60.0 … +60.0 °C, 0.1 °C adım
+TEMP_MIN = -60.0
+TEMP_STEP = 0.1
+TEMP_BINS = 1201
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def temperature_bin(temperature: float) -> int:
+    """Sıcaklığı histogram indeksine çevir (aralık dışı değerler kenar kutulara)"""
+    # SQL ROUND ile aynı yuvarlama (kaydırılmış değer pozitif olduğundan yarım yukarı)
+    index = math.floor((temperature - TEMP_MIN) / TEMP_STEP + 0.5)
+    return min(max(index, 0), TEMP_BINS - 1)
+
+
+class _StatsState:
+    """Şehir × ay özet dizileri"""
+
+    def __init__(self, cities: List[str], classes: List[str], epoch: int, fingerprint: tuple):
+        self.cities = cities
+        self.classes = classes
+        self.city_index = {city: i for i, city in enumerate(cities)}
+        self.class_index = {name: i for i, name in enumerate(classes)}
+        shape = (len(cities), 12)
+        self.records = np.zeros(shape, dtype=np.int64)
+        self.weather_counts = np.zeros(shape + (max(1, len(classes)),), dtype=np.int64)
+        self.temp_count = np.zeros(shape, dtype=np.int64)
+        self.temp_sum = np.zeros(shape, dtype=np.float64)
+        self.temp_min = np.full(shape, np.inf)
+        self.temp_max = np.full(shape, -np.inf)
+        self.histogram = np.zeros(shape + (TEMP_BINS,), dtype=np.int32)
+        self.epoch = epoch
+        self.fingerprint = fingerprint
+        # Şehir bazında hazırlanmış yanıtlar (veri değişince ilgili şehir için silinir)
+        self.responses: Dict[str, Dict] = {}
+
+    def class_id(self, weather_main: str) -> int:
+        """Sınıf indeksini getir; yeni bir sınıfsa diziyi genişlet"""
+        k = self.class_index.get(weather_main)
+        if k is None:
+            k = len(self.classes)
+            self.classes.append(weather_main)
+            self.class_index[weather_main] = k
+            if k >= self.weather_counts.shape[2]:
+                extra = np.zeros(self.weather_counts.shape[:2] + (1,), dtype=np.int64)
+                self.weather_counts = np.concatenate([self.weather_counts, extra], axis=2)
+        return k
+
+
+class CityStatisticsStore:
+    """historical_weather özetlerinin şehir × ay bellek içi görünümü"""
+
+    def __init__(self, collector, refresh_interval: float = 30.0):
+        self.collector = collector
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._state: Optional[_StatsState] = None
+        self.reload()
+        # Toplayıcının kaydettiği batch'ler doğrudan bu görünüme uygulanır
+        collector.batch_listeners.append(self.apply_batch)
+
+    def _fingerprint(self, conn) -> tuple:
+        """Başka süreçlerin yazımlarını algılamak için veri sürümü (historical_weather yazımlarında artar)"""
+        cursor = conn.cursor()
+        cursor.execute(self.collector.storage.sql("data_fingerprint"))
+        return tuple(cursor.fetchone())
+
+    def reload(self, epoch: Optional[int] = None):
+        """Özetleri historical_weather üzerinde tek taramayla yeniden oluştur"""
+        if epoch is None:
+            epoch = getattr(self.collector, "data_epoch", 0)
+        snapshot = getattr(self.collector, "snapshot", None)
+        rows = []
+        with self.collector.storage.read_connection() as conn:
+            fingerprint = self._fingerprint(conn)
+            use_snapshot = snapshot is not None and snapshot.is_fresh(fingerprint)
+            if not use_snapshot:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT city, month, weather_main,
+                           CAST(ROUND((temperature - ({TEMP_MIN})) / {TEMP_STEP}, 0) AS INTEGER) AS temp_bin,
+                           COUNT(*), COUNT(temperature), SUM(temperature), MIN(temperature), MAX(temperature)
+                    FROM historical_weather
+                    GROUP BY city, month, weather_main,
+                             CAST(ROUND((temperature - ({TEMP_MIN})) / {TEMP_STEP}, 0) AS INTEGER)
+                ''')
+                rows = cursor.fetchall()
+
+        if use_snapshot:
+            manifest = snapshot.manifest()
+            found_cities, classes = set(manifest["cities"]), list(manifest["weather_classes"])
+        else:
+            found_cities, classes = {row[0] for row in rows}, sorted({row[2] for row in rows})
+        known = list(self.collector.cities_data.keys())
+        cities = known + sorted(found_cities - set(known))
+        state = _StatsState(cities, classes, epoch, fingerprint)
+
+        if use_snapshot:
+            self._load_snapshot(state, snapshot)
+        elif rows:
+            n = len(rows)
+            city_ids = np.fromiter((state.city_index[row[0]] for row in rows), dtype=np.int64, count=n)
+            month_ids = np.fromiter((row[1] - 1 for row in rows), dtype=np.int64, count=n)
+            class_ids = np.fromiter((state.class_index[row[2]] for row in rows), dtype=np.int64, count=n)
+            bins = np.fromiter((-1 if row[3] is None else row[3] for row in rows), dtype=np.int64, count=n)
+            counts = np.fromiter((row[4] for row in rows), dtype=np.int64, count=n)
+            temp_counts = np.fromiter((row[5] for row in rows), dtype=np.int64, count=n)
+            temp_sums = np.fromiter((row[6] or 0.0 for row in rows), dtype=np.float64, count=n)
+
+            np.add.at(state.records, (city_ids, month_ids), counts)
+            np.add.at(state.weather_counts, (city_ids, month_ids, class_ids), counts)
+            np.add.at(state.temp_count, (city_ids, month_ids), temp_counts)
+            np.add.at(state.temp_sum, (city_ids, month_ids), temp_sums)
+            has_temp = temp_counts > 0
+            cells = (city_ids[has_temp], month_ids[has_temp])
+            np.minimum.at(state.temp_min, cells, [row[7] for row, keep in zip(rows, has_temp) if keep])
+            np.maximum.at(state.temp_max, cells, [row[8] for row, keep in zip(rows, has_temp) if keep])
+            np.add.at(state.histogram,
+                      (city_ids[has_temp], month_ids[has_temp], np.clip(bins[has_temp], 0, TEMP_BINS - 1)),
+                      temp_counts[has_temp])
+
+        self._state = state
+        self._last_check = time.monotonic()
+
+    @staticmethod
+    def _load_snapshot(state: _StatsState, snapshot, chunksize: int = 1_000_000):
+        """Özetleri anlık görüntünün dört kolonundan vektörel olarak hesapla (bincount ile)"""
+        n_cells, n_classes = state.records.size, state.weather_counts.shape[2]
+        columns = ["city", "month", "weather_main", "temperature"]
+        for frame in snapshot.iter_frames(OBSERVATIONS, columns, chunksize):
+            cell = category_ids(frame["city"], state.city_index) * 12 + frame["month"].to_numpy(np.int64) - 1
+            class_ids = category_ids(frame["weather_main"], state.class_index)
+            temperature = frame["temperature"].to_numpy(np.float64)
+            has_temp = ~np.isnan(temperature)
+
+            state.records += np.bincount(cell, minlength=n_cells).reshape(state.records.shape)
+            state.weather_counts += np.bincount(
+                cell * n_classes + class_ids, minlength=n_cells * n_classes
+            ).reshape(state.weather_counts.shape)
+
+            cell, temperature = cell[has_temp], temperature[has_temp]
+            state.temp_count += np.bincount(cell, minlength=n_cells).reshape(state.temp_count.shape)
+            state.temp_sum += np.bincount(cell, weights=temperature, minlength=n_cells).reshape(state.temp_sum.shape)
+            np.minimum.at(state.temp_min.reshape(-1), cell, temperature)
+            np.maximum.at(state.temp_max.reshape(-1), cell, temperature)
+            # temperature_bin ile aynı yuvarlama
+            bins = np.clip(np.floor((temperature - TEMP_MIN) / TEMP_STEP + 0.5), 0, TEMP_BINS - 1).astype(np.int64)
+            state.histogram += np.bincount(
+                cell * TEMP_BINS + bins, minlength=n_cells * TEMP_BINS
+            ).reshape(state.histogram.shape).astype(np.int32)
+
+    def ensure_fresh(self):
+        """Toplayıcı epoch'u veya tablo parmak izi değiştiyse özetleri yeniden yükle"""
+        state = self._state
+        epoch = getattr(self.collector, "data_epoch", 0)
+        if epoch <= state.epoch and time.monotonic() - self._last_check < self.refresh_interval:
+            return
+
+        with self._lock:
+            state = self._state
+            if epoch > state.epoch:
+                # Dinleyicisi olmayan bir değişiklik (ör. olasılık tablosunun yeniden oluşturulması)
+                self.reload()
+                return
+            if time.monotonic() - self._last_check < self.refresh_interval:
+                return
+            with self.collector.storage.read_connection() as conn:
+                fingerprint = self._fingerprint(conn)
+            if fingerprint != state.fingerprint:
+                self.reload()
+            else:
+                self._last_check = time.monotonic()
+
+    def apply_batch(self, params: List[Tuple], previous: Dict[Tuple[str, str], Tuple[str, Optional[float]]],
+                    epoch: int, fingerprint: tuple):
+        """Kaydedilen batch'i özetlere uygula (önceki gözlemler çıkarılır, yenileri eklenir)"""
+        with self._lock:
+            state = self._state
+            version, origin = fingerprint[0], fingerprint[1:]
+            if state.fingerprint[1:] == origin and state.fingerprint[0] >= version:
+                # Yükleme batch commit edildikten sonra okudu: batch özetlerde zaten var
+                state.epoch = max(state.epoch, epoch)
+                return
+            if state.fingerprint != (version - 1,) + origin \
+                    or any(param[0] not in state.city_index for param in params):
+                # Araya başka bir yazım girdi veya yeni şehir var: tam yeniden yükleme
+                self.reload(epoch)
+                return
+
+            seen = {}
+            stale_extremes = set()
+            for param in params:
+                city, date, weather_main, temperature = param[0], param[1], param[2], param[4]
+                key = (city, date)
+                i, m = state.city_index[city], int(date[5:7]) - 1
+                old = seen.get(key, previous.get(key))
+                if old is not None:
+                    self._add(state, i, m, old[0], old[1], -1)
+                    if old[1] is not None and (old[1] <= state.temp_min[i, m] or old[1] >= state.temp_max[i, m]):
+                        # Silinen değer ay içi uç değerdi: kesin min/max veritabanından yeniden okunur
+                        stale_extremes.add((i, m))
+                self._add(state, i, m, weather_main, temperature, 1)
+                seen[key] = (weather_main, temperature)
+                state.responses.pop(city, None)
+
+            if stale_extremes:
+                self._reload_extremes(state, stale_extremes)
+            state.epoch = epoch
+            state.fingerprint = fingerprint
+
+    @staticmethod
+    def _add(state: _StatsState, i: int, m: int, weather_main: str, temperature: Optional[float], sign: int):
+        k = state.class_id(weather_main)  # Dizi genişleyebilir, önce indeksi al
+        state.records[i, m] += sign
+        state.weather_counts[i, m, k] += sign
+        if temperature is not None:
+            state.temp_count[i, m] += sign
+            state.temp_sum[i, m] += sign * temperature
+            state.histogram[i, m, temperature_bin(temperature)] += sign
+            if sign > 0:
+                state.temp_min[i, m] = min(state.temp_min[i, m], temperature)
+                state.temp_max[i, m] = max(state.temp_max[i, m], temperature)
+
+    def _reload_extremes(self, state: _StatsState, cells):
+        """Uç değeri silinen şehir × ay hücrelerinin kesin MIN/MAX değerlerini tek sorguyla oku"""
+        cities = sorted({state.cities[i] for i, _ in cells})
+        with self.collector.storage.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT city, month, MIN(temperature), MAX(temperature)
+                FROM historical_weather
+                WHERE city IN ({", ".join("?" * len(cities))})
+                GROUP BY city, month
+            ''', cities)
+            extremes = {(state.city_index[city], month - 1): (low, high)
+                        for city, month, low, high in cursor.fetchall()}
+        for cell in cells:
+            low, high = extremes.get(cell, (None, None))
+            state.temp_min[cell] = np.inf if low is None else low
+            state.temp_max[cell] = -np.inf if high is None else high
+
+    @staticmethod
+    def _temperature_summary(histogram: np.ndarray, count: int, total: float,
+                             minimum: float, maximum: float) -> Tuple[Dict, Dict]:
+        """Toplamlardan ortalama, kesin min/max; histogramdan yüzdelikler"""
+        if count <= 0:
+            stats = {"avg_temp": None, "min_temp": None, "max_temp": None}
+            return stats, {f"p{p}": None for p in PERCENTILES}
+
+        cumulative = np.cumsum(histogram)
+        to_temp = lambda index: round(TEMP_MIN + int(index) * TEMP_STEP, 1)
+        stats = {
+            "avg_temp": round(total / count, 2),
+            "min_temp": float(minimum),
+            "max_temp": float(maximum)
+        }
+        # En yakın sıra (nearest-rank) yüzdelik
+        percentiles = {
+            f"p{p}": to_temp(np.searchsorted(cumulative, max(1, int(np.ceil(p / 100 * count)))))
+            for p in PERCENTILES
+        }
+        return stats, percentiles
+
+    def _distribution(self, state: _StatsState, counts: np.ndarray) -> List[Dict]:
+        return [
+            {"weather_main": state.classes[k], "count": int(counts[k])}
+            for k in np.argsort(-counts, kind="stable") if counts[k] > 0
+        ]
+
+    def get_city_statistics(self, city: str) -> Dict:
+        """Şehir için genel ve aylık istatistikler (veritabanı sorgusu yok)"""
+        self.ensure_fresh()
+        state = self._state
+        response = state.responses.get(city)
+        if response is None:
+            # Artımlı güncellemeyle yarışmamak için kilit altında hazırla
+            with self._lock:
+                state = self._state
+                response = state.responses.get(city)
+                if response is None:
+                    response = self._build_response(state, city)
+                    state.responses[city] = response
+        return response
+
+    def _build_response(self, state: _StatsState, city: str) -> Dict:
+        i = state.city_index.get(city)
+        if i is None:
+            stats, percentiles = self._temperature_summary(None, 0, 0.0, None, None)
+            return {
+                "city": city,
+                "total_records": 0,
+                "weather_distribution": [],
+                "temperature_stats": stats,
+                "temperature_percentiles": percentiles,
+                "monthly": []
+            }
+
+        records = state.records[i]
+        weather_counts = state.weather_counts[i]
+        histogram = state.histogram[i]
+        temp_count = state.temp_count[i]
+        temp_sum = state.temp_sum[i]
+
+        stats, percentiles = self._temperature_summary(
+            histogram.sum(axis=0), int(temp_count.sum()), float(temp_sum.sum()),
+            state.temp_min[i].min(), state.temp_max[i].max()
+        )
+        monthly = []
+        for m in range(12):
+            if records[m] == 0:
+                continue
+            month_stats, month_percentiles = self._temperature_summary(
+                histogram[m], int(temp_count[m]), float(temp_sum[m]), state.temp_min[i, m], state.temp_max[i, m]
+            )
+            monthly.append({
+                "month": m + 1,
+                "records": int(records[m]),
+                "weather_distribution": self._distribution(state, weather_counts[m]),
+                "temperature_stats": month_stats,
+                "temperature_percentiles": month_percentiles
+            })
+
+        return {
+            "city": city,
+            "total_records": int(records.sum()),
+            "weather_distribution": self._distribution(state, weather_counts.sum(axis=0)),
+            "temperature_stats": stats,
+            "temperature_percentiles": percentiles,
+            "monthly": monthly
+        }
+
+    @property
+    def fingerprint(self) -> tuple:
+        """Yüklü özetlerin tablo parmak izi (yanıt ETag'leri için)"""
+        return self._state.fingerprint
+
+    @property
+    def nbytes(self) -> int:
+        """Özet dizilerinin toplam bellek kullanımı (byte)"""
+        state = self._state
+        return sum(a.nbytes for a in (state.records, state.weather_counts, state.temp_count,
+                                      state.temp_sum, state.temp_min, state.temp_max, state.histogram))
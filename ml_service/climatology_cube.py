@@ -0,0 +1,277 @@
+"""
+Bellek İçi Klimatoloji Olasılık Küpü
+
+Bu modül, daily_probabilities tablosunu başlangıçta bir kez okuyup
+şehir × yılın günü × hava durumu sınıfı boyutlarında yoğun (dense) NumPy
+dizilerine yükler. Böylece her tahmin için SQL sorgusu + DataFrame
+oluşturmak yerine O(1) dizi indekslemesi yapılır.
+
+Özellikler:
+- Sayılar (int32) ve olasılıklar (float64) için ayrı küpler
+- Tek şehir/gün için O(1), bütün rota için tek fancy-indexing çağrısı
+- Toplayıcının kaydettiği batch'ler küpe artımlı uygulanır (veri alımında tam yükleme yok)
+- Başka süreçlerin yazımları için parmak izi kontrolü ile yeniden yükleme
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Artık yıl takvimi ile ay başlangıç indeksleri (29 Şubat dahil 366 gün)
+MONTH_OFFSETS = np.array([0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335])
+DAYS_IN_YEAR = 366
+
+
+def day_of_year_index(month, day):
+    """(ay, gün) → 0..365 arası sabit indeks (skaler veya dizi)"""
+    return MONTH_OFFSETS[np.asarray(month) - 1] + np.asarray(day) - 1
+
+
+class _CubeState:
+    """Tek seferde değiştirilen (atomik) küp içeriği"""
+
+    def __init__(self, cities: List[str], classes: List[str], counts: np.ndarray,
+                 probabilities: np.ndarray, totals: np.ndarray, epoch: int, fingerprint: tuple):
+        self.cities = cities
+        self.classes = classes
+        self.city_index = {city: i for i, city in enumerate(cities)}
+        self.counts = counts
+        self.probabilities = probabilities
+        self.totals = totals
+        self.epoch = epoch
+        self.fingerprint = fingerprint
+
+
+class ClimatologyCube:
+    """daily_probabilities verisinin şehir × gün × sınıf NumPy küpü"""
+
+    def __init__(self, collector, refresh_interval: float = 30.0):
+        self.collector = collector
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._state: Optional[_CubeState] = None
+        self.reload()
+        # Toplayıcının kaydettiği batch'ler doğrudan küpe uygulanır
+        collector.batch_listeners.append(self.apply_batch)
+
+    def _fingerprint(self, conn) -> tuple:
+        """Başka süreçlerin yazımlarını algılamak için veri sürümü (sayaç yazımlarında ve yeniden oluşturmada artar)"""
+        cursor = conn.cursor()
+        cursor.execute(self.collector.storage.sql("data_fingerprint"))
+        return tuple(cursor.fetchone())
+
+    def reload(self, epoch: Optional[int] = None):
+        """Küpü veritabanından yeniden oluştur"""
+        if epoch is None:
+            epoch = getattr(self.collector, "data_epoch", 0)
+        with self.collector.storage.read_connection() as conn:
+            fingerprint = self._fingerprint(conn)
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT city, month, day, weather_main, probability, sample_count FROM daily_probabilities"
+            )
+            rows = cursor.fetchall()
+
+        # Bilinen şehirler önce, veritabanında olup listede olmayanlar sona
+        known = list(self.collector.cities_data.keys())
+        known_set = set(known)
+        cities = known + sorted({row[0] for row in rows} - known_set)
+        classes = sorted({row[3] for row in rows})
+        city_index = {city: i for i, city in enumerate(cities)}
+        class_index = {name: i for i, name in enumerate(classes)}
+
+        counts = np.zeros((len(cities), DAYS_IN_YEAR, max(1, len(classes))), dtype=np.int32)
+        probabilities = np.zeros(counts.shape, dtype=np.float64)
+
+        if rows:
+            city_ids = np.fromiter((city_index[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+            months = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+            days = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+            class_ids = np.fromiter((class_index[row[3]] for row in rows), dtype=np.int64, count=len(rows))
+            day_ids = day_of_year_index(months, days)
+            probabilities[city_ids, day_ids, class_ids] = [row[4] for row in rows]
+            counts[city_ids, day_ids, class_ids] = [row[5] for row in rows]
+
+        totals = counts.sum(axis=2)
+        self._state = _CubeState(cities, classes, counts, probabilities, totals, epoch, fingerprint)
+        self._last_check = time.monotonic()
+
+    def ensure_fresh(self):
+        """Toplayıcı epoch'u veya tablo parmak izi değiştiyse küpü yeniden yükle"""
+        state = self._state
+        epoch = getattr(self.collector, "data_epoch", 0)
+        now = time.monotonic()
+
+        if epoch <= state.epoch and now - self._last_check < self.refresh_interval:
+            return
+
+        with self._lock:
+            state = self._state
+            if epoch > state.epoch:
+                # Dinleyicisi olmayan bir değişiklik (ör. olasılık tablosunun yeniden oluşturulması)
+                self.reload()
+                return
+            if time.monotonic() - self._last_check < self.refresh_interval:
+                return
+            with self.collector.storage.read_connection() as conn:
+                fingerprint = self._fingerprint(conn)
+            if fingerprint != state.fingerprint:
+                self.reload()
+            else:
+                self._last_check = time.monotonic()
+
+    def apply_batch(self, params: List[Tuple], previous: Dict[Tuple[str, str], Tuple[str, Optional[float]]],
+                    epoch: int, fingerprint: tuple):
+        """Kaydedilen batch'in sayaç değişikliklerini küpe uygula (_update_probability_counters ile aynı)
+
+        Okuyucular kilitsiz okuduğu için diziler yerinde değiştirilmez: değişiklikler kopyalara
+        uygulanır ve reload() gibi tek bir referans değişimiyle yeni _CubeState yayımlanır.
+        """
+        with self._lock:
+            state = self._state
+            version, origin = fingerprint[0], fingerprint[1:]
+            if state.fingerprint[1:] == origin and state.fingerprint[0] >= version:
+                # Yükleme batch commit edildikten sonra okudu: batch küpte zaten var
+                if epoch > state.epoch:
+                    self._state = _CubeState(state.cities, state.classes, state.counts, state.probabilities,
+                                             state.totals, epoch, state.fingerprint)
+                return
+            class_index = {name: k for k, name in enumerate(state.classes)}
+            if state.fingerprint != (version - 1,) + origin \
+                    or any(param[0] not in state.city_index or param[2] not in class_index for param in params) \
+                    or any(value[0] not in class_index for value in previous.values()):
+                # Araya başka bir yazım girdi veya yeni şehir/sınıf var: tam yeniden yükleme
+                self.reload(epoch)
+                return
+
+            counts = state.counts.copy()
+            totals = state.totals.copy()
+            current = {key: value[0] for key, value in previous.items()}
+            touched = set()
+            for param in params:
+                city, date, weather_main = param[0], param[1], param[2]
+                old_weather = current.get((city, date))
+                if old_weather == weather_main:
+                    continue
+                i, d = state.city_index[city], int(day_of_year_index(int(date[5:7]), int(date[8:10])))
+                if old_weather is None:
+                    totals[i, d] += 1
+                else:
+                    counts[i, d, class_index[old_weather]] -= 1
+                counts[i, d, class_index[weather_main]] += 1
+                current[(city, date)] = weather_main
+                touched.add((i, d))
+
+            # Yalnızca etkilenen günlerin olasılıkları yeniden hesaplanır
+            probabilities = state.probabilities.copy() if touched else state.probabilities
+            for i, d in touched:
+                total = totals[i, d]
+                probabilities[i, d] = counts[i, d] / total if total > 0 else 0.0
+
+            self._state = _CubeState(state.cities, state.classes, counts, probabilities, totals, epoch, fingerprint)
+
+    @property
+    def cities(self) -> List[str]:
+        """Küpteki şehirler (bilinen şehirler + veritabanındaki diğerleri)"""
+        return self._state.cities
+
+    @property
+    def fingerprint(self) -> tuple:
+        """Yüklü küpün tablo parmak izi (küpten türetilen önbelleklerin geçerliliği için)"""
+        return self._state.fingerprint
+
+    @property
+    def nbytes(self) -> int:
+        """Küplerin toplam bellek kullanımı (byte)"""
+        state = self._state
+        return state.counts.nbytes + state.probabilities.nbytes + state.totals.nbytes
+
+    def _result(self, state: _CubeState, city: str, month: int, day: int,
+                probabilities: Optional[np.ndarray], counts: Optional[np.ndarray]) -> Dict:
+        """Küp satırını get_daily_weather_probability ile aynı formata çevir"""
+        if probabilities is None or counts.sum() == 0:
+            return {
+                "city": city,
+                "date": f"{month:02d}-{day:02d}",
+                "weather_probabilities": {},
+                "most_likely": "Unknown",
+                "confidence": 0.0,
+                "sample_count": 0
+            }
+
+        present = np.flatnonzero(counts)
+        order = present[np.argsort(-probabilities[present], kind="stable")]
+        weather_probabilities = {
+            state.classes[k]: {
+                "probability": float(probabilities[k]),
+                "sample_count": int(counts[k])
+            }
+            for k in order
+        }
+        return {
+            "city": city,
+            "date": f"{month:02d}-{day:02d}",
+            "weather_probabilities": weather_probabilities,
+            "most_likely": state.classes[order[0]],
+            "confidence": float(probabilities[order[0]]),
+            "sample_count": int(counts.sum())
+        }
+
+    def get_daily_weather_probability(self, city: str, month: int, day: int) -> Dict:
+        """Belirli bir gün için hava durumu olasılıkları (O(1) indeksleme)"""
+        self.ensure_fresh()
+        state = self._state
+        i = state.city_index.get(city)
+        if i is None:
+            return self._result(state, city, month, day, None, None)
+        d = int(day_of_year_index(month, day))
+        return self._result(state, city, month, day, state.probabilities[i, d], state.counts[i, d])
+
+    def lookup_route(self, cities: Sequence[str], months, days) -> Dict[str, np.ndarray]:
+        """Birden fazla (şehir, ay, gün) için tek fancy-indexing çağrısı
+
+        months/days skaler (tüm şehirler aynı gün) veya şehir sayısı uzunluğunda dizi olabilir.
+        Dönen sözlükte her şehir için olasılık/sayı satırları, en olası sınıf ve güven bulunur.
+        """
+        self.ensure_fresh()
+        return self._lookup(self._state, cities, months, days)
+
+    def _lookup(self, state: _CubeState, cities: Sequence[str], months, days) -> Dict[str, np.ndarray]:
+        city_ids = np.array([state.city_index.get(city, -1) for city in cities], dtype=np.int64)
+        known = city_ids >= 0
+        day_ids = np.broadcast_to(day_of_year_index(months, days), city_ids.shape)
+
+        safe_ids = np.where(known, city_ids, 0)
+        probabilities = state.probabilities[safe_ids, day_ids]
+        counts = state.counts[safe_ids, day_ids]
+        probabilities[~known] = 0.0
+        counts[~known] = 0
+
+        sample_counts = counts.sum(axis=1)
+        best = probabilities.argmax(axis=1)
+        confidence = probabilities[np.arange(len(city_ids)), best]
+        return {
+            "classes": state.classes,
+            "probabilities": probabilities,
+            "counts": counts,
+            "sample_count": sample_counts,
+            "most_likely_index": best,
+            "confidence": np.where(sample_counts > 0, confidence, 0.0),
+        }
+
+    def get_route_probabilities(self, cities: Sequence[str], month: int, day: int) -> List[Dict]:
+        """Rota üzerindeki şehirler için get_daily_weather_probability formatında sonuçlar"""
+        return self.get_probabilities(cities, [month] * len(cities), [day] * len(cities))
+
+    def get_probabilities(self, cities: Sequence[str], months: Sequence[int], days: Sequence[int]) -> List[Dict]:
+        """(şehir, ay, gün) üçlüleri için get_daily_weather_probability formatında sonuçlar (tek indeksleme)"""
+        self.ensure_fresh()
+        state = self._state
+        batch = self._lookup(state, cities, np.asarray(months, dtype=np.int64), np.asarray(days, dtype=np.int64))
+        return [
+            self._result(state, city, int(months[i]), int(days[i]), batch["probabilities"][i], batch["counts"][i])
+            for i, city in enumerate(cities)
+        ]
@@ -0,0 +1,148 @@
+"""
+Kaldığı Yerden Devam Edebilen (Resumable) Veri Toplama Yardımcıları
+
+Bu modül, tarihsel veri toplama işlerinin kesintiye uğradıktan sonra baştan
+başlamak yerine yalnızca eksik günleri çekmesini sağlar.
+
+Özellikler:
+- Beklenen (şehir, tarih) kümesi ile veri tablosu arasında tek anti-join ile eksik gün tespiti
+- collection_journal tablosu: veri dönmeyen veya kalıcı hata veren günlerin kaydı
+  (bir sonraki çalıştırmada sonsuza kadar yeniden denenmezler)
+- Dry-run için kalan API çağrısı özeti
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+# Journal durumları
+STATUS_NO_DATA = "no_data"   # API 200 döndü ama veri yok → tekrar denemeye gerek yok
+STATUS_FAILED = "failed"     # Yeniden denemeler tükendi → max_attempts'a kadar tekrar denenir
+
+JOURNAL_DDL_SQLITE = '''
+    CREATE TABLE IF NOT EXISTS collection_journal (
+        city TEXT NOT NULL,
+        date TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 1,
+        last_error TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(city, date)
+    )
+'''
+
+JOURNAL_DDL_SQLSERVER = '''
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='collection_journal' AND xtype='U')
+    CREATE TABLE collection_journal (
+        city NVARCHAR(100) NOT NULL,
+        date NVARCHAR(10) NOT NULL,
+        status NVARCHAR(20) NOT NULL,
+        attempts INT NOT NULL DEFAULT 1,
+        last_error NVARCHAR(400),
+        updated_at DATETIME DEFAULT GETDATE(),
+        CONSTRAINT UQ_collection_journal_city_date UNIQUE(city, date)
+    )
+'''
+
+
+def date_range(start_date: str, end_date: str) -> List[str]:
+    """Başlangıç ve bitiş dahil YYYY-MM-DD tarih listesi"""
+    current = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    dates = []
+    while current <= end:
+        dates.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    return dates
+
+
+def find_missing_days(conn, data_table: str, cities: Iterable[str], start_date: str, end_date: str,
+                      max_attempts: int = 3, sqlite: bool = True) -> List[Tuple[str, str]]:
+    """Veri tablosunda olmayan ve journal'a göre hâlâ denenmesi gereken (şehir, tarih) çiftleri
+
+    Beklenen çiftler geçici tabloya yazılır, eksikler tek anti-join sorgusuyla bulunur.
+    """
+    expected_table = "temp_expected_days" if sqlite else "#expected_days"
+    expected = [(city, date) for city in cities for date in date_range(start_date, end_date)]
+    if not expected:
+        return []
+
+    cursor = conn.cursor()
+    if sqlite:
+        cursor.execute(f"DROP TABLE IF EXISTS {expected_table}")
+        cursor.execute(f"CREATE TEMP TABLE {expected_table} (city TEXT NOT NULL, date TEXT NOT NULL, PRIMARY KEY (city, date))")
+    else:
+        cursor.execute(f"IF OBJECT_ID('tempdb..{expected_table}') IS NOT NULL DROP TABLE {expected_table}")
+        cursor.execute(f"CREATE TABLE {expected_table} (city NVARCHAR(100) NOT NULL, date NVARCHAR(10) NOT NULL, PRIMARY KEY (city, date))")
+        cursor.fast_executemany = True
+    cursor.executemany(f"INSERT INTO {expected_table} (city, date) VALUES (?, ?)", expected)
+
+    cursor.execute(f'''
+        SELECT e.city, e.date
+        FROM {expected_table} e
+        WHERE NOT EXISTS (
+                SELECT 1 FROM {data_table} d WHERE d.city = e.city AND d.date = e.date
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM collection_journal j
+                WHERE j.city = e.city AND j.date = e.date
+                    AND (j.status = '{STATUS_NO_DATA}' OR j.attempts >= ?)
+            )
+        ORDER BY e.city, e.date
+    ''', (max_attempts,))
+    missing = [(row[0], row[1]) for row in cursor.fetchall()]
+    cursor.execute(f"DROP TABLE {expected_table}")
+    conn.commit()
+    return missing
+
+
+def record_journal_entries(conn, entries: List[Tuple[str, str, str, str]], sqlite: bool = True):
+    """(şehir, tarih, durum, hata) kayıtlarını journal'a yaz; tekrar eden hatalarda deneme sayısını artır"""
+    if not entries:
+        return
+    cursor = conn.cursor()
+    if sqlite:
+        cursor.executemany('''
+            INSERT INTO collection_journal (city, date, status, attempts, last_error)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(city, date) DO UPDATE SET
+                status = excluded.status,
+                attempts = attempts + 1,
+                last_error = excluded.last_error,
+                updated_at = CURRENT_TIMESTAMP
+        ''', entries)
+    else:
+        cursor.executemany('''
+            MERGE collection_journal AS target
+            USING (SELECT ? as city, ? as date, ? as status, ? as last_error) AS source
+            ON target.city = source.city AND target.date = source.date
+            WHEN MATCHED THEN UPDATE SET status = source.status, attempts = target.attempts + 1,
+                last_error = source.last_error, updated_at = GETDATE()
+            WHEN NOT MATCHED THEN INSERT (city, date, status, attempts, last_error)
+                VALUES (source.city, source.date, source.status, 1, source.last_error);
+        ''', entries)
+    conn.commit()
+
+
+def summarize_missing(missing: List[Tuple[str, str]], expected_total: int) -> Dict:
+    """Dry-run raporu: kalan API çağrısı sayısı ve şehir bazlı dağılım"""
+    per_city = OrderedDict()
+    for city, _ in missing:
+        per_city[city] = per_city.get(city, 0) + 1
+    return {
+        "expected_days": expected_total,
+        "already_collected": expected_total - len(missing),
+        "remaining_calls": len(missing),
+        "cities_with_gaps": len(per_city),
+        "per_city": dict(per_city)
+    }
+
+
+def print_plan(summary: Dict, top: int = 10):
+    """Toplama planını konsola yazdır"""
+    print(f"🧭 Beklenen gün: {summary['expected_days']:,} | "
+          f"toplanmış: {summary['already_collected']:,} | "
+          f"kalan API çağrısı: {summary['remaining_calls']:,} "
+          f"({summary['cities_with_gaps']} şehirde eksik)")
+    for city, count in sorted(summary["per_city"].items(), key=lambda x: -x[1])[:top]:
+        print(f"   {city}: {count} gün")
@@ -0,0 +1,195 @@
+"""
+Yerel OpenWeatherMap Taklit Sunucusu
+
+Bu modül, veri toplama motorlarını gerçek API'ye çıkmadan (çevrimdışı)
+test etmek ve hızını ölçmek için OpenWeatherMap'in tarihsel veri
+(`/data/2.5/onecall/timemachine`) ve şehir adıyla hava durumu (`/data/2.5/weather`)
+yanıtlarını taklit eden küçük bir HTTP sunucusudur.
+
+Özellikler:
+- Şehir koordinatı ve tarihe göre deterministik (tekrarlanabilir) yanıtlar
+- Yapay gecikme (latency) ekleme
+- Hata enjeksiyonu (429 / 500) ile retry mantığını test etme
+- İstek sayacı
+
+Kullanım:
+    python fake_openweather_server.py --port 8089 --latency 0.05
+"""
+
+import json
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+TIMEMACHINE_PATH = "/data/2.5/onecall/timemachine"
+CURRENT_WEATHER_PATH = "/data/2.5/weather"
+
+# Hava durumu sınıfları (OpenWeatherMap "main" değerleri)
+WEATHER_CLASSES = [
+    ("Clear", "clear sky"),
+    ("Clouds", "scattered clouds"),
+    ("Rain", "light rain"),
+    ("Snow", "light snow"),
+    ("Mist", "mist"),
+]
+
+
+def synthetic_observation(lat: float, lon: float, dt: int) -> dict:
+    """Koordinat ve zaman damgasından deterministik bir gözlem üret"""
+    date_obj = datetime.fromtimestamp(dt)
+    day_of_year = date_obj.timetuple().tm_yday
+    seed = zlib.crc32(f"{lat:.4f}:{lon:.4f}:{date_obj.strftime('%Y-%m-%d')}".encode())
+
+    # Kışın kar/yağmur, yazın açık hava ağırlıklı basit bir iklim
+    is_winter = date_obj.month in (12, 1, 2)
+    if is_winter and seed % 3 == 0:
+        weather_main, description = WEATHER_CLASSES[3]
+    else:
+        weather_main, description = WEATHER_CLASSES[seed % 3 if not is_winter else 1 + seed % 2]
+
+    temperature = round(15 - 12 * (1 if is_winter else 0) + (day_of_year % 30) / 3 - (lat - 36) * 0.8, 2)
+    return {
+        "dt": dt,
+        "temp": temperature,
+        "humidity": 40 + seed % 50,
+        "wind_speed": round((seed % 120) / 10, 1),
+        "weather": [{"main": weather_main, "description": description}],
+    }
+
+
+def city_coordinates(query: str) -> Tuple[float, float]:
+    """q=Şehir,TR sorgusundan Türkiye sınırları içinde deterministik sahte koordinat"""
+    seed = zlib.crc32(query.split(",")[0].strip().lower().encode())
+    return round(36.0 + (seed % 600) / 100, 4), round(26.0 + (seed // 600 % 1900) / 100, 4)
+
+
+class _FakeOpenWeatherHandler(BaseHTTPRequestHandler):
+    """Timemachine ve /weather isteklerini yanıtlayan HTTP handler"""
+
+    protocol_version = "HTTP/1.1"
+    # Başlık ve gövde ayrı yazıldığında Nagle + gecikmeli ACK ~40 ms ekler
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+        with server.lock:
+            server.request_count += 1
+            request_no = server.request_count
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        # Hata enjeksiyonu: her N. istek başarısız olur
+        if server.fail_every and request_no % server.fail_every == 0:
+            status = server.fail_status
+            body = {"cod": status, "message": "injected failure"}
+            self._send_json(status, body, retry_after=status == 429)
+            return
+
+        if parsed.path == CURRENT_WEATHER_PATH:
+            self._send_current_weather(params)
+            return
+
+        if parsed.path != TIMEMACHINE_PATH:
+            self._send_json(404, {"cod": 404, "message": "not found"})
+            return
+
+        try:
+            lat = float(params["lat"])
+            lon = float(params["lon"])
+            dt = int(params["dt"])
+        except (KeyError, ValueError):
+            self._send_json(400, {"cod": 400, "message": "lat, lon ve dt gerekli"})
+            return
+
+        observation = synthetic_observation(lat, lon, dt)
+        self._send_json(200, {
+            "lat": lat,
+            "lon": lon,
+            "timezone": "Europe/Istanbul",
+            "timezone_offset": 10800,
+            "data": [observation],
+        })
+
+    def _send_current_weather(self, params: dict):
+        """/data/2.5/weather: q=şehir,TR ve dt ile aynı sentetik gözlem, OpenWeatherMap biçiminde"""
+        if not params.get("q"):
+            self._send_json(400, {"cod": 400, "message": "q gerekli"})
+            return
+        try:
+            dt = int(params.get("dt", time.time()))
+        except ValueError:
+            self._send_json(400, {"cod": 400, "message": "dt geçersiz"})
+            return
+
+        lat, lon = city_coordinates(params["q"])
+        observation = synthetic_observation(lat, lon, dt)
+        self._send_json(200, {
+            "coord": {"lat": lat, "lon": lon},
+            "weather": observation["weather"],
+            "main": {"temp": observation["temp"], "humidity": observation["humidity"]},
+            "wind": {"speed": observation["wind_speed"]},
+            "dt": dt,
+            "name": params["q"].split(",")[0],
+            "cod": 200,
+        })
+
+    def _send_json(self, status: int, body: dict, retry_after: bool = False):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if retry_after:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Benchmark çıktısını kirletmemek için istek loglarını sustur
+        pass
+
+
+def start_fake_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                      fail_every: int = 0, fail_status: int = 500) -> Tuple[ThreadingHTTPServer, str]:
+    """Taklit sunucuyu arka planda başlat, (sunucu, base_url) döndür"""
+    server = ThreadingHTTPServer((host, port), _FakeOpenWeatherHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_every = fail_every
+    server.fail_status = fail_status
+    server.request_count = 0
+    server.lock = threading.Lock()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://{host}:{server.server_address[1]}"
+    return server, base_url
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Yerel OpenWeatherMap taklit sunucusu")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="İstek başına yapay gecikme (saniye)")
+    parser.add_argument("--fail-every", type=int, default=0, help="Her N. isteği başarısız yap (0 = kapalı)")
+    parser.add_argument("--fail-status", type=int, default=500)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(port=args.port, latency=args.latency,
+                                         fail_every=args.fail_every, fail_status=args.fail_status)
+    print(f"🌐 Taklit OpenWeatherMap sunucusu çalışıyor: {base_url}{TIMEMACHINE_PATH}, {base_url}{CURRENT_WEATHER_PATH}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print("🛑 Sunucu durduruldu")
@@ -0,0 +1,155 @@
+"""
+Önceden Hesaplanmış Tahmin Deposu
+
+HistoricalWeatherPredictor'ın özellikleri yalnızca şehir ve takvim tarihine
+bağlıdır. Bu modül, eğitimden sonra tüm şehirler × önümüzdeki günler için
+hesaplanan tahminleri (sınıf, sınıf olasılıkları, sıcaklık) tek bir sıkıştırılmamış
+NumPy dosyasında saklar; /predict ve /predict_route bu dosyadan indeksleme ile sunulur.
+
+Özellikler:
+- Şehir × gün dizileri (int8 sınıf, float16 olasılık, float32 sıcaklık)
+- Model sürümü ve veri parmak izi uyuşmazsa dosya yok sayılır (canlı tahmine düşülür)
+- Puanlama süreç havuzunda yapılır; işçi fonksiyonları yan etkisiz bu modülde durur
+- Atomik yazım (geçici dosya + os.replace), dosya değişince otomatik yeniden yükleme
+"""
+
+import json
+import os
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from weather_snapshot import normalize_fingerprint
+
+FORMAT_VERSION = 1
+
+# Süreç havuzundaki işçinin puanlayıcısı (initializer ile bir kez yüklenir)
+_worker_models = None
+
+
+def init_worker(spec: Dict):
+    """İşçi süreçte modelleri yükle (tek model veya iklim bölgesi parçaları)"""
+    global _worker_models
+    from zone_models import load_models
+    _worker_models = load_models(spec)
+
+
+def score_block(index: int, zones: Optional[Sequence[str]], features) -> Tuple[int, Tuple[np.ndarray, np.ndarray]]:
+    """Bir gün bloğunu işçi süreçte puanla: (sınıf olasılıkları, sıcaklık)"""
+    return index, _worker_models.score(zones, features)
+
+
+class _ForecastState:
+    """Yüklü tahmin dosyasının içeriği"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], mtime: float):
+        self.meta = json.loads(str(arrays["meta"]))
+        self.start_date = date.fromisoformat(self.meta["start_date"])
+        self.days = int(self.meta["days"])
+        self.cities = [str(city) for city in arrays["cities"]]
+        self.city_index = {city: i for i, city in enumerate(self.cities)}
+        self.classes = arrays["classes"]
+        self.weather = arrays["weather"]
+        self.confidence = arrays["confidence"]
+        self.probabilities = arrays["probabilities"]
+        self.temperature = arrays["temperature"]
+        self.mtime = mtime
+
+
+class ForecastStore:
+    """Şehir × gün tahmin dizilerinin dosya deposu"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Optional[_ForecastState] = None
+
+    def save(self, start_date: date, cities: List[str], classes: Sequence[str], probabilities: np.ndarray,
+             temperature: np.ndarray, model_version: str, fingerprint: Sequence, meta: Optional[Dict] = None):
+        """Tahminleri atomik olarak yaz
+
+        probabilities: (şehir, gün, sınıf) model olasılıkları, temperature: (şehir, gün) tahmini sıcaklık.
+        """
+        weather = probabilities.argmax(axis=2)
+        manifest = dict(meta or {})
+        manifest.update({
+            "format_version": FORMAT_VERSION,
+            "start_date": start_date.isoformat(),
+            "days": int(probabilities.shape[1]),
+            "model_version": model_version,
+            "fingerprint": normalize_fingerprint(fingerprint),
+        })
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        staging = f"{self.path}.tmp-{os.getpid()}.npz"
+        np.savez(
+            staging,
+            meta=np.array(json.dumps(manifest, ensure_ascii=False)),
+            cities=np.array(cities, dtype=str),
+            classes=np.array(classes, dtype=str),
+            weather=weather.astype(np.int8),
+            # Yanıttaki ml_confidence canlı tahminle birebir aynı kalsın diye tam hassasiyet
+            confidence=np.take_along_axis(probabilities, weather[..., None], axis=2)[..., 0].astype(np.float64),
+            probabilities=probabilities.astype(np.float16),
+            # Yanıtta zaten 1 ondalığa yuvarlanıyor
+            temperature=np.round(temperature, 1).astype(np.float32),
+        )
+        os.replace(staging, self.path)
+        return manifest
+
+    def load(self) -> Optional[_ForecastState]:
+        """Dosyayı (değiştiyse) yükle; yoksa veya okunamıyorsa None"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            self._state = None
+            return None
+
+        state = self._state
+        if state is not None and state.mtime == mtime:
+            return state
+
+        with self._lock:
+            if self._state is None or self._state.mtime != mtime:
+                try:
+                    with np.load(self.path, allow_pickle=False) as arrays:
+                        self._state = _ForecastState({key: arrays[key] for key in arrays.files}, mtime)
+                    if self._state.meta.get("format_version") != FORMAT_VERSION:
+                        self._state = None
+                except Exception as e:
+                    print(f"⚠️ Önceden hesaplanmış tahminler okunamadı: {e}")
+                    self._state = None
+            return self._state
+
+    def lookup(self, cities: Sequence[str], day: date, model_version: str,
+               fingerprint: Sequence) -> Optional[Dict[str, np.ndarray]]:
+        """Şehirlerin o günkü tahminleri; dosya güncel değilse veya kapsamıyorsa None"""
+        return self.lookup_pairs(cities, [day] * len(cities), model_version, fingerprint)
+
+    def lookup_pairs(self, cities: Sequence[str], days: Sequence[date], model_version: str,
+                     fingerprint: Sequence) -> Optional[Dict[str, np.ndarray]]:
+        """(şehir, gün) çiftlerinin tahminleri; herhangi biri kapsanmıyorsa None"""
+        state = self.load()
+        if state is None:
+            return None
+        if state.meta["model_version"] != model_version:
+            return None
+        if state.meta["fingerprint"] != normalize_fingerprint(fingerprint):
+            return None
+
+        offsets = [(day - state.start_date).days for day in days]
+        if not all(0 <= offset < state.days for offset in offsets):
+            return None
+        city_ids = [state.city_index.get(city) for city in cities]
+        if None in city_ids:
+            return None
+
+        weather = state.weather[city_ids, offsets]
+        return {
+            "weather": state.classes[weather],
+            "confidence": state.confidence[city_ids, offsets],
+            "probabilities": state.probabilities[city_ids, offsets].astype(np.float64),
+            "temperature": state.temperature[city_ids, offsets].astype(np.float64),
+        }
@@ -0,0 +1,365 @@
+"""
+Son 3 Yıl Ortalamaları İçin Okuma Katmanı (Read-Through)
+
+MLWeatherDatabase.get_historical_average her çağrıda yeni bir sqlite bağlantısı
+açıp yıl başına ayrı sorgu çalıştırıyordu. Bu modül aynı sonucu sırasıyla üç
+katmandan sunar:
+
+1. Bellek içi önbellek: (şehir, ay, gün) → sonuç
+2. city_statistics tablosu: update_city_statistics'in önceden hesapladığı ortalamalar
+   (yalnızca aynı yıl penceresiyle ve son gözlemden sonra yazılmışsa)
+3. weather_data üzerinde üç yılı tek seferde okuyan tek bir IN (...) sorgusu
+
+Özellikler:
+- Katman başına isabet sayaçları (stats())
+- weather_data parmak izi değişince önceden hesaplanmış satırlar ve önbellek geçersiz
+- İş parçacığı başına salt okunur WAL bağlantısı (sqlite_access)
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sqlite_access import sqlite_access
+
+
+def empty_average() -> Dict:
+    """Veri yoksa dönen sonuç (fallback yok)"""
+    return {
+        'avg_temperature': 0.0,
+        'avg_humidity': 0.0,
+        'avg_wind_speed': 0.0,
+        'weather_probabilities': {},
+        'most_likely_weather': 'veri_yok',
+        'confidence': 0.0,
+        'sample_count': 0
+    }
+
+
+def average_of(rows: List[Tuple]) -> Dict:
+    """(temperature, humidity, wind_speed, weather_condition) satırlarının ortalaması ve sınıf olasılıkları"""
+    if not rows:
+        return empty_average()
+
+    weather_counts = {}
+    for row in rows:
+        weather_counts[row[3]] = weather_counts.get(row[3], 0) + 1
+
+    total_samples = len(rows)
+    weather_probabilities = {
+        condition: count / total_samples
+        for condition, count in weather_counts.items()
+    }
+
+    # En olası hava durumu
+    most_likely_weather = max(weather_probabilities, key=weather_probabilities.get)
+
+    return {
+        'avg_temperature': np.mean([row[0] for row in rows]),
+        'avg_humidity': np.mean([row[1] for row in rows]),
+        'avg_wind_speed': np.mean([row[2] for row in rows]),
+        'weather_probabilities': weather_probabilities,
+        'most_likely_weather': most_likely_weather,
+        'confidence': weather_probabilities[most_likely_weather],
+        'sample_count': total_samples
+    }
+
+
+def window_years(now: Optional[datetime] = None) -> Tuple[int, int, int]:
+    """Ortalamanın kapsadığı son 3 tam yıl"""
+    current_year = (now or datetime.now()).year
+    return current_year - 3, current_year - 2, current_year - 1
+
+
+def calendar_days() -> List[Tuple[int, int]]:
+    """Tam takvim: artık yıl dahil 366 (ay, gün) çifti"""
+    return [(date.month, date.day) for date in pd.date_range("2024-01-01", "2024-12-31")]
+
+
+# Normalize olasılık tabloları: sınıf adları bir kez, olasılıklar (şehir, ay, gün, sınıf) başına bir satır
+STATISTICS_DDL_SQLITE = [
+    '''
+    CREATE TABLE IF NOT EXISTS weather_classes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS city_statistics_probabilities (
+        city TEXT NOT NULL,
+        month INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        class_id INTEGER NOT NULL REFERENCES weather_classes(id),
+        probability REAL NOT NULL,
+        PRIMARY KEY (city, month, day, class_id)
+    ) WITHOUT ROWID
+    ''',
+    # "P(kar) > 0.3 olan günler" gibi filtreler için
+    '''
+    CREATE INDEX IF NOT EXISTS idx_city_statistics_probabilities_class
+    ON city_statistics_probabilities (class_id, probability)
+    ''',
+]
+
+# city_statistics'e sonradan eklenen kolonlar (yazım anında hesaplanan en olası sınıf)
+STATISTICS_COLUMNS = {"most_likely_weather": "TEXT", "confidence": "REAL"}
+
+
+def init_statistics_tables(cursor):
+    """Olasılık tablolarını oluştur ve eski city_statistics tablosuna eksik kolonları ekle"""
+    for statement in STATISTICS_DDL_SQLITE:
+        cursor.execute(statement)
+    cursor.execute("PRAGMA table_info(city_statistics)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for column, column_type in STATISTICS_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE city_statistics ADD COLUMN {column} {column_type}")
+
+
+def window_statistics(conn, cities: Iterable[str], years: Tuple[int, int, int]) -> Tuple[List[Tuple], List[Tuple]]:
+    """Tüm şehirler × takvim günleri için son 3 yıl ortalamaları (weather_data tek okuma)
+
+    İki liste döner: (city, month, day, avg_temperature, avg_humidity, avg_wind_speed,
+    sample_count, most_likely_weather, confidence) özet satırları ve (city, month, day,
+    weather_condition, probability) olasılık satırları. Verisiz günler sıfır örnekle döner.
+    Değerler get_historical_average ile birebir aynıdır: yıl sırasıyla toplama, eşitlikte
+    ilk görülen hava durumu en olası sayılır.
+    """
+    cities = list(cities)
+    df = pd.read_sql_query('''
+        SELECT city, date, weather_condition, temperature, humidity, wind_speed
+        FROM weather_data
+        WHERE date >= ? AND date <= ?
+    ''', conn, params=(f"{years[0]}-01-01", f"{years[-1]}-12-31"))
+    df['month'] = df['date'].str[5:7].astype(int)
+    df['day'] = df['date'].str[8:10].astype(int)
+    df = df.sort_values(['city', 'month', 'day', 'date'], kind='stable').reset_index(drop=True)
+
+    # Ortalamalar: grup × yıl sırası matrisi, sütunlar soldan sağa toplanır (np.mean ile aynı toplama
+    # sırası, ((a + b) + c) / n); eksik yıllar 0.0 olarak eklenir, bu toplamı değiştirmez
+    keys = ['city', 'month', 'day']
+    starts = np.flatnonzero(~df.duplicated(keys).to_numpy())
+    counts = np.diff(np.append(starts, len(df)))
+    group_ids = np.repeat(np.arange(len(starts)), counts)
+    positions = np.arange(len(df)) - np.repeat(starts, counts)
+    averages = {}
+    for column in ('temperature', 'humidity', 'wind_speed'):
+        matrix = np.zeros((len(starts), len(years)))
+        matrix[group_ids, positions] = df[column].to_numpy(dtype=np.float64)
+        total = matrix[:, 0].copy() if len(starts) else np.zeros(0)
+        for j in range(1, len(years)):
+            total += matrix[:, j]
+        averages[column] = total / counts
+
+    # Olasılıklar: grup içinde hava durumlarının ilk görülme sırası korunur (sort=False),
+    # böylece idxmax eşitlikte ilk görüleni seçer
+    sizes = df.groupby(keys + ['weather_condition'], sort=False).size().rename('count').reset_index()
+    sizes['probability'] = sizes['count'] / sizes.groupby(keys, sort=False)['count'].transform('sum')
+    best = sizes.loc[sizes.groupby(keys, sort=False)['count'].idxmax(), keys + ['weather_condition', 'probability']]
+    best_by_key = {row[:3]: row[3:] for row in best.itertuples(index=False, name=None)}
+
+    computed = {}
+    for i, key in enumerate(df.loc[starts, keys].itertuples(index=False, name=None)):
+        weather, confidence = best_by_key[key]
+        computed[key] = (
+            float(averages['temperature'][i]), float(averages['humidity'][i]), float(averages['wind_speed'][i]),
+            int(counts[i]), weather, float(confidence)
+        )
+
+    empty = (0.0, 0.0, 0.0, 0, 'veri_yok', 0.0)
+    statistics = [
+        (city, month, day, *computed.get((city, month, day), empty))
+        for city in cities for month, day in calendar_days()
+    ]
+    wanted = set(cities)
+    probabilities = [
+        (city, month, day, condition, float(probability))
+        for city, month, day, condition, probability in sizes[keys + ['weather_condition', 'probability']]
+        .itertuples(index=False, name=None) if city in wanted
+    ]
+    return statistics, probabilities
+
+
+def write_statistics(conn, statistics: List[Tuple], probabilities: List[Tuple]):
+    """Özet ve olasılık satırlarını tek transaction'da yaz (yazılan şehirlerin eski olasılıkları silinir)"""
+    with conn:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT OR IGNORE INTO weather_classes (name) VALUES (?)",
+                           [(name,) for name in sorted({row[3] for row in probabilities})])
+        cursor.execute("SELECT name, id FROM weather_classes")
+        class_ids = dict(cursor.fetchall())
+
+        cursor.executemany("DELETE FROM city_statistics_probabilities WHERE city = ?",
+                           [(city,) for city in dict.fromkeys(row[0] for row in statistics)])
+        cursor.executemany('''
+            INSERT OR REPLACE INTO city_statistics
+            (city, month, day, avg_temperature, avg_humidity, avg_wind_speed,
+             sample_count, most_likely_weather, confidence)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', statistics)
+        cursor.executemany('''
+            INSERT INTO city_statistics_probabilities (city, month, day, class_id, probability)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(city, month, day, class_ids[name], probability)
+              for city, month, day, name, probability in probabilities])
+
+
+def read_statistics(cursor, city: str, month: int, day: int, condition: str = "",
+                    params: Tuple = ()) -> Optional[Dict]:
+    """city_statistics satırı ve olasılıkları tek sorguda (JSON yok)
+
+    condition, city_statistics (s) üzerinde ek filtredir. Olasılıklar sınıf id sırasıyla
+    (birincil anahtar sırası, ek sıralama yok) döner. Satır yoksa veya eski biçimde
+    yazılmışsa (en olası sınıf kolonu boş) None döner.
+    """
+    cursor.execute(f'''
+        SELECT s.avg_temperature, s.avg_humidity, s.avg_wind_speed, s.sample_count,
+               s.most_likely_weather, s.confidence, c.name, p.probability
+        FROM city_statistics s
+        LEFT JOIN city_statistics_probabilities p ON p.city = s.city AND p.month = s.month AND p.day = s.day
+        LEFT JOIN weather_classes c ON c.id = p.class_id
+        WHERE s.city = ? AND s.month = ? AND s.day = ? {condition}
+        ORDER BY p.class_id
+    ''', (city, month, day, *params))
+    rows = cursor.fetchall()
+    if not rows or rows[0][4] is None:
+        return None
+
+    first = rows[0]
+    if not first[3]:
+        return empty_average()
+    return {
+        'avg_temperature': first[0],
+        'avg_humidity': first[1],
+        'avg_wind_speed': first[2],
+        'weather_probabilities': {row[6]: row[7] for row in rows if row[6] is not None},
+        'most_likely_weather': first[4],
+        'confidence': first[5],
+        'sample_count': first[3]
+    }
+
+
+class HistoricalAverageStore:
+    """Bellek → city_statistics → tek IN sorgusu sırasıyla okuyan son 3 yıl ortalamaları"""
+
+    def __init__(self, db_path: str, refresh_interval: float = 30.0):
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, int, int], Dict] = {}
+        self._years: Optional[Tuple[int, int, int]] = None
+        self._fingerprint: Optional[tuple] = None
+        self._last_check = 0.0
+        # Önbellek her boşaltıldığında artar; sorgu sürerken boşaltılırsa eski sonuç saklanmaz
+        self._generation = 0
+        self.memory_hits = 0
+        self.statistics_hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """İş parçacığına ait salt okunur kalıcı bağlantı (WAL: yazımlar okumaları bekletmez)"""
+        return sqlite_access(self.db_path).reader()
+
+    def _reset_connection(self):
+        sqlite_access(self.db_path).reset_reader()
+
+    def invalidate(self):
+        """Önbelleği boşalt ve parmak izini bir sonraki okumada yeniden al (bu süreçteki yazımlardan sonra)"""
+        with self._lock:
+            self._cache = {}
+            self._generation += 1
+            self._fingerprint = None
+            self._last_check = 0.0
+
+    def _ensure_fresh(self, conn) -> Tuple[Tuple[int, int, int], Optional[str], int]:
+        """Yıl penceresi veya weather_data parmak izi değiştiyse önbelleği boşalt (yıllar, watermark, nesil)"""
+        years = window_years()
+        with self._lock:
+            if years == self._years and self._fingerprint is not None \
+                    and time.monotonic() - self._last_check < self.refresh_interval:
+                return years, self._fingerprint[2], self._generation
+
+        # En büyük id son yazılan satırdır (INSERT OR REPLACE yeni id alır); created_at'i taramasız okunur
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*), MAX(id), (SELECT created_at FROM weather_data ORDER BY id DESC LIMIT 1) FROM weather_data"
+        )
+        fingerprint = tuple(cursor.fetchone())
+        with self._lock:
+            if years != self._years or fingerprint != self._fingerprint:
+                self._cache = {}
+                self._generation += 1
+                self._years = years
+                self._fingerprint = fingerprint
+            self._last_check = time.monotonic()
+            return years, fingerprint[2], self._generation
+
+    def _from_statistics(self, cursor, city: str, month: int, day: int, years: Tuple[int, int, int],
+                         watermark: Optional[str]) -> Optional[Dict]:
+        """Aynı yıl penceresiyle ve son gözlemden sonra yazılmış city_statistics satırı"""
+        if watermark is None:
+            return None
+        return read_statistics(
+            cursor, city, month, day,
+            "AND s.last_updated > ? AND CAST(strftime('%Y', s.last_updated, 'localtime') AS INTEGER) = ?",
+            (watermark, years[-1] + 1)
+        )
+
+    def _from_observations(self, cursor, city: str, month: int, day: int, years: Tuple[int, int, int]) -> Dict:
+        """Üç yılın aynı günü tek sorguda (yıl sırasıyla)"""
+        dates = [f"{year}-{month:02d}-{day:02d}" for year in years]
+        cursor.execute('''
+            SELECT temperature, humidity, wind_speed, weather_condition
+            FROM weather_data
+            WHERE city = ? AND date IN (?, ?, ?)
+            ORDER BY date
+        ''', (city, *dates))
+        return average_of(cursor.fetchall())
+
+    def get(self, city: str, month: int, day: int) -> Dict:
+        """Belirli bir gün için son 3 yıllık ortalama (önbellek → city_statistics → weather_data)"""
+        key = (city, month, day)
+        try:
+            conn = self._connection()
+            years, watermark, generation = self._ensure_fresh(conn)
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self.memory_hits += 1
+                    return dict(cached)
+
+            cursor = conn.cursor()
+            result = self._from_statistics(cursor, city, month, day, years, watermark)
+            with self._lock:
+                if result is not None:
+                    self.statistics_hits += 1
+                else:
+                    self.misses += 1
+            if result is None:
+                result = self._from_observations(cursor, city, month, day, years)
+            with self._lock:
+                # Sorgu sırasında önbellek boşaltıldıysa sonuç eski olabilir: saklanmaz
+                if self._generation == generation:
+                    self._cache[key] = result
+            return dict(result)
+
+        except Exception as e:
+            print(f"❌ {city} için tarihsel ortalama hatası: {e}")
+            self._reset_connection()
+            return empty_average()
+
+    def stats(self) -> Dict:
+        """Katman başına isabet sayaçları"""
+        total = self.memory_hits + self.statistics_hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "memory_hits": self.memory_hits,
+            "statistics_hits": self.statistics_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.statistics_hits) / total, 3) if total else 0.0
+        }
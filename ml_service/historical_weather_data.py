@@ -5,31 +5,31 @@ Bu modül, Türkiye şehirleri için son 5 yıllık gerçek hava durumu verileri
 ve gün bazında olasılık hesaplamaları yapar.
 
 Özellikler:
-- OpenWeatherMap API'den tarihsel veri çekme
-- SQL Server LocalDB ile veri saklama
+- OpenWeatherMap API'den tarihsel veri çekme (eşzamanlı, hız sınırlı, toplu yazım)
+- SQL Server LocalDB / SQLite ile veri saklama (WEATHER_DB_BACKEND ile açıkça seçilir)
 - Gün bazında olasılık hesaplamaları
 - ML modelleri için eğitim verisi hazırlama
 - Gerçek zamanlı tahmin için veri tabanı
 """
 
-import requests
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 import json
 import os
 from typing import Dict, List, Tuple, Optional
-import time
 from collections import defaultdict
-import pyodbc
-import urllib.parse
+import threading
+
+from weather_ingestion import ConcurrentWeatherIngestor, IngestionJob
+from collection_checkpoint import find_missing_days, print_plan, record_journal_entries, summarize_missing
+from weather_storage import WeatherStorage, create_storage, resolve_connection_string
+from weather_snapshot import TRAINING_COLUMNS, WeatherSnapshot
 
 class HistoricalWeatherDataCollector:
     def __init__(self, api_key: str = None):
         if api_key is None:
             # .env dosyasından API anahtarını al
             from dotenv import load_dotenv
-            import os
             load_dotenv()
             api_key = os.getenv("OPENWEATHER_API_KEY")
             
@@ -38,33 +38,31 @@ class HistoricalWeatherDataCollector:
         
         self.api_key = api_key
         self.base_url = "http://api.openweathermap.org/data/2.5/onecall/timemachine"
-        self.connection_string = self._get_connection_string()
+        # Arka uç yapılandırmadan seçilir; bağlantı ve şema ilk kullanımda hazırlanır
+        self.connection_string = resolve_connection_string()
+        # Lehçeye özel SQL, hazırlanmış ifadeler ve toplu yazım bu adaptörde
+        self._storage = create_storage(self.connection_string)
+        self._schema_ready = False
+        self._schema_lock = threading.RLock()
+        # Sütunlu anlık görüntü (güncelse eğitim/istatistik okumaları SQL yerine buradan)
+        self.snapshot = WeatherSnapshot(os.getenv("WEATHER_SNAPSHOT_DIR", "weather_snapshot"))
         self.cities_data = self._load_cities_data()
         
-        # Veritabanını oluştur
-        self._create_database()
-        
-    def _get_connection_string(self) -> str:
-        """SQL Server bağlantı string'i oluştur"""
-        # LocalDB'yi öncelikle dene
-        try:
-            test_conn = pyodbc.connect('Driver={ODBC Driver 17 for SQL Server};Server=(localdb)\\MSSQLLocalDB;Database=master;Trusted_Connection=yes;', timeout=5)
-            test_conn.close()
-            print("✅ SQL Server LocalDB bağlantısı başarılı")
-            return 'Driver={ODBC Driver 17 for SQL Server};Server=(localdb)\\MSSQLLocalDB;Database=HistoricalWeatherDB;Trusted_Connection=yes;'
-        except Exception as e:
-            print(f"⚠️ SQL Server LocalDB bağlantısı başarısız: {e}")
-            
-            # Normal SQL Server'ı dene
-            try:
-                test_conn = pyodbc.connect('Driver={ODBC Driver 17 for SQL Server};Server=localhost;Database=master;Trusted_Connection=yes;', timeout=5)
-                test_conn.close()
-                print("✅ SQL Server bağlantısı başarılı")
-                return 'Driver={ODBC Driver 17 for SQL Server};Server=localhost;Database=HistoricalWeatherDB;Trusted_Connection=yes;'
-            except Exception as e2:
-                print(f"⚠️ SQL Server bağlantısı da başarısız: {e2}")
-                print("⚠️ SQLite kullanılıyor...")
-                return "sqlite:///historical_weather.db"
+        # Veri değiştikçe artan sayaç (bellek içi önbellekler bununla geçersizlenir)
+        self.data_epoch = 0
+        self._epoch_lock = threading.Lock()
+        # Kaydedilen her batch'ten sonra, yeni epoch yayınlanmadan önce çağrılır:
+        # (parametreler, önceki gözlemler, yeni epoch, batch'in veri parmak izi)
+        self.batch_listeners = []
+    
+    @property
+    def storage(self) -> WeatherStorage:
+        """Veritabanı adaptörü (veritabanı/şema ilk erişimde, bir kez hazırlanır)"""
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._create_database()
+        return self._storage
     
     def _load_cities_data(self) -> Dict:
         """Türkiye şehirlerinin koordinat verileri"""
@@ -131,305 +129,242 @@ class HistoricalWeatherDataCollector:
         }
     
     def _create_database(self):
-        """SQL Server veritabanını oluştur"""
+        """Veritabanını ve şemayı yalnızca gerektiğinde oluştur"""
+        storage = self._storage
         try:
-            # Önce normal SQL Server'ı dene
             try:
-                master_conn = pyodbc.connect('Driver={ODBC Driver 17 for SQL Server};Server=localhost;Database=master;Trusted_Connection=yes;')
-                cursor = master_conn.cursor()
-                
-                # Veritabanını oluştur (transaction dışında)
-                cursor.execute("IF NOT EXISTS (SELECT name FROM sys.databases WHERE name = 'HistoricalWeatherDB') BEGIN CREATE DATABASE HistoricalWeatherDB END")
-                master_conn.commit()
-                master_conn.close()
-                print("✅ SQL Server veritabanı oluşturuldu")
-                
+                conn = storage.connect()
             except Exception as e:
-                print(f"⚠️ SQL Server bağlantısı başarısız: {e}")
-                # LocalDB'yi dene
-                master_conn = pyodbc.connect('Driver={ODBC Driver 17 for SQL Server};Server=(localdb)\\MSSQLLocalDB;Database=master;Trusted_Connection=yes;')
-                cursor = master_conn.cursor()
-                
-                # Veritabanını oluştur (transaction dışında)
-                cursor.execute("IF NOT EXISTS (SELECT name FROM sys.databases WHERE name = 'HistoricalWeatherDB') BEGIN CREATE DATABASE HistoricalWeatherDB END")
-                master_conn.commit()
-                master_conn.close()
-                print("✅ SQL Server LocalDB veritabanı oluşturuldu")
-            
-            # Veritabanına bağlan
-            conn = pyodbc.connect(self.connection_string)
-            cursor = conn.cursor()
-            
-            # Tarihsel hava durumu verileri tablosu
-            cursor.execute('''
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='historical_weather' AND xtype='U')
-                CREATE TABLE historical_weather (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    city NVARCHAR(100) NOT NULL,
-                    date NVARCHAR(10) NOT NULL,
-                    weather_main NVARCHAR(50) NOT NULL,
-                    weather_description NVARCHAR(200),
-                    temperature FLOAT,
-                    humidity INT,
-                    wind_speed FLOAT,
-                    created_at DATETIME DEFAULT GETDATE(),
-                    CONSTRAINT UQ_city_date UNIQUE(city, date)
-                )
-            ''')
+                if storage.dialect != "sqlserver":
+                    raise
+                # Hedef veritabanı henüz yok: master üzerinden oluştur ve tekrar bağlan
+                print(f"⚠️ {storage.database_name()} veritabanına bağlanılamadı: {e}")
+                storage.create_database()
+                conn = storage.connect()
             
-            # Günlük olasılık hesaplamaları tablosu
-            cursor.execute('''
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='daily_probabilities' AND xtype='U')
-                CREATE TABLE daily_probabilities (
-                    id INT IDENTITY(1,1) PRIMARY KEY,
-                    city NVARCHAR(100) NOT NULL,
-                    month INT NOT NULL,
-                    day INT NOT NULL,
-                    weather_main NVARCHAR(50) NOT NULL,
-                    probability FLOAT NOT NULL,
-                    sample_count INT NOT NULL,
-                    last_updated DATETIME DEFAULT GETDATE(),
-                    CONSTRAINT UQ_city_month_day_weather UNIQUE(city, month, day, weather_main)
-                )
-            ''')
+            try:
+                schema_is_current = storage.schema_is_current(conn)
+            finally:
+                conn.close()
             
-            conn.commit()
-            conn.close()
-            print("✅ SQL Server LocalDB veritabanı oluşturuldu")
+            needs_counter_bootstrap = False
+            if not schema_is_current:
+                # Tabloları oluştur ve eski şemaları taşı (SQLite'ta tek yazıcı üzerinden)
+                with storage.write_connection() as conn:
+                    needs_counter_bootstrap = storage.create_schema(conn)
+                print(f"✅ Veritabanı şeması hazırlandı ({storage.dialect})")
             
         except Exception as e:
             print(f"❌ Veritabanı oluşturma hatası: {e}")
             print("⚠️ SQLite'a fallback yapılıyor...")
             self._create_sqlite_database()
+            return
+        
+        self._schema_ready = True
+        if needs_counter_bootstrap:
+            # Sayaçlar mevcut veriden bir kez tam olarak hesaplanır, sonrası artımlıdır
+            self._calculate_daily_probabilities()
     
     def _create_sqlite_database(self):
         """SQLite veritabanını oluştur (fallback)"""
-        import sqlite3
-        
-        conn = sqlite3.connect("historical_weather.db")
-        cursor = conn.cursor()
-        
-        # Tarihsel hava durumu verileri tablosu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS historical_weather (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                city TEXT NOT NULL,
-                date TEXT NOT NULL,
-                weather_main TEXT NOT NULL,
-                weather_description TEXT,
-                temperature REAL,
-                humidity INTEGER,
-                wind_speed REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(city, date)
-            )
-        ''')
-        
-        # Günlük olasılık hesaplamaları tablosu
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS daily_probabilities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                city TEXT NOT NULL,
-                month INTEGER NOT NULL,
-                day INTEGER NOT NULL,
-                weather_main TEXT NOT NULL,
-                probability REAL NOT NULL,
-                sample_count INTEGER NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(city, month, day, weather_main)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        print("✅ SQLite veritabanı oluşturuldu (fallback)")
-    
-    def _get_connection(self):
-        """Veritabanı bağlantısı al"""
-        try:
-            if "sqlite" in self.connection_string:
-                import sqlite3
-                return sqlite3.connect("historical_weather.db")
-            else:
-                return pyodbc.connect(self.connection_string)
-        except Exception as e:
-            print(f"❌ Veritabanı bağlantı hatası: {e}")
-            # SQLite'a fallback
-            import sqlite3
-            return sqlite3.connect("historical_weather.db")
+        if self._storage.dialect != "sqlite":
+            self.connection_string = resolve_connection_string(backend="sqlite")
+            self._storage = create_storage(self.connection_string)
+        
+        needs_counter_bootstrap = False
+        with self._storage.write_connection() as conn:
+            if not self._storage.schema_is_current(conn):
+                needs_counter_bootstrap = self._storage.create_schema(conn)
+                print("✅ SQLite veritabanı oluşturuldu (fallback)")
+        
+        self._schema_ready = True
+        if needs_counter_bootstrap:
+            # Sayaçlar mevcut veriden bir kez tam olarak hesaplanır, sonrası artımlıdır
+            self._calculate_daily_probabilities()
     
-    def collect_historical_data(self, start_year: int = 2020, end_year: int = 2024):
-        """Son 5 yıllık tarihsel verileri topla"""
+    def collect_historical_data(self, start_year: int = 2020, end_year: int = 2024,
+                                requests_per_second: float = 10.0, max_concurrency: int = 8,
+                                batch_size: int = 500, dry_run: bool = False, max_attempts: int = 3):
+        """Son 5 yıllık tarihsel verileri topla (eşzamanlı, hız sınırlı, toplu yazım)
+        
+        Yalnızca veritabanında olmayan (şehir, gün) çiftleri çekilir; kesilen bir
+        çalıştırma kaldığı yerden devam eder. dry_run=True ise sadece plan raporlanır.
+        """
         print(f"📊 {start_year}-{end_year} arası tarihsel hava durumu verileri toplanıyor...")
         
-        for city, coords in self.cities_data.items():
-            print(f"🌤️ {city} için veriler toplanıyor...")
-            
-            # Her gün için veri topla
-            current_date = datetime(start_year, 1, 1)
-            end_date = datetime(end_year, 12, 31)
-            
-            while current_date <= end_date:
-                try:
-                    # OpenWeatherMap API'den tarihsel veri al
-                    timestamp = int(current_date.timestamp())
-                    url = f"{self.base_url}?lat={coords['lat']}&lon={coords['lon']}&dt={timestamp}&appid={self.api_key}&units=metric"
-                    
-                    response = requests.get(url)
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        if 'data' in data and len(data['data']) > 0:
-                            daily_data = data['data'][0]
-                            
-                            # Veritabanına kaydet
-                            self._save_weather_data(
-                                city=city,
-                                date=current_date.strftime('%Y-%m-%d'),
-                                weather_main=daily_data['weather'][0]['main'],
-                                weather_description=daily_data['weather'][0]['description'],
-                                temperature=daily_data['temp'],
-                                humidity=daily_data['humidity'],
-                                wind_speed=daily_data['wind_speed']
-                            )
-                    
-                    # API rate limit için bekle
-                    time.sleep(0.1)
-                    
-                except Exception as e:
-                    print(f"❌ {city} {current_date.strftime('%Y-%m-%d')} verisi alınamadı: {e}")
-                
-                current_date += timedelta(days=1)
-            
-            print(f"✅ {city} verileri tamamlandı")
+        sqlite = self.storage.dialect == "sqlite"
+        start_date, end_date = f"{start_year}-01-01", f"{end_year}-12-31"
+        # Beklenen günler geçici tabloya yazıldığı için yazıcı bağlantısı kullanılır
+        with self.storage.write_connection() as conn:
+            missing = find_missing_days(conn, "historical_weather", self.cities_data.keys(),
+                                        start_date, end_date, max_attempts=max_attempts, sqlite=sqlite)
+        
+        expected_total = len(self.cities_data) * ((datetime(end_year, 12, 31) - datetime(start_year, 1, 1)).days + 1)
+        plan = summarize_missing(missing, expected_total)
+        print_plan(plan)
+        if dry_run or not missing:
+            return plan
+        
+        failures = []
+        
+        def on_failure(job: IngestionJob, status: str, error: str):
+            failures.append((job.city, job.date, status, error[:400]))
+        
+        ingestor = ConcurrentWeatherIngestor(
+            base_url=self.base_url,
+            api_key=self.api_key,
+            write_batch=self._save_weather_batch,
+            requests_per_second=requests_per_second,
+            max_concurrency=max_concurrency,
+            batch_size=batch_size,
+            on_failure=on_failure
+        )
         
-        # Olasılık hesaplamalarını güncelle
-        self._calculate_daily_probabilities()
-        print("🎯 Günlük olasılık hesaplamaları tamamlandı")
+        jobs = (IngestionJob(city, date, self.cities_data[city]['lat'], self.cities_data[city]['lon'])
+                for city, date in missing)
+        try:
+            stats = ingestor.run(jobs)
+        finally:
+            ingestor.close()
+            # Veri dönmeyen / hata veren günleri günlüğe yaz (kesintide bile)
+            with self.storage.write_connection() as conn:
+                record_journal_entries(conn, failures, sqlite=sqlite)
+        
+        print(f"✅ {stats['saved']}/{stats['jobs']} gün kaydedildi "
+              f"({stats['requests']} istek, {stats['retries']} yeniden deneme, "
+              f"{stats['failed']} hata, {stats['no_data']} veri yok, {stats['elapsed_seconds']} sn)")
+        
+        # Olasılıklar kayıt sırasında artımlı olarak güncellendi; tam yeniden hesaplama gerekmez
+        print("🎯 Günlük olasılık sayaçları güncel")
+        return stats
     
     def _save_weather_data(self, city: str, date: str, weather_main: str, 
                           weather_description: str, temperature: float, 
                           humidity: int, wind_speed: float):
         """Hava durumu verisini veritabanına kaydet"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        self._save_weather_batch([{
+            "city": city,
+            "date": date,
+            "weather_main": weather_main,
+            "weather_description": weather_description,
+            "temperature": temperature,
+            "humidity": humidity,
+            "wind_speed": wind_speed
+        }])
+    
+    def _save_weather_batch(self, rows: List[Dict]) -> int:
+        """Hava durumu verilerini tek transaction içinde toplu olarak kaydet"""
+        if not rows:
+            return 0
+        
+        params = [
+            (row['city'], row['date'], row['weather_main'], row['weather_description'],
+             row['temperature'], row['humidity'], row['wind_speed'])
+            for row in rows
+        ]
+        
+        # Yazıcı bağlantısı kalıcıdır: ifadeler batch'ler arasında hazır kalır
+        storage = self.storage
         
         try:
-            if "sqlite" in self.connection_string:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO historical_weather 
-                    (city, date, weather_main, weather_description, temperature, humidity, wind_speed)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (city, date, weather_main, weather_description, temperature, humidity, wind_speed))
-            else:
-                cursor.execute('''
-                    MERGE historical_weather AS target
-                    USING (SELECT ? as city, ? as date, ? as weather_main, ? as weather_description, ? as temperature, ? as humidity, ? as wind_speed) AS source
-                    ON target.city = source.city AND target.date = source.date
-                    WHEN MATCHED THEN
-                        UPDATE SET weather_main = source.weather_main, weather_description = source.weather_description, 
-                                 temperature = source.temperature, humidity = source.humidity, wind_speed = source.wind_speed
-                    WHEN NOT MATCHED THEN
-                        INSERT (city, date, weather_main, weather_description, temperature, humidity, wind_speed)
-                        VALUES (source.city, source.date, source.weather_main, source.weather_description, 
-                                source.temperature, source.humidity, source.wind_speed);
-                ''', (city, date, weather_main, weather_description, temperature, humidity, wind_speed))
-            
-            conn.commit()
+            with storage.write_connection() as conn:
+                cursor = conn.cursor()
+                storage.begin_write(cursor)
+                previous = self._fetch_previous_observations(cursor, params)
+                storage.executemany(cursor, "upsert_observation", params)
+                
+                # Olasılık sayaçlarını artımlı olarak güncelle
+                self._update_probability_counters(cursor, params, previous)
+                # Veri sürümü aynı transaction'da artar: başka süreçlerin önbellekleri de geçersizlenir
+                cursor.execute(storage.sql("bump_data_version"))
+                cursor.execute(storage.sql("data_fingerprint"))
+                fingerprint = tuple(cursor.fetchone())
+                
+                conn.commit()
         except Exception as e:
-            print(f"❌ Veri kaydetme hatası: {e}")
-        finally:
-            conn.close()
+            print(f"❌ Veri kaydetme hatası ({len(params)} kayıt): {e}")
+            storage.reset_connection()
+            return 0
+        
+        self._notify_batch_listeners(params, previous, fingerprint)
+        return len(params)
     
-    def _calculate_daily_probabilities(self):
-        """Günlük hava durumu olasılıklarını hesapla"""
-        conn = self._get_connection()
-        
-        # Her şehir için günlük olasılıkları hesapla
-        for city in self.cities_data.keys():
-            if "sqlite" in self.connection_string:
-                query = '''
-                    SELECT 
-                        CAST(SUBSTR(date, 6, 2) AS INTEGER) as month,
-                        CAST(SUBSTR(date, 9, 2) AS INTEGER) as day,
-                        weather_main,
-                        COUNT(*) as count
-                    FROM historical_weather 
-                    WHERE city = ?
-                    GROUP BY month, day, weather_main
-                    ORDER BY month, day, weather_main
-                '''
-            else:
-                query = '''
-                    SELECT 
-                        CAST(SUBSTRING(date, 6, 2) AS INT) as month,
-                        CAST(SUBSTRING(date, 9, 2) AS INT) as day,
-                        weather_main,
-                        COUNT(*) as count
-                    FROM historical_weather 
-                    WHERE city = ?
-                    GROUP BY month, day, weather_main
-                    ORDER BY month, day, weather_main
-                '''
-            
-            df = pd.read_sql_query(query, conn, params=(city,))
+    def _notify_batch_listeners(self, params: List[Tuple], previous: Dict, fingerprint: Tuple):
+        """Bellek içi görünümlere kaydedilen batch'i bildir, ardından yeni epoch'u yayınla
+        
+        Okuyucular yeni epoch'u gördüğünde görünümler batch'i zaten uygulamıştır; veri alımı
+        sırasında okumalar tam yeniden yüklemeye düşmez.
+        """
+        with self._epoch_lock:
+            epoch = self.data_epoch + 1
+            for listener in self.batch_listeners:
+                try:
+                    listener(params, previous, epoch, fingerprint)
+                except Exception as e:
+                    print(f"⚠️ Batch dinleyici hatası: {e}")
+            self.data_epoch = epoch
+    
+    def _fetch_previous_observations(self, cursor, params: List[Tuple]) -> Dict[Tuple[str, str], Tuple[str, Optional[float]]]:
+        """Kaydedilecek (şehir, tarih) çiftleri için mevcut (weather_main, temperature) değerlerini getir"""
+        # Batch başına tek küme sorgusu: (şehir, tarih) çiftleri VALUES tablosuyla birleştirilir
+        return self.storage.query_previous_observations(cursor, [(param[0], param[1]) for param in params])
+    
+    def _update_probability_counters(self, cursor, params: List[Tuple],
+                                     previous: Dict[Tuple[str, str], Tuple[str, Optional[float]]]):
+        """Yeni gözlemler için (şehir, ay, gün, hava) sayaçlarını ve gün toplamlarını güncelle
+
+        Maliyet yalnızca etkilenen günlerle orantılıdır; olasılıklar sadece bu günler için
+        yeniden hesaplanır (tam tablo yeniden oluşturma gerekmez).
+        """
+        count_deltas = defaultdict(int)
+        total_deltas = defaultdict(int)
+        current = {key: value[0] for key, value in previous.items()}
+        
+        for param in params:
+            city, date, weather_main = param[0], param[1], param[2]
+            day_key = (city, int(date[5:7]), int(date[8:10]))
+            old_weather = current.get((city, date))
             
-            if not df.empty:
-                # Her gün için toplam sayıyı hesapla
-                daily_totals = df.groupby(['month', 'day'])['count'].sum().reset_index()
-                daily_totals = daily_totals.rename(columns={'count': 'total_count'})
-                
-                # Olasılıkları hesapla
-                df = df.merge(daily_totals, on=['month', 'day'])
-                df['probability'] = df['count'] / df['total_count']
-                
-                # Veritabanına kaydet
-                cursor = conn.cursor()
-                for _, row in df.iterrows():
-                    if "sqlite" in self.connection_string:
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO daily_probabilities 
-                            (city, month, day, weather_main, probability, sample_count)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        ''', (city, row['month'], row['day'], row['weather_main'], 
-                             row['probability'], row['count']))
-                    else:
-                        cursor.execute('''
-                            MERGE daily_probabilities AS target
-                            USING (SELECT ? as city, ? as month, ? as day, ? as weather_main, ? as probability, ? as sample_count) AS source
-                            ON target.city = source.city AND target.month = source.month AND target.day = source.day AND target.weather_main = source.weather_main
-                            WHEN MATCHED THEN
-                                UPDATE SET probability = source.probability, sample_count = source.sample_count, last_updated = GETDATE()
-                            WHEN NOT MATCHED THEN
-                                INSERT (city, month, day, weather_main, probability, sample_count)
-                                VALUES (source.city, source.month, source.day, source.weather_main, source.probability, source.sample_count);
-                        ''', (city, row['month'], row['day'], row['weather_main'], 
-                             row['probability'], row['count']))
-        
-        conn.commit()
-        conn.close()
+            if old_weather == weather_main:
+                continue
+            if old_weather is None:
+                total_deltas[day_key] += 1
+            else:
+                count_deltas[day_key + (old_weather,)] -= 1
+            count_deltas[day_key + (weather_main,)] += 1
+            current[(city, date)] = weather_main
+        
+        count_params = [key + (delta,) for key, delta in count_deltas.items() if delta != 0]
+        total_params = [key + (delta,) for key, delta in total_deltas.items()]
+        touched_days = list({key[:3] for key, _ in count_deltas.items()})
+        if not touched_days:
+            return
+        
+        storage = self.storage
+        storage.executemany(cursor, "upsert_daily_total", total_params)
+        storage.executemany(cursor, "upsert_probability_count", count_params)
+        
+        # Sayacı sıfıra inen sınıfları sil, etkilenen günlerin olasılıklarını yenile
+        storage.executemany(cursor, "delete_empty_probabilities", touched_days)
+        storage.executemany(cursor, "refresh_probabilities", touched_days)
+    
+    def _calculate_daily_probabilities(self):
+        """Günlük hava durumu olasılıklarını hesapla
+
+        Tüm tablo veritabanında tek bir küme tabanlı (set-based) sorguyla gölge tabloya
+        yazılır, ardından tek transaction içinde gerçek tabloyla yer değiştirilir.
+        Okuyucular hiçbir zaman yarım yazılmış bir tablo görmez.
+
+        Normal veri toplamada olasılıklar artımlı güncellenir; bu tam yeniden hesaplama
+        yalnızca ilk kurulumda veya elle tutarlılık onarımı için gereklidir.
+        """
+        self.storage.rebuild_daily_probabilities()
+        with self._epoch_lock:
+            self.data_epoch += 1
     
     def get_daily_weather_probability(self, city: str, month: int, day: int) -> Dict:
         """Belirli bir gün için hava durumu olasılıklarını getir"""
-        conn = self._get_connection()
-        
-        if "sqlite" in self.connection_string:
-            query = '''
-                SELECT weather_main, probability, sample_count
-                FROM daily_probabilities 
-                WHERE city = ? AND month = ? AND day = ?
-                ORDER BY probability DESC
-            '''
-        else:
-            query = '''
-                SELECT weather_main, probability, sample_count
-                FROM daily_probabilities 
-                WHERE city = ? AND month = ? AND day = ?
-                ORDER BY probability DESC
-            '''
-        
-        df = pd.read_sql_query(query, conn, params=(city, month, day))
-        conn.close()
+        df = self.storage.query_df("daily_probabilities_for_day", (city, month, day))
         
         if df.empty:
             return {
@@ -465,126 +400,89 @@ class HistoricalWeatherDataCollector:
     
     def get_historical_examples(self, city: str, month: int, day: int, limit: int = 5) -> List[Dict]:
         """Belirli bir gün için geçmiş örnekleri getir"""
-        conn = self._get_connection()
-        
-        if "sqlite" in self.connection_string:
-            query = '''
-                SELECT date, weather_main, weather_description, temperature, humidity, wind_speed
-                FROM historical_weather 
-                WHERE city = ? AND CAST(SUBSTR(date, 6, 2) AS INTEGER) = ? AND CAST(SUBSTR(date, 9, 2) AS INTEGER) = ?
-                ORDER BY date DESC
-                LIMIT ?
-            '''
-        else:
-            query = '''
-                SELECT TOP (?) date, weather_main, weather_description, temperature, humidity, wind_speed
-                FROM historical_weather 
-                WHERE city = ? AND CAST(SUBSTRING(date, 6, 2) AS INT) = ? AND CAST(SUBSTRING(date, 9, 2) AS INT) = ?
-                ORDER BY date DESC
-            '''
-        
-        if "sqlite" in self.connection_string:
-            df = pd.read_sql_query(query, conn, params=(city, month, day, limit))
-        else:
-            df = pd.read_sql_query(query, conn, params=(limit, city, month, day))
-        
-        conn.close()
-        
-        examples = []
-        for _, row in df.iterrows():
-            examples.append({
-                "year": row['date'][:4],
-                "weather": row['weather_main'],
-                "description": row['weather_description'],
-                "temperature": row['temperature'],
-                "humidity": row['humidity'],
-                "wind_speed": row['wind_speed']
-            })
-        
-        return examples
+        rows = self.storage.query("historical_examples", (city, month, day, limit))
+        return [self._example_from_row(row) for row in rows]
     
-    def generate_training_data(self) -> pd.DataFrame:
-        """ML modelleri için eğitim verisi oluştur"""
-        conn = self._get_connection()
-        
-        if "sqlite" in self.connection_string:
-            query = '''
-                SELECT 
-                    hw.city,
-                    hw.date,
-                    CAST(SUBSTR(hw.date, 6, 2) AS INTEGER) as month,
-                    CAST(SUBSTR(hw.date, 9, 2) AS INTEGER) as day,
-                    hw.weather_main,
-                    hw.temperature,
-                    hw.humidity,
-                    hw.wind_speed,
-                    dp.probability,
-                    dp.sample_count
-                FROM historical_weather hw
-                LEFT JOIN daily_probabilities dp ON 
-                    hw.city = dp.city AND 
-                    CAST(SUBSTR(hw.date, 6, 2) AS INTEGER) = dp.month AND 
-                    CAST(SUBSTR(hw.date, 9, 2) AS INTEGER) = dp.day AND
-                    hw.weather_main = dp.weather_main
-            '''
-        else:
-            query = '''
-                SELECT 
-                    hw.city,
-                    hw.date,
-                    CAST(SUBSTRING(hw.date, 6, 2) AS INT) as month,
-                    CAST(SUBSTRING(hw.date, 9, 2) AS INT) as day,
-                    hw.weather_main,
-                    hw.temperature,
-                    hw.humidity,
-                    hw.wind_speed,
-                    dp.probability,
-                    dp.sample_count
-                FROM historical_weather hw
-                LEFT JOIN daily_probabilities dp ON 
-                    hw.city = dp.city AND 
-                    CAST(SUBSTRING(hw.date, 6, 2) AS INT) = dp.month AND 
-                    CAST(SUBSTRING(hw.date, 9, 2) AS INT) = dp.day AND
-                    hw.weather_main = dp.weather_main
-            '''
-        
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        # Şehir koordinatlarını ekle
-        df['latitude'] = 0.0
-        df['longitude'] = 0.0
-        
-        for city, coords in self.cities_data.items():
-            mask = df['city'] == city
-            df.loc[mask, 'latitude'] = coords['lat']
-            df.loc[mask, 'longitude'] = coords['lon']
-        
+    def get_historical_examples_for_cities(self, cities: List[str], month: int, day: int,
+                                           limit: int = 5) -> Dict[str, List[Dict]]:
+        """Birden fazla şehir için aynı günün geçmiş örnekleri (tek sorgu)"""
+        rows = self.storage.query_examples_for_cities(cities, month, day, limit)
+        return {city: [self._example_from_row(row) for row in city_rows] for city, city_rows in rows.items()}
+    
+    @staticmethod
+    def _example_from_row(row: Tuple) -> Dict:
+        date, weather_main, weather_description, temperature, humidity, wind_speed = row
+        return {
+            "year": date[:4],
+            "weather": weather_main,
+            "description": weather_description,
+            "temperature": temperature,
+            "humidity": humidity,
+            "wind_speed": wind_speed
+        }
+    
+    def generate_training_data(self, chunksize: Optional[int] = None):
+        """ML modelleri için eğitim verisi oluştur
+        
+        chunksize verilirse tek bir DataFrame yerine en fazla chunksize satırlık
+        DataFrame'ler üreten bir iterator döner (bellekten büyük tablolar için).
+        """
+        if self._snapshot_is_fresh():
+            chunks = (self._attach_coordinates(chunk) for chunk in self.snapshot.iter_training_chunks(chunksize))
+            if chunksize is None:
+                return next(chunks, pd.DataFrame(columns=TRAINING_COLUMNS + ['latitude', 'longitude']))
+            return chunks
+        
+        query = self.storage.sql("training_data")
+        
+        if chunksize is None:
+            with self.storage.read_connection() as conn:
+                df = pd.read_sql_query(query, conn)
+            return self._attach_coordinates(df)
+        
+        return self._iter_training_chunks(query, chunksize)
+    
+    def _iter_training_chunks(self, query: str, chunksize: int):
+        """Eğitim verisini sınırlı boyutlu parçalar halinde üret"""
+        with self.storage.read_connection() as conn:
+            for chunk in pd.read_sql_query(query, conn, chunksize=chunksize):
+                yield self._attach_coordinates(chunk)
+    
+    def _snapshot_is_fresh(self) -> bool:
+        """Anlık görüntü mevcut ve veritabanıyla aynı veriyi mi içeriyor"""
+        try:
+            return self.snapshot.is_fresh(self.storage.query("data_fingerprint")[0])
+        except Exception as e:
+            print(f"⚠️ Anlık görüntü kontrol edilemedi, SQL kullanılacak: {e}")
+            return False
+    
+    def _city_coordinates_frame(self) -> pd.DataFrame:
+        """Şehir → enlem/boylam tablosu"""
+        return pd.DataFrame(
+            [(city, coords['lat'], coords['lon']) for city, coords in self.cities_data.items()],
+            columns=['city', 'latitude', 'longitude']
+        ).set_index('city')
+    
+    def _attach_coordinates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Şehir koordinatlarını vektörel olarak ekle (bilinmeyen şehirler 0.0)"""
+        coordinates = self._city_coordinates_frame()
+        # Kategorik şehir kolonunda map kategorik döner; önce float'a çevrilir
+        df['latitude'] = df['city'].map(coordinates['latitude']).astype(float).fillna(0.0)
+        df['longitude'] = df['city'].map(coordinates['longitude']).astype(float).fillna(0.0)
         return df
     
     def get_city_statistics(self, city: str) -> Dict:
         """Şehir için istatistiksel bilgiler"""
-        conn = self._get_connection()
+        storage = self.storage
         
         # Toplam veri sayısı
-        total_count = pd.read_sql_query(
-            "SELECT COUNT(*) as count FROM historical_weather WHERE city = ?", 
-            conn, params=(city,)
-        ).iloc[0]['count']
+        total_count = storage.query("city_record_count", (city,))[0][0]
         
         # Hava durumu dağılımı
-        weather_dist = pd.read_sql_query(
-            "SELECT weather_main, COUNT(*) as count FROM historical_weather WHERE city = ? GROUP BY weather_main",
-            conn, params=(city,)
-        )
+        weather_dist = storage.query_df("city_weather_distribution", (city,))
         
         # Sıcaklık istatistikleri
-        temp_stats = pd.read_sql_query(
-            "SELECT AVG(temperature) as avg_temp, MIN(temperature) as min_temp, MAX(temperature) as max_temp FROM historical_weather WHERE city = ?",
-            conn, params=(city,)
-        )
-        
-        conn.close()
+        temp_stats = storage.query_df("city_temperature_stats", (city,))
         
         return {
             "city": city,
@@ -12,15 +12,24 @@ gün bazında olasılık hesaplamaları yapar ve ML modellerini eğitir.
 """
 
 from historical_weather_data import HistoricalWeatherDataCollector
+from climatology_cube import ClimatologyCube
+from city_statistics import CityStatisticsStore
+from forecast_store import ForecastStore, init_worker, score_block
+from zone_models import SingleModel, ZoneModelRegistry, train_zone_models, zone_of_cities
+from weather_snapshot import normalize_fingerprint
 from flask import Flask, request, jsonify
 from flask_cors import CORS #(Cross-Origin Resource Sharing)
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
+import calendar
+import hashlib
 import json
 import joblib
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
@@ -28,9 +37,28 @@ from sklearn.metrics import accuracy_score, classification_report
 import warnings
 warnings.filterwarnings('ignore')
 
+# Tahmin yanıtının alanları (city ve date her zaman döner); fields parametresi bunların alt kümesidir
+PREDICTION_FIELDS = (
+    'predicted_weather', 'predicted_temperature', 'historical_probabilities', 'historical_examples',
+    'ml_confidence', 'historical_confidence', 'sample_count', 'explanation'
+)
+# Rota özetinin (route_summary) dayandığı alanlar
+ROUTE_SUMMARY_FIELDS = frozenset({'predicted_weather', 'predicted_temperature', 'ml_confidence'})
+# /predict_range sınırları (tek istekte tek özellik matrisi)
+MAX_RANGE_DAYS = 31
+MAX_RANGE_PAIRS = 5000
+
 class HistoricalWeatherPredictor:
     def __init__(self):
         self.collector = HistoricalWeatherDataCollector()
+        
+        # daily_probabilities tablosunun bellek içi küpü (O(1) olasılık sorgusu)
+        self.probability_cube = ClimatologyCube(self.collector)
+        print(f"🧊 Olasılık küpü yüklendi: {self.probability_cube.nbytes / 1024:.0f} KB")
+        
+        # Şehir istatistiklerinin tek taramayla materyalize edilmiş bellek içi görünümü
+        self.city_statistics = CityStatisticsStore(self.collector)
+        print(f"📈 Şehir istatistikleri yüklendi: {self.city_statistics.nbytes / 1024:.0f} KB")
         self.weather_model = None
         self.temperature_model = None
         self.scaler = StandardScaler()
@@ -43,6 +71,19 @@ class HistoricalWeatherPredictor:
             '../models/historical_scaler.pkl',
             '../models/historical_weather_encoder.pkl'
         ]
+        self.model_version = None
+        
+        # Puanlayıcı: tek model (SingleModel) veya iklim bölgesi parçaları (ZoneModelRegistry)
+        self.models = None
+        self.model_sharding = os.getenv("WEATHER_MODEL_SHARDING", "none")
+        if self.model_sharding not in ("none", "zone"):
+            raise ValueError(f"Bilinmeyen WEATHER_MODEL_SHARDING: {self.model_sharding} (none veya zone)")
+        self.zone_model_dir = '../models/historical_zones'
+        self.shard_memory_mb = float(os.getenv("WEATHER_SHARD_MEMORY_MB", "512"))
+        self._city_zones: Dict[str, str] = {}
+        
+        # Şehir × gün önceden hesaplanmış tahminler (eğitimden sonra doldurulur)
+        self.forecasts = ForecastStore(os.getenv("WEATHER_FORECAST_FILE", '../models/historical_forecasts.npz'))
         
         # Modelleri yükle veya eğit
         self.load_or_train_models()
@@ -51,6 +92,19 @@ class HistoricalWeatherPredictor:
     
     def load_or_train_models(self):
         """ML modellerini yükle veya eğit"""
+        if self.model_sharding == "zone":
+            try:
+                self.models = ZoneModelRegistry(self.zone_model_dir, self.shard_memory_mb)
+                self.model_version = self.models.version
+                print(f"✅ {len(self.models.zones)} iklim bölgesi modeli bulundu (ilk istekte yüklenecek)")
+                return
+            except Exception as e:
+                print(f"❌ Bölge modelleri yüklenemedi: {e}")
+            
+            print("🤖 İklim bölgesi modelleri eğitiliyor...")
+            self.train_models()
+            return
+        
         # Model dosyalarının varlığını kontrol et
         if all(os.path.exists(f) for f in self.model_files):
             try:
@@ -58,6 +112,8 @@ class HistoricalWeatherPredictor:
                 self.temperature_model = joblib.load(self.model_files[1])
                 self.scaler = joblib.load(self.model_files[2])
                 self.weather_encoder = joblib.load(self.model_files[3])
+                self.models = SingleModel(self.weather_model, self.temperature_model, self.weather_encoder)
+                self.model_version = self._model_version()
                 print("✅ Tarihsel veri modelleri yüklendi")
                 return
             except Exception as e:
@@ -66,65 +122,248 @@ class HistoricalWeatherPredictor:
         print("🤖 Tarihsel veri modelleri eğitiliyor...")
         self.train_models()
     
-    def train_models(self):
-        """ML modellerini eğit"""
+    def train_models(self, chunksize: int = 100_000, max_training_rows: int = 1_000_000):
+        """ML modellerini eğit
+        
+        Eğitim verisi parça parça okunur; tablo max_training_rows'tan büyükse
+        modeller bellekte tutulan düzgün (uniform) bir örneklem üzerinde eğitilir.
+        """
         try:
-            # Eğitim verisini al
-            training_data = self.collector.generate_training_data()
+            # Eğitim verisini parçalar halinde al ve özellikleri hazırla
+            features, total_rows = self._sample_training_features(chunksize, max_training_rows,
+                                                                  with_zone=self.model_sharding == "zone")
             
-            if training_data.empty:
+            if features is None or features.empty:
                 print("❌ Eğitim verisi bulunamadı!")
                 return
             
-            print(f"📊 Eğitim verisi: {len(training_data)} kayıt")
+            print(f"📊 Eğitim verisi: {total_rows} kayıt"
+                  + (f" ({len(features)} kayıtlık örneklem)" if len(features) < total_rows else ""))
             
-            # Özellikleri hazırla
-            features = self._prepare_features(training_data)
-            
-            # Hava durumu sınıflandırma modeli
-            X_weather = features.drop(['weather_main', 'temperature'], axis=1, errors='ignore')
-            y_weather = self.weather_encoder.fit_transform(training_data['weather_main'])
+            if self.model_sharding == "zone":
+                self._train_zone_models(features.drop(columns='zone'), features['zone'])
+            else:
+                # Hava durumu sınıflandırma modeli
+                X_weather = features.drop(['weather_main', 'temperature'], axis=1, errors='ignore')
+                y_weather = self.weather_encoder.fit_transform(features['weather_main'])
             
-            # Sıcaklık regresyon modeli
-            X_temp = features.drop(['weather_main', 'temperature'], axis=1, errors='ignore')
-            y_temp = training_data['temperature']
+                # Sıcaklık regresyon modeli
+                X_temp = features.drop(['weather_main', 'temperature'], axis=1, errors='ignore')
+                y_temp = features['temperature']
             
-            # Veriyi eğitim ve test olarak böl
-            X_weather_train, X_weather_test, y_weather_train, y_weather_test = train_test_split(
-                X_weather, y_weather, test_size=0.2, random_state=42
-            )
+                # Veriyi eğitim ve test olarak böl
+                X_weather_train, X_weather_test, y_weather_train, y_weather_test = train_test_split(
+                    X_weather, y_weather, test_size=0.2, random_state=42
+                )
             
-            X_temp_train, X_temp_test, y_temp_train, y_temp_test = train_test_split(
-                X_temp, y_temp, test_size=0.2, random_state=42
-            )
+                X_temp_train, X_temp_test, y_temp_train, y_temp_test = train_test_split(
+                    X_temp, y_temp, test_size=0.2, random_state=42
+                )
             
-            # Modelleri eğit
-            print("🌤️ Hava durumu sınıflandırma modeli eğitiliyor...")
-            self.weather_model = RandomForestClassifier(n_estimators=100, random_state=42)
-            self.weather_model.fit(X_weather_train, y_weather_train)
+                # Modelleri eğit
+                print("🌤️ Hava durumu sınıflandırma modeli eğitiliyor...")
+                self.weather_model = RandomForestClassifier(n_estimators=100, random_state=42)
+                self.weather_model.fit(X_weather_train, y_weather_train)
             
-            print("🌡️ Sıcaklık regresyon modeli eğitiliyor...")
-            self.temperature_model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.temperature_model.fit(X_temp_train, y_temp_train)
+                print("🌡️ Sıcaklık regresyon modeli eğitiliyor...")
+                self.temperature_model = RandomForestRegressor(n_estimators=100, random_state=42)
+                self.temperature_model.fit(X_temp_train, y_temp_train)
             
-            # Model performansını değerlendir
-            weather_accuracy = accuracy_score(y_weather_test, self.weather_model.predict(X_weather_test))
-            temp_r2 = self.temperature_model.score(X_temp_test, y_temp_test)
+                # Model performansını değerlendir
+                weather_accuracy = accuracy_score(y_weather_test, self.weather_model.predict(X_weather_test))
+                temp_r2 = self.temperature_model.score(X_temp_test, y_temp_test)
             
-            print(f"✅ Hava durumu modeli doğruluğu: {weather_accuracy:.3f}")
-            print(f"✅ Sıcaklık modeli R² skoru: {temp_r2:.3f}")
+                print(f"✅ Hava durumu modeli doğruluğu: {weather_accuracy:.3f}")
+                print(f"✅ Sıcaklık modeli R² skoru: {temp_r2:.3f}")
             
-            # Modelleri kaydet
-            os.makedirs('../models', exist_ok=True)
-            joblib.dump(self.weather_model, self.model_files[0])
-            joblib.dump(self.temperature_model, self.model_files[1])
-            joblib.dump(self.scaler, self.model_files[2])
-            joblib.dump(self.weather_encoder, self.model_files[3])
+                # Modelleri kaydet
+                os.makedirs('../models', exist_ok=True)
+                joblib.dump(self.weather_model, self.model_files[0])
+                joblib.dump(self.temperature_model, self.model_files[1])
+                joblib.dump(self.scaler, self.model_files[2])
+                joblib.dump(self.weather_encoder, self.model_files[3])
             
-            print("💾 Modeller kaydedildi")
+                self.models = SingleModel(self.weather_model, self.temperature_model, self.weather_encoder)
+                self.model_version = self._model_version()
+                print("💾 Modeller kaydedildi")
             
         except Exception as e:
             print(f"❌ Model eğitimi hatası: {e}")
+            return
+        
+        # Eğitimden sonra önümüzdeki ayların tahminlerini önceden hesapla (0 ay: kapalı)
+        months = int(os.getenv("WEATHER_FORECAST_MONTHS", "12"))
+        if months > 0:
+            try:
+                self.precompute_forecasts(months=months,
+                                          time_budget=float(os.getenv("WEATHER_FORECAST_TIME_BUDGET", "120")))
+            except Exception as e:
+                print(f"⚠️ Tahminler önceden hesaplanamadı (canlı tahmin kullanılacak): {e}")
+    
+    def _train_zone_models(self, features: pd.DataFrame, zones: pd.Series):
+        """Her iklim bölgesi için model çiftini paralel eğit ve kayıt üzerinden tembel yükle"""
+        print(f"🗺️ {zones.nunique()} iklim bölgesi için modeller paralel eğitiliyor...")
+        manifest = train_zone_models(features, zones.to_numpy(), self.zone_model_dir)
+        for zone, entry in manifest["zones"].items():
+            accuracy = "-" if entry["accuracy"] is None else f"{entry['accuracy']:.3f}"
+            r2 = "-" if entry["r2"] is None else f"{entry['r2']:.3f}"
+            print(f"   {zone}: {entry['rows']} kayıt, doğruluk {accuracy}, R² {r2}, "
+                  f"{entry['bytes'] / 1024 / 1024:.1f} MB")
+        print(f"💾 Bölge modelleri kaydedildi ({manifest['workers']} süreç, {manifest['train_seconds']:.1f} sn)")
+        
+        self.models = ZoneModelRegistry(self.zone_model_dir, self.shard_memory_mb)
+        self.model_version = self.models.version
+    
+    def _zones_for(self, cities: List[str]) -> Optional[List[str]]:
+        """Parçalı modellerde şehirlerin iklim bölgeleri (tek modelde None)"""
+        if self.model_sharding != "zone":
+            return None
+        unknown = [city for city in cities if city not in self._city_zones]
+        if unknown:
+            self._city_zones.update(zone_of_cities(unknown, self.collector.cities_data))
+        return [self._city_zones[city] for city in cities]
+    
+    def _model_spec(self) -> Dict:
+        """Süreç havuzu işçilerinin aynı modelleri yükleyebilmesi için tanım"""
+        if self.model_sharding == "zone":
+            # Toplu iş her bloğu tüm bölgelerle puanlar; işçide bütçe sınırı yok
+            return {"zone_directory": self.zone_model_dir, "memory_budget_mb": None}
+        return {"files": [self.model_files[0], self.model_files[1], self.model_files[3]]}
+    
+    def _model_version(self) -> str:
+        """Kaydedilmiş modellerin sürümü (önceden hesaplanmış tahminlerin geçerliliği için)"""
+        stats = [os.stat(path) for path in self.model_files]
+        return "-".join(f"{stat.st_mtime_ns}:{stat.st_size}" for stat in stats)
+    
+    def precompute_forecasts(self, months: int = 12, workers: Optional[int] = None,
+                             time_budget: float = 120.0, block_days: int = 7) -> Dict:
+        """Tüm şehirler × önümüzdeki months ayın her günü için tahminleri hesapla ve kaydet
+        
+        Günler block_days'lik bloklar halinde süreç havuzunda puanlanır. time_budget saniye
+        dolduğunda bekleyen bloklar iptal edilir; dosya yalnızca kesintisiz tamamlanan ilk
+        günleri kapsar, sonrası canlı tahminle sunulur.
+        """
+        if self.models is None or self.model_version is None:
+            print("⚠️ Modeller hazır olmadığı için tahminler önceden hesaplanmadı")
+            return {}
+        
+        started = time.monotonic()
+        deadline = started + time_budget
+        workers = workers or max(1, min(4, (os.cpu_count() or 1) - 1))
+        
+        # Bugünden months ay sonrasına kadar (ay sonları kırpılır)
+        start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        month_index = start_date.month - 1 + months
+        end_year, end_month = start_date.year + month_index // 12, month_index % 12 + 1
+        end_date = start_date.replace(year=end_year, month=end_month,
+                                      day=min(start_date.day, calendar.monthrange(end_year, end_month)[1]))
+        dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days)]
+        blocks = [dates[i:i + block_days] for i in range(0, len(dates), block_days)]
+        
+        self.probability_cube.ensure_fresh()
+        cities = list(self.probability_cube.cities)
+        zones = self._zones_for(cities)
+        fingerprint = self.probability_cube.fingerprint
+        print(f"🗓️ {len(cities)} şehir × {len(dates)} gün için tahminler hesaplanıyor "
+              f"({workers} süreç, süre sınırı {time_budget:.0f} sn)...")
+        
+        def block_features(block):
+            frames = []
+            for date_obj in block:
+                probs = self.probability_cube.get_route_probabilities(cities, date_obj.month, date_obj.day)
+                examples = self.collector.get_historical_examples_for_cities(cities, date_obj.month, date_obj.day, limit=5)
+                frames.append(self._route_features(cities, [date_obj] * len(cities), probs,
+                                                   [examples[city] for city in cities]))
+            return pd.concat(frames, ignore_index=True)
+        
+        scored = {}
+        if workers == 1:
+            # Tek süreç: havuz kurmadan aynı sırayla puanla
+            for index, block in enumerate(blocks):
+                if time.monotonic() >= deadline:
+                    break
+                block_zones = None if zones is None else zones * len(block)
+                scored[index] = self.models.score(block_zones, block_features(block))
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                       initargs=(self._model_spec(),))
+            try:
+                # Bloklar tarih sırasıyla gönderilir; işçiler puanlarken sıradaki bloğun özellikleri hazırlanır
+                futures = []
+                for index, block in enumerate(blocks):
+                    if time.monotonic() >= deadline:
+                        break
+                    block_zones = None if zones is None else zones * len(block)
+                    futures.append(pool.submit(score_block, index, block_zones, block_features(block)))
+                for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                    index, result = future.result()
+                    scored[index] = result
+            except FuturesTimeoutError:
+                pass
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+        
+        # Yalnızca baştan kesintisiz tamamlanan bloklar saklanır
+        covered = 0
+        while covered in scored:
+            covered += 1
+        if covered == 0:
+            print("⚠️ Süre sınırında hiç blok tamamlanamadı, tahmin dosyası yazılmadı")
+            return {}
+        if covered < len(blocks):
+            print(f"⏱️ Süre sınırı doldu: {len(blocks)} bloğun ilk {covered} tanesi saklanıyor")
+        
+        n_cities = len(cities)
+        probabilities = np.concatenate([
+            scored[i][0].reshape(len(blocks[i]), n_cities, -1) for i in range(covered)
+        ]).transpose(1, 0, 2)
+        temperature = np.concatenate([
+            scored[i][1].reshape(len(blocks[i]), n_cities) for i in range(covered)
+        ]).T
+        classes = self.models.classes
+        
+        elapsed = time.monotonic() - started
+        manifest = self.forecasts.save(
+            start_date.date(), cities, classes, probabilities, temperature, self.model_version, fingerprint,
+            meta={"requested_days": len(dates), "workers": workers, "elapsed_seconds": round(elapsed, 2)}
+        )
+        print(f"💾 {n_cities} şehir × {manifest['days']} günlük tahmin kaydedildi ({elapsed:.1f} sn)")
+        return manifest
+    
+    def _sample_training_features(self, chunksize: int, max_rows: int,
+                                  with_zone: bool = False) -> Tuple[Optional[pd.DataFrame], int]:
+        """Parçalardan özellik çıkar, en fazla max_rows satırlık düzgün örneklemi tut
+        
+        Her satıra rastgele bir anahtar verilir ve en küçük anahtarlı max_rows satır
+        saklanır (bottom-k örnekleme); bellek kullanımı örneklem + bir parça ile sınırlıdır.
+        Tablo sınırdan küçükse tüm satırlar orijinal sırasıyla döner.
+        with_zone=True ise satırın iklim bölgesi 'zone' kolonuna eklenir.
+        """
+        rng = np.random.default_rng(42)
+        sample, keys, total_rows = None, None, 0
+        
+        for chunk in self.collector.generate_training_data(chunksize=chunksize):
+            features = self._prepare_features(chunk)
+            numeric = features.columns.difference(['weather_main', 'temperature'])
+            features[numeric] = features[numeric].astype(np.float32)
+            if with_zone:
+                cities = chunk['city'].astype(str)
+                features['zone'] = cities.map(zone_of_cities(cities.unique(), self.collector.cities_data))
+            chunk_keys = rng.random(len(features))
+            total_rows += len(features)
+            
+            if sample is None:
+                sample, keys = features, chunk_keys
+            else:
+                sample = pd.concat([sample, features], ignore_index=True)
+                keys = np.concatenate([keys, chunk_keys])
+            
+            if len(sample) > max_rows:
+                keep = np.sort(np.argpartition(keys, max_rows)[:max_rows])
+                sample = sample.iloc[keep].reset_index(drop=True)
+                keys = keys[keep]
+        
+        return sample, total_rows
     
     def _prepare_features(self, data: pd.DataFrame) -> pd.DataFrame:
         """ML modelleri için özellikleri hazırla"""
@@ -164,26 +403,140 @@ class HistoricalWeatherPredictor:
         
         return features[numeric_features + ['weather_main', 'temperature']]
     
-    def predict_weather(self, city: str, date_str: str) -> Dict:
-        """Belirli bir şehir ve tarih için hava durumu tahmini"""
+    def predict_weather(self, city: str, date_str: str, fields: Optional[frozenset] = None) -> Dict:
+        """Belirli bir şehir ve tarih için hava durumu tahmini (fields: istenen alanlar, None ise tümü)"""
         try:
-            # Tarihi parse et
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            month = date_obj.month
-            day = date_obj.day
+            return self._predict_cities([city], date_str, fields)[0]
             
-            # Tarihsel olasılıkları al
-            historical_prob = self.collector.get_daily_weather_probability(city, month, day)
-            
-            # Geçmiş örnekleri al
-            historical_examples = self.collector.get_historical_examples(city, month, day, limit=5)
-            
-            # ML modeli için özellikleri hazırla
+        except Exception as e:
+            print(f"❌ Hava durumu tahmin hatası: {e}")
+            return self._select_fields(self._get_fallback_prediction(city, date_str), fields)
+    
+    @staticmethod
+    def parse_fields(fields) -> Optional[frozenset]:
+        """İstekteki fields parametresini (liste veya virgüllü metin) doğrula; yoksa None (tüm alanlar)"""
+        if fields is None:
+            return None
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        if not isinstance(fields, (list, tuple)) or not all(isinstance(field, str) for field in fields):
+            raise ValueError("fields bir alan adı listesi olmalı")
+        unknown = sorted(set(fields) - set(PREDICTION_FIELDS))
+        if unknown:
+            raise ValueError(f"Bilinmeyen alan(lar): {', '.join(unknown)}. Geçerli alanlar: {', '.join(PREDICTION_FIELDS)}")
+        return frozenset(fields)
+    
+    @staticmethod
+    def _select_fields(prediction: Dict, fields: Optional[frozenset]) -> Dict:
+        """Tahminden yalnızca istenen alanları (şehir ve tarih her zaman) bırak"""
+        if fields is None:
+            return prediction
+        return {key: value for key, value in prediction.items() if key in ('city', 'date') or key in fields}
+    
+    def _predict_cities(self, cities: List[str], date_str: str, fields: Optional[frozenset] = None) -> List[Dict]:
+        """Aynı tarih için şehirlerin tahmini"""
+        return self._predict_pairs([(city, date_str) for city in cities], fields)
+    
+    def _predict_pairs(self, pairs: List[Tuple[str, str]], fields: Optional[frozenset] = None) -> List[Dict]:
+        """(şehir, tarih) çiftlerinin tahmini: tek özellik matrisi, model başına tek geçiş
+        
+        Geçmiş örnekler takvim günü başına tek sorguyla alınır. fields verilirse yalnızca
+        o alanlar hesaplanır; istenmeyen alanların alt hesapları (geçmiş örnek sorgusu,
+        açıklama, model geçişleri) hiç çalıştırılmaz.
+        """
+        fields = frozenset(PREDICTION_FIELDS) if fields is None else fields
+        need_weather = 'predicted_weather' in fields or 'ml_confidence' in fields
+        need_temperature = 'predicted_temperature' in fields
+        
+        # Tarihleri parse et (aynı tarih bir kez)
+        unique_pairs = list(dict.fromkeys(pairs))
+        parsed = {date_str: datetime.strptime(date_str, '%Y-%m-%d') for date_str in dict.fromkeys(d for _, d in unique_pairs)}
+        cities = [city for city, _ in unique_pairs]
+        dates = [parsed[date_str] for _, date_str in unique_pairs]
+        
+        # Tarihsel olasılıklar (bellek içi küp, tek indeksleme)
+        historical_probs = self.probability_cube.get_probabilities(
+            cities, [date_obj.month for date_obj in dates], [date_obj.day for date_obj in dates]
+        )
+        
+        # Önceden hesaplanmış tahminler güncelse modele hiç gidilmez
+        forecast = None
+        if need_weather or need_temperature:
+            forecast = self.forecasts.lookup_pairs(cities, [date_obj.date() for date_obj in dates],
+                                                   self.model_version, self.probability_cube.fingerprint)
+        
+        # Geçmiş örnekler (takvim günü başına tek sorgu): yanıtta istenmişse veya canlı model özellikleri için gerekiyorsa
+        need_examples = ('historical_examples' in fields or 'explanation' in fields
+                         or ((need_weather or need_temperature) and forecast is None))
+        examples = [[] for _ in unique_pairs]
+        if need_examples:
+            by_day: Dict[Tuple[int, int], List[int]] = {}
+            for i, date_obj in enumerate(dates):
+                by_day.setdefault((date_obj.month, date_obj.day), []).append(i)
+            for (month, day), indices in by_day.items():
+                day_cities = list(dict.fromkeys(cities[i] for i in indices))
+                day_examples = self.collector.get_historical_examples_for_cities(day_cities, month, day, limit=5)
+                for i in indices:
+                    examples[i] = day_examples[cities[i]]
+        
+        weather_preds = ml_confidences = predicted_temps = None
+        if forecast is not None:
+            weather_preds = forecast["weather"]
+            ml_confidences = forecast["confidence"]
+            predicted_temps = forecast["temperature"]
+        elif not (need_weather or need_temperature):
+            # Model alanı istenmedi: özellik matrisi kurulmaz, model puanlanmaz
+            pass
+        elif self.models is not None:
+            features = self._route_features(cities, dates, historical_probs, examples)
+            # ML tahminleri: predict, predict_proba'nın argmax'ıdır; orman bir kez dolaşılır
+            weather_proba, predicted_temps = self.models.score(
+                self._zones_for(cities), features, need_weather, need_temperature
+            )
+            if need_weather:
+                best = weather_proba.argmax(axis=1)
+                weather_preds = self.models.classes[best]
+                ml_confidences = weather_proba[np.arange(len(unique_pairs)), best]
+        else:
+            weather_preds = [prob.get('most_likely', 'Unknown') for prob in historical_probs]
+            ml_confidences = [0.5] * len(unique_pairs)
+            if need_temperature:
+                predicted_temps = [
+                    np.mean([ex['temperature'] for ex in pair_examples]) if pair_examples else 20
+                    for pair_examples in examples
+                ]
+        
+        # Sonuçları birleştir (alanlar her zaman aynı sırada)
+        results = {}
+        for i, ((city, date_str), date_obj, historical_prob) in enumerate(zip(unique_pairs, dates, historical_probs)):
+            historical_examples = examples[i]
+            values = {
+                "predicted_weather": lambda: weather_preds[i],
+                "predicted_temperature": lambda: round(predicted_temps[i], 1),
+                "historical_probabilities": lambda: historical_prob.get('weather_probabilities', {}),
+                "historical_examples": lambda: historical_examples,
+                "ml_confidence": lambda: ml_confidences[i],
+                "historical_confidence": lambda: historical_prob.get('confidence', 0.0),
+                "sample_count": lambda: historical_prob.get('sample_count', 0),
+                "explanation": lambda: self._generate_explanation(city, date_obj.month, date_obj.day,
+                                                                  historical_prob, historical_examples)
+            }
+            result = {"city": city, "date": date_str}
+            result.update((field, values[field]()) for field in PREDICTION_FIELDS if field in fields)
+            results[(city, date_str)] = result
+        
+        return [dict(results[pair]) for pair in pairs]
+    
+    def _route_features(self, cities: List[str], dates: List[datetime], historical_probs: List[Dict],
+                        examples: List[List[Dict]]) -> pd.DataFrame:
+        """ML modeli için özellik matrisi (her (şehir, tarih) çifti için bir satır)"""
+        rows = []
+        for city, date_obj, historical_prob, historical_examples in zip(cities, dates, historical_probs, examples):
+            month = date_obj.month
             city_coords = self.collector.cities_data.get(city, {"lat": 39.0, "lon": 35.0})
-            
-            features = pd.DataFrame([{
+            rows.append({
                 'month': month,
-                'day': day,
+                'day': date_obj.day,
                 'day_of_year': date_obj.timetuple().tm_yday,
                 'day_of_week': date_obj.weekday(),
                 'season': (month % 12 + 3) // 3,
@@ -193,43 +546,8 @@ class HistoricalWeatherPredictor:
                 'wind_speed': np.mean([ex['wind_speed'] for ex in historical_examples]) if historical_examples else 10,
                 'probability': historical_prob.get('confidence', 0.5),
                 'sample_count': historical_prob.get('sample_count', 1)
-            }])
-            
-            # ML tahminleri
-            if self.weather_model is not None:
-                weather_pred = self.weather_encoder.inverse_transform(
-                    self.weather_model.predict(features)
-                )[0]
-                weather_proba = self.weather_model.predict_proba(features)[0]
-                ml_confidence = max(weather_proba)
-            else:
-                weather_pred = historical_prob.get('most_likely', 'Unknown')
-                ml_confidence = 0.5
-            
-            if self.temperature_model is not None:
-                predicted_temp = self.temperature_model.predict(features)[0]
-            else:
-                predicted_temp = np.mean([ex['temperature'] for ex in historical_examples]) if historical_examples else 20
-            
-            # Sonuçları birleştir
-            result = {
-                "city": city,
-                "date": date_str,
-                "predicted_weather": weather_pred,
-                "predicted_temperature": round(predicted_temp, 1),
-                "historical_probabilities": historical_prob.get('weather_probabilities', {}),
-                "historical_examples": historical_examples,
-                "ml_confidence": ml_confidence,
-                "historical_confidence": historical_prob.get('confidence', 0.0),
-                "sample_count": historical_prob.get('sample_count', 0),
-                "explanation": self._generate_explanation(city, month, day, historical_prob, historical_examples)
-            }
-            
-            return result
-            
-        except Exception as e:
-            print(f"❌ Hava durumu tahmin hatası: {e}")
-            return self._get_fallback_prediction(city, date_str)
+            })
+        return pd.DataFrame(rows)
     
     def _generate_explanation(self, city: str, month: int, day: int, 
                             historical_prob: Dict, historical_examples: List[Dict]) -> str:
@@ -275,58 +593,166 @@ class HistoricalWeatherPredictor:
             "explanation": "Yeterli veri bulunamadığı için tahmin yapılamadı."
         }
     
-    def predict_route_weather(self, cities: List[str], date_str: str) -> Dict:
-        """Rota üzerindeki tüm şehirler için hava durumu tahmini"""
-        predictions = []
-        total_confidence = 0
+    def predict_route_weather(self, cities: List[str], date_str: str, fields: Optional[frozenset] = None) -> Dict:
+        """Rota üzerindeki tüm şehirler için hava durumu tahmini (fields: şehir başına istenen alanlar)"""
+        # Rota özeti için gereken alanlar her durumda hesaplanır
+        computed = None if fields is None else fields | ROUTE_SUMMARY_FIELDS
+        try:
+            predictions = self._predict_cities(cities, date_str, computed) if cities else []
+        except Exception as e:
+            # Toplu yol başarısız olursa şehir şehir dene (her şehir kendi fallback'ine düşer)
+            print(f"⚠️ Toplu rota tahmini başarısız, şehir bazında deneniyor: {e}")
+            predictions = [self.predict_weather(city, date_str, computed) for city in cities]
         
-        for city in cities:
-            prediction = self.predict_weather(city, date_str)
-            predictions.append(prediction)
-            total_confidence += prediction.get('ml_confidence', 0)
+        return {
+            "predictions": [self._select_fields(prediction, fields) for prediction in predictions],
+            "route_summary": {"total_cities": len(cities), **self._summarize(predictions)}
+        }
+    
+    def predict_range_weather(self, pairs: List[Tuple[str, str]], fields: Optional[frozenset] = None) -> Dict:
+        """Çok günlük yolculuk: (şehir, tarih) çiftleri tek özellik matrisinde, şehir × tarih tablosu olarak"""
+        computed = None if fields is None else fields | ROUTE_SUMMARY_FIELDS
+        try:
+            predictions = self._predict_pairs(pairs, computed)
+        except Exception as e:
+            # Toplu yol başarısız olursa çift çift dene (her çift kendi fallback'ine düşer)
+            print(f"⚠️ Toplu aralık tahmini başarısız, çift bazında deneniyor: {e}")
+            predictions = [self.predict_weather(city, date_str, computed) for city, date_str in pairs]
         
-        avg_confidence = total_confidence / len(cities) if cities else 0
+        grid = {}
+        for prediction in predictions:
+            grid.setdefault(prediction["city"], {})[prediction["date"]] = self._select_fields(prediction, fields)
         
         return {
-            "predictions": predictions,
-            "route_summary": {
-                "total_cities": len(cities),
-                "avg_confidence": avg_confidence,
-                "weather_conditions": list(set([p["predicted_weather"] for p in predictions])),
-                "avg_temperature": sum([p["predicted_temperature"] for p in predictions]) / len(predictions) if predictions else 20.0
-            }
+            "cities": list(grid),
+            "dates": sorted({date_str for _, date_str in pairs}),
+            "grid": grid,
+            "summary": {"total_predictions": len(predictions), **self._summarize(predictions)}
+        }
+    
+    @staticmethod
+    def _summarize(predictions: List[Dict]) -> Dict:
+        """Tahmin listesinin ortalama güveni, hava durumları ve ortalama sıcaklığı"""
+        total_confidence = sum(prediction.get('ml_confidence', 0) for prediction in predictions)
+        return {
+            "avg_confidence": total_confidence / len(predictions) if predictions else 0,
+            "weather_conditions": list(set([p["predicted_weather"] for p in predictions])),
+            "avg_temperature": sum([p["predicted_temperature"] for p in predictions]) / len(predictions) if predictions else 20.0
         }
     
+    @staticmethod
+    def parse_range_pairs(data: Dict) -> List[Tuple[str, str]]:
+        """/predict_range isteğinden (şehir, tarih) çiftleri
+        
+        Ya start_date–end_date aralığı (her şehir × her gün) ya da şehir başına arrival_dates
+        (cities ile aynı sırada liste veya şehir → tarih sözlüğü) verilir.
+        """
+        cities = data.get('cities')
+        if not isinstance(cities, list) or not cities or not all(isinstance(city, str) and city for city in cities):
+            raise ValueError("cities boş olmayan bir şehir listesi olmalı")
+        
+        def parse_date(value, name):
+            try:
+                return datetime.strptime(value, '%Y-%m-%d')
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} YYYY-MM-DD formatında olmalı: {value!r}")
+        
+        arrival_dates = data.get('arrival_dates')
+        if arrival_dates is not None:
+            if isinstance(arrival_dates, dict):
+                arrival_dates = [arrival_dates.get(city) for city in cities]
+            if not isinstance(arrival_dates, list) or len(arrival_dates) != len(cities):
+                raise ValueError("arrival_dates, cities ile aynı uzunlukta bir liste veya şehir → tarih sözlüğü olmalı")
+            pairs = [(city, parse_date(value, 'arrival_dates').strftime('%Y-%m-%d'))
+                     for city, value in zip(cities, arrival_dates)]
+        else:
+            start = parse_date(data.get('start_date'), 'start_date')
+            end = parse_date(data.get('end_date', data.get('start_date')), 'end_date')
+            days = (end - start).days + 1
+            if days < 1:
+                raise ValueError("end_date, start_date'ten önce olamaz")
+            if days > MAX_RANGE_DAYS:
+                raise ValueError(f"Tarih aralığı en fazla {MAX_RANGE_DAYS} gün olabilir")
+            dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+            pairs = [(city, date_str) for city in cities for date_str in dates]
+        
+        if len(pairs) > MAX_RANGE_PAIRS:
+            raise ValueError(f"En fazla {MAX_RANGE_PAIRS} (şehir, tarih) çifti istenebilir")
+        return pairs
+    
+    def response_epoch(self, kind: str) -> str:
+        """Yanıtların veri/model epoch'u: veri alımında ve model değişiminde değişir
+        
+        Süreç içi sayaçlar (data_epoch) işçi süreçler arasında karşılaştırılamaz; bu yüzden
+        epoch, yanıtı üreten bellek içi görünümün tablo parmak izinden (toplayıcının epoch'u
+        değişince hemen yenilenir) ve tahminler için model sürümünden türetilir.
+        """
+        if kind == 'statistics':
+            self.city_statistics.ensure_fresh()
+            parts = [normalize_fingerprint(self.city_statistics.fingerprint)]
+        else:
+            self.probability_cube.ensure_fresh()
+            parts = [normalize_fingerprint(self.probability_cube.fingerprint), self.model_version]
+        return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()[:16]
+    
+    def etag(self, kind: str, key) -> str:
+        """İstek anahtarı ve epoch'tan ETag (yanıt hesaplanmadan önce)"""
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+        return f"{kind}-{self.response_epoch(kind)}-{digest}"
+    
     def get_city_statistics(self, city: str) -> Dict:
-        """Şehir için istatistiksel bilgiler"""
-        return self.collector.get_city_statistics(city)
+        """Şehir için genel ve aylık istatistikler (bellekten, istek başına sorgu yok)"""
+        return self.city_statistics.get_city_statistics(city)
 
 # Flask API
 app = Flask(__name__)
 CORS(app)  # CORS desteği ekle
 predictor = HistoricalWeatherPredictor()
 
+def _conditional_response(etag: str, compute):
+    """If-None-Match ETag ile eşleşirse hesaplamadan 304, değilse ETag'li JSON yanıt"""
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(compute())
+    response.set_etag(etag)
+    # Önbellekler saklayabilir ama her kullanımda doğrulamalı
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy",
         "service": "Historical Weather Predictor",
-        "models_loaded": predictor.weather_model is not None and predictor.temperature_model is not None,
+        "models_loaded": predictor.models is not None,
+        "model_sharding": predictor.model_sharding,
+        "model_shards": predictor.models.stats() if isinstance(predictor.models, ZoneModelRegistry) else None,
         "cities_supported": len(predictor.collector.cities_data)
     })
 
-@app.route('/predict', methods=['POST'])
+@app.route('/predict', methods=['GET', 'POST'])
 def predict_weather():
+    """POST: JSON gövdesi, her zaman 200; GET: sorgu parametreleri, ETag ile koşullu (304)"""
     try:
-        data = request.get_json()
+        data = request.args if request.method == 'GET' else request.get_json()
         city = data.get('city')
         date = data.get('date')
         
         if not city or not date:
             return jsonify({"error": "city ve date parametreleri gerekli"}), 400
         
-        prediction = predictor.predict_weather(city, date)
-        return jsonify(prediction)
+        try:
+            fields = predictor.parse_fields(data.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if request.method == 'POST':
+            # POST yanıtları önbelleğe alınabilir temsil değildir: ETag/304 yalnızca GET'te
+            return jsonify(predictor.predict_weather(city, date, fields))
+        
+        etag = predictor.etag('predict', {"city": city, "date": date, "fields": None if fields is None else sorted(fields)})
+        return _conditional_response(etag, lambda: predictor.predict_weather(city, date, fields))
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -341,7 +767,29 @@ def predict_route():
         if not cities or not date:
             return jsonify({"error": "cities ve date parametreleri gerekli"}), 400
         
-        prediction = predictor.predict_route_weather(cities, date)
+        try:
+            fields = predictor.parse_fields(data.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        prediction = predictor.predict_route_weather(cities, date, fields)
+        return jsonify(prediction)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/predict_range', methods=['POST'])
+def predict_range():
+    try:
+        data = request.get_json()
+        
+        try:
+            pairs = predictor.parse_range_pairs(data)
+            fields = predictor.parse_fields(data.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        prediction = predictor.predict_range_weather(pairs, fields)
         return jsonify(prediction)
         
     except Exception as e:
@@ -350,8 +798,8 @@ def predict_route():
 @app.route('/statistics/<city>', methods=['GET'])
 def get_city_statistics(city):
     try:
-        stats = predictor.get_city_statistics(city)
-        return jsonify(stats)
+        etag = predictor.etag('statistics', city)
+        return _conditional_response(etag, lambda: predictor.get_city_statistics(city))
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -361,6 +809,7 @@ if __name__ == "__main__":
     print("📊 Örnek kullanım:")
     print("  POST /predict - Tek şehir tahmini")
     print("  POST /predict_route - Rota tahmini")
+    print("  POST /predict_range - Şehir × tarih aralığı tahmini")
     print("  GET /statistics/<city> - Şehir istatistikleri")
     
     app.run(host='0.0.0.0', port=5002, debug=True) 
\ No newline at end of file
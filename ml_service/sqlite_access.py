@@ -0,0 +1,115 @@
+"""
+SQLite Erişim Katmanı (WAL + İş Parçacığı Başına Okuyucu + Tek Yazıcı)
+
+historical_weather.db dosyasını kullanan modüller (MLWeatherDatabase, son 3 yıl
+ortalamaları, HistoricalWeatherDataCollector'ın SQLite adaptörü) bağlantılarını bu
+katmandan alır. Dosya WAL kipinde açılır: veri alımı veya istatistik yeniden oluşturma
+yazarken Flask istek iş parçacıklarındaki okumalar beklemez.
+
+Özellikler:
+- Dosya başına tek SQLiteAccess (süreç içi kayıt defteri, mutlak yol anahtarlı)
+- İş parçacığı başına kalıcı, salt okunur (query_only) okuyucu bağlantılar
+- Tüm yazımlar tek yazıcı bağlantısından, kilit altında ve tek transaction'da
+- mmap_size / cache_size / busy_timeout ayarı (ortam değişkenleriyle değiştirilebilir)
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Okuyucular sayfaları bellek eşlemeli okur; sayfa önbelleği bağlantı başınadır (KiB, negatif değer)
+MMAP_SIZE = int(os.getenv("WEATHER_SQLITE_MMAP_MB", "256")) * 1024 * 1024
+CACHE_SIZE_KB = int(os.getenv("WEATHER_SQLITE_CACHE_MB", "64")) * 1024
+BUSY_TIMEOUT_MS = 5000
+
+
+def tune_connection(conn: sqlite3.Connection, read_only: bool = False) -> sqlite3.Connection:
+    """Bağlantı başına ayarlar (journal_mode dosyada kalıcıdır, burada değiştirilmez)"""
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    # WAL'da NORMAL dayanıklılığı korur (yalnızca checkpoint'te fsync)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class SQLiteAccess:
+    """Tek bir SQLite dosyası için WAL kipinde okuyucu/yazıcı bağlantıları"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.journal_mode: Optional[str] = None
+        self._local = threading.local()
+        # Aynı iş parçacığında iç içe writer() kullanımı kilitlenmesin
+        self._write_lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._generation = 0
+
+    def open(self, read_only: bool = False, check_same_thread: bool = True) -> sqlite3.Connection:
+        """Yeni ayarlı bağlantı (kapatmak çağırana aittir); dosya ilk açılışta WAL'a geçirilir"""
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=256,
+                               check_same_thread=check_same_thread)
+        if self.journal_mode is None:
+            self.journal_mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        return tune_connection(conn, read_only)
+
+    def reader(self) -> sqlite3.Connection:
+        """İş parçacığına ait salt okunur kalıcı bağlantı"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.generation != self._generation:
+            self.reset_reader()
+            conn = self.open(read_only=True)
+            self._local.conn = conn
+            self._local.generation = self._generation
+        return conn
+
+    def reset_reader(self):
+        """Bu iş parçacığının okuyucu bağlantısını kapat (hata sonrası temiz başlangıç için)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local.conn = None
+
+    @contextmanager
+    def writer(self):
+        """Tek yazıcı bağlantısı: kilit altında, çıkışta commit (hata olursa rollback)"""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self.open(check_same_thread=False)
+            conn = self._writer
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def close(self):
+        """Yazıcıyı kapat; diğer iş parçacıklarının okuyucuları bir sonraki kullanımda yeniden açılır"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._generation += 1
+        self.reset_reader()
+
+
+_registry: Dict[str, SQLiteAccess] = {}
+_registry_lock = threading.Lock()
+
+
+def sqlite_access(db_path: str) -> SQLiteAccess:
+    """Dosya için süreç genelindeki erişim katmanı (aynı dosyaya tek yazıcı)"""
+    key = os.path.abspath(db_path)
+    access = _registry.get(key)
+    if access is None:
+        with _registry_lock:
+            access = _registry.setdefault(key, SQLiteAccess(key))
+    return access
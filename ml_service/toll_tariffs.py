@@ -0,0 +1,181 @@
+"""
+Köprü ve Otoyol Ücret Tarifesi Motoru
+
+calculate_toll_cost ve /calculate_cost, yol adında "köprü"/"otoyol" geçip
+geçmediğine bakıp sabit 200 TL, km başına 0.15 TL veya yol başına 25 TL
+hesaplıyordu. Bu modül tarifeyi (köprüler, otoyol kesimleri, araç sınıfları)
+yerel bir veri dosyasından bir kez yükleyip dizilere çevirir; çok sayıda rota ×
+araç sınıfı tek bir matris çarpımıyla hesaplanır.
+
+Özellikler:
+- data/toll_tariffs.json (TOLL_TARIFF_FILE ile değiştirilebilir), dosya değişince yeniden yükleme
+- Ad eşleştirme önceden hesaplanmış normalize ad → kalem sözlüğüyle (Türkçe harf, büyük/küçük,
+  noktalama farkları ve takma adlar; ör. "FSM Köprüsü", "o-4")
+- Tarifede olmayan ama "köprü"/"otoyol" içeren adlar için eski davranışla uyumlu yedek kalemler
+- Ücret = rota × kalem sayım matrisi @ (sabit ücret + km ücreti × min(mesafe, kesim uzunluğu))
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_TARIFF_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "toll_tariffs.json")
+DEFAULT_VEHICLE_CLASS = 1
+MATCH_CACHE_SIZE = 4096
+
+# Yanıtlardaki kalem türü adları (eski toll_details biçimi)
+TYPE_LABELS = {"bridge": "köprü", "motorway": "otoyol"}
+
+_TURKISH_FOLD = str.maketrans({
+    "İ": "i", "I": "i", "ç": "c", "Ç": "c", "ğ": "g", "Ğ": "g", "ı": "i",
+    "ö": "o", "Ö": "o", "ş": "s", "Ş": "s", "ü": "u", "Ü": "u", "â": "a", "î": "i", "û": "u",
+})
+
+
+def normalize_name(name: str) -> str:
+    """Eşleştirme anahtarı: Türkçe harfler sadeleştirilir, noktalama boşluğa çevrilir"""
+    folded = str(name).translate(_TURKISH_FOLD).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", folded))
+
+
+class TollTariff:
+    """Dizilere çevrilmiş ücret tarifesi (kalem × araç sınıfı)"""
+
+    def __init__(self, data: Dict, mtime: int = 0):
+        self.currency = data.get("currency", "TRY")
+        self.valid_from = data.get("valid_from")
+        self.vehicle_classes = [int(entry["id"]) for entry in data["vehicle_classes"]]
+        self.class_index = {vehicle_class: i for i, vehicle_class in enumerate(self.vehicle_classes)}
+        self.mtime = mtime
+
+        items = [("bridge", entry) for entry in data.get("bridges", [])]
+        items += [("motorway", entry) for entry in data.get("motorways", [])]
+        fallbacks = data.get("fallbacks", [])
+        items += [(entry["type"], entry) for entry in fallbacks]
+
+        count, classes = len(items), len(self.vehicle_classes)
+        self.names: List[str] = [entry["name"] for _, entry in items]
+        self.types: List[str] = [kind for kind, _ in items]
+        self.fixed = np.zeros((count, classes), dtype=np.float64)
+        self.per_km = np.zeros((count, classes), dtype=np.float64)
+        # Uzunluğu verilmeyen (yedek) otoyol kalemi tüm mesafe boyunca ücretlenir
+        self.length_km = np.full(count, np.inf, dtype=np.float64)
+        self.name_index: Dict[str, int] = {}
+
+        for i, (kind, entry) in enumerate(items):
+            if kind == "bridge":
+                self.fixed[i] = self._class_values(entry, "fees")
+            else:
+                self.per_km[i] = self._class_values(entry, "per_km")
+                if entry.get("length_km") is not None:
+                    self.length_km[i] = float(entry["length_km"])
+            if i < count - len(fallbacks):
+                for name in [entry["name"], *entry.get("aliases", [])]:
+                    self.name_index.setdefault(normalize_name(name), i)
+
+        first_fallback = count - len(fallbacks)
+        self.keyword_items: List[Tuple[str, int]] = [
+            (normalize_name(keyword), first_fallback + k)
+            for k, entry in enumerate(fallbacks) for keyword in entry["keywords"]
+        ]
+        self._match_cache: Dict[str, Optional[int]] = {}
+
+    def _class_values(self, entry: Dict, key: str) -> np.ndarray:
+        values = np.asarray(entry[key], dtype=np.float64)
+        if values.shape != (len(self.vehicle_classes),):
+            raise ValueError(f"{entry['name']}: {key} {len(self.vehicle_classes)} araç sınıfı için değer içermeli")
+        return values
+
+    def match(self, name: str) -> Optional[int]:
+        """Yol adının tarife kalemi; tarifede ve yedek anahtar kelimelerde yoksa None"""
+        item = self._match_cache.get(name, -1)
+        if item != -1:
+            return item
+        key = normalize_name(name)
+        item = self.name_index.get(key)
+        if item is None:
+            # Eski davranış: adın içinde "köprü"/"otoyol" geçmesi yeterli ("Köprüsü" dahil)
+            item = next((index for keyword, index in self.keyword_items if keyword in key), None)
+        if len(self._match_cache) >= MATCH_CACHE_SIZE:
+            self._match_cache.clear()
+        self._match_cache[name] = item
+        return item
+
+    def route_matrix(self, highway_lists: Sequence[Iterable[str]]) -> np.ndarray:
+        """Rota × kalem geçiş sayıları"""
+        matrix = np.zeros((len(highway_lists), len(self.names)), dtype=np.float64)
+        for r, highways in enumerate(highway_lists):
+            for name in highways:
+                item = self.match(name)
+                if item is not None:
+                    matrix[r, item] += 1
+        return matrix
+
+    def class_columns(self, vehicle_classes: Optional[Sequence[int]]) -> List[int]:
+        """Araç sınıfı kodlarının tarife sütunları (None → tüm sınıflar)"""
+        if vehicle_classes is None:
+            return list(range(len(self.vehicle_classes)))
+        try:
+            return [self.class_index[int(vehicle_class)] for vehicle_class in vehicle_classes]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Geçersiz araç sınıfı: {list(vehicle_classes)} (seçenekler: {self.vehicle_classes})")
+
+    def unit_costs(self, distances: Sequence[float], columns: List[int]) -> np.ndarray:
+        """Rota × kalem × sınıf tek geçiş ücretleri (km ücreti kesim uzunluğuyla sınırlı)"""
+        kilometres = np.minimum(np.asarray(distances, dtype=np.float64)[:, None], self.length_km[None, :])
+        return self.fixed[None, :, columns] + kilometres[:, :, None] * self.per_km[None, :, columns]
+
+    def costs(self, distances: Sequence[float], highway_lists: Sequence[Iterable[str]],
+              vehicle_classes: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Rota × araç sınıfı toplam ücretleri (tek vektörel hesap)"""
+        counts = self.route_matrix(highway_lists)
+        columns = self.class_columns(vehicle_classes)
+        kilometres = np.minimum(np.asarray(distances, dtype=np.float64)[:, None], self.length_km[None, :])
+        return counts @ self.fixed[:, columns] + (counts * kilometres) @ self.per_km[:, columns]
+
+    def route_cost(self, route_distance: float, route_highways: List[str],
+                   vehicle_class: int = DEFAULT_VEHICLE_CLASS) -> Dict:
+        """Tek rota için calculate_toll_cost biçiminde sonuç (kalem dökümüyle)"""
+        unit = self.unit_costs([route_distance], self.class_columns([vehicle_class]))[0, :, 0]
+        details, total_cost = [], 0.0
+        for name in route_highways or []:
+            item = self.match(name)
+            if item is not None:
+                total_cost += float(unit[item])
+                details.append({
+                    "name": name,
+                    "tariff_name": self.names[item],
+                    "cost": round(float(unit[item]), 2),
+                    "type": TYPE_LABELS[self.types[item]],
+                })
+        return {
+            "total_cost": round(total_cost, 2),
+            "toll_details": details,
+            "cost_per_km": round(total_cost / route_distance, 2) if route_distance > 0 else 0,
+            "vehicle_class": int(vehicle_class),
+            "currency": self.currency,
+        }
+
+
+_lock = threading.Lock()
+_tariffs: Dict[str, TollTariff] = {}
+
+
+def load_tariff(path: Optional[str] = None) -> TollTariff:
+    """Tarife dosyasını yükle (dosya değişmediyse bellektekini döndür)"""
+    path = path or os.getenv("TOLL_TARIFF_FILE") or DEFAULT_TARIFF_FILE
+    mtime = os.stat(path).st_mtime_ns
+    tariff = _tariffs.get(path)
+    if tariff is not None and tariff.mtime == mtime:
+        return tariff
+    with _lock:
+        tariff = _tariffs.get(path)
+        if tariff is None or tariff.mtime != mtime:
+            with open(path, encoding="utf-8") as f:
+                tariff = TollTariff(json.load(f), mtime)
+            _tariffs[path] = tariff
+    return tariff
@@ -0,0 +1,160 @@
+"""
+Toplu Trafik Çarpanı Hesaplama ve Önceden Hesaplanmış Tablo
+
+calculate_traffic_multiplier'ın girdileri yalnızca şehrin sabit verileri (enlem,
+boylam, rakım, nüfus) ile tarihin ayı, haftanın günü ve yılın günüdür. Bu modül
+(şehir, tarih) çiftlerini tek özellik matrisi + tek scaler.transform + tek
+predict çağrısıyla puanlar; isteğe bağlı olarak tüm şehirler × yılın günü ×
+haftanın günü için çarpanları önceden hesaplayıp sık yolu dizi indekslemesine çevirir.
+
+Özellikler:
+- Artık yıl ayrımı: aynı yılın günü artık yılda farklı aya düşebilir (60 → 29 Şubat / 1 Mart)
+- Tablo, kurulduğu scaler/model nesnelerine bağlıdır; model değişirse tablo kullanılmaz
+- Değerler canlı model ile birebir aynı (np.round(..., 2)), bilinmeyen şehir/tarih → 1.0
+"""
+
+import calendar
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_MULTIPLIER = 1.0
+DAYS_IN_YEAR = 366
+WEEKDAYS = 7
+
+
+def parse_traffic_dates(date_strs: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Tarih metinlerini ay / haftanın günü / yılın günü / artık yıl dizilerine çevir
+
+    Geçersiz tarihler valid=False olarak işaretlenir (çağıran 1.0 döndürür).
+    """
+    count = len(date_strs)
+    parsed = {
+        "month": np.zeros(count, dtype=np.int64),
+        "weekday": np.zeros(count, dtype=np.int64),
+        "day_of_year": np.ones(count, dtype=np.int64),
+        "leap": np.zeros(count, dtype=np.int64),
+        "valid": np.zeros(count, dtype=bool),
+    }
+    cache: Dict[str, Optional[Tuple[int, int, int, int]]] = {}
+    for i, date_str in enumerate(date_strs):
+        if date_str not in cache:
+            try:
+                date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+                cache[date_str] = (date_obj.month, date_obj.weekday(), date_obj.timetuple().tm_yday,
+                                   int(calendar.isleap(date_obj.year)))
+            except (TypeError, ValueError):
+                cache[date_str] = None
+        values = cache[date_str]
+        if values is not None:
+            parsed["month"][i], parsed["weekday"][i], parsed["day_of_year"][i], parsed["leap"][i] = values
+            parsed["valid"][i] = True
+    return parsed
+
+
+def traffic_features(cities_data: Dict, cities: Sequence[str], months, weekdays, days_of_year) -> np.ndarray:
+    """Eğitimdeki sırayla özellik matrisi: enlem, boylam, rakım, nüfus, ay, haftanın günü, yılın günü"""
+    static = np.array([
+        [cities_data[city]["lat"], cities_data[city]["lon"], cities_data[city]["elevation"],
+         cities_data[city]["population"]]
+        for city in cities
+    ], dtype=np.float64).reshape(len(cities), 4)
+    calendar_columns = np.column_stack([months, weekdays, days_of_year]).astype(np.float64)
+    return np.hstack([static, calendar_columns])
+
+
+def score_traffic(scaler, model, features: np.ndarray) -> np.ndarray:
+    """Tek transform + tek predict; calculate_traffic_multiplier ile aynı yuvarlama"""
+    if len(features) == 0:
+        return np.zeros(0, dtype=np.float64)
+    return np.round(model.predict(scaler.transform(features)), 2)
+
+
+class TrafficMultiplierTable:
+    """Artık yıl × şehir × yılın günü × haftanın günü trafik çarpanı tablosu"""
+
+    def __init__(self, cities: List[str], multipliers: np.ndarray, scaler, model):
+        self.cities = cities
+        self.city_index = {city: i for i, city in enumerate(cities)}
+        self.multipliers = multipliers
+        # Tablo yalnızca kurulduğu nesnelerle geçerli (yeniden eğitim/yüklemede yenisi kurulur)
+        self._scaler = scaler
+        self._model = model
+
+    @classmethod
+    def build(cls, cities_data: Dict, scaler, model) -> "TrafficMultiplierTable":
+        """Tüm şehirler ve takvim kombinasyonlarını tek model çağrısında puanla"""
+        cities = list(cities_data.keys())
+        multipliers = np.full((2, len(cities), DAYS_IN_YEAR, WEEKDAYS), DEFAULT_MULTIPLIER, dtype=np.float64)
+
+        blocks = []
+        for leap, year in ((0, 2023), (1, 2024)):
+            days = np.arange(1, 366 + leap)
+            months = np.array([datetime.strptime(f"{year}-{day}", "%Y-%j").month for day in days])
+            # (şehir, gün, haftanın günü) ızgarası
+            city_ids, day_ids, weekdays = np.meshgrid(np.arange(len(cities)), days - 1, np.arange(WEEKDAYS),
+                                                      indexing="ij")
+            blocks.append((leap, city_ids.ravel(), day_ids.ravel(), weekdays.ravel(), months[day_ids.ravel()]))
+
+        features = np.vstack([
+            traffic_features(cities_data, [cities[i] for i in city_ids], months, weekdays, day_ids + 1)
+            for _, city_ids, day_ids, weekdays, months in blocks
+        ])
+        scores = score_traffic(scaler, model, features)
+
+        offset = 0
+        for leap, city_ids, day_ids, weekdays, _ in blocks:
+            multipliers[leap, city_ids, day_ids, weekdays] = scores[offset:offset + len(city_ids)]
+            offset += len(city_ids)
+        return cls(cities, multipliers, scaler, model)
+
+    def matches(self, scaler, model) -> bool:
+        """Tablo bu scaler/model ile mi kuruldu?"""
+        return self._scaler is scaler and self._model is model
+
+    @property
+    def nbytes(self) -> int:
+        """Tablonun bellek kullanımı (byte)"""
+        return self.multipliers.nbytes
+
+    def lookup(self, cities: Sequence[str], parsed: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+        """Çiftlerin çarpanları; tabloda olmayan şehir varsa None"""
+        city_ids = [self.city_index.get(city) for city in cities]
+        if None in city_ids:
+            return None
+        return self.multipliers[parsed["leap"], city_ids, parsed["day_of_year"] - 1, parsed["weekday"]]
+
+
+def calculate_traffic_multipliers(cities_data: Dict, scaler, model, pairs: Sequence[Tuple[str, str]],
+                                  table: Optional[TrafficMultiplierTable] = None) -> List[float]:
+    """(şehir, tarih) çiftleri için trafik çarpanları
+
+    Bilinmeyen şehir veya geçersiz tarih 1.0 döner. Tablo bu modelle kurulmuşsa dizi
+    indekslemesi, değilse geçerli çiftler için tek model çağrısı kullanılır.
+    """
+    if not pairs:
+        return []
+    result = np.full(len(pairs), DEFAULT_MULTIPLIER, dtype=np.float64)
+
+    cities = [city.title() if isinstance(city, str) else "" for city, _ in pairs]
+    parsed = parse_traffic_dates([date_str for _, date_str in pairs])
+    valid = parsed["valid"] & np.array([city in cities_data for city in cities], dtype=bool)
+    rows = np.flatnonzero(valid)
+    if len(rows) == 0:
+        return result.tolist()
+
+    selected = [cities[i] for i in rows]
+    selected_dates = {key: values[rows] for key, values in parsed.items()}
+    try:
+        scores = None
+        if table is not None and table.matches(scaler, model):
+            scores = table.lookup(selected, selected_dates)
+        if scores is None:
+            features = traffic_features(cities_data, selected, selected_dates["month"], selected_dates["weekday"],
+                                        selected_dates["day_of_year"])
+            scores = score_traffic(scaler, model, features)
+        result[rows] = scores
+    except Exception as e:
+        print(f"⚠️ Trafik çarpanı hesaplanamadı, varsayılan kullanılıyor: {e}")
+    return result.tolist()
@@ -0,0 +1,159 @@
+"""
+MLWeatherDatabase Eğitim Verisi Oluşturucu (Vektörel, Parçalı)
+
+train_models yedi özellikle (enlem, boylam, rakım, nüfus, ay, haftanın günü,
+yılın günü) üç orman eğitir: hava durumu sınıflandırıcısı, sıcaklık ve trafik
+çarpanı regresörleri. Bu modül weather_data satırlarını parça parça alıp şehir
+tablosuyla kolon bazında birleştirir; satır döngüsü veya satır başına strptime yoktur.
+
+Özellikler:
+- Şehir birleştirme: şehir indeksi (Index.get_indexer) ile sabit dizi indekslemesi, bilinmeyen şehir atlanır
+- Tarih özellikleri: tek pd.to_datetime çağrısı, geçersiz tarih atlanır
+- Parçalar sabit boyutlu float32 bloklar halinde biriktirilir; metin kolonlar bellekte tutulmaz
+- Trafik hedefi weather_data'da olmadığından günlük kural tabanlı çarpandan türetilir
+  (train_ai_models.calculate_realistic_traffic_multiplier'ın saat ve tatil içermeyen hali)
+- Üç orman iş parçacıklarında birlikte eğitilir (ağaç kurulumu GIL'i bırakır, X kopyalanmaz)
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['latitude', 'longitude', 'elevation', 'population', 'month', 'day_of_week', 'day_of_year']
+TRAINING_QUERY = "SELECT city, date, weather_condition, temperature FROM weather_data"
+
+# Günlük trafik çarpanı kuralları (saat etkisi günlük veride yok, tatiller HolidayService'te)
+WEEKEND_FACTOR = 1.3
+SUMMER_MONTHS = (7, 8)
+SUMMER_FACTOR = 1.1
+METROPOLIS_POPULATION = 1_000_000
+METROPOLIS_FACTOR = 1.1
+WEATHER_TRAFFIC_FACTORS = {
+    "rain": 1.15, "drizzle": 1.15, "yağmur": 1.15,
+    "snow": 1.3, "kar": 1.3,
+    "thunderstorm": 1.25, "fırtına": 1.25,
+}
+
+
+def city_table(cities_data: Dict) -> Tuple[List[str], np.ndarray]:
+    """Şehir adları ve aynı sırada (enlem, boylam, rakım, nüfus) dizisi"""
+    cities = list(cities_data)
+    static = np.array([
+        [cities_data[city]["lat"], cities_data[city]["lon"], cities_data[city]["elevation"],
+         cities_data[city]["population"]]
+        for city in cities
+    ], dtype=np.float64).reshape(len(cities), 4)
+    return cities, static
+
+
+def traffic_targets(months: np.ndarray, weekdays: np.ndarray, populations: np.ndarray,
+                    conditions: pd.Series) -> np.ndarray:
+    """Günlük trafik çarpanı: hafta sonu, yaz tatili, büyükşehir ve hava durumu etkileri"""
+    multiplier = np.ones(len(months), dtype=np.float64)
+    multiplier[weekdays >= 5] *= WEEKEND_FACTOR
+    multiplier[np.isin(months, SUMMER_MONTHS)] *= SUMMER_FACTOR
+    multiplier[populations > METROPOLIS_POPULATION] *= METROPOLIS_FACTOR
+    multiplier *= conditions.str.lower().map(WEATHER_TRAFFIC_FACTORS).fillna(1.0).to_numpy(dtype=np.float64)
+    return np.round(np.clip(multiplier, 0.5, 3.0), 2)
+
+
+def featurize_chunk(chunk: pd.DataFrame, cities: List[str], static: np.ndarray) -> pd.DataFrame:
+    """weather_data parçasını train_models kolonlarına çevir (özellikler + weather/temperature/traffic_multiplier)"""
+    codes = pd.Index(cities).get_indexer(chunk['city'])
+    dates = pd.to_datetime(chunk['date'], format="%Y-%m-%d", errors="coerce")
+    keep = (codes >= 0) & dates.notna().to_numpy() & chunk['temperature'].notna().to_numpy()
+    codes, dates = codes[keep], dates[keep].dt
+    conditions = chunk['weather_condition'][keep].reset_index(drop=True)
+
+    months = dates.month.to_numpy(dtype=np.int64)
+    weekdays = dates.dayofweek.to_numpy(dtype=np.int64)
+    columns = {name: static[codes, i] for i, name in enumerate(FEATURE_COLUMNS[:4])}
+    columns.update({
+        'month': months,
+        'day_of_week': weekdays,
+        'day_of_year': dates.dayofyear.to_numpy(dtype=np.int64),
+        'weather': conditions,
+        'temperature': chunk['temperature'].to_numpy(dtype=np.float64)[keep],
+        'traffic_multiplier': traffic_targets(months, weekdays, columns['population'], conditions),
+    })
+    return pd.DataFrame(columns)
+
+
+class TrainingSet:
+    """Parçalardan biriktirilen eğitim dizileri (X float32, hava durumu kodları, iki sayısal hedef)"""
+
+    def __init__(self):
+        self._features: List[np.ndarray] = []
+        self._weather_codes: List[np.ndarray] = []
+        self._temperature: List[np.ndarray] = []
+        self._traffic: List[np.ndarray] = []
+        self._vocabulary: Dict[str, int] = {}
+        self.rows = 0
+        self.skipped_rows = 0
+
+    def add(self, frame: pd.DataFrame, source_rows: Optional[int] = None):
+        """featurize_chunk çıktısını ekle; hava durumu metinleri tamsayı kodlara çevrilir"""
+        codes, uniques = pd.factorize(frame['weather'])
+        mapping = np.array([self._vocabulary.setdefault(str(name), len(self._vocabulary)) for name in uniques],
+                           dtype=np.int64)
+        self._features.append(frame[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+        self._weather_codes.append(mapping[codes])
+        self._temperature.append(frame['temperature'].to_numpy(dtype=np.float64))
+        self._traffic.append(frame['traffic_multiplier'].to_numpy(dtype=np.float64))
+        self.rows += len(frame)
+        if source_rows is not None:
+            self.skipped_rows += source_rows - len(frame)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(X, sıralı sınıf adları, sınıf indeksleri, sıcaklık, trafik) — LabelEncoder.fit_transform ile aynı kodlar"""
+        if not self._features:
+            empty = np.zeros(0, dtype=np.float64)
+            return np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float32), np.array([], dtype=object), \
+                np.zeros(0, dtype=np.int64), empty, empty
+        X = np.concatenate(self._features)
+        names = np.array(list(self._vocabulary), dtype=object)
+        order = np.argsort(names)
+        rank = np.empty(len(names), dtype=np.int64)
+        rank[order] = np.arange(len(names))
+        labels = rank[np.concatenate(self._weather_codes)]
+        # Parça listeleri bırakılır; tepe bellek bir kopya ile sınırlı kalır
+        self._features, self._weather_codes = [], []
+        return X, names[order], labels, np.concatenate(self._temperature), np.concatenate(self._traffic)
+
+
+def build_training_set(chunks: Iterable[pd.DataFrame], cities_data: Dict) -> TrainingSet:
+    """Ham weather_data parçalarından eğitim kümesi oluştur"""
+    cities, static = city_table(cities_data)
+    training = TrainingSet()
+    for chunk in chunks:
+        training.add(featurize_chunk(chunk, cities, static), source_rows=len(chunk))
+    return training
+
+
+def fit_forests(models: Dict[str, Tuple[object, np.ndarray]], X: np.ndarray,
+                workers: Optional[int] = None) -> Dict[str, float]:
+    """Ormanları aynı X üzerinde birlikte eğit; model başına süre (sn) döner
+
+    İşlemci sayısı modellere bölünür (her ormana n_jobs); eğitimden sonra n_jobs
+    sıfırlanır ki tek satırlık tahminler iş parçacığı havuzu açmasın.
+    """
+    cpus = os.cpu_count() or 1
+    workers = workers or max(1, min(len(models), cpus))
+    for model, _ in models.values():
+        model.set_params(n_jobs=max(1, cpus // workers))
+
+    def fit(item):
+        name, (model, y) = item
+        started = time.perf_counter()
+        model.fit(X, y)
+        model.set_params(n_jobs=None)
+        return name, time.perf_counter() - started
+
+    if workers == 1:
+        return dict(fit(item) for item in models.items())
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(fit, models.items()))
@@ -0,0 +1,1456 @@
+#!/usr/bin/env python3
+"""
+Tarihsel Hava Durumu Veri Katmanı Benchmark'ları
+
+Bu script, historical_weather veritabanı üzerindeki sorgu ve işlem sürelerini
+sentetik (yapay) veriyle ölçer. Gerçek API anahtarı veya SQL Server gerekmez;
+tüm ölçümler geçici bir SQLite dosyası üzerinde yapılır.
+
+Kullanım:
+    python weather_benchmarks.py month-day-index --rows 3000000
+    python weather_benchmarks.py probability-cube
+    python weather_benchmarks.py city-statistics
+    python weather_benchmarks.py training-data --rows 10000000
+    python weather_benchmarks.py storage-adapter
+    python weather_benchmarks.py snapshot
+    WEATHER_DB_BACKEND=sqlite python weather_benchmarks.py startup
+    python weather_benchmarks.py route-prediction
+    python weather_benchmarks.py forecasts --months 12 --workers 4
+    python weather_benchmarks.py fields
+    python weather_benchmarks.py zones --budget-mb 40
+    python weather_benchmarks.py range --cities 50 --days 7
+    python weather_benchmarks.py etags
+    python weather_benchmarks.py historical-average
+    python weather_benchmarks.py city-statistics-rebuild
+    python weather_benchmarks.py city-statistics-read
+    python weather_benchmarks.py traffic-multiplier --cities 75 --days 30
+    python weather_benchmarks.py ml-collection --cities 10 --days 30 --quota-rpm 600
+    python weather_benchmarks.py sqlite-concurrency --readers 8 --batch-size 5000
+    python weather_benchmarks.py toll-tariff --routes 10000
+    python weather_benchmarks.py ml-training --years 3 --workers 3
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+WEATHER_CLASSES = ["Clear", "Clouds", "Rain", "Snow", "Mist", "Drizzle", "Thunderstorm"]
+
+# İklim bölgesine bağlı sentetik profil: (yıllık ortalama sıcaklık, mevsimsel genlik, yağış eğilimi)
+ZONE_PROFILES = {
+    "Marmara": (14.5, 9.0, 0.35), "İç Anadolu": (11.0, 12.0, 0.25), "Doğu Anadolu": (6.0, 15.0, 0.30),
+    "Karadeniz": (13.5, 8.0, 0.55), "Akdeniz": (19.0, 8.5, 0.20), "Güneydoğu Anadolu": (17.0, 13.0, 0.15),
+    "Ege": (17.0, 9.5, 0.22),
+}
+
+
+def _timeit(func: Callable, repeat: int = 1) -> float:
+    """Fonksiyonu çalıştır, ortalama süreyi milisaniye olarak döndür"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def _synthetic_cities(count: int) -> List[str]:
+    """Benchmark için şehir isimleri"""
+    return [f"Şehir_{i:03d}" for i in range(count)]
+
+
+def _geographic_weather(zone: str, dates: pd.DatetimeIndex, rng) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bölge profiline göre mevsimsel sıcaklık, hava durumu ve nem"""
+    mean, amplitude, wetness = ZONE_PROFILES[zone]
+    season = -np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 15) / 365.25)  # Ocak -1, Temmuz +1
+    temperature = np.round(mean + amplitude * season + rng.normal(0, 3, size=len(dates)), 1)
+    wet = rng.random(len(dates)) < wetness * (1.3 - 0.6 * (season + 1) / 2)
+    cloudy = rng.random(len(dates)) < 0.35
+    weather = np.where(wet, np.where(temperature < 1.0, "Snow", "Rain"), np.where(cloudy, "Clouds", "Clear"))
+    humidity = np.clip(np.where(wet, 85, 55) + rng.integers(-15, 15, size=len(dates)), 10, 100)
+    return weather, temperature, humidity
+
+
+def create_synthetic_history(db_path: str, rows: int, cities: int = 59, legacy: bool = False,
+                             seed: int = 42, geographic: bool = False) -> List[str]:
+    """historical_weather tablosunu sentetik verilerle doldur
+
+    legacy=True ise year/month/day kolonları olmayan eski şema kullanılır.
+    geographic=True ise gerçek şehir adları ve iklim bölgesine bağlı mevsimsel veriler üretilir.
+    """
+    rng = np.random.default_rng(seed)
+    if geographic:
+        from advanced_weather_data import CITIES_GEOGRAPHIC_DATA
+        city_names = list(CITIES_GEOGRAPHIC_DATA)[:cities]
+    else:
+        city_names = _synthetic_cities(cities)
+    days_per_city = max(1, rows // cities)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    extra_columns = "" if legacy else "year INTEGER, month INTEGER, day INTEGER,"
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS historical_weather (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            city TEXT NOT NULL,
+            date TEXT NOT NULL,
+            weather_main TEXT NOT NULL,
+            weather_description TEXT,
+            temperature REAL,
+            humidity INTEGER,
+            wind_speed REAL,
+            {extra_columns}
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(city, date)
+        )
+    ''')
+
+    end_date = datetime(2024, 12, 31)
+    dates = pd.date_range(end=end_date, periods=days_per_city, freq="D")
+    date_strings = dates.strftime("%Y-%m-%d").to_numpy()
+
+    for city in city_names:
+        if geographic:
+            weather, temperature, humidity = _geographic_weather(CITIES_GEOGRAPHIC_DATA[city]["climate"], dates, rng)
+        else:
+            weather = rng.choice(WEATHER_CLASSES, size=days_per_city)
+            temperature = np.round(rng.normal(15, 10, size=days_per_city), 1)
+            humidity = rng.integers(20, 100, size=days_per_city)
+        wind_speed = np.round(rng.uniform(0, 15, size=days_per_city), 1)
+
+        if legacy:
+            conn.executemany(
+                "INSERT INTO historical_weather (city, date, weather_main, weather_description, "
+                "temperature, humidity, wind_speed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                zip([city] * days_per_city, date_strings, weather, weather,
+                    temperature.tolist(), humidity.tolist(), wind_speed.tolist())
+            )
+        else:
+            conn.executemany(
+                "INSERT INTO historical_weather (city, date, weather_main, weather_description, "
+                "temperature, humidity, wind_speed, year, month, day) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                zip([city] * days_per_city, date_strings, weather, weather,
+                    temperature.tolist(), humidity.tolist(), wind_speed.tolist(),
+                    dates.year.tolist(), dates.month.tolist(), dates.day.tolist())
+            )
+    conn.commit()
+    conn.close()
+    return city_names
+
+
+def bench_month_day_index(args):
+    """SUBSTR filtreleri ile indeksli month/day kolonlarını karşılaştır"""
+    from weather_storage import SQLiteWeatherStorage
+
+    workdir = tempfile.mkdtemp(prefix="hw_bench_")
+    db_path = os.path.join(workdir, "historical_weather.db")
+
+    print(f"🧪 {args.rows:,} satırlık sentetik tablo oluşturuluyor (eski şema)...")
+    build_ms = _timeit(lambda: create_synthetic_history(db_path, args.rows, legacy=True))
+    print(f"   oluşturma: {build_ms / 1000:.1f} sn")
+
+    cities = _synthetic_cities(59)
+    rnd = random.Random(1)
+    lookups = [(rnd.choice(cities), rnd.randint(1, 12), rnd.randint(1, 28)) for _ in range(args.lookups)]
+
+    conn = sqlite3.connect(db_path)
+
+    legacy_examples = '''
+        SELECT date, weather_main, weather_description, temperature, humidity, wind_speed
+        FROM historical_weather
+        WHERE city = ? AND CAST(SUBSTR(date, 6, 2) AS INTEGER) = ? AND CAST(SUBSTR(date, 9, 2) AS INTEGER) = ?
+        ORDER BY date DESC LIMIT 5
+    '''
+    legacy_group = '''
+        SELECT CAST(SUBSTR(date, 6, 2) AS INTEGER) as month, CAST(SUBSTR(date, 9, 2) AS INTEGER) as day,
+               weather_main, COUNT(*) FROM historical_weather WHERE city = ?
+        GROUP BY month, day, weather_main
+    '''
+    indexed_examples = '''
+        SELECT date, weather_main, weather_description, temperature, humidity, wind_speed
+        FROM historical_weather
+        WHERE city = ? AND month = ? AND day = ?
+        ORDER BY date DESC LIMIT 5
+    '''
+    indexed_group = '''
+        SELECT month, day, weather_main, COUNT(*) FROM historical_weather WHERE city = ?
+        GROUP BY month, day, weather_main
+    '''
+
+    def run_lookups(query):
+        for params in lookups:
+            conn.execute(query, params).fetchall()
+
+    results = {}
+    results["examples_before"] = _timeit(lambda: run_lookups(legacy_examples)) / len(lookups)
+    results["group_before"] = _timeit(lambda: conn.execute(legacy_group, (cities[0],)).fetchall(), repeat=3)
+
+    print("🔄 Migrasyon (kolon ekleme + backfill + indeks) çalışıyor...")
+    results["migration"] = _timeit(lambda: SQLiteWeatherStorage.migrate_schema(conn))
+
+    results["examples_after"] = _timeit(lambda: run_lookups(indexed_examples)) / len(lookups)
+    results["group_after"] = _timeit(lambda: conn.execute(indexed_group, (cities[0],)).fetchall(), repeat=3)
+    plan = conn.execute("EXPLAIN QUERY PLAN " + indexed_examples, lookups[0]).fetchall()
+    conn.close()
+
+    print(f"\n📊 Sonuçlar ({args.rows:,} satır, {len(lookups)} nokta sorgusu)")
+    print(f"   get_historical_examples : {results['examples_before']:.2f} ms → {results['examples_after']:.3f} ms "
+          f"({results['examples_before'] / max(results['examples_after'], 1e-6):.0f}x)")
+    print(f"   şehir bazlı GROUP BY    : {results['group_before']:.1f} ms → {results['group_after']:.1f} ms")
+    print(f"   migrasyon süresi        : {results['migration'] / 1000:.1f} sn (tek seferlik)")
+    print(f"   sorgu planı             : {plan[0][-1]}")
+    return results
+
+
+def _collector_on_synthetic_db(rows: int, cities: int = 59, geographic: bool = False):
+    """Geçici dizinde sentetik historical_weather ile gerçek bir toplayıcı oluştur
+
+    Toplayıcı SQLite dosyasını çalışma dizininde açtığı için süreç o dizine geçer.
+    """
+    from historical_weather_data import HistoricalWeatherDataCollector
+
+    workdir = tempfile.mkdtemp(prefix="hw_bench_")
+    os.chdir(workdir)
+    city_names = create_synthetic_history(os.path.join(workdir, "historical_weather.db"), rows, cities=cities,
+                                          geographic=geographic)
+    collector = HistoricalWeatherDataCollector(api_key="benchmark")
+    # Sentetik şehirleri tanıt (coğrafi veride gerçek koordinatlar, aksi halde önemsiz)
+    if geographic:
+        from advanced_weather_data import CITIES_GEOGRAPHIC_DATA
+        collector.cities_data = {city: {"lat": CITIES_GEOGRAPHIC_DATA[city]["lat"],
+                                        "lon": CITIES_GEOGRAPHIC_DATA[city]["lon"]} for city in city_names}
+    else:
+        collector.cities_data = {city: {"lat": 39.0, "lon": 35.0} for city in city_names}
+    return collector, city_names
+
+
+def bench_probability_cube(args):
+    """SQL + DataFrame olasılık sorgusu ile NumPy küp indekslemesini karşılaştır"""
+    from climatology_cube import ClimatologyCube
+
+    collector, cities = _collector_on_synthetic_db(args.rows)
+
+    start = time.perf_counter()
+    cube = ClimatologyCube(collector)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    rnd = random.Random(7)
+    lookups = [(rnd.choice(cities), rnd.randint(1, 12), rnd.randint(1, 28)) for _ in range(args.lookups)]
+
+    sql_ms = _timeit(lambda: [collector.get_daily_weather_probability(*q) for q in lookups]) / len(lookups)
+    cube_ms = _timeit(lambda: [cube.get_daily_weather_probability(*q) for q in lookups]) / len(lookups)
+
+    # Sonuçların aynı olduğunu doğrula
+    for q in lookups[:50]:
+        a = collector.get_daily_weather_probability(*q)
+        b = cube.get_daily_weather_probability(*q)
+        assert a["most_likely"] == b["most_likely"] or abs(a["confidence"] - b["confidence"]) < 1e-9
+        assert int(a["sample_count"]) == b["sample_count"]
+
+    route = cities[:args.route_cities]
+    route_ms = _timeit(lambda: cube.lookup_route(route, 12, 15), repeat=200)
+
+    state = cube._state
+    print(f"\n📊 Sonuçlar ({args.rows:,} gözlem, küp boyutu {state.counts.shape})")
+    print(f"   bellek kullanımı        : {cube.nbytes / 1024:.0f} KB")
+    print(f"   küp yükleme süresi      : {load_ms:.1f} ms")
+    print(f"   SQL + DataFrame sorgusu : {sql_ms:.3f} ms / şehir-gün")
+    print(f"   küp indeksleme          : {cube_ms * 1000:.1f} µs / şehir-gün ({sql_ms / cube_ms:.0f}x)")
+    print(f"   rota ({len(route)} şehir, tek çağrı): {route_ms * 1000:.1f} µs")
+
+
+def bench_city_statistics(args):
+    """Üç sorguluk şehir istatistikleri ile materyalize bellek içi görünümü karşılaştır"""
+    from city_statistics import CityStatisticsStore
+
+    collector, cities = _collector_on_synthetic_db(args.rows)
+    conn = collector.storage.connect()
+
+    def legacy_statistics(city):
+        # Eski uygulama: istek başına üç ayrı tarama
+        pd.read_sql_query("SELECT COUNT(*) as count FROM historical_weather WHERE city = ?", conn, params=(city,))
+        pd.read_sql_query("SELECT weather_main, COUNT(*) as count FROM historical_weather WHERE city = ? "
+                          "GROUP BY weather_main", conn, params=(city,))
+        pd.read_sql_query("SELECT AVG(temperature) as avg_temp, MIN(temperature) as min_temp, "
+                          "MAX(temperature) as max_temp FROM historical_weather WHERE city = ?",
+                          conn, params=(city,))
+
+    rnd = random.Random(11)
+    requests_ = [rnd.choice(cities) for _ in range(args.requests)]
+
+    legacy_ms = _timeit(lambda: [legacy_statistics(city) for city in requests_]) / len(requests_)
+    conn.close()
+
+    start = time.perf_counter()
+    store = CityStatisticsStore(collector)
+    load_ms = (time.perf_counter() - start) * 1000
+    store_ms = _timeit(lambda: [store.get_city_statistics(city) for city in requests_]) / len(requests_)
+
+    # Artımlı güncelleme: 500 satırlık bir batch (yarısı mevcut günlerin üzerine yazar)
+    rows = [{
+        "city": rnd.choice(cities),
+        "date": f"{rnd.choice([2024, 2030])}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        "weather_main": rnd.choice(WEATHER_CLASSES), "weather_description": "",
+        "temperature": round(rnd.uniform(-10, 35), 2), "humidity": 50, "wind_speed": 3.0
+    } for _ in range(500)]
+    batch_ms = _timeit(lambda: collector._save_weather_batch(rows))
+
+    # Artımlı görünüm tam yeniden yükleme ile aynı olmalı
+    incremental = store.get_city_statistics(cities[0])
+    store.reload()
+    assert incremental == store.get_city_statistics(cities[0])
+
+    print(f"\n📊 Sonuçlar ({args.rows:,} gözlem, {len(requests_)} istek)")
+    print(f"   üç sorgu (eski)           : {legacy_ms:.2f} ms / istek")
+    print(f"   bellek içi görünüm        : {store_ms * 1000:.1f} µs / istek ({legacy_ms / store_ms:.0f}x, aylık kırılım + yüzdelikler dahil)")
+    print(f"   görünüm yükleme (1 tarama): {load_ms:.1f} ms, {store.nbytes / 1024:.0f} KB")
+    print(f"   500 satırlık batch yazımı (sayaçlar + görünüm): {batch_ms:.1f} ms")
+
+
+def _training_extraction_worker(collector, mode: str, chunksize: int, memory_limit_mb: int, queue):
+    """Alt süreçte eğitim verisini çıkar; tepe bellek (RSS) ve süreyi raporla"""
+    import resource
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if memory_limit_mb:
+        # Makineyi OOM'a sokmamak için adres alanı sınırı (aşılırsa MemoryError)
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    start = time.perf_counter()
+    rows = 0
+    try:
+        if mode == "legacy":
+            # Eski uygulama: tek DataFrame + şehir başına maske döngüsü
+            df = collector.generate_training_data()
+            df['latitude'] = 0.0
+            df['longitude'] = 0.0
+            for city, coords in collector.cities_data.items():
+                mask = df['city'] == city
+                df.loc[mask, 'latitude'] = coords['lat']
+                df.loc[mask, 'longitude'] = coords['lon']
+            rows = len(df)
+        elif mode == "full":
+            rows = len(collector.generate_training_data())
+        else:
+            for chunk in collector.generate_training_data(chunksize=chunksize):
+                rows += len(chunk)
+        error = None
+    except MemoryError:
+        error = "MemoryError"
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((rows, time.perf_counter() - start, baseline_kb, peak_kb, error))
+
+
+def bench_training_data(args):
+    """Tek DataFrame (eski döngü / vektörel) ile parçalı eğitim verisi çıkarımını karşılaştır"""
+    import multiprocessing
+
+    print(f"🧪 {args.rows:,} satırlık sentetik tablo oluşturuluyor...")
+    collector, _ = _collector_on_synthetic_db(args.rows)
+    context = multiprocessing.get_context("fork")
+
+    print(f"\n📊 Sonuçlar ({args.rows:,} satır, parça boyutu {args.chunksize:,}, "
+          f"bellek sınırı {args.memory_limit_mb} MB)")
+    for mode in args.modes.split(","):
+        queue = context.Queue()
+        process = context.Process(target=_training_extraction_worker,
+                                  args=(collector, mode, args.chunksize, args.memory_limit_mb, queue))
+        process.start()
+        rows, elapsed, baseline_kb, peak_kb, error = queue.get()
+        process.join()
+        status = f"❌ {error}" if error else f"{rows:,} satır"
+        print(f"   {mode:<7}: {elapsed:6.1f} sn | tepe RSS {peak_kb / 1024:7.0f} MB "
+              f"(başlangıç {baseline_kb / 1024:.0f} MB) | {status}")
+
+
+def bench_storage_adapter(args):
+    """Sorgu başına bağlantı + SQL metni ile kalıcı bağlantı + hazırlanmış ifadeleri karşılaştır"""
+    collector, cities = _collector_on_synthetic_db(args.rows)
+    storage = collector.storage
+
+    rnd = random.Random(5)
+    lookups = [(rnd.choice(cities), rnd.randint(1, 12), rnd.randint(1, 28)) for _ in range(args.lookups)]
+    examples_sql = storage.sql("historical_examples")
+
+    def legacy_lookup(city, month, day):
+        # Eski yol: her çağrıda yeni bağlantı + pandas
+        conn = sqlite3.connect(storage.db_path)
+        pd.read_sql_query(examples_sql, conn, params=(city, month, day, 5))
+        conn.close()
+
+    legacy_ms = _timeit(lambda: [legacy_lookup(*q) for q in lookups]) / len(lookups)
+    adapter_ms = _timeit(lambda: [storage.query("historical_examples", q + (5,)) for q in lookups]) / len(lookups)
+    method_ms = _timeit(lambda: [collector.get_historical_examples(*q) for q in lookups]) / len(lookups)
+
+    print(f"\n📊 Sonuçlar ({args.rows:,} gözlem, {len(lookups)} sorgu)")
+    print(f"   bağlantı + read_sql_query (eski) : {legacy_ms * 1000:.0f} µs / sorgu")
+    print(f"   adaptör (kalıcı bağlantı, hazır) : {adapter_ms * 1000:.0f} µs / sorgu ({legacy_ms / adapter_ms:.1f}x)")
+    print(f"   get_historical_examples (adaptör): {method_ms * 1000:.0f} µs / çağrı")
+
+    for batch_size in (1, 500):
+        rows = [{
+            "city": rnd.choice(cities), "date": f"2031-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "weather_main": rnd.choice(WEATHER_CLASSES), "weather_description": "",
+            "temperature": 10.0, "humidity": 50, "wind_speed": 3.0
+        } for _ in range(batch_size)]
+        batch_ms = _timeit(lambda: collector._save_weather_batch(rows), repeat=5)
+        print(f"   {batch_size:>3} satırlık batch upsert          : {batch_ms:.2f} ms "
+              f"({batch_ms * 1000 / batch_size:.0f} µs / satır)")
+
+
+def _directory_size_mb(path: str) -> float:
+    """Dizindeki dosyaların toplam boyutu (MB)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 1024 / 1024
+
+
+def bench_snapshot(args):
+    """SQL (read_sql_query / GROUP BY) ile Parquet anlık görüntüsünden okumayı karşılaştır"""
+    from city_statistics import CityStatisticsStore
+
+    print(f"🧪 {args.rows:,} satırlık sentetik tablo oluşturuluyor...")
+    collector, cities = _collector_on_synthetic_db(args.rows)
+    snapshot = collector.snapshot
+
+    # SQL yolu (görüntü henüz yok)
+    sql_train_ms = _timeit(lambda: collector.generate_training_data())
+    sql_chunked_ms = _timeit(lambda: sum(len(c) for c in collector.generate_training_data(chunksize=args.chunksize)))
+    start = time.perf_counter()
+    store = CityStatisticsStore(collector)
+    sql_stats_ms = (time.perf_counter() - start) * 1000
+    expected = [store.get_city_statistics(city) for city in cities[:5]]
+
+    export_ms = _timeit(lambda: snapshot.export(collector.storage, chunksize=args.chunksize))
+    assert collector._snapshot_is_fresh()
+
+    snap_train_ms = _timeit(lambda: collector.generate_training_data())
+    snap_chunked_ms = _timeit(lambda: sum(len(c) for c in collector.generate_training_data(chunksize=args.chunksize)))
+    snap_stats_ms = _timeit(store.reload)
+    store._state.responses.clear()
+    assert expected == [store.get_city_statistics(city) for city in cities[:5]]
+    projection_ms = _timeit(lambda: next(snapshot.iter_frames("historical_weather", ["temperature"])))
+
+    db_mb = os.path.getsize(collector.storage.db_path) / 1024 / 1024
+    print(f"\n📊 Sonuçlar ({args.rows:,} gözlem, parça boyutu {args.chunksize:,})")
+    print(f"   disk: SQLite {db_mb:.0f} MB | Parquet görüntüsü {_directory_size_mb(snapshot.path):.0f} MB "
+          f"(dışa aktarma {export_ms / 1000:.1f} sn)")
+    print(f"   eğitim verisi (tek DataFrame): SQL {sql_train_ms:.0f} ms → Parquet {snap_train_ms:.0f} ms "
+          f"({sql_train_ms / snap_train_ms:.1f}x)")
+    print(f"   eğitim verisi (parçalı)      : SQL {sql_chunked_ms:.0f} ms → Parquet {snap_chunked_ms:.0f} ms "
+          f"({sql_chunked_ms / snap_chunked_ms:.1f}x)")
+    print(f"   şehir istatistikleri yükleme : SQL {sql_stats_ms:.0f} ms → Parquet {snap_stats_ms:.0f} ms "
+          f"({sql_stats_ms / snap_stats_ms:.1f}x)")
+    print(f"   tek kolon projeksiyonu (temperature): {projection_ms:.0f} ms")
+
+
+_STARTUP_PROBE = """
+import time
+start = time.perf_counter()
+from historical_weather_data import HistoricalWeatherDataCollector
+imported = time.perf_counter()
+collector = HistoricalWeatherDataCollector(api_key="benchmark")
+constructed = time.perf_counter()
+collector.get_daily_weather_probability("Ankara", 1, 1)
+queried = time.perf_counter()
+print("STARTUP", imported - start, constructed - imported, queried - constructed)
+"""
+
+
+def bench_startup(args):
+    """Yeni süreçte toplayıcının açılış süresi: import, kurucu ve ilk sorgu (şema hazırlığı dahil)"""
+    import statistics
+    import subprocess
+    import sys
+
+    workdir = tempfile.mkdtemp(prefix="hw_bench_")
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [module_dir, os.getenv("PYTHONPATH")])))
+
+    samples = []
+    for run in range(args.runs):
+        output = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], cwd=workdir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        line = next(line for line in output.splitlines() if line.startswith("STARTUP"))
+        samples.append([float(value) * 1000 for value in line.split()[1:]])
+
+    # İlk çalıştırma boş dizinde şemayı oluşturur; sonrakiler mevcut veritabanını açar
+    first, rest = samples[0], samples[1:] or samples
+    median = [statistics.median(column) for column in zip(*rest)]
+    print(f"\n📊 Sonuçlar (WEATHER_DB_BACKEND={os.getenv('WEATHER_DB_BACKEND', 'auto')}, {args.runs} süreç)")
+    print(f"   ilk açılış (şema oluşturma): import {first[0]:.0f} ms | kurucu {first[1]:.1f} ms | "
+          f"ilk sorgu {first[2]:.1f} ms")
+    print(f"   sonraki açılışlar (medyan) : import {median[0]:.0f} ms | kurucu {median[1]:.1f} ms | "
+          f"ilk sorgu {median[2]:.1f} ms")
+
+
+def _predictor_on_synthetic_db(rows: int, geographic: bool = False, cities: int = 59):
+    """Sentetik veritabanı üzerinde eğitilmiş tahmin servisi
+
+    Servis modülü import edilirken tahmin nesnesini oluşturur ve modelleri '../models' altına
+    yazar; bu yüzden geçici dizinin bir alt dizinine geçilir ve veritabanı yolu ortamdan verilir.
+    """
+    _, cities = _collector_on_synthetic_db(rows, cities=cities, geographic=geographic)
+    os.environ["WEATHER_DB_BACKEND"] = "sqlite"
+    os.environ["WEATHER_SQLITE_PATH"] = os.path.abspath("historical_weather.db")
+    os.environ["WEATHER_FORECAST_MONTHS"] = "0"  # Önceden hesaplama ayrıca ölçülür
+    os.makedirs("service")
+    os.chdir("service")
+
+    print("🧪 Modeller sentetik veri üzerinde eğitiliyor...")
+    import historical_weather_predictor
+    return historical_weather_predictor.predictor, cities
+
+
+def bench_route_prediction(args):
+    """Şehir başına tahmin döngüsü ile toplu (tek sorgu + tek model geçişi) rota tahminini karşılaştır"""
+    predictor, cities = _predictor_on_synthetic_db(args.rows)
+    date_str = "2025-12-15"
+
+    def legacy_route(route):
+        # Eski uygulama: şehir başına iki veri çağrısı, tek satırlık DataFrame ve üç model geçişi
+        for city in route:
+            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+            prob = predictor.probability_cube.get_daily_weather_probability(city, date_obj.month, date_obj.day)
+            examples = predictor.collector.get_historical_examples(city, date_obj.month, date_obj.day, limit=5)
+            features = pd.DataFrame([{
+                'month': date_obj.month, 'day': date_obj.day,
+                'day_of_year': date_obj.timetuple().tm_yday, 'day_of_week': date_obj.weekday(),
+                'season': (date_obj.month % 12 + 3) // 3, 'latitude': 39.0, 'longitude': 35.0,
+                'humidity': np.mean([ex['humidity'] for ex in examples]) if examples else 50,
+                'wind_speed': np.mean([ex['wind_speed'] for ex in examples]) if examples else 10,
+                'probability': prob.get('confidence', 0.5), 'sample_count': prob.get('sample_count', 1)
+            }])
+            predictor.weather_encoder.inverse_transform(predictor.weather_model.predict(features))
+            predictor.weather_model.predict_proba(features)
+            predictor.temperature_model.predict(features)
+
+    print(f"\n📊 Sonuçlar ({args.rows:,} gözlem, RandomForest {len(predictor.weather_model.estimators_)} ağaç)")
+    for size in (2, 10, 50):
+        route = cities[:size]
+        batched = predictor.predict_route_weather(route, date_str)["predictions"]
+        single = [predictor.predict_weather(city, date_str) for city in route]
+        assert [(p["predicted_weather"], p["predicted_temperature"]) for p in batched] == \
+               [(p["predicted_weather"], p["predicted_temperature"]) for p in single]
+
+        legacy_ms = _timeit(lambda: legacy_route(route), repeat=args.repeat)
+        batched_ms = _timeit(lambda: predictor.predict_route_weather(route, date_str), repeat=args.repeat)
+        print(f"   {size:>2} şehir: şehir başına döngü {legacy_ms:7.1f} ms → toplu {batched_ms:6.1f} ms "
+              f"({legacy_ms / batched_ms:.1f}x)")
+
+
+def bench_forecasts(args):
+    """Önceden hesaplanmış tahminler: hesaplama süresi, dosya boyutu ve sunum gecikmesi"""
+    predictor, cities = _predictor_on_synthetic_db(args.rows)
+    from forecast_store import ForecastStore
+
+    print(f"\n📊 Önceden hesaplama ({len(predictor.probability_cube.cities)} şehir, {args.months} ay)")
+    for workers in sorted({1, args.workers}):
+        manifest = predictor.precompute_forecasts(months=args.months, workers=workers, time_budget=args.budget)
+        print(f"   {workers} süreç: {manifest['elapsed_seconds']:.1f} sn, "
+              f"{manifest['days']}/{manifest['requested_days']} gün, "
+              f"{os.path.getsize(predictor.forecasts.path) / 1024:.0f} KB")
+
+    manifest = predictor.precompute_forecasts(months=args.months, workers=args.workers,
+                                              time_budget=args.short_budget)
+    if manifest:
+        print(f"   Süre sınırı {args.short_budget:.1f} sn: {manifest['elapsed_seconds']:.1f} sn, "
+              f"{manifest['days']}/{manifest['requested_days']} gün saklandı")
+    predictor.precompute_forecasts(months=args.months, workers=args.workers, time_budget=args.budget)
+
+    date_str = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    stored, live_store = predictor.forecasts, ForecastStore(os.path.join(os.getcwd(), "missing.npz"))
+    print(f"\n📊 Sunum ({date_str})")
+    for size in (1, 10, 50):
+        route = cities[:size]
+        served = predictor.predict_route_weather(route, date_str)
+        served_ms = _timeit(lambda: predictor.predict_route_weather(route, date_str), repeat=args.repeat)
+        predictor.forecasts = live_store
+        live = predictor.predict_route_weather(route, date_str)
+        live_ms = _timeit(lambda: predictor.predict_route_weather(route, date_str), repeat=args.repeat)
+        predictor.forecasts = stored
+        assert served == live
+        print(f"   {size:>2} şehir: canlı model {live_ms:6.1f} ms → önceden hesaplanmış {served_ms:5.1f} ms "
+              f"({live_ms / served_ms:.1f}x)")
+
+
+def bench_fields(args):
+    """Tüm alanlar vs. en küçük alan kümesi (predicted_weather + predicted_temperature), HTTP üzerinden"""
+    predictor, cities = _predictor_on_synthetic_db(args.rows)
+    import historical_weather_predictor
+    from forecast_store import ForecastStore
+    client = historical_weather_predictor.app.test_client()
+    date_str = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    minimal = ["predicted_weather", "predicted_temperature"]
+
+    requests = [
+        ("/predict", {"city": cities[0], "date": date_str}),
+        ("/predict_route", {"cities": cities[:10], "date": date_str}),
+        ("/predict_route", {"cities": cities[:50], "date": date_str}),
+    ]
+
+    def measure(label):
+        print(f"\n📊 {label}")
+        for path, body in requests:
+            full = client.post(path, json=body).get_json()
+            selected = client.post(path, json=dict(body, fields=minimal)).get_json()
+            # Seçilen alanlar tam yanıttakilerle aynı olmalı
+            full_items = full["predictions"] if "predictions" in full else [full]
+            selected_items = selected["predictions"] if "predictions" in selected else [selected]
+            assert [{key: item[key] for key in ["city", "date"] + minimal} for item in full_items] == selected_items
+
+            full_ms = _timeit(lambda: client.post(path, json=body), repeat=args.repeat)
+            minimal_ms = _timeit(lambda: client.post(path, json=dict(body, fields=minimal)), repeat=args.repeat)
+            size = len(body.get("cities", [None]))
+            print(f"   {path:<15} {size:>2} şehir: tüm alanlar {full_ms:6.1f} ms → "
+                  f"{'+'.join(minimal)} {minimal_ms:5.1f} ms ({full_ms / minimal_ms:.1f}x)")
+
+    predictor.forecasts = ForecastStore(os.path.join(os.getcwd(), "missing.npz"))
+    measure("Canlı model")
+    predictor.forecasts = ForecastStore(os.path.join(os.getcwd(), "forecasts.npz"))
+    predictor.precompute_forecasts(months=2, workers=1)
+    measure("Önceden hesaplanmış tahminler")
+
+
+def bench_zones(args):
+    """Tek model vs. iklim bölgesi parçaları: eğitim süresi, bellek, gecikme ve doğruluk"""
+    os.environ["WEATHER_MODEL_SHARDING"] = "zone"
+    os.environ["WEATHER_SHARD_MEMORY_MB"] = str(args.budget_mb)
+    from advanced_weather_data import CITIES_GEOGRAPHIC_DATA
+    sharded, cities = _predictor_on_synthetic_db(args.rows, geographic=True, cities=len(CITIES_GEOGRAPHIC_DATA))
+    import historical_weather_predictor
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+    from zone_models import ZoneModelRegistry
+
+    os.environ["WEATHER_MODEL_SHARDING"] = "none"
+    started = time.perf_counter()
+    single = historical_weather_predictor.HistoricalWeatherPredictor()
+    single_train_s = time.perf_counter() - started
+
+    # Tek modelin doğruluğu, eğitimdekiyle aynı %20 test bölmesinde
+    features, _ = single._sample_training_features(100_000, 1_000_000)
+    X = features.drop(['weather_main', 'temperature'], axis=1)
+    _, X_test, _, y_weather_test = train_test_split(
+        X, single.weather_encoder.transform(features['weather_main']), test_size=0.2, random_state=42)
+    _, X_temp_test, _, y_temp_test = train_test_split(X, features['temperature'], test_size=0.2, random_state=42)
+    single_accuracy = accuracy_score(y_weather_test, single.weather_model.predict(X_test))
+    single_r2 = single.temperature_model.score(X_temp_test, y_temp_test)
+    single_mb = sum(os.path.getsize(path) for path in single.model_files) / 1024 / 1024
+
+    manifest = sharded.models.manifest
+    entries = list(manifest["zones"].values())
+    rows = sum(entry["rows"] for entry in entries)
+    zone_accuracy = sum(entry["accuracy"] * entry["rows"] for entry in entries) / rows
+    zone_r2 = sum(entry["r2"] * entry["rows"] for entry in entries) / rows
+    zone_mb = [entry["bytes"] / 1024 / 1024 for entry in entries]
+
+    print(f"\n📊 Eğitim ({len(features):,} kayıt, {len(entries)} bölge)")
+    print(f"   tek model: {single_train_s:.1f} sn | bölgeler: {manifest['train_seconds']:.1f} sn duvar saati "
+          f"({manifest['workers']} süreç), parça süreleri toplamı "
+          f"{sum(entry['train_seconds'] for entry in entries):.1f} sn, en büyük parça "
+          f"{max(entry['train_seconds'] for entry in entries):.1f} sn (yeterli çekirdekte duvar saati alt sınırı)")
+    print("\n📊 Doğruluk (her modelin kendi %20 test bölmesi; bölgeler satır ağırlıklı)")
+    print(f"   hava durumu: tek model {single_accuracy:.3f} | bölgeler {zone_accuracy:.3f}")
+    print(f"   sıcaklık R²: tek model {single_r2:.3f} | bölgeler {zone_r2:.3f}")
+    print("\n📊 Bellek (kayıtlı model boyutu)")
+    print(f"   tek model: {single_mb:.1f} MB | tüm bölgeler: {sum(zone_mb):.1f} MB "
+          f"| tek bölgeye hizmet eden işçi: {min(zone_mb):.1f}–{max(zone_mb):.1f} MB")
+
+    date_str = "2025-01-15"
+    minimal = frozenset({"predicted_weather", "predicted_temperature"})
+    zones = sharded._zones_for(cities)
+    one_zone = [city for city, zone in zip(cities, zones) if zone == zones[0]][:5]
+    spread = list({zone: city for city, zone in zip(cities, zones)}.values())
+
+    print("\n📊 Gecikme (/predict_route, en küçük alan kümesi)")
+    for label, route, budget in ((f"tek bölge, {len(one_zone)} şehir", one_zone, args.budget_mb),
+                                 (f"{len(spread)} bölge, {len(spread)} şehir", spread, args.budget_mb),
+                                 (f"{len(spread)} bölge, {len(spread)} şehir", spread, None)):
+        single_ms = _timeit(lambda: single.predict_route_weather(route, date_str, minimal), repeat=args.repeat)
+        sharded.models = ZoneModelRegistry(sharded.zone_model_dir, budget)
+        first_ms = _timeit(lambda: sharded.predict_route_weather(route, date_str, minimal), repeat=1)
+        warm_ms = _timeit(lambda: sharded.predict_route_weather(route, date_str, minimal), repeat=args.repeat)
+        stats = sharded.models.stats()
+        label += f", bütçe {'sınırsız' if budget is None else f'{budget:.0f} MB'}"
+        print(f"   {label}: tek model {single_ms:.1f} ms | bölgeler ilk istek {first_ms:.0f} ms, "
+              f"sonraki {warm_ms:.1f} ms (yüklü {stats['loaded_mb']:.1f} MB, "
+              f"{stats['loads']} yükleme, {stats['evictions']} çıkarma)")
+
+
+def bench_range(args):
+    """Şehir × gün tablosu: tarih başına /predict_route veya çift başına /predict vs. tek /predict_range"""
+    predictor, cities = _predictor_on_synthetic_db(args.rows)
+    import historical_weather_predictor
+    from forecast_store import ForecastStore
+    predictor.forecasts = ForecastStore(os.path.join(os.getcwd(), "missing.npz"))
+    client = historical_weather_predictor.app.test_client()
+    route = cities[:args.cities]
+    start = datetime.now() + timedelta(days=30)
+    dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(args.days)]
+    body = {"cities": route, "start_date": dates[0], "end_date": dates[-1]}
+
+    # Model geçişlerini say
+    score_calls = []
+    score = predictor.models.score
+    predictor.models.score = lambda *a, **kw: score_calls.append(len(a[1])) or score(*a, **kw)
+
+    def per_pair():
+        return {city: {date_str: client.post("/predict", json={"city": city, "date": date_str}).get_json()
+                       for date_str in dates} for city in route}
+
+    def per_date():
+        grid = {city: {} for city in route}
+        for date_str in dates:
+            for prediction in client.post("/predict_route", json={"cities": route, "date": date_str}).get_json()["predictions"]:
+                grid[prediction["city"]][date_str] = prediction
+        return grid
+
+    def ranged():
+        return client.post("/predict_range", json=body).get_json()["grid"]
+
+    results = {}
+    print(f"\n📊 {len(route)} şehir × {len(dates)} gün ({len(route) * len(dates)} çift), canlı model")
+    for label, func, repeat in (("çift başına /predict", per_pair, 1),
+                                ("tarih başına /predict_route", per_date, args.repeat),
+                                ("tek /predict_range", ranged, args.repeat)):
+        score_calls.clear()
+        results[label] = func()
+        calls = list(score_calls)
+        elapsed = _timeit(func, repeat=repeat)
+        print(f"   {label:<28} {elapsed:8.1f} ms | model çağrısı: {len(calls)} (satır: {max(calls)})")
+    grids = list(results.values())
+    assert grids[0] == grids[1] == grids[2]
+    print("   ✓ Üç yolun tahminleri birebir aynı")
+
+
+def bench_etags(args):
+    """Panel yoklaması: koşulsuz GET vs. If-None-Match ile 304; veri alımında ETag değişimi"""
+    predictor, cities = _predictor_on_synthetic_db(args.rows)
+    import historical_weather_predictor
+    client = historical_weather_predictor.app.test_client()
+    city = cities[0]
+    endpoints = (
+        ("/statistics", lambda headers: client.get(f"/statistics/{city}", headers=headers)),
+        ("/predict", lambda headers: client.get("/predict", query_string={"city": city, "date": "2025-12-15"},
+                                                headers=headers)),
+    )
+
+    print(f"\n📊 Yoklama ({args.polls} istek, sonuç değişmeden)")
+    etags = {}
+    for label, call in endpoints:
+        first = call({})
+        etags[label] = first.headers["ETag"]
+        cached = call({"If-None-Match": etags[label]})
+        assert cached.status_code == 304 and not cached.data and cached.headers["ETag"] == etags[label]
+
+        full_ms = _timeit(lambda: [call({}) for _ in range(args.polls)])
+        conditional_ms = _timeit(lambda: [call({"If-None-Match": etags[label]}) for _ in range(args.polls)])
+        print(f"   {label:<12} koşulsuz {full_ms / args.polls:6.2f} ms, {len(first.data):>6,} B → "
+              f"304 {conditional_ms / args.polls:5.2f} ms, 0 B ({full_ms / conditional_ms:.1f}x)")
+
+    # POST /predict koşullu değildir: aynı gövde, ETag yok, her zaman 200
+    posted = client.post("/predict", json={"city": city, "date": "2025-12-15"},
+                         headers={"If-None-Match": etags["/predict"]})
+    assert posted.status_code == 200 and "ETag" not in posted.headers
+    assert posted.get_json() == endpoints[1][1]({}).get_json()
+
+    # Yeni gözlem alımı epoch'u değiştirir: eski ETag artık 200 ve yeni içerik döndürür
+    predictor.collector._save_weather_batch([{
+        "city": city, "date": "2025-12-15", "weather_main": "Snow", "weather_description": "kar",
+        "temperature": -12.5, "humidity": 90, "wind_speed": 4.0
+    }])
+    print("\n📊 Veri alımından sonra")
+    for label, call in endpoints:
+        response = call({"If-None-Match": etags[label]})
+        assert response.status_code == 200 and response.headers["ETag"] != etags[label]
+        print(f"   {label:<12} eski ETag → {response.status_code}, yeni ETag {response.headers['ETag']}")
+
+
+def _ml_database_on_synthetic_db(years: int = 3):
+    """Sentetik weather_data üzerinde MLWeatherDatabase (model yükleme/eğitim atlanır)
+
+    Veritabanı çalışma dizinindeki historical_weather.db dosyasıdır; geçici dizine geçilir.
+    """
+    from advanced_weather_data import CITIES_GEOGRAPHIC_DATA, MLWeatherDatabase
+    from historical_averages import HistoricalAverageStore
+    os.chdir(tempfile.mkdtemp(prefix="hw_bench_"))
+
+    db = MLWeatherDatabase.__new__(MLWeatherDatabase)
+    db.cities_data = dict(CITIES_GEOGRAPHIC_DATA)
+    db.db_path = "historical_weather.db"
+    db._init_database()
+    db.historical_averages = HistoricalAverageStore(db.db_path)
+
+    rng = np.random.default_rng(42)
+    current_year = datetime.now().year
+    dates = pd.date_range(f"{current_year - years}-01-01", f"{current_year - 1}-12-31").strftime("%Y-%m-%d")
+    conditions = ["güneş", "bulut", "yağmur", "kar", "sis"]
+    rows = [
+        (city, date, conditions[rng.integers(len(conditions))], round(float(rng.normal(14, 9)), 1),
+         float(rng.integers(30, 95)), round(float(rng.uniform(0, 20)), 1))
+        for city in db.cities_data for date in dates
+    ]
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany("INSERT INTO weather_data (city, date, weather_condition, temperature, humidity, wind_speed) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    print(f"🧪 {len(rows):,} sentetik gözlem ({len(db.cities_data)} şehir, {years} yıl)")
+    return db
+
+
+def _legacy_historical_average(db_path: str, city: str, month: int, day: int):
+    """Eski get_historical_average: her çağrıda yeni bağlantı, yıl başına ayrı sorgu"""
+    from historical_averages import average_of, window_years
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    rows = []
+    for year in window_years():
+        cursor.execute("SELECT temperature, humidity, wind_speed, weather_condition FROM weather_data "
+                       "WHERE city = ? AND date = ?", (city, f"{year}-{month:02d}-{day:02d}"))
+        result = cursor.fetchone()
+        if result:
+            rows.append(result)
+    conn.close()
+    return average_of(rows)
+
+
+def bench_historical_average(args):
+    """get_historical_average: yıl başına sorgu + yeni bağlantı vs. önbellek → city_statistics → tek IN sorgusu"""
+    db = _ml_database_on_synthetic_db()
+    route = list(db.cities_data)[:args.cities]
+    days = [(12, 12), (7, 15), (1, 1), (3, 21)]
+
+    legacy_average = lambda city, month, day: _legacy_historical_average(db.db_path, city, month, day)
+
+    def requests(average):
+        return [average(city, month, day) for month, day in days for city in route]
+
+    assert requests(legacy_average) == requests(db.get_historical_average)
+
+    print(f"\n📊 {len(days)} tarih × {len(route)} şehirlik rota (çağrı başına ortalama)")
+    calls = len(days) * len(route)
+    legacy_ms = _timeit(lambda: requests(legacy_average), repeat=args.repeat) / calls
+    print(f"   eski (bağlantı + 3 sorgu)       {legacy_ms * 1000:7.1f} µs")
+
+    # Bağlantı ve weather_data parmak izi (refresh_interval'da bir) ölçümden önce alınır
+    db.historical_averages.invalidate()
+    db.historical_averages.refresh_interval = float("inf")
+    fingerprint_ms = _timeit(lambda: db.get_historical_average("Bilinmeyen", 1, 1))
+    print(f"   ilk çağrı: bağlantı + parmak izi {fingerprint_ms:7.1f} ms (30 sn'de bir)")
+    cold_ms = _timeit(lambda: requests(db.get_historical_average)) / calls
+    warm_ms = _timeit(lambda: requests(db.get_historical_average), repeat=args.repeat) / calls
+    print(f"   tek IN sorgusu (soğuk)          {cold_ms * 1000:7.1f} µs ({legacy_ms / cold_ms:.1f}x)")
+    print(f"   bellek önbelleği (sıcak)        {warm_ms * 1000:7.1f} µs ({legacy_ms / warm_ms:.1f}x)")
+
+    # city_statistics katmanı: yeni süreç (boş önbellek) özet tablodan okur
+    time.sleep(1.1)  # last_updated son gözlemden sonra olmalı (saniye çözünürlüğü)
+    db.update_city_statistics()
+
+    from historical_averages import HistoricalAverageStore
+    fresh = HistoricalAverageStore(db.db_path, refresh_interval=float("inf"))
+    assert requests(fresh.get) == requests(legacy_average)
+    fresh = HistoricalAverageStore(db.db_path, refresh_interval=float("inf"))
+    fresh.get("Bilinmeyen", 1, 1)
+    statistics_ms = _timeit(lambda: requests(fresh.get)) / calls
+    print(f"   city_statistics (yeni süreç)    {statistics_ms * 1000:7.1f} µs ({legacy_ms / statistics_ms:.1f}x)")
+    print(f"\n📊 Sayaçlar: {db.historical_averages.stats()}")
+    print(f"   city_statistics katmanı: {fresh.stats()}")
+
+
+def bench_city_statistics_rebuild(args):
+    """update_city_statistics: şehir × 12 ay × 28 gün döngüsü vs. tek okuma + gruplama + toplu yazım"""
+    db = _ml_database_on_synthetic_db()
+
+    def legacy_rebuild():
+        # Eski uygulama: gün başına get_historical_average (bağlantı + 3 sorgu) ve tek satırlık INSERT.
+        # Eski kod okumaları açık yazma transaction'ı içinde yapıyordu; sayfa önbelleği taşınca kendi
+        # kilidine takılır ("database is locked"), bu yüzden burada önce okunup sonra yazılır.
+        rows = []
+        for city in db.cities_data:
+            for month in range(1, 13):
+                for day in range(1, 29):
+                    average = _legacy_historical_average(db.db_path, city, month, day)
+                    rows.append((city, month, day, average['avg_temperature'], average['avg_humidity'],
+                                 average['avg_wind_speed'], json.dumps(average['weather_probabilities']),
+                                 average['sample_count']))
+        conn = sqlite3.connect(db.db_path)
+        cursor = conn.cursor()
+        for row in rows:
+            cursor.execute("INSERT OR REPLACE INTO city_statistics (city, month, day, avg_temperature, "
+                           "avg_humidity, avg_wind_speed, weather_probabilities, sample_count) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+        conn.commit()
+        conn.close()
+
+    def legacy_table():
+        conn = sqlite3.connect(db.db_path)
+        rows = conn.execute("SELECT city, month, day, avg_temperature, avg_humidity, avg_wind_speed, "
+                            "weather_probabilities, sample_count FROM city_statistics").fetchall()
+        conn.close()
+        return {row[:3]: (*row[3:6], json.loads(row[6]), row[7]) for row in rows}
+
+    print(f"\n📊 city_statistics yeniden oluşturma ({len(db.cities_data)} şehir)")
+    legacy_ms = _timeit(legacy_rebuild)
+    legacy = legacy_table()
+    rebuild_ms = _timeit(db.update_city_statistics)
+
+    # Eski yolun kapsadığı günler birebir aynı; yeni yol 29–31 ve 29 Şubat'ı da kapsar
+    from historical_averages import read_statistics
+    conn = sqlite3.connect(db.db_path)
+    cursor = conn.cursor()
+    rebuilt = conn.execute("SELECT COUNT(*) FROM city_statistics").fetchone()[0]
+    for (city, month, day), value in legacy.items():
+        result = read_statistics(cursor, city, month, day)
+        assert (result['avg_temperature'], result['avg_humidity'], result['avg_wind_speed'],
+                result['weather_probabilities'], result['sample_count']) == value
+    conn.close()
+    print(f"   eski döngü: {legacy_ms / 1000:6.1f} sn, {len(legacy):,} gün (ayın 1–28'i)")
+    print(f"   toplu:      {rebuild_ms / 1000:6.1f} sn, {rebuilt:,} gün (tam takvim) — "
+          f"{legacy_ms / rebuild_ms:.0f}x, ortak günlerde değerler aynı")
+
+
+def bench_city_statistics_read(args):
+    """city_statistics okuma: JSON kolonu + json.loads + max vs. normalize olasılık tablosu"""
+    db = _ml_database_on_synthetic_db()
+    db.update_city_statistics()
+    from historical_averages import read_statistics
+
+    # Eski biçim: aynı değerler JSON kolonunda (ayrı tabloda)
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("CREATE TABLE legacy_city_statistics AS SELECT city, month, day, avg_temperature, avg_humidity, "
+                 "avg_wind_speed, sample_count, '' AS weather_probabilities FROM city_statistics")
+    legacy_rows = []
+    for city, month, day in conn.execute("SELECT city, month, day FROM city_statistics").fetchall():
+        legacy_rows.append((json.dumps(read_statistics(conn.cursor(), city, month, day)['weather_probabilities']),
+                            city, month, day))
+    conn.executemany("UPDATE legacy_city_statistics SET weather_probabilities = ? WHERE city = ? AND month = ? "
+                     "AND day = ?", legacy_rows)
+    conn.execute("CREATE UNIQUE INDEX idx_legacy_city_statistics ON legacy_city_statistics (city, month, day)")
+    conn.commit()
+    cursor = conn.cursor()
+
+    def legacy_read(city, month, day):
+        cursor.execute("SELECT avg_temperature, avg_humidity, avg_wind_speed, weather_probabilities, sample_count "
+                       "FROM legacy_city_statistics WHERE city = ? AND month = ? AND day = ?", (city, month, day))
+        result = cursor.fetchone()
+        weather_probabilities = json.loads(result[3])
+        most_likely_weather = max(weather_probabilities, key=weather_probabilities.get)
+        return {'avg_temperature': result[0], 'weather_probabilities': weather_probabilities,
+                'most_likely_weather': most_likely_weather, 'confidence': weather_probabilities[most_likely_weather]}
+
+    keys = [(city, month, day) for city in list(db.cities_data)[:args.cities] for month, day in ((1, 15), (7, 15))]
+    # En olası sınıf eşitlikte farklı seçilebilir (JSON'da sözlük sırası, tabloda yazım anındaki ilk görülen)
+    for key in keys:
+        legacy, normalized = legacy_read(*key), read_statistics(cursor, *key)
+        assert all(legacy[field] == normalized[field] for field in ('avg_temperature', 'weather_probabilities',
+                                                                    'confidence'))
+
+    legacy_ms = _timeit(lambda: [legacy_read(*key) for key in keys], repeat=args.repeat) / len(keys)
+    normalized_ms = _timeit(lambda: [read_statistics(cursor, *key) for key in keys], repeat=args.repeat) / len(keys)
+    print(f"\n📊 Nokta okuma (ortalama, {len(keys)} gün)")
+    print(f"   JSON kolonu + json.loads + max: {legacy_ms * 1000:6.1f} µs")
+    print(f"   normalize tablo (tek JOIN):     {normalized_ms * 1000:6.1f} µs")
+
+    # Filtre: P(kar) > 0.3 olan günler
+    def legacy_filter():
+        rows = cursor.execute("SELECT city, month, day, weather_probabilities FROM legacy_city_statistics").fetchall()
+        return sorted((row[0], row[1], row[2]) for row in rows if json.loads(row[3]).get("kar", 0.0) > 0.3)
+
+    indexed = sorted((row["city"], row["month"], row["day"])
+                     for row in db.get_days_with_weather_probability("kar", 0.3))
+    assert legacy_filter() == indexed
+    legacy_ms = _timeit(legacy_filter, repeat=args.repeat)
+    indexed_ms = _timeit(lambda: db.get_days_with_weather_probability("kar", 0.3), repeat=args.repeat)
+    print(f"\n📊 P(kar) > 0.3 olan günler ({len(indexed):,} gün)")
+    print(f"   tam tarama + json.loads: {legacy_ms:7.1f} ms")
+    print(f"   indeksli SQL filtresi:   {indexed_ms:7.1f} ms ({legacy_ms / indexed_ms:.1f}x)")
+    conn.close()
+
+def bench_traffic_multiplier(args):
+    """calculate_traffic_multiplier: çift başına tek satırlık predict vs. toplu çağrı vs. önceden hesaplanmış tablo"""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+    from advanced_weather_data import CITIES_GEOGRAPHIC_DATA, MLWeatherDatabase
+    from traffic_multipliers import TrafficMultiplierTable
+
+    # Eğitim verisi üreticisi depoda olmadığından trafik modeli sentetik özelliklerle,
+    # train_models ile aynı hiperparametrelerle eğitilir
+    db = MLWeatherDatabase.__new__(MLWeatherDatabase)
+    db.cities_data = dict(CITIES_GEOGRAPHIC_DATA)
+    rng = np.random.default_rng(42)
+    dates = pd.date_range("2022-01-01", "2025-12-31")
+    static = np.array([[data["lat"], data["lon"], data["elevation"], data["population"]]
+                       for data in db.cities_data.values()])
+    X = np.array([[*static[rng.integers(len(static))], date.month, date.weekday(), date.dayofyear]
+                  for date in dates[rng.integers(len(dates), size=20_000)]], dtype=np.float64)
+    y = 1.0 + 0.3 * (X[:, 5] >= 5) + 0.2 * np.isin(X[:, 4], [7, 8]) + X[:, 3] / 5e7 + rng.normal(0, 0.05, len(X))
+    db.scaler = StandardScaler().fit(X)
+    db.traffic_model = RandomForestRegressor(n_estimators=10, max_depth=5, min_samples_split=50, random_state=42)
+    db.traffic_model.fit(db.scaler.transform(X), y)
+    db.traffic_table = None
+
+    def legacy(city, date_str):
+        # Eski uygulama: çift başına tek satırlık dizi + scaler.transform + predict
+        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+        data = db.cities_data[city]
+        features = np.array([[data["lat"], data["lon"], data["elevation"], data["population"],
+                              date_obj.month, date_obj.weekday(), date_obj.timetuple().tm_yday]])
+        return round(db.traffic_model.predict(db.scaler.transform(features))[0], 2)
+
+    start = datetime.now().date()
+    pairs = [(city, (start + timedelta(days=offset)).isoformat())
+             for offset in range(args.days) for city in list(db.cities_data)[:args.cities]]
+    expected = [legacy(city, date_str) for city, date_str in pairs]
+    assert db.calculate_traffic_multipliers(pairs) == expected
+
+    print(f"\n📊 {len(pairs):,} (şehir, tarih) çifti ({args.cities} şehir × {args.days} gün)")
+    legacy_ms = _timeit(lambda: [legacy(city, date_str) for city, date_str in pairs])
+    batch_ms = _timeit(lambda: db.calculate_traffic_multipliers(pairs), repeat=args.repeat)
+    print(f"   çift başına predict: {legacy_ms:8.1f} ms")
+    print(f"   toplu (tek predict): {batch_ms:8.1f} ms ({legacy_ms / batch_ms:.0f}x)")
+
+    build_ms = _timeit(db.build_traffic_table)
+    assert db.calculate_traffic_multipliers(pairs) == expected
+    table_ms = _timeit(lambda: db.calculate_traffic_multipliers(pairs), repeat=args.repeat)
+    single_us = _timeit(lambda: db.calculate_traffic_multiplier(pairs[0][0], pairs[0][1]), repeat=1000) * 1000
+    print(f"   tablo indekslemesi:  {table_ms:8.1f} ms ({legacy_ms / table_ms:.0f}x), tek çağrı {single_us:.0f} µs")
+    print(f"   tablo kurulumu {build_ms:.0f} ms, {db.traffic_table.nbytes / 1024 / 1024:.1f} MB "
+          f"({len(db.traffic_table.cities)} şehir × 2 takvim × 366 gün × 7); değerler eski yol ile aynı")
+
+def bench_ml_collection(args):
+    """MLWeatherDatabase veri toplama: şehir başına sıralı requests.get vs. ortak oturum + kota + toplu yazım"""
+    import requests
+    from collection_checkpoint import date_range
+    from fake_openweather_server import CURRENT_WEATHER_PATH, start_fake_server
+
+    os.environ.setdefault("OPENWEATHER_API_KEY", "bench-key")
+    db = _ml_database_on_synthetic_db(years=0)
+    db.cities_data = dict(list(db.cities_data.items())[:args.cities])
+    server, base_url = start_fake_server(latency=args.latency)
+    db.base_url = base_url + CURRENT_WEATHER_PATH
+    start_date = "2023-01-01"
+    end_date = (datetime(2023, 1, 1) + timedelta(days=args.days - 1)).strftime("%Y-%m-%d")
+    dates = date_range(start_date, end_date)
+
+    def legacy_collect():
+        # Eski uygulama: şehir başına gün gün oturumsuz requests.get, satır başına INSERT,
+        # 30 günde bir commit ve şehirler arasında time.sleep(1)
+        conn = sqlite3.connect(db.db_path)
+        cursor = conn.cursor()
+        for city in db.cities_data:
+            for i, date in enumerate(dates, 1):
+                params = {"q": f"{city},TR", "appid": "bench-key", "units": "metric",
+                          "dt": int(datetime.strptime(date, "%Y-%m-%d").timestamp())}
+                data = requests.get(db.base_url, params=params).json()
+                cursor.execute("INSERT OR REPLACE INTO weather_data (city, date, weather_condition, temperature, "
+                               "humidity, wind_speed) VALUES (?, ?, ?, ?, ?, ?)",
+                               (city, date, data["weather"][0]["main"].lower(), data["main"]["temp"],
+                                data["main"]["humidity"], data["wind"]["speed"]))
+                if i % 30 == 0:
+                    conn.commit()
+            conn.commit()
+            time.sleep(args.legacy_sleep)
+        conn.close()
+
+    def table():
+        conn = sqlite3.connect(db.db_path)
+        rows = conn.execute("SELECT city, date, weather_condition, temperature, humidity, wind_speed "
+                            "FROM weather_data ORDER BY city, date").fetchall()
+        conn.execute("DELETE FROM weather_data")
+        conn.commit()
+        conn.close()
+        return rows
+
+    calls = len(db.cities_data) * len(dates)
+    try:
+        print(f"\n📊 {len(db.cities_data)} şehir × {len(dates)} gün = {calls} istek "
+              f"(taklit sunucu, istek başına {args.latency * 1000:.0f} ms gecikme)")
+        legacy_ms = _timeit(legacy_collect)
+        legacy = table()
+        collect_ms = _timeit(lambda: db.collect_all_cities_data(start_date, end_date, requests_per_minute=args.rpm,
+                                                                max_concurrency=args.concurrency))
+        assert table() == legacy
+        print(f"   eski (sıralı, şehirler arası {args.legacy_sleep:g} sn bekleme): {legacy_ms / 1000:6.2f} sn")
+        print(f"   ortak oturum, {args.concurrency} eşzamanlı, dakikada {args.rpm:g}: "
+              f"{collect_ms / 1000:6.2f} sn ({legacy_ms / collect_ms:.1f}x), satırlar aynı")
+
+        # Kota: istek sayısı kotanın izin verdiğinden hızlı tamamlanamaz
+        quota_dates = dates[:max(1, args.quota_requests // len(db.cities_data))]
+        quota_calls = len(quota_dates) * len(db.cities_data)
+        quota_ms = _timeit(lambda: db.collect_all_cities_data(start_date, quota_dates[-1],
+                                                              requests_per_minute=args.quota_rpm,
+                                                              max_concurrency=args.concurrency))
+        print(f"   kota dakikada {args.quota_rpm:g}: {quota_calls} istek {quota_ms / 1000:.2f} sn → "
+              f"dakikada {(quota_calls - 1) / (quota_ms / 60000):.0f} istek (ilk istek beklemesiz)")
+    finally:
+        server.shutdown()
+
+def bench_sqlite_concurrency(args):
+    """N okuyucu iş parçacığı + sürekli toplu yazıcı: rollback journal + sorgu başına bağlantı vs. WAL katmanı"""
+    import threading
+    from sqlite_access import sqlite_access
+
+    db = _ml_database_on_synthetic_db()
+    cities = list(db.cities_data)
+    years = [datetime.now().year - offset for offset in (3, 2, 1)]
+
+    read_sql = ("SELECT temperature, humidity, wind_speed, weather_condition FROM weather_data "
+                "WHERE city = ? AND date IN (?, ?, ?) ORDER BY date")
+    write_sql = ("INSERT OR REPLACE INTO weather_data (city, date, weather_condition, temperature, humidity, "
+                 "wind_speed) VALUES (?, ?, ?, ?, ?, ?)")
+
+    # Eski düzen: aynı veri, varsayılan rollback journal'lı ayrı dosyada
+    legacy_path = os.path.abspath("legacy_weather.db")
+    sqlite_access(db.db_path).close()
+    source = sqlite3.connect(db.db_path)
+    legacy = sqlite3.connect(legacy_path)
+    source.backup(legacy)
+    source.close()
+    legacy.execute("PRAGMA journal_mode = DELETE")
+    legacy.close()
+
+    def legacy_read(sql, params):
+        conn = sqlite3.connect(legacy_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def legacy_write(rows):
+        conn = sqlite3.connect(legacy_path)
+        try:
+            conn.executemany(write_sql, rows)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def wal_read(sql, params):
+        return sqlite_access(db.db_path).reader().execute(sql, params).fetchall()
+
+    def wal_write(rows):
+        with sqlite_access(db.db_path).writer() as conn:
+            conn.executemany(write_sql, rows)
+
+    def run(read, write) -> Dict:
+        stop = threading.Event()
+        latencies = [[] for _ in range(args.readers)]
+        errors = [0] * (args.readers + 1)
+        written = [0]
+
+        def reader(index: int):
+            rng = random.Random(index)
+            while not stop.is_set():
+                city, month, day = rng.choice(cities), rng.randint(1, 12), rng.randint(1, 28)
+                start = time.perf_counter()
+                try:
+                    read(read_sql, (city, *[f"{year}-{month:02d}-{day:02d}" for year in years]))
+                    latencies[index].append(time.perf_counter() - start)
+                except sqlite3.OperationalError:
+                    errors[index] += 1
+
+        def writer():
+            rng = np.random.default_rng(0)
+            batch = 0
+            while not stop.is_set():
+                day = datetime(2100, 1, 1) + timedelta(days=batch)
+                rows = [(city, (day + timedelta(days=i * 400)).strftime("%Y-%m-%d"), "bulut",
+                         float(rng.normal(10, 5)), 60.0, 5.0)
+                        for i in range(args.batch_size // len(cities) + 1) for city in cities][:args.batch_size]
+                try:
+                    write(rows)
+                    written[0] += len(rows)
+                except sqlite3.OperationalError:
+                    errors[-1] += 1
+                batch += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        if args.batch_size:
+            threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        merged = np.array(sorted(value for values in latencies for value in values)) * 1000
+        return {
+            "reads": len(merged),
+            "p50": float(np.percentile(merged, 50)) if len(merged) else 0.0,
+            "p99": float(np.percentile(merged, 99)) if len(merged) else 0.0,
+            "max": float(merged.max()) if len(merged) else 0.0,
+            "read_errors": sum(errors[:-1]),
+            "written": written[0],
+            "write_errors": errors[-1],
+        }
+
+    print(f"\n📊 {args.readers} okuyucu iş parçacığı + toplu yazıcı ({args.batch_size} satır/transaction), "
+          f"{args.seconds:g} sn")
+    for label, read, write in (("rollback journal, sorgu başına bağlantı", legacy_read, legacy_write),
+                               ("WAL, iş parçacığı başına okuyucu + tek yazıcı", wal_read, wal_write)):
+        result = run(read, write)
+        print(f"   {label}:")
+        print(f"      okuma {result['reads'] / args.seconds:8,.0f}/sn | p50 {result['p50']:6.2f} ms | "
+              f"p99 {result['p99']:7.2f} ms | max {result['max']:7.1f} ms | hata {result['read_errors']}")
+        print(f"      yazım {result['written'] / args.seconds:8,.0f} satır/sn | hata {result['write_errors']}")
+
+
+def bench_toll_tariff(args):
+    """Rota ücreti: eski anahtar kelime döngüsü vs. rota × sınıf başına route_cost vs. tek vektörel costs()"""
+    from toll_tariffs import load_tariff
+
+    tariff = load_tariff()
+    rng = np.random.default_rng(42)
+    names = [*tariff.names[:-2], "FSM Köprüsü", "o-4", "Boğaziçi Köprüsü", "Haliç Köprüsü", "Çevre Otoyolu",
+             "D-100", "E-80", "Sahil Yolu"]
+    distances = rng.uniform(20, 1200, args.routes).round(1)
+    highway_lists = [list(rng.choice(names, rng.integers(1, 6))) for _ in range(args.routes)]
+
+    def legacy(route_distance, route_highways):
+        # Eski calculate_toll_cost: ad başına lower() + anahtar kelime, tek sınıf
+        total_cost = 0
+        for highway in route_highways:
+            if "köprü" in highway.lower() or "bridge" in highway.lower():
+                total_cost += 200
+            elif "otoyol" in highway.lower() or "highway" in highway.lower():
+                total_cost += route_distance * 0.15
+        return round(total_cost, 2)
+
+    def scalar():
+        return [[tariff.route_cost(distance, highways, vehicle_class)["total_cost"]
+                 for vehicle_class in tariff.vehicle_classes]
+                for distance, highways in zip(distances, highway_lists)]
+
+    vectorized = tariff.costs(distances, highway_lists)
+    # Toplama sırası farkı yalnızca yarım kuruş sınırında yuvarlamayı değiştirebilir
+    assert np.abs(np.array(scalar()) - vectorized).max() <= 0.005 + 1e-9
+
+    classes = len(tariff.vehicle_classes)
+    print(f"\n📊 {args.routes:,} rota × {classes} araç sınıfı, {len(tariff.names)} tarife kalemi")
+    legacy_ms = _timeit(lambda: [legacy(distance, highways) for distance, highways in zip(distances, highway_lists)])
+    scalar_ms = _timeit(scalar)
+    vector_ms = _timeit(lambda: tariff.costs(distances, highway_lists), repeat=args.repeat)
+    print(f"   eski anahtar kelime döngüsü (tek sınıf): {legacy_ms:8.1f} ms")
+    print(f"   route_cost, rota × sınıf başına:          {scalar_ms:8.1f} ms")
+    print(f"   costs(), tek vektörel çağrı:             {vector_ms:8.1f} ms "
+          f"({scalar_ms / vector_ms:.0f}x route_cost'a göre); değerler route_cost ile aynı")
+
+
+def bench_ml_training(args):
+    """MLWeatherDatabase.train_models: satır döngüsüyle eğitim verisi + sıralı eğitim vs. parçalı vektörel + birlikte eğitim"""
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from training_set import FEATURE_COLUMNS, TRAINING_QUERY, build_training_set, fit_forests
+
+    db = _ml_database_on_synthetic_db(years=args.years)
+    db.db_path = os.path.abspath(db.db_path)
+    db.scaler, db.weather_encoder, db.traffic_table = StandardScaler(), LabelEncoder(), None
+
+    def legacy_build():
+        # Satır başına strptime + şehir sözlüğü araması + kural tabanlı trafik çarpanı
+        conn = sqlite3.connect(db.db_path)
+        rows = conn.execute(TRAINING_QUERY).fetchall()
+        conn.close()
+        records = []
+        for city, date_str, weather, temperature in rows:
+            data = db.cities_data[city]
+            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+            traffic = 1.0
+            traffic *= 1.3 if date_obj.weekday() >= 5 else 1.0
+            traffic *= 1.1 if date_obj.month in (7, 8) else 1.0
+            traffic *= 1.1 if data["population"] > 1_000_000 else 1.0
+            traffic *= {"yağmur": 1.15, "kar": 1.3, "fırtına": 1.25}.get(weather, 1.0)
+            records.append({
+                "latitude": data["lat"], "longitude": data["lon"], "elevation": data["elevation"],
+                "population": data["population"], "month": date_obj.month, "day_of_week": date_obj.weekday(),
+                "day_of_year": date_obj.timetuple().tm_yday, "weather": weather, "temperature": temperature,
+                "traffic_multiplier": round(min(max(traffic, 0.5), 3.0), 2),
+            })
+        return pd.DataFrame(records)
+
+    def vector_build():
+        chunks = pd.read_sql_query(TRAINING_QUERY, db.sqlite.reader(), chunksize=args.chunksize)
+        return build_training_set(chunks, db.cities_data).arrays()
+
+    legacy_ms = _timeit(legacy_build)
+    vector_ms = _timeit(vector_build)
+    df = legacy_build()
+    X, classes, labels, temperature, traffic = vector_build()
+    assert np.array_equal(df[FEATURE_COLUMNS].to_numpy(dtype=np.float32), X)
+    assert np.array_equal(LabelEncoder().fit_transform(df["weather"]), labels)
+    # round() ile np.round yalnızca yarım kuruş sınırında ayrışabilir
+    assert np.abs(df["traffic_multiplier"].to_numpy() - traffic).max() <= 0.01 + 1e-9
+    print(f"\n📊 {len(X):,} satır, parça boyutu {args.chunksize:,}")
+    print(f"   eğitim verisi, satır döngüsü:    {legacy_ms:8.0f} ms")
+    print(f"   eğitim verisi, parçalı vektörel: {vector_ms:8.0f} ms ({legacy_ms / vector_ms:.0f}x); özellikler aynı")
+
+    X_scaled = StandardScaler().fit_transform(X)
+
+    def forests():
+        return {
+            "weather": (RandomForestClassifier(n_estimators=10, max_depth=5, min_samples_split=50, random_state=42), labels),
+            "temperature": (RandomForestRegressor(n_estimators=10, max_depth=5, min_samples_split=50, random_state=42), temperature),
+            "traffic": (RandomForestRegressor(n_estimators=10, max_depth=5, min_samples_split=50, random_state=42), traffic),
+        }
+
+    sequential, parallel = forests(), forests()
+    sequential_ms = _timeit(lambda: fit_forests(sequential, X_scaled, workers=1))
+    parallel_ms = _timeit(lambda: fit_forests(parallel, X_scaled, workers=args.workers))
+    for name in sequential:
+        assert np.array_equal(sequential[name][0].predict(X_scaled[:1000]), parallel[name][0].predict(X_scaled[:1000]))
+    print(f"   üç orman sıralı:                 {sequential_ms:8.0f} ms")
+    print(f"   üç orman birlikte ({args.workers} iş parçacığı, {os.cpu_count()} CPU): {parallel_ms:8.0f} ms "
+          f"({sequential_ms / parallel_ms:.1f}x); tahminler aynı")
+
+    os.makedirs("service", exist_ok=True)
+    os.chdir("service")
+    db.train_models(chunksize=args.chunksize, workers=args.workers)
+    report = db.training_report
+    print(f"   train_models (soğuk başlangıç): oluşturma {report['build_seconds']:.2f} sn, "
+          f"eğitim {report['fit_seconds']:.2f} sn")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tarihsel hava durumu veri katmanı benchmark'ları")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("month-day-index", help="SUBSTR filtreleri vs. indeksli month/day kolonları")
+    p.add_argument("--rows", type=int, default=3_000_000)
+    p.add_argument("--lookups", type=int, default=200)
+    p.set_defaults(func=bench_month_day_index)
+
+    p = subparsers.add_parser("probability-cube", help="SQL olasılık sorgusu vs. bellek içi NumPy küpü")
+    p.add_argument("--rows", type=int, default=59 * 365 * 5)
+    p.add_argument("--lookups", type=int, default=500)
+    p.add_argument("--route-cities", type=int, default=50)
+    p.set_defaults(func=bench_probability_cube)
+
+    p = subparsers.add_parser("city-statistics", help="İstek başına üç tarama vs. materyalize şehir istatistikleri")
+    p.add_argument("--rows", type=int, default=59 * 365 * 5)
+    p.add_argument("--requests", type=int, default=200)
+    p.set_defaults(func=bench_city_statistics)
+
+    p = subparsers.add_parser("training-data", help="Tek DataFrame vs. parçalı eğitim verisi çıkarımı (tepe bellek)")
+    p.add_argument("--rows", type=int, default=10_000_000)
+    p.add_argument("--chunksize", type=int, default=100_000)
+    p.add_argument("--modes", default="chunked,full,legacy")
+    p.add_argument("--memory-limit-mb", type=int, default=4096)
+    p.set_defaults(func=bench_training_data)
+
+    p = subparsers.add_parser("storage-adapter", help="Sorgu başına bağlantı vs. kalıcı bağlantı + hazırlanmış ifadeler")
+    p.add_argument("--rows", type=int, default=59 * 365 * 5)
+    p.add_argument("--lookups", type=int, default=2000)
+    p.set_defaults(func=bench_storage_adapter)
+
+    p = subparsers.add_parser("snapshot", help="SQL okuma vs. bölümlü Parquet anlık görüntüsü (mmap + projeksiyon)")
+    p.add_argument("--rows", type=int, default=59 * 365 * 5)
+    p.add_argument("--chunksize", type=int, default=100_000)
+    p.set_defaults(func=bench_snapshot)
+
+    p = subparsers.add_parser("startup", help="Toplayıcı açılış süresi (arka uç seçimi + ilk sorgu)")
+    p.add_argument("--runs", type=int, default=5)
+    p.set_defaults(func=bench_startup)
+
+    p = subparsers.add_parser("route-prediction", help="Şehir başına tahmin vs. toplu rota tahmini")
+    p.add_argument("--rows", type=int, default=59 * 365 * 2)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_route_prediction)
+
+    p = subparsers.add_parser("forecasts", help="Önceden hesaplanmış tahminler vs. canlı model")
+    p.add_argument("--rows", type=int, default=59 * 365 * 2)
+    p.add_argument("--months", type=int, default=12)
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--budget", type=float, default=120.0)
+    p.add_argument("--short-budget", type=float, default=1.0, help="Kısmi kapsama örneği için süre sınırı")
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_forecasts)
+
+    p = subparsers.add_parser("fields", help="Tüm yanıt alanları vs. en küçük alan kümesi")
+    p.add_argument("--rows", type=int, default=59 * 365 * 2)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_fields)
+
+    p = subparsers.add_parser("zones", help="Tek model vs. iklim bölgesi parçaları")
+    p.add_argument("--rows", type=int, default=59 * 365 * 3)
+    p.add_argument("--budget-mb", type=float, default=40.0)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_zones)
+
+    p = subparsers.add_parser("range", help="Çift/tarih başına istekler vs. tek /predict_range")
+    p.add_argument("--rows", type=int, default=59 * 365 * 2)
+    p.add_argument("--cities", type=int, default=50)
+    p.add_argument("--days", type=int, default=7)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_range)
+
+    p = subparsers.add_parser("etags", help="Koşulsuz istekler vs. If-None-Match ile 304")
+    p.add_argument("--rows", type=int, default=59 * 365 * 2)
+    p.add_argument("--polls", type=int, default=200)
+    p.set_defaults(func=bench_etags)
+
+    p = subparsers.add_parser("historical-average", help="Yıl başına sorgu vs. önbellek → city_statistics → tek IN sorgusu")
+    p.add_argument("--cities", type=int, default=10)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_historical_average)
+
+    p = subparsers.add_parser("city-statistics-rebuild", help="Gün başına döngü vs. toplu city_statistics yeniden oluşturma")
+    p.set_defaults(func=bench_city_statistics_rebuild)
+
+    p = subparsers.add_parser("city-statistics-read", help="JSON olasılık kolonu vs. normalize olasılık tablosu")
+    p.add_argument("--cities", type=int, default=20)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_city_statistics_read)
+
+    p = subparsers.add_parser("traffic-multiplier", help="Çift başına trafik tahmini vs. toplu çağrı vs. tablo")
+    p.add_argument("--cities", type=int, default=75)
+    p.add_argument("--days", type=int, default=30)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_traffic_multiplier)
+
+    p = subparsers.add_parser("ml-collection", help="Sıralı şehir döngüsü vs. ortak oturum + kota + toplu yazım")
+    p.add_argument("--cities", type=int, default=10)
+    p.add_argument("--days", type=int, default=30)
+    p.add_argument("--latency", type=float, default=0.02)
+    p.add_argument("--legacy-sleep", type=float, default=1.0)
+    p.add_argument("--rpm", type=float, default=60000)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--quota-rpm", type=float, default=600)
+    p.add_argument("--quota-requests", type=int, default=50)
+    p.set_defaults(func=bench_ml_collection)
+
+    p = subparsers.add_parser("sqlite-concurrency", help="Okuyucular + toplu yazıcı: rollback journal vs. WAL katmanı")
+    p.add_argument("--readers", type=int, default=8)
+    p.add_argument("--batch-size", type=int, default=5000, help="Yazıcının transaction başına satırı (0 = yazıcı yok)")
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.set_defaults(func=bench_sqlite_concurrency)
+
+    p = subparsers.add_parser("toll-tariff", help="Anahtar kelime döngüsü vs. rota başına tarife vs. vektörel çağrı")
+    p.add_argument("--routes", type=int, default=10000)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_toll_tariff)
+
+    p = subparsers.add_parser("ml-training", help="Satır döngüsüyle eğitim verisi + sıralı eğitim vs. vektörel + birlikte eğitim")
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--chunksize", type=int, default=200_000)
+    p.add_argument("--workers", type=int, default=3)
+    p.set_defaults(func=bench_ml_training)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
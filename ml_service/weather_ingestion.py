@@ -0,0 +1,315 @@
+"""
+Eşzamanlı ve Hız Sınırlı Tarihsel Hava Durumu Veri Toplama Motoru
+
+Bu modül, şehir × gün isteklerini tek tek ve bloklayarak göndermek yerine
+asyncio üzerinde sınırlı eşzamanlılıkla çalıştırır.
+
+Özellikler:
+- Token bucket hız sınırlayıcı (saniye başına istek kotası)
+- Sınırlı eşzamanlılık (aynı anda en fazla N istek)
+- Üstel geri çekilmeli (exponential backoff) yeniden deneme
+- Keep-alive HTTP oturumu ile bağlantı yeniden kullanımı
+- Tamponlu, toplu (batch) veritabanı yazımı
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Yeniden denenebilir HTTP durum kodları
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket hız sınırlayıcı"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate pozitif olmalı")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self) -> float:
+        """Token almayı dene; alınamazsa beklenmesi gereken süreyi döndür"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Token alınana kadar bekle (bloklayan sürüm)"""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0.0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Token alınana kadar bekle (asyncio sürümü)"""
+        while True:
+            wait = self.try_acquire()
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+
+@dataclass(frozen=True)
+class IngestionJob:
+    """Tek bir (şehir, gün) veri çekme işi"""
+    city: str
+    date: str  # YYYY-MM-DD
+    lat: float
+    lon: float
+
+
+class BufferedBatchWriter:
+    """Satırları tamponlayıp belirli boyutlarda toplu olarak yazan yardımcı sınıf"""
+
+    def __init__(self, write_batch: Callable[[List[Dict]], Optional[int]], batch_size: int = 500):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.written = 0
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, row: Dict) -> Optional[List[Dict]]:
+        """Satırı tampona ekle; tampon dolduysa yazılacak batch'i döndür"""
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                batch, self._buffer = self._buffer, []
+                return batch
+        return None
+
+    def drain(self) -> List[Dict]:
+        """Tamponda kalan satırları al"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        return batch
+
+    def write(self, batch: List[Dict]):
+        """Batch'i veritabanına yaz (write_batch kaydedilen satır sayısını döndürebilir)"""
+        if batch:
+            saved = self.write_batch(batch)
+            self.written += len(batch) if saved is None else saved
+
+
+def build_timemachine_params(job: IngestionJob, api_key: str) -> Dict:
+    """OpenWeatherMap timemachine isteği için parametreleri oluştur"""
+    timestamp = int(datetime.strptime(job.date, "%Y-%m-%d").timestamp())
+    return {
+        "lat": job.lat,
+        "lon": job.lon,
+        "dt": timestamp,
+        "appid": api_key,
+        "units": "metric",
+    }
+
+
+def build_current_weather_params(job: IngestionJob, api_key: str) -> Dict:
+    """OpenWeatherMap /data/2.5/weather isteği için parametreleri oluştur (şehir adıyla)"""
+    timestamp = int(datetime.strptime(job.date, "%Y-%m-%d").timestamp())
+    return {
+        "q": f"{job.city},TR",
+        "appid": api_key,
+        "units": "metric",
+        "dt": timestamp,
+    }
+
+
+def parse_current_weather_response(job: IngestionJob, data: Dict) -> Optional[Dict]:
+    """/data/2.5/weather yanıtını weather_data satırına çevir"""
+    if not data.get("weather"):
+        return None
+
+    return {
+        "city": job.city,
+        "date": job.date,
+        "weather_condition": data["weather"][0]["main"].lower(),
+        "temperature": data["main"]["temp"],
+        "humidity": data["main"]["humidity"],
+        "wind_speed": data["wind"]["speed"],
+    }
+
+
+def parse_timemachine_response(job: IngestionJob, data: Dict) -> Optional[Dict]:
+    """Timemachine yanıtını historical_weather satırına çevir"""
+    if "data" not in data or len(data["data"]) == 0:
+        return None
+
+    daily_data = data["data"][0]
+    return {
+        "city": job.city,
+        "date": job.date,
+        "weather_main": daily_data["weather"][0]["main"],
+        "weather_description": daily_data["weather"][0]["description"],
+        "temperature": daily_data["temp"],
+        "humidity": daily_data["humidity"],
+        "wind_speed": daily_data["wind_speed"],
+    }
+
+
+class ConcurrentWeatherIngestor:
+    """Sınırlı eşzamanlılık, hız sınırı ve yeniden deneme ile veri toplayan motor"""
+
+    def __init__(self, base_url: str, api_key: str,
+                 write_batch: Callable[[List[Dict]], Optional[int]],
+                 requests_per_second: float = 10.0,
+                 burst: Optional[float] = None,
+                 max_concurrency: int = 8,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 batch_size: int = 500,
+                 timeout: float = 10.0,
+                 build_params: Callable[[IngestionJob, str], Dict] = build_timemachine_params,
+                 parse_response: Callable[[IngestionJob, Dict], Optional[Dict]] = parse_timemachine_response,
+                 on_failure: Optional[Callable[[IngestionJob, str, str], None]] = None,
+                 no_data_status_codes: Iterable[int] = ()):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.write_batch = write_batch
+        # burst: kova kapasitesi (varsayılan bir saniyelik kota); 1 → istekler eşit aralıklı
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.build_params = build_params
+        self.parse_response = parse_response
+        # Başarısız işler için geri çağrı: (iş, durum, hata) — durum "no_data" veya "failed"
+        self.on_failure = on_failure
+        # Bu kodlar "veri yok" sayılır (ör. 404): yeniden denenmez, günlükte tekrar istenmez
+        self.no_data_status_codes = set(no_data_status_codes)
+
+        # Keep-alive bağlantı havuzu
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Üstel geri çekilme süresi (jitter ile)"""
+        if retry_after is not None:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        delay = self.backoff_base * (2 ** attempt)
+        return min(self.backoff_max, delay * (0.5 + random.random() / 2))
+
+    def _fetch(self, job: IngestionJob) -> requests.Response:
+        """Tek HTTP isteği (thread havuzunda çalışır)"""
+        return self.session.get(self.base_url, params=self.build_params(job, self.api_key),
+                                timeout=self.timeout)
+
+    async def _fetch_with_retry(self, job: IngestionJob, loop, http_pool, stats: Dict) -> Tuple[Optional[Dict], str, str]:
+        """Hız sınırına uyarak isteği gönder, gerekirse yeniden dene
+
+        (satır, durum, hata) döndürür; durum "ok", "no_data" veya "failed" olur.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire_async()
+            retry_after = None
+            try:
+                response = await loop.run_in_executor(http_pool, self._fetch, job)
+                stats["requests"] += 1
+
+                if response.status_code == 200:
+                    try:
+                        row = self.parse_response(job, response.json())
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        print(f"❌ {job.city} {job.date} yanıtı çözümlenemedi: {e}")
+                        return None, "failed", f"parse: {e}"
+                    if row is None:
+                        return None, "no_data", "empty response"
+                    return row, "ok", ""
+
+                if response.status_code in self.no_data_status_codes:
+                    return None, "no_data", f"HTTP {response.status_code}"
+
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    print(f"❌ {job.city} {job.date} verisi alınamadı: HTTP {response.status_code}")
+                    return None, "failed", f"HTTP {response.status_code}"
+
+                retry_after = response.headers.get("Retry-After")
+                error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                stats["requests"] += 1
+                error = str(e)
+
+            if attempt < self.max_retries:
+                stats["retries"] += 1
+                await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+            else:
+                print(f"❌ {job.city} {job.date} verisi alınamadı ({self.max_retries + 1} deneme): {error}")
+        return None, "failed", error
+
+    async def _run_async(self, jobs: Iterable[IngestionJob], stats: Dict):
+        loop = asyncio.get_running_loop()
+        writer = BufferedBatchWriter(self.write_batch, self.batch_size)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        pending_writes = []
+
+        # HTTP istekleri için N thread, yazma için tek thread (yazımlar sıralı kalır)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as http_pool, \
+                ThreadPoolExecutor(max_workers=1) as write_pool:
+
+            async def worker(job: IngestionJob):
+                async with semaphore:
+                    row, status, error = await self._fetch_with_retry(job, loop, http_pool, stats)
+                if row is None:
+                    stats[status] += 1
+                    if self.on_failure is not None:
+                        self.on_failure(job, status, error)
+                    return
+                batch = writer.add(row)
+                if batch:
+                    pending_writes.append(loop.run_in_executor(write_pool, writer.write, batch))
+
+            # Tüm işleri aynı anda task yapmak yerine pencereli olarak ilerle
+            window = max(1, self.max_concurrency * 4)
+            tasks = set()
+            for job in jobs:
+                stats["jobs"] += 1
+                tasks.add(asyncio.ensure_future(worker(job)))
+                if len(tasks) >= window:
+                    _, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            if tasks:
+                await asyncio.gather(*tasks)
+
+            pending_writes.append(loop.run_in_executor(write_pool, writer.write, writer.drain()))
+            await asyncio.gather(*pending_writes)
+
+        stats["saved"] = writer.written
+
+    def run(self, jobs: Iterable[IngestionJob]) -> Dict:
+        """İşleri çalıştır ve istatistikleri döndür"""
+        stats = {"jobs": 0, "requests": 0, "retries": 0, "failed": 0, "no_data": 0, "saved": 0}
+        start = time.perf_counter()
+        asyncio.run(self._run_async(jobs, stats))
+        stats["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def close(self):
+        self.session.close()
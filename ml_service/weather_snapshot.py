@@ -0,0 +1,295 @@
+"""
+Sütunlu (Parquet/Arrow) Tarihsel Hava Durumu Anlık Görüntüsü
+
+Bu modül, historical_weather ve daily_probabilities tablolarını şehir/yıl
+bölümlü Parquet dosyalarına aktarır. Eğitim ve istatistik yolları satır satır
+SQL okumak yerine yalnızca ihtiyaç duydukları kolonları bellek eşlemeli
+(memory-mapped) dosyalardan okur.
+
+Özellikler:
+- Hive bölümleme: historical_weather/city=<şehir>/year=<yıl>/, daily_probabilities/city=<şehir>/
+- Şehir, hava durumu sınıfı ve açıklaması sözlük (dictionary) kodlu
+- Kolon projeksiyonu + mmap ile okuma (kullanılmayan kolonlar diskten okunmaz)
+- Manifest'te veri parmak izi: tablo değiştiyse okuyucular SQL yoluna döner
+- Geçici dizine yazıp tek rename ile yayınlama (yarım görüntü okunmaz)
+
+pyarrow opsiyoneldir; kurulu değilse tüm okuyucular SQL yolunu kullanır.
+
+Kullanım:
+    python weather_snapshot.py --dir weather_snapshot
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = "_manifest.json"
+FORMAT_VERSION = 1
+OBSERVATIONS = "historical_weather"
+PROBABILITIES = "daily_probabilities"
+
+# Eğitim verisi kolonları (training_data sorgusuyla aynı sıra)
+TRAINING_COLUMNS = ["city", "date", "month", "day", "weather_main", "temperature",
+                    "humidity", "wind_speed", "probability", "sample_count"]
+
+
+def pyarrow_available() -> bool:
+    """pyarrow kurulu mu (opsiyonel bağımlılık)"""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.dataset  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def normalize_fingerprint(fingerprint: Sequence) -> List[Optional[str]]:
+    """Parmak izini JSON'da saklanabilir ve karşılaştırılabilir hale getir"""
+    return [None if value is None else str(value) for value in fingerprint]
+
+
+def _observation_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("city", pa.dictionary(pa.int32(), pa.string())),
+        ("year", pa.int16()),
+        ("date", pa.date32()),
+        ("month", pa.int8()),
+        ("day", pa.int8()),
+        ("weather_main", pa.dictionary(pa.int32(), pa.string())),
+        ("weather_description", pa.dictionary(pa.int32(), pa.string())),
+        ("temperature", pa.float64()),
+        ("humidity", pa.int16()),
+        ("wind_speed", pa.float64()),
+    ])
+
+
+def _probability_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("city", pa.dictionary(pa.int32(), pa.string())),
+        ("month", pa.int8()),
+        ("day", pa.int8()),
+        ("weather_main", pa.dictionary(pa.int32(), pa.string())),
+        ("probability", pa.float64()),
+        ("sample_count", pa.int32()),
+    ])
+
+
+def _to_record_batch(df: pd.DataFrame, schema):
+    """SQL parçasını şemaya uygun Arrow batch'ine çevir (metin kolonları sözlük kodlu)"""
+    import pyarrow as pa
+    arrays = []
+    for field in schema:
+        values = df[field.name]
+        if pa.types.is_dictionary(field.type):
+            array = pa.array(values, type=pa.string(), from_pandas=True).dictionary_encode()
+            arrays.append(array.cast(field.type))
+        elif pa.types.is_date32(field.type):
+            arrays.append(pa.array(pd.to_datetime(values).dt.date, type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def category_ids(values: pd.Series, index: Dict[str, int]) -> np.ndarray:
+    """Kategorik kolonu global indekslere çevir (bilinmeyen değerler -1)"""
+    categorical = values.astype("category")
+    lookup = np.array([index.get(name, -1) for name in categorical.cat.categories] + [-1], dtype=np.int64)
+    return lookup[categorical.cat.codes.to_numpy()]  # Kod -1 (null) son elemana düşer
+
+
+class WeatherSnapshot:
+    """Bölümlü Parquet anlık görüntüsünün yazıcısı ve okuyucusu"""
+
+    def __init__(self, path: str = "weather_snapshot"):
+        self.path = path
+        self._manifest = None
+        self._manifest_mtime = None
+
+    # ---- Manifest ----
+
+    def manifest(self) -> Optional[Dict]:
+        """Manifest'i oku (dosya değişmediyse önbellekten)"""
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        try:
+            mtime = os.stat(manifest_path).st_mtime_ns
+        except OSError:
+            self._manifest, self._manifest_mtime = None, None
+            return None
+        if mtime != self._manifest_mtime:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def is_fresh(self, fingerprint: Sequence) -> bool:
+        """Görüntü mevcut ve veritabanındaki verilerle aynı mı"""
+        if not pyarrow_available():
+            return False
+        manifest = self.manifest()
+        return (manifest is not None
+                and manifest.get("format_version") == FORMAT_VERSION
+                and manifest.get("fingerprint") == normalize_fingerprint(fingerprint))
+
+    # ---- Dışa aktarma ----
+
+    def export(self, storage, chunksize: int = 200_000) -> Dict:
+        """Tabloları bölümlü Parquet dosyalarına aktar ve manifest'i yaz"""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        start = time.perf_counter()
+        staging = f"{self.path}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        with storage.read_connection() as conn:
+            try:
+                # Parmak izi okumadan önce alınır: aktarım sırasında yazım olursa görüntü bayat sayılır
+                cursor = conn.cursor()
+                cursor.execute(storage.sql("data_fingerprint"))
+                fingerprint = normalize_fingerprint(cursor.fetchone())
+                conn.commit()
+
+                # write_dataset girdiyi kendi thread'inde tükettiği için (SQLite bağlantısı thread'e bağlı)
+                # her SQL parçası ayrı çağrıyla yazılır; sıralı okuma sayesinde bölüm başına 1-2 dosya oluşur
+                write_options = ds.ParquetFileFormat().make_write_options(compression="snappy")
+                observation_partitioning = ds.partitioning(
+                    pa.schema([("city", pa.string()), ("year", pa.int16())]), flavor="hive")
+                cities, classes, rows = set(), set(), 0
+                chunks = pd.read_sql_query(storage.sql("snapshot_observations"), conn, chunksize=chunksize)
+                for part, chunk in enumerate(chunks):
+                    cities.update(chunk["city"].unique())
+                    classes.update(chunk["weather_main"].unique())
+                    rows += len(chunk)
+                    ds.write_dataset(
+                        _to_record_batch(chunk, _observation_schema()), os.path.join(staging, OBSERVATIONS),
+                        format="parquet", file_options=write_options, partitioning=observation_partitioning,
+                        basename_template=f"part-{part}-{{i}}.parquet", existing_data_behavior="overwrite_or_ignore"
+                    )
+
+                probabilities = pd.read_sql_query(storage.sql("snapshot_probabilities"), conn)
+                ds.write_dataset(
+                    _to_record_batch(probabilities, _probability_schema()), os.path.join(staging, PROBABILITIES),
+                    format="parquet", file_options=write_options,
+                    partitioning=ds.partitioning(pa.schema([("city", pa.string())]), flavor="hive"),
+                    existing_data_behavior="overwrite_or_ignore"
+                )
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "fingerprint": fingerprint,
+            "rows": {OBSERVATIONS: rows, PROBABILITIES: len(probabilities)},
+            "cities": sorted(cities),
+            "weather_classes": sorted(classes),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # Eski görüntüyü kenara al, yenisini tek rename ile yayınla
+        retired = f"{self.path}.old-{os.getpid()}"
+        if os.path.exists(self.path):
+            os.rename(self.path, retired)
+        os.rename(staging, self.path)
+        shutil.rmtree(retired, ignore_errors=True)
+
+        print(f"🗄️ Anlık görüntü yazıldı: {rows:,} gözlem, {len(probabilities):,} olasılık satırı "
+              f"({time.perf_counter() - start:.1f} sn) → {self.path}")
+        return manifest
+
+    # ---- Okuma ----
+
+    def dataset(self, name: str):
+        """Bölümlü veri kümesini bellek eşlemeli dosya sistemiyle aç"""
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+
+        # Dosyalar zaten bellek eşlemeli: okuma birleştirme (pre-buffer) gereksiz
+        parquet_format = ds.ParquetFileFormat(
+            default_fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=False))
+        return ds.dataset(
+            os.path.join(self.path, name), format=parquet_format,
+            partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+            filesystem=fs.LocalFileSystem(use_mmap=True)
+        )
+
+    def iter_frames(self, name: str, columns: List[str], chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Yalnızca istenen kolonları en fazla chunksize satırlık DataFrame'ler halinde üret
+
+        Sözlük kodlu kolonlar kategorik olarak döner. chunksize verilmezse tek DataFrame üretilir.
+        """
+        import pyarrow as pa
+
+        # Küçük bölüm dosyalarının batch'leri birleştirilir (parça başına sabit maliyet azalır)
+        dataset = self.dataset(name)
+        schema = pa.schema([dataset.schema.field(column) for column in columns])
+        pending, pending_rows = [], 0
+        for batch in dataset.to_batches(columns=columns, batch_size=chunksize or 1 << 20):
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if chunksize and pending_rows >= chunksize:
+                table = pa.Table.from_batches(pending)
+                while table.num_rows >= chunksize:
+                    yield table.slice(0, chunksize).to_pandas(date_as_object=False)
+                    table = table.slice(chunksize)
+                pending, pending_rows = table.to_batches(), table.num_rows
+        if pending_rows or chunksize is None:
+            yield pa.Table.from_batches(pending, schema=schema).to_pandas(date_as_object=False)
+
+    def iter_training_chunks(self, chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """training_data sorgusunun karşılığı: gözlemler + o günün olasılık/örnek sayısı"""
+        manifest = self.manifest()
+        city_index = {city: i for i, city in enumerate(manifest["cities"])}
+        class_index = {name: k for k, name in enumerate(manifest["weather_classes"])}
+
+        # Olasılıklar küçük: şehir × ay × gün × sınıf küpüne yerleştirilir (LEFT JOIN yerine indeksleme)
+        shape = (len(city_index) + 1, 12, 31, len(class_index) + 1)
+        probability = np.full(shape, np.nan)
+        sample_count = np.full(shape, np.nan)
+        for frame in self.iter_frames(PROBABILITIES, ["city", "month", "day", "weather_main",
+                                                      "probability", "sample_count"]):
+            index = (category_ids(frame["city"], city_index), frame["month"].to_numpy(np.int64) - 1,
+                     frame["day"].to_numpy(np.int64) - 1, category_ids(frame["weather_main"], class_index))
+            probability[index] = frame["probability"].to_numpy(np.float64)
+            sample_count[index] = frame["sample_count"].to_numpy(np.float64)
+
+        columns = [column for column in TRAINING_COLUMNS if column not in ("probability", "sample_count")]
+        for frame in self.iter_frames(OBSERVATIONS, columns, chunksize):
+            # Bilinmeyen şehir/sınıf (-1) küpün NaN dolu son dilimine düşer
+            index = (category_ids(frame["city"], city_index), frame["month"].to_numpy(np.int64) - 1,
+                     frame["day"].to_numpy(np.int64) - 1, category_ids(frame["weather_main"], class_index))
+            frame["probability"] = probability[index]
+            frame["sample_count"] = sample_count[index]
+            yield frame[TRAINING_COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="historical_weather tablolarını bölümlü Parquet'e aktar")
+    parser.add_argument("--dir", default=os.getenv("WEATHER_SNAPSHOT_DIR", "weather_snapshot"))
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    args = parser.parse_args()
+
+    if not pyarrow_available():
+        print("❌ pyarrow kurulu değil: pip install pyarrow")
+        return
+
+    from historical_weather_data import HistoricalWeatherDataCollector
+
+    collector = HistoricalWeatherDataCollector()
+    WeatherSnapshot(args.dir).export(collector.storage, chunksize=args.chunksize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,870 @@
+"""
+Tarihsel Hava Durumu Veritabanı Lehçe Adaptörleri
+
+Bu modül, HistoricalWeatherDataCollector'ın SQLite ve SQL Server için ayrı ayrı
+string dallanmasıyla kurduğu SQL'i tek bir arayüz arkasında toplar.
+
+Özellikler:
+- Her ifade adıyla bir kez tanımlanır; iki lehçede de aynı parametre sırası (qmark)
+- İş parçacığı başına kalıcı bağlantı ile hazırlanmış ifade (prepared statement) önbelleği
+  (SQLite: bağlantı ifade önbelleği, SQL Server: ifade başına ayrı pyodbc cursor'ı)
+- executemany ile toplu upsert (SQL Server'da fast_executemany)
+- Şema oluşturma, migrasyon ve daily_probabilities yeniden oluşturma lehçeye özel
+- Ortam değişkenleriyle açık arka uç seçimi (açılışta sunucu yoklaması yok)
+- SQLite: WAL kipi; okumalar iş parçacığının salt okunur okuyucusundan, yazımlar süreç
+  genelindeki tek yazıcı bağlantısından (sqlite_access)
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from collection_checkpoint import JOURNAL_DDL_SQLITE, JOURNAL_DDL_SQLSERVER
+from sqlite_access import sqlite_access
+
+DEFAULT_SQLITE_PATH = "historical_weather.db"
+DEFAULT_DATABASE = "HistoricalWeatherDB"
+LOCALDB_SERVER = "(localdb)\\MSSQLLocalDB"
+SQLSERVER_SERVER = "localhost"
+BACKENDS = ("auto", "sqlite", "sqlserver", "localdb")
+
+# Şema sürümü: mevcut veritabanında eşleşiyorsa açılışta DDL/migrasyon çalıştırılmaz
+SCHEMA_VERSION = 2
+SCHEMA_TABLES = ("historical_weather", "daily_probabilities", "daily_totals", "collection_journal", "data_version")
+
+# Şehir + ay/gün kapsayan (covering) indeksi; anahtar kolonlar INCLUDE listesinde tekrar edilemez (hata 1909)
+CITY_DAY_INDEX_SQLSERVER = '''
+    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_historical_weather_city_month_day')
+    CREATE INDEX IX_historical_weather_city_month_day ON historical_weather (city, month, day, date)
+    INCLUDE (weather_main, weather_description, temperature, humidity, wind_speed)
+'''
+
+# İki lehçede de birebir aynı olan ifadeler
+COMMON_STATEMENTS = {
+    "delete_empty_probabilities": '''
+        DELETE FROM daily_probabilities WHERE city = ? AND month = ? AND day = ? AND sample_count <= 0
+    ''',
+    "refresh_probabilities": '''
+        UPDATE daily_probabilities SET probability = CAST(sample_count AS FLOAT) / (
+            SELECT t.total_count FROM daily_totals t
+            WHERE t.city = daily_probabilities.city AND t.month = daily_probabilities.month
+                AND t.day = daily_probabilities.day
+        )
+        WHERE city = ? AND month = ? AND day = ?
+    ''',
+    "daily_probabilities_for_day": '''
+        SELECT weather_main, probability, sample_count
+        FROM daily_probabilities
+        WHERE city = ? AND month = ? AND day = ?
+        ORDER BY probability DESC
+    ''',
+    "training_data": '''
+        SELECT
+            hw.city,
+            hw.date,
+            hw.month,
+            hw.day,
+            hw.weather_main,
+            hw.temperature,
+            hw.humidity,
+            hw.wind_speed,
+            dp.probability,
+            dp.sample_count
+        FROM historical_weather hw
+        LEFT JOIN daily_probabilities dp ON
+            hw.city = dp.city AND
+            hw.month = dp.month AND
+            hw.day = dp.day AND
+            hw.weather_main = dp.weather_main
+    ''',
+    "city_record_count": '''
+        SELECT COUNT(*) as count FROM historical_weather WHERE city = ?
+    ''',
+    "city_weather_distribution": '''
+        SELECT weather_main, COUNT(*) as count FROM historical_weather WHERE city = ? GROUP BY weather_main
+    ''',
+    "city_temperature_stats": '''
+        SELECT AVG(temperature) as avg_temp, MIN(temperature) as min_temp, MAX(temperature) as max_temp
+        FROM historical_weather WHERE city = ?
+    ''',
+    # Rota için: birden fazla şehrin aynı takvim günündeki son örnekleri ({cities}: şehir yer tutucuları)
+    "historical_examples_for_cities": '''
+        SELECT city, date, weather_main, weather_description, temperature, humidity, wind_speed
+        FROM (
+            SELECT city, date, weather_main, weather_description, temperature, humidity, wind_speed,
+                   ROW_NUMBER() OVER (PARTITION BY city ORDER BY date DESC) AS rank_in_city
+            FROM historical_weather
+            WHERE city IN ({cities}) AND month = ? AND day = ?
+        ) ranked
+        WHERE rank_in_city <= ?
+        ORDER BY city, date DESC
+    ''',
+    # Başka süreçlerin yazımlarını algılamak için veri sürümü; historical_weather'a ya da sayaçlara
+    # yazan her transaction sürümü artırır (aynı hava durumuyla yerinde güncellemeler dahil)
+    "data_fingerprint": '''
+        SELECT version, created_at FROM data_version WHERE id = 1
+    ''',
+    "bump_data_version": '''
+        UPDATE data_version SET version = version + 1 WHERE id = 1
+    ''',
+    "snapshot_observations": '''
+        SELECT city, year, date, month, day, weather_main, weather_description,
+               temperature, humidity, wind_speed
+        FROM historical_weather
+        ORDER BY city, date
+    ''',
+    "snapshot_probabilities": '''
+        SELECT city, month, day, weather_main, probability, sample_count
+        FROM daily_probabilities
+        ORDER BY city, month, day
+    ''',
+}
+
+# Her lehçenin tanımlaması gereken ifadeler ve parametre sıraları
+DIALECT_STATEMENTS = {
+    # (city, date, weather_main, weather_description, temperature, humidity, wind_speed)
+    "upsert_observation",
+    # (city, month, day, delta)
+    "upsert_daily_total",
+    # (city, month, day, weather_main, delta)
+    "upsert_probability_count",
+    # (city, month, day, limit)
+    "historical_examples",
+    # {keys}: "(?, ?)" (city, date) çiftleri → (city, date, weather_main, temperature)
+    "previous_observations",
+}
+
+
+def parameter_count(sql: str) -> int:
+    """İfadedeki parametre sayısı (numaralı ?N veya sıralı ? yer tutucular)"""
+    numbered = [int(n) for n in re.findall(r"\?(\d+)", sql)]
+    if numbered:
+        return max(numbered)
+    return sql.count("?")
+
+
+class WeatherStorage:
+    """Lehçe adaptörlerinin ortak arayüzü"""
+
+    dialect = ""
+    STATEMENTS: Dict[str, str] = {}
+    # Tek sorgudaki (şehir, tarih) çifti sayısı: SQL Server 2100 parametre ve 1000 VALUES satırı sınırı
+    KEYS_PER_QUERY = 1000
+
+    def __init__(self):
+        self._local = threading.local()
+        self.statements = dict(COMMON_STATEMENTS, **self.STATEMENTS)
+
+    def connect(self):
+        """Yeni bir bağlantı aç (kapatmak çağırana aittir)"""
+        raise NotImplementedError
+
+    def connection(self):
+        """İş parçacığına ait kalıcı bağlantı (hazırlanmış ifadeler bağlantıyla birlikte önbellekte kalır)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.connect()
+            self._local.conn = conn
+            self._local.cursors = {}
+        return conn
+
+    @contextmanager
+    def read_connection(self):
+        """Toplu okumalar (pandas, tam tablo) için bağlantı (varsayılan: yeni bağlantı, çıkışta kapatılır)"""
+        conn = self.connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def write_connection(self):
+        """Yazım bağlantısı, hata olursa rollback (varsayılan: iş parçacığının kalıcı bağlantısı)"""
+        conn = self.connection()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+
+    def reset_connection(self):
+        """Bu iş parçacığının kalıcı bağlantısını kapat (hata sonrası temiz başlangıç için)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local.conn = None
+        self._local.cursors = {}
+
+    def sql(self, name: str) -> str:
+        return self.statements[name]
+
+    def cursor_for(self, name: str):
+        """İfade için cursor; varsayılan olarak bağlantı başına tek cursor"""
+        return self.connection().cursor()
+
+    def query(self, name: str, params: Sequence = ()) -> List[tuple]:
+        """Adlandırılmış sorguyu kalıcı bağlantıda çalıştır ve tüm satırları döndür"""
+        cursor = self.cursor_for(name)
+        cursor.execute(self.sql(name), tuple(params))
+        rows = [tuple(row) for row in cursor.fetchall()]
+        self.connection().commit()  # Okuma transaction'ını kapat (SQLite'ta yazarları bekletmesin)
+        return rows
+
+    def query_df(self, name: str, params: Sequence = ()) -> pd.DataFrame:
+        """Adlandırılmış sorguyu DataFrame olarak döndür"""
+        cursor = self.cursor_for(name)
+        cursor.execute(self.sql(name), tuple(params))
+        columns = [column[0] for column in cursor.description]
+        rows = [tuple(row) for row in cursor.fetchall()]
+        self.connection().commit()
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def query_examples_for_cities(self, cities: Sequence[str], month: int, day: int,
+                                  limit: int) -> Dict[str, List[tuple]]:
+        """Şehir başına en yeni limit örnek, tek sorguda (şehir → satırlar)"""
+        examples = {city: [] for city in cities}
+        if not examples:
+            return examples
+        name = "historical_examples_for_cities"
+        sql = self.sql(name).format(cities=", ".join("?" * len(examples)))
+        cursor = self.cursor_for(name)
+        cursor.execute(sql, tuple(examples) + (month, day, limit))
+        for row in cursor.fetchall():
+            examples[row[0]].append(tuple(row[1:]))
+        self.connection().commit()
+        return examples
+
+    def query_previous_observations(self, cursor, keys: Sequence[tuple]) -> Dict[tuple, tuple]:
+        """(şehir, tarih) çiftlerinin mevcut (weather_main, temperature) değerleri, yazma cursor'ında tek sorguyla"""
+        previous = {}
+        keys = list(dict.fromkeys(keys))
+        sql = self.sql("previous_observations")
+        for start in range(0, len(keys), self.KEYS_PER_QUERY):
+            chunk = keys[start:start + self.KEYS_PER_QUERY]
+            cursor.execute(sql.format(keys=", ".join(["(?, ?)"] * len(chunk))),
+                           tuple(value for key in chunk for value in key))
+            for city, date, weather_main, temperature in cursor.fetchall():
+                previous[(city, date)] = (weather_main, temperature)
+        return previous
+
+    def executemany(self, cursor, name: str, rows: List[Sequence]):
+        """Toplu yazım (aynı hazırlanmış ifade tüm satırlar için kullanılır)"""
+        if rows:
+            cursor.executemany(self.sql(name), rows)
+
+    def begin_write(self, cursor):
+        """Okuma + yazma adımlarını tek yazma transaction'ında topla"""
+
+    def table_exists(self, cursor, table_name: str) -> bool:
+        raise NotImplementedError
+
+    def daily_probabilities_ddl(self, table_name: str, constraint_name: str) -> str:
+        raise NotImplementedError
+
+    def daily_totals_ddl(self, table_name: str, constraint_name: str) -> str:
+        raise NotImplementedError
+
+    def create_schema(self, conn) -> bool:
+        """Tabloları oluştur; sayaç tablosu yeni oluşturulduysa True döndür"""
+        raise NotImplementedError
+
+    def migrate_schema(self, conn):
+        raise NotImplementedError
+
+    def schema_is_current(self, conn) -> bool:
+        """Şema güncel mi (güncelse create_schema çağrılmasına gerek yok)"""
+        raise NotImplementedError
+
+    def rebuild_daily_probabilities(self):
+        raise NotImplementedError
+
+
+class SQLiteWeatherStorage(WeatherStorage):
+    """SQLite adaptörü (yerel / fallback veritabanı)"""
+
+    dialect = "sqlite"
+    # SQLite 3.32 öncesinde sorgu başına en fazla 999 parametre
+    KEYS_PER_QUERY = 1000 if sqlite3.sqlite_version_info >= (3, 32, 0) else 499
+    STATEMENTS = {
+        # year/month/day tarihten türetilir; parametre sırası SQL Server ile aynı kalır
+        "upsert_observation": '''
+            INSERT INTO historical_weather
+            (city, date, weather_main, weather_description, temperature, humidity, wind_speed,
+             year, month, day)
+            VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7,
+                    CAST(SUBSTR(?2, 1, 4) AS INTEGER), CAST(SUBSTR(?2, 6, 2) AS INTEGER),
+                    CAST(SUBSTR(?2, 9, 2) AS INTEGER))
+            ON CONFLICT(city, date) DO UPDATE SET
+                weather_main = excluded.weather_main,
+                weather_description = excluded.weather_description,
+                temperature = excluded.temperature,
+                humidity = excluded.humidity,
+                wind_speed = excluded.wind_speed
+        ''',
+        "upsert_daily_total": '''
+            INSERT INTO daily_totals (city, month, day, total_count) VALUES (?, ?, ?, ?)
+            ON CONFLICT(city, month, day) DO UPDATE SET total_count = total_count + excluded.total_count
+        ''',
+        "upsert_probability_count": '''
+            INSERT INTO daily_probabilities (city, month, day, weather_main, probability, sample_count)
+            VALUES (?, ?, ?, ?, 0, ?)
+            ON CONFLICT(city, month, day, weather_main) DO UPDATE SET
+                sample_count = sample_count + excluded.sample_count,
+                last_updated = CURRENT_TIMESTAMP
+        ''',
+        "historical_examples": '''
+            SELECT date, weather_main, weather_description, temperature, humidity, wind_speed
+            FROM historical_weather
+            WHERE city = ? AND month = ? AND day = ?
+            ORDER BY date DESC
+            LIMIT ?
+        ''',
+        "previous_observations": '''
+            WITH keys(city, date) AS (VALUES {keys})
+            SELECT h.city, h.date, h.weather_main, h.temperature
+            FROM historical_weather h
+            JOIN keys k ON h.city = k.city AND h.date = k.date
+        ''',
+    }
+
+    def __init__(self, db_path: str = DEFAULT_SQLITE_PATH):
+        super().__init__()
+        self.db_path = db_path
+
+    def connect(self):
+        if self.db_path == ":memory:":
+            return sqlite3.connect(self.db_path, cached_statements=256)
+        # WAL kipinde, mmap/cache ayarlı bağlantı (okumalar yazımları beklemez)
+        return sqlite_access(self.db_path).open()
+
+    def connection(self):
+        """İş parçacığının salt okunur (query_only) okuyucusu; yazımlar write_connection'dan yapılır"""
+        if self.db_path == ":memory:":
+            return super().connection()
+        return sqlite_access(self.db_path).reader()
+
+    @contextmanager
+    def read_connection(self):
+        """İş parçacığının okuyucusu (kalıcıdır, çıkışta kapatılmaz)"""
+        yield self.connection()
+
+    def write_connection(self):
+        """Süreçteki tek yazıcı bağlantısı: yazımlar sırayla, çıkışta commit"""
+        if self.db_path == ":memory:":
+            return super().write_connection()
+        return sqlite_access(self.db_path).writer()
+
+    def reset_connection(self):
+        if self.db_path == ":memory:":
+            super().reset_connection()
+        else:
+            sqlite_access(self.db_path).reset_reader()
+
+    def begin_write(self, cursor):
+        # Önceki gözlemlerin okunması ve sayaç güncellemesi aynı yazma transaction'ında
+        cursor.execute("BEGIN IMMEDIATE")
+
+    def table_exists(self, cursor, table_name: str) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+        return cursor.fetchone() is not None
+
+    def daily_probabilities_ddl(self, table_name: str, constraint_name: str = None) -> str:
+        """daily_probabilities şeması (SQLite); gölge tablo da aynı şemayla oluşturulur"""
+        return f'''
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                city TEXT NOT NULL,
+                month INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                weather_main TEXT NOT NULL,
+                probability REAL NOT NULL,
+                sample_count INTEGER NOT NULL,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(city, month, day, weather_main)
+            )
+        '''
+
+    def daily_totals_ddl(self, table_name: str, constraint_name: str = None) -> str:
+        """daily_totals şeması (SQLite): (şehir, ay, gün) başına toplam gözlem sayısı"""
+        return f'''
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                city TEXT NOT NULL,
+                month INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                total_count INTEGER NOT NULL,
+                UNIQUE(city, month, day)
+            )
+        '''
+
+    def create_schema(self, conn) -> bool:
+        cursor = conn.cursor()
+
+        # Tarihsel hava durumu verileri tablosu
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS historical_weather (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                city TEXT NOT NULL,
+                date TEXT NOT NULL,
+                weather_main TEXT NOT NULL,
+                weather_description TEXT,
+                temperature REAL,
+                humidity INTEGER,
+                wind_speed REAL,
+                year INTEGER,
+                month INTEGER,
+                day INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(city, date)
+            )
+        ''')
+
+        # Günlük olasılık hesaplamaları tablosu
+        cursor.execute(self.daily_probabilities_ddl('daily_probabilities'))
+
+        # Artımlı olasılık bakımı için gün toplamları tablosu
+        needs_counter_bootstrap = not self.table_exists(cursor, 'daily_totals')
+        cursor.execute(self.daily_totals_ddl('daily_totals'))
+
+        # Kaldığı yerden devam için toplama günlüğü
+        cursor.execute(JOURNAL_DDL_SQLITE)
+
+        # Tek satırlık veri sürümü (önbelleklerin ve anlık görüntünün parmak izi)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS data_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+        conn.commit()
+
+        # Eski şemaları yıl/ay/gün kolonlarına taşı
+        self.migrate_schema(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+        return needs_counter_bootstrap
+
+    def schema_is_current(self, conn) -> bool:
+        # Sürüm yalnızca tablolar ve migrasyon tamamlandıktan sonra yazılır
+        return conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    @staticmethod
+    def migrate_schema(conn):
+        """historical_weather tablosuna year/month/day kolonlarını ve (city, month, day) indeksini ekle
+
+        İndeksin sonuna date eklenir; böylece ORDER BY date DESC de indeksten karşılanır.
+        """
+        cursor = conn.cursor()
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(historical_weather)")}
+
+        for col in ('year', 'month', 'day'):
+            if col not in columns:
+                cursor.execute(f"ALTER TABLE historical_weather ADD COLUMN {col} INTEGER")
+
+        # İndeks, backfill ile aynı transaction'da oluşturulur; varlığı migrasyonun bittiğini gösterir
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_historical_weather_city_month_day'"
+        )
+        if cursor.fetchone():
+            return
+
+        # Mevcut kayıtları tek seferlik doldur (backfill)
+        cursor.execute('''
+            UPDATE historical_weather SET
+                year = CAST(SUBSTR(date, 1, 4) AS INTEGER),
+                month = CAST(SUBSTR(date, 6, 2) AS INTEGER),
+                day = CAST(SUBSTR(date, 9, 2) AS INTEGER)
+            WHERE month IS NULL OR day IS NULL OR year IS NULL
+        ''')
+        if cursor.rowcount > 0:
+            print(f"🔄 {cursor.rowcount} kayıt için yıl/ay/gün kolonları dolduruldu")
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_historical_weather_city_month_day
+            ON historical_weather (city, month, day, date)
+        ''')
+        conn.commit()
+
+    def rebuild_daily_probabilities(self):
+        """daily_probabilities tablosunu gölge tablo + atomik rename ile yeniden oluştur (SQLite)
+
+        Doldurma ve yer değiştirme tek yazıcıdan, tek BEGIN IMMEDIATE transaction'ında yapılır:
+        arada kaydedilen bir batch'in sayaç güncellemesi eski tabloda kalıp kaybolmaz.
+        """
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("DROP TABLE IF EXISTS daily_probabilities_shadow")
+                cursor.execute("DROP TABLE IF EXISTS daily_totals_shadow")
+                cursor.execute(self.daily_probabilities_ddl('daily_probabilities_shadow'))
+                cursor.execute(self.daily_totals_ddl('daily_totals_shadow'))
+
+                # Gruplanmış sayımlar ve gün toplamları (window) veritabanında hesaplanır
+                cursor.execute('''
+                    INSERT INTO daily_probabilities_shadow
+                        (city, month, day, weather_main, probability, sample_count)
+                    SELECT
+                        city,
+                        month,
+                        day,
+                        weather_main,
+                        CAST(COUNT(*) AS REAL) / SUM(COUNT(*)) OVER (PARTITION BY city, month, day),
+                        COUNT(*)
+                    FROM historical_weather
+                    GROUP BY city, month, day, weather_main
+                ''')
+                cursor.execute('''
+                    INSERT INTO daily_totals_shadow (city, month, day, total_count)
+                    SELECT city, month, day, COUNT(*)
+                    FROM historical_weather
+                    GROUP BY city, month, day
+                ''')
+
+                # Yer değiştirme (olasılıklar ve artımlı sayaçların toplamları birlikte); WAL okuyucuları
+                # commit'e kadar eski tabloları görmeye devam eder
+                cursor.execute("DROP TABLE IF EXISTS daily_probabilities")
+                cursor.execute("DROP TABLE IF EXISTS daily_totals")
+                cursor.execute("ALTER TABLE daily_probabilities_shadow RENAME TO daily_probabilities")
+                cursor.execute("ALTER TABLE daily_totals_shadow RENAME TO daily_totals")
+                cursor.execute(self.sql("bump_data_version"))
+        except Exception as e:
+            print(f"❌ Olasılık tablosu yeniden oluşturma hatası: {e}")
+
+
+class SqlServerWeatherStorage(WeatherStorage):
+    """SQL Server / LocalDB adaptörü (pyodbc)"""
+
+    dialect = "sqlserver"
+    STATEMENTS = {
+        # year/month/day kalıcı hesaplanmış kolonlardır, yazarken gerekmez
+        "upsert_observation": '''
+            MERGE historical_weather AS target
+            USING (SELECT ? as city, ? as date, ? as weather_main, ? as weather_description, ? as temperature, ? as humidity, ? as wind_speed) AS source
+            ON target.city = source.city AND target.date = source.date
+            WHEN MATCHED THEN
+                UPDATE SET weather_main = source.weather_main, weather_description = source.weather_description,
+                         temperature = source.temperature, humidity = source.humidity, wind_speed = source.wind_speed
+            WHEN NOT MATCHED THEN
+                INSERT (city, date, weather_main, weather_description, temperature, humidity, wind_speed)
+                VALUES (source.city, source.date, source.weather_main, source.weather_description,
+                        source.temperature, source.humidity, source.wind_speed);
+        ''',
+        "upsert_daily_total": '''
+            MERGE daily_totals AS target
+            USING (SELECT ? as city, ? as month, ? as day, ? as delta) AS source
+            ON target.city = source.city AND target.month = source.month AND target.day = source.day
+            WHEN MATCHED THEN UPDATE SET total_count = target.total_count + source.delta
+            WHEN NOT MATCHED THEN INSERT (city, month, day, total_count)
+                VALUES (source.city, source.month, source.day, source.delta);
+        ''',
+        "upsert_probability_count": '''
+            MERGE daily_probabilities AS target
+            USING (SELECT ? as city, ? as month, ? as day, ? as weather_main, ? as delta) AS source
+            ON target.city = source.city AND target.month = source.month AND target.day = source.day
+                AND target.weather_main = source.weather_main
+            WHEN MATCHED THEN UPDATE SET sample_count = target.sample_count + source.delta, last_updated = GETDATE()
+            WHEN NOT MATCHED THEN INSERT (city, month, day, weather_main, probability, sample_count)
+                VALUES (source.city, source.month, source.day, source.weather_main, 0, source.delta);
+        ''',
+        # TOP (?) yerine OFFSET/FETCH: limit parametresi SQLite'taki gibi en sonda kalır
+        "historical_examples": '''
+            SELECT date, weather_main, weather_description, temperature, humidity, wind_speed
+            FROM historical_weather
+            WHERE city = ? AND month = ? AND day = ?
+            ORDER BY date DESC
+            OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+        ''',
+        "previous_observations": '''
+            SELECT h.city, h.date, h.weather_main, h.temperature
+            FROM historical_weather h
+            JOIN (VALUES {keys}) AS k(city, date) ON h.city = k.city AND h.date = k.date
+        ''',
+    }
+
+    def __init__(self, connection_string: str):
+        super().__init__()
+        self.connection_string = connection_string
+
+    def connect(self):
+        import pyodbc
+        return pyodbc.connect(self.connection_string)
+
+    def cursor_for(self, name: str):
+        # pyodbc yalnızca cursor'daki son ifadeyi hazırlanmış tutar; ifade başına ayrı cursor
+        # ile her ifade bir kez hazırlanır ve sonraki çağrılarda yeniden kullanılır
+        conn = self.connection()
+        cursor = self._local.cursors.get(name)
+        if cursor is None:
+            cursor = conn.cursor()
+            self._local.cursors[name] = cursor
+        return cursor
+
+    def executemany(self, cursor, name: str, rows: List[Sequence]):
+        if rows:
+            cursor.fast_executemany = True
+            cursor.executemany(self.sql(name), rows)
+
+    def table_exists(self, cursor, table_name: str) -> bool:
+        cursor.execute("SELECT OBJECT_ID(?, 'U')", (table_name,))
+        return cursor.fetchone()[0] is not None
+
+    def daily_probabilities_ddl(self, table_name: str, constraint_name: str) -> str:
+        """daily_probabilities şeması (SQL Server); gölge tablo da aynı şemayla oluşturulur"""
+        return f'''
+            CREATE TABLE {table_name} (
+                id INT IDENTITY(1,1) PRIMARY KEY,
+                city NVARCHAR(100) NOT NULL,
+                month INT NOT NULL,
+                day INT NOT NULL,
+                weather_main NVARCHAR(50) NOT NULL,
+                probability FLOAT NOT NULL,
+                sample_count INT NOT NULL,
+                last_updated DATETIME DEFAULT GETDATE(),
+                CONSTRAINT {constraint_name} UNIQUE(city, month, day, weather_main)
+            )
+        '''
+
+    def daily_totals_ddl(self, table_name: str, constraint_name: str) -> str:
+        """daily_totals şeması (SQL Server): (şehir, ay, gün) başına toplam gözlem sayısı"""
+        return f'''
+            CREATE TABLE {table_name} (
+                city NVARCHAR(100) NOT NULL,
+                month INT NOT NULL,
+                day INT NOT NULL,
+                total_count INT NOT NULL,
+                CONSTRAINT {constraint_name} UNIQUE(city, month, day)
+            )
+        '''
+
+    def create_schema(self, conn) -> bool:
+        cursor = conn.cursor()
+
+        # Tarihsel hava durumu verileri tablosu
+        cursor.execute('''
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='historical_weather' AND xtype='U')
+            CREATE TABLE historical_weather (
+                id INT IDENTITY(1,1) PRIMARY KEY,
+                city NVARCHAR(100) NOT NULL,
+                date NVARCHAR(10) NOT NULL,
+                weather_main NVARCHAR(50) NOT NULL,
+                weather_description NVARCHAR(200),
+                temperature FLOAT,
+                humidity INT,
+                wind_speed FLOAT,
+                year AS CAST(SUBSTRING(date, 1, 4) AS INT) PERSISTED,
+                month AS CAST(SUBSTRING(date, 6, 2) AS INT) PERSISTED,
+                day AS CAST(SUBSTRING(date, 9, 2) AS INT) PERSISTED,
+                created_at DATETIME DEFAULT GETDATE(),
+                CONSTRAINT UQ_city_date UNIQUE(city, date)
+            )
+        ''')
+
+        # Günlük olasılık hesaplamaları tablosu
+        cursor.execute(
+            "IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='daily_probabilities' AND xtype='U') "
+            + self.daily_probabilities_ddl('daily_probabilities', 'UQ_city_month_day_weather')
+        )
+
+        # Artımlı olasılık bakımı için gün toplamları tablosu
+        needs_counter_bootstrap = not self.table_exists(cursor, 'daily_totals')
+        if needs_counter_bootstrap:
+            cursor.execute(self.daily_totals_ddl('daily_totals', 'UQ_daily_totals_city_month_day'))
+
+        # Kaldığı yerden devam için toplama günlüğü
+        cursor.execute(JOURNAL_DDL_SQLSERVER)
+
+        # Tek satırlık veri sürümü (önbelleklerin ve anlık görüntünün parmak izi)
+        cursor.execute('''
+            IF OBJECT_ID('data_version', 'U') IS NULL
+            CREATE TABLE data_version (
+                id INT PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL,
+                created_at DATETIME2 DEFAULT SYSUTCDATETIME()
+            )
+        ''')
+        cursor.execute("IF NOT EXISTS (SELECT 1 FROM data_version) INSERT INTO data_version (id, version) VALUES (1, 0)")
+
+        conn.commit()
+
+        # Eski şemaları yıl/ay/gün kolonlarına taşı
+        self.migrate_schema(conn)
+        return needs_counter_bootstrap
+
+    def schema_is_current(self, conn) -> bool:
+        # Tüm tablolar ve migrasyon indeksi tek sorguyla kontrol edilir
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT
+                (SELECT COUNT(*) FROM sys.tables WHERE name IN ({", ".join("?" * len(SCHEMA_TABLES))})),
+                (SELECT COUNT(*) FROM sys.indexes WHERE name = 'IX_historical_weather_city_month_day')
+        ''', SCHEMA_TABLES)
+        tables, indexes = cursor.fetchone()
+        conn.commit()
+        return tables == len(SCHEMA_TABLES) and indexes > 0
+
+    def create_database(self):
+        """Hedef veritabanı yoksa master üzerinden oluştur (yalnızca bağlantı başarısız olduğunda çağrılır)"""
+        import pyodbc
+        database = self.database_name()
+        master = re.sub(r"(?i)(Database|Initial Catalog)=[^;]*", "Database=master", self.connection_string)
+        conn = pyodbc.connect(master, autocommit=True)  # CREATE DATABASE transaction içinde çalışmaz
+        try:
+            conn.cursor().execute(
+                f"IF NOT EXISTS (SELECT name FROM sys.databases WHERE name = ?) CREATE DATABASE [{database}]",
+                (database,)
+            )
+        finally:
+            conn.close()
+        print(f"✅ SQL Server veritabanı oluşturuldu: {database}")
+
+    def database_name(self) -> str:
+        match = re.search(r"(?i)(?:Database|Initial Catalog)=([^;]*)", self.connection_string)
+        return match.group(1) if match else DEFAULT_DATABASE
+
+    @staticmethod
+    def migrate_schema(conn):
+        """SQL Server'da year/month/day kalıcı hesaplanmış kolonlarını ve indeksi ekle"""
+        cursor = conn.cursor()
+
+        # Hesaplanmış (PERSISTED) kolonlar eklenirken SQL Server mevcut satırları kendisi doldurur
+        for col, start, length in (('year', 1, 4), ('month', 6, 2), ('day', 9, 2)):
+            cursor.execute(f'''
+                IF COL_LENGTH('historical_weather', '{col}') IS NULL
+                ALTER TABLE historical_weather ADD {col} AS CAST(SUBSTRING(date, {start}, {length}) AS INT) PERSISTED
+            ''')
+
+        cursor.execute(CITY_DAY_INDEX_SQLSERVER)
+        conn.commit()
+
+    def rebuild_daily_probabilities(self):
+        """daily_probabilities tablosunu gölge tablo + sp_rename ile yeniden oluştur (SQL Server)
+
+        Doldurma ve yer değiştirme tek transaction'dadır; historical_weather üzerindeki tablo kilidi
+        arada kaydedilen batch'lerin sayaç güncellemelerinin eski tabloda kaybolmasını önler.
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("SET XACT_ABORT ON")
+            # Devam eden yazımlar bitene kadar bekle, yenilerini commit'e kadar beklet
+            cursor.execute("SELECT TOP 0 id FROM historical_weather WITH (TABLOCK, HOLDLOCK)")
+            cursor.execute("IF OBJECT_ID('daily_probabilities_shadow', 'U') IS NOT NULL DROP TABLE daily_probabilities_shadow")
+            cursor.execute("IF OBJECT_ID('daily_totals_shadow', 'U') IS NOT NULL DROP TABLE daily_totals_shadow")
+            cursor.execute(self.daily_probabilities_ddl(
+                'daily_probabilities_shadow', 'UQ_city_month_day_weather_shadow'
+            ))
+            cursor.execute(self.daily_totals_ddl(
+                'daily_totals_shadow', 'UQ_daily_totals_city_month_day_shadow'
+            ))
+
+            # Gruplanmış sayımlar ve gün toplamları (window) veritabanında hesaplanır
+            cursor.execute('''
+                INSERT INTO daily_probabilities_shadow
+                    (city, month, day, weather_main, probability, sample_count)
+                SELECT
+                    city,
+                    month,
+                    day,
+                    weather_main,
+                    CAST(COUNT(*) AS FLOAT) / SUM(COUNT(*)) OVER (PARTITION BY city, month, day),
+                    COUNT(*)
+                FROM historical_weather
+                GROUP BY city, month, day, weather_main
+            ''')
+            cursor.execute('''
+                INSERT INTO daily_totals_shadow (city, month, day, total_count)
+                SELECT city, month, day, COUNT(*)
+                FROM historical_weather
+                GROUP BY city, month, day
+            ''')
+
+            # Yer değiştirme: eski tablo düşürülür, gölge tablo ve kısıtı yeniden adlandırılır
+            cursor.execute('''
+                IF OBJECT_ID('daily_probabilities', 'U') IS NOT NULL DROP TABLE daily_probabilities;
+                EXEC sp_rename 'daily_probabilities_shadow', 'daily_probabilities';
+                EXEC sp_rename 'UQ_city_month_day_weather_shadow', 'UQ_city_month_day_weather', 'OBJECT';
+                IF OBJECT_ID('daily_totals', 'U') IS NOT NULL DROP TABLE daily_totals;
+                EXEC sp_rename 'daily_totals_shadow', 'daily_totals';
+                EXEC sp_rename 'UQ_daily_totals_city_month_day_shadow', 'UQ_daily_totals_city_month_day', 'OBJECT';
+            ''')
+            cursor.execute(self.sql("bump_data_version"))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Olasılık tablosu yeniden oluşturma hatası: {e}")
+        finally:
+            conn.close()
+
+
+def sqlserver_connection_string(server: str, database: str = DEFAULT_DATABASE) -> str:
+    """Windows kimlik doğrulamalı SQL Server / LocalDB bağlantı string'i"""
+    return (f"Driver={{ODBC Driver 17 for SQL Server}};Server={server};"
+            f"Database={database};Trusted_Connection=yes;")
+
+
+def _probe_sqlserver(server: str, timeout: int) -> bool:
+    """Sunucuya master üzerinden bağlanılabiliyor mu (yalnızca 'auto' modunda)"""
+    try:
+        import pyodbc
+        pyodbc.connect(sqlserver_connection_string(server, "master"), timeout=timeout).close()
+        return True
+    except Exception as e:
+        print(f"⚠️ {server} bağlantısı başarısız: {e}")
+        return False
+
+
+def resolve_connection_string(backend: Optional[str] = None, connection_string: Optional[str] = None,
+                              sqlite_path: Optional[str] = None, probe_timeout: int = 2) -> str:
+    """Arka ucu yapılandırmadan belirle (parametre verilmezse ortam değişkenleri kullanılır)
+
+    WEATHER_DB_BACKEND: sqlite | sqlserver | localdb | auto (varsayılan)
+    WEATHER_DB_CONNECTION_STRING: SQL Server için tam ODBC bağlantı string'i
+    WEATHER_SQLITE_PATH: SQLite dosyasının yolu
+
+    'auto' yalnızca Windows'ta LocalDB ve yerel SQL Server'ı (kısa zaman aşımıyla, bir kez) dener;
+    diğer platformlarda Windows kimlik doğrulaması olmadığından doğrudan SQLite seçilir.
+    """
+    backend = (backend or os.getenv("WEATHER_DB_BACKEND") or "auto").strip().lower()
+    connection_string = connection_string or os.getenv("WEATHER_DB_CONNECTION_STRING")
+    sqlite_path = sqlite_path or os.getenv("WEATHER_SQLITE_PATH") or DEFAULT_SQLITE_PATH
+    sqlite_string = f"sqlite:///{sqlite_path}"
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Bilinmeyen WEATHER_DB_BACKEND: {backend} (seçenekler: {', '.join(BACKENDS)})")
+    if backend == "sqlite":
+        return sqlite_string
+    if backend == "sqlserver":
+        return connection_string or sqlserver_connection_string(SQLSERVER_SERVER)
+    if backend == "localdb":
+        return connection_string or sqlserver_connection_string(LOCALDB_SERVER)
+
+    # auto
+    if connection_string:
+        return connection_string
+    if os.name == "nt":
+        for server in (LOCALDB_SERVER, SQLSERVER_SERVER):
+            if _probe_sqlserver(server, probe_timeout):
+                print(f"✅ SQL Server bağlantısı başarılı: {server}")
+                return sqlserver_connection_string(server)
+    return sqlite_string
+
+
+def create_storage(connection_string: str, sqlite_path: str = DEFAULT_SQLITE_PATH) -> WeatherStorage:
+    """Bağlantı string'ine göre uygun adaptörü oluştur (sqlite:///<yol> dosya yolunu da taşır)"""
+    if connection_string.startswith("sqlite:///"):
+        return SQLiteWeatherStorage(connection_string[len("sqlite:///"):] or sqlite_path)
+    if "sqlite" in connection_string:
+        return SQLiteWeatherStorage(sqlite_path)
+    return SqlServerWeatherStorage(connection_string)
@@ -0,0 +1,264 @@
+"""
+İklim Bölgesine Göre Parçalanmış (Sharded) Tahmin Modelleri
+
+Tek bir sınıflandırıcı + regresör yerine her iklim bölgesi (CITIES_GEOGRAPHIC_DATA
+içindeki "climate" alanı) için ayrı bir model çifti eğitilir. Parçalar ilk istekte
+diskten yüklenir ve bellek bütçesi aşılınca en uzun süredir kullanılmayan parça
+bellekten çıkarılır (LRU).
+
+Özellikler:
+- Parçalar süreç havuzunda paralel eğitilir (işçi fonksiyonları yan etkisiz bu modülde)
+- Bölge listesi, sınıf birleşimi ve parça metrikleri manifest.json'da tutulur
+- Tek model ve parçalı modeller aynı puanlama arayüzünü (classes + score) sunar
+- Tabloda olmayan şehirler en yakın bilinen şehrin bölgesine atanır
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from advanced_weather_data import CITIES_GEOGRAPHIC_DATA
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+TARGET_COLUMNS = ['weather_main', 'temperature']
+
+# Koordinatı bilinmeyen şehirler için özelliklerde kullanılan varsayılan konum
+DEFAULT_COORDINATES = {"lat": 39.0, "lon": 35.0}
+
+
+def zone_of_cities(cities: Sequence[str], cities_data: Dict) -> Dict[str, str]:
+    """Şehir → iklim bölgesi (tabloda yoksa koordinatına en yakın bilinen şehrin bölgesi)"""
+    names = list(CITIES_GEOGRAPHIC_DATA)
+    coordinates = np.array([[CITIES_GEOGRAPHIC_DATA[name]["lat"], CITIES_GEOGRAPHIC_DATA[name]["lon"]]
+                            for name in names])
+    zones = {}
+    for city in cities:
+        known = CITIES_GEOGRAPHIC_DATA.get(city)
+        if known is not None:
+            zones[city] = known["climate"]
+            continue
+        coords = cities_data.get(city, DEFAULT_COORDINATES)
+        nearest = np.argmin(((coordinates - [coords["lat"], coords["lon"]]) ** 2).sum(axis=1))
+        zones[city] = CITIES_GEOGRAPHIC_DATA[names[nearest]]["climate"]
+    return zones
+
+
+class SingleModel:
+    """Tüm şehirler için tek model çifti (ZoneModelRegistry ile aynı puanlama arayüzü)"""
+
+    def __init__(self, weather_model, temperature_model, weather_encoder):
+        self.weather_model = weather_model
+        self.temperature_model = temperature_model
+        self.classes = weather_encoder.inverse_transform(weather_model.classes_)
+
+    def score(self, zones: Optional[Sequence[str]], features: pd.DataFrame, need_weather: bool = True,
+              need_temperature: bool = True) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Sınıf olasılıkları (self.classes sırasıyla) ve sıcaklık; istenmeyen model çalıştırılmaz"""
+        probabilities = self.weather_model.predict_proba(features) if need_weather else None
+        temperatures = self.temperature_model.predict(features) if need_temperature else None
+        return probabilities, temperatures
+
+
+def _train_zone(zone: str, features: pd.DataFrame, path: str, n_estimators: int) -> Dict:
+    """Bir bölgenin sınıflandırıcı + regresörünü eğit ve kaydet (işçi süreçte çalışır)"""
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+
+    started = time.perf_counter()
+    X = features.drop(TARGET_COLUMNS, axis=1, errors='ignore')
+    encoder = LabelEncoder()
+    y_weather = encoder.fit_transform(features['weather_main'])
+    y_temp = features['temperature']
+
+    weather_model = RandomForestClassifier(n_estimators=n_estimators, random_state=42)
+    temperature_model = RandomForestRegressor(n_estimators=n_estimators, random_state=42)
+    accuracy = r2 = None
+    if len(features) >= 10:
+        # Tek modelle aynı bölme: %20 test
+        X_train, X_test, y_weather_train, y_weather_test, y_temp_train, y_temp_test = train_test_split(
+            X, y_weather, y_temp, test_size=0.2, random_state=42
+        )
+        weather_model.fit(X_train, y_weather_train)
+        temperature_model.fit(X_train, y_temp_train)
+        accuracy = float(accuracy_score(y_weather_test, weather_model.predict(X_test)))
+        r2 = float(temperature_model.score(X_test, y_temp_test))
+    else:
+        weather_model.fit(X, y_weather)
+        temperature_model.fit(X, y_temp)
+
+    joblib.dump({
+        "weather_model": weather_model,
+        "temperature_model": temperature_model,
+        "weather_encoder": encoder,
+    }, path)
+    return {
+        "zone": zone,
+        "file": os.path.basename(path),
+        "rows": int(len(features)),
+        "classes": [str(name) for name in encoder.classes_],
+        "accuracy": accuracy,
+        "r2": r2,
+        "bytes": os.path.getsize(path),
+        "train_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def train_zone_models(features: pd.DataFrame, zones: Sequence[str], directory: str,
+                      workers: Optional[int] = None, n_estimators: int = 100) -> Dict:
+    """Her iklim bölgesi için modelleri (paralel) eğit ve manifest'i yaz
+
+    features: _prepare_features çıktısı (hedef kolonlar dahil), zones: satır başına bölge.
+    """
+    os.makedirs(directory, exist_ok=True)
+    zones = np.asarray(zones)
+    names = sorted(set(zones.tolist()))
+    groups = [(zone, features[zones == zone].reset_index(drop=True),
+               os.path.join(directory, f"zone_{i:02d}.pkl"), n_estimators) for i, zone in enumerate(names)]
+    workers = workers or max(1, min(len(groups), (os.cpu_count() or 1) - 1))
+
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_train_zone(*group) for group in groups]
+    else:
+        # Büyük bölgeler önce gönderilir ki en uzun iş en son başlamasın
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {group[0]: pool.submit(_train_zone, *group)
+                       for group in sorted(groups, key=lambda group: -len(group[1]))}
+            results = [futures[zone].result() for zone in names]
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "classes": sorted({name for result in results for name in result["classes"]}),
+        # Modeli olmayan bölgedeki şehirler en çok verisi olan bölgenin modelini kullanır
+        "fallback_zone": max(results, key=lambda result: result["rows"])["zone"],
+        "zones": {result["zone"]: result for result in results},
+        "workers": workers,
+        "train_seconds": round(time.perf_counter() - started, 2),
+    }
+    staging = os.path.join(directory, f"{MANIFEST_FILE}.tmp-{os.getpid()}")
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(staging, os.path.join(directory, MANIFEST_FILE))
+    return manifest
+
+
+class ZoneModelRegistry:
+    """Bölge modellerini ilk istekte yükleyen ve bellek bütçesinde tutan kayıt (LRU)
+
+    Bir parçanın bellek maliyeti kayıtlı dosya boyutuyla ölçülür (joblib ormanın
+    düğüm dizilerini sıkıştırmadan yazar). Bütçe tek parçadan küçükse bile istenen
+    parça yüklenir; diğerleri çıkarılır.
+    """
+
+    def __init__(self, directory: str, memory_budget_mb: Optional[float] = 512.0):
+        self.directory = directory
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        with open(manifest_path, encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Desteklenmeyen bölge modeli formatı: {manifest_path}")
+        missing = [entry["file"] for entry in self.manifest["zones"].values()
+                   if not os.path.exists(os.path.join(directory, entry["file"]))]
+        if missing:
+            raise FileNotFoundError(f"Eksik bölge modeli dosyaları: {', '.join(missing)}")
+
+        self.version = f"zones:{os.stat(manifest_path).st_mtime_ns}"
+        self.classes = np.array(self.manifest["classes"], dtype=object)
+        self._class_index = {name: i for i, name in enumerate(self.manifest["classes"])}
+        self.memory_budget = None if memory_budget_mb is None else int(memory_budget_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[str, Dict]" = OrderedDict()
+        self.loaded_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+        self.hits = 0
+
+    @property
+    def zones(self) -> List[str]:
+        return list(self.manifest["zones"])
+
+    def _resolve(self, zone: str) -> str:
+        return zone if zone in self.manifest["zones"] else self.manifest["fallback_zone"]
+
+    def shard(self, zone: str) -> Dict:
+        """Bölgenin model parçası (gerekirse yükle, bütçeyi aşanları çıkar)"""
+        import joblib
+
+        zone = self._resolve(zone)
+        with self._lock:
+            shard = self._loaded.get(zone)
+            if shard is not None:
+                self._loaded.move_to_end(zone)
+                self.hits += 1
+                return shard
+
+            entry = self.manifest["zones"][zone]
+            shard = joblib.load(os.path.join(self.directory, entry["file"]))
+            names = shard["weather_encoder"].inverse_transform(shard["weather_model"].classes_)
+            # Parçanın predict_proba kolonlarının ortak sınıf listesindeki yerleri
+            shard["class_columns"] = np.array([self._class_index[name] for name in names], dtype=np.int64)
+            shard["bytes"] = entry["bytes"]
+            self.loads += 1
+
+            self._loaded[zone] = shard
+            self.loaded_bytes += shard["bytes"]
+            while (self.memory_budget is not None and self.loaded_bytes > self.memory_budget
+                   and len(self._loaded) > 1):
+                _, evicted = self._loaded.popitem(last=False)
+                self.loaded_bytes -= evicted["bytes"]
+                self.evictions += 1
+            return shard
+
+    def score(self, zones: Sequence[str], features: pd.DataFrame, need_weather: bool = True,
+              need_temperature: bool = True) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Satırları bölgelerine göre gruplayıp her parça için tek geçiş yap"""
+        zones = np.array([self._resolve(zone) for zone in zones], dtype=object)
+        probabilities = np.zeros((len(features), len(self.classes))) if need_weather else None
+        temperatures = np.zeros(len(features)) if need_temperature else None
+
+        for zone in dict.fromkeys(zones.tolist()):
+            rows = np.flatnonzero(zones == zone)
+            subset = features.iloc[rows]
+            shard = self.shard(zone)
+            if need_weather:
+                probabilities[np.ix_(rows, shard["class_columns"])] = shard["weather_model"].predict_proba(subset)
+            if need_temperature:
+                temperatures[rows] = shard["temperature_model"].predict(subset)
+        return probabilities, temperatures
+
+    def stats(self) -> Dict:
+        """Yüklü parçalar ve önbellek sayaçları"""
+        with self._lock:
+            return {
+                "zones": len(self.manifest["zones"]),
+                "loaded": list(self._loaded),
+                "loaded_mb": round(self.loaded_bytes / 1024 / 1024, 1),
+                "memory_budget_mb": None if self.memory_budget is None else round(self.memory_budget / 1024 / 1024, 1),
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+            }
+
+
+def load_models(spec: Dict):
+    """Model tanımından puanlayıcı oluştur (süreç havuzu işçileri için)
+
+    spec: {"files": [hava, sıcaklık, kodlayıcı]} veya {"zone_directory": ..., "memory_budget_mb": ...}
+    """
+    if "zone_directory" in spec:
+        return ZoneModelRegistry(spec["zone_directory"], spec.get("memory_budget_mb"))
+    import joblib
+    weather_model, temperature_model, weather_encoder = (joblib.load(path) for path in spec["files"])
+    return SingleModel(weather_model, temperature_model, weather_encoder)
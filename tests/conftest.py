@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Ortak test fikstürleri: geçici SQLite veritabanı üzerinde tarihsel veri toplayıcı"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+
+def _weather_rows(observations):
+    """(şehir, tarih, hava[, sıcaklık]) üçlü/dörtlülerini _save_weather_batch satırlarına çevir"""
+    rows = []
+    for city, date, weather_main, *temperature in observations:
+        rows.append({"city": city, "date": date, "weather_main": weather_main,
+                     "weather_description": weather_main.lower(),
+                     "temperature": temperature[0] if temperature else 0.0, "humidity": 70, "wind_speed": 2.0})
+    return rows
+
+
+@pytest.fixture(scope="session")
+def weather_rows():
+    return _weather_rows
+
+
+@pytest.fixture
+def seed_observations():
+    """Toplayıcıya başlangıçta kaydedilen gözlemler (test modülleri kendi listeleriyle geçersiz kılar)"""
+    return []
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch, seed_observations):
+    """Geçici SQLite dosyasına yazan toplayıcı; seed_observations tek batch'te kaydedilir"""
+    from historical_weather_data import HistoricalWeatherDataCollector
+    from sqlite_access import sqlite_access
+
+    monkeypatch.delenv("WEATHER_DB_CONNECTION_STRING", raising=False)
+    monkeypatch.setenv("WEATHER_DB_BACKEND", "sqlite")
+    monkeypatch.setenv("WEATHER_SQLITE_PATH", str(tmp_path / "historical_weather.db"))
+    monkeypatch.setenv("WEATHER_SNAPSHOT_DIR", str(tmp_path / "weather_snapshot"))
+    collector = HistoricalWeatherDataCollector(api_key="test-key")
+    if seed_observations:
+        assert collector._save_weather_batch(_weather_rows(seed_observations)) == len(seed_observations)
+    yield collector
+    sqlite_access(str(tmp_path / "historical_weather.db")).close()
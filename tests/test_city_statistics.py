@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Bellek içi şehir istatistikleri testleri (yerel SQLite ile)"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from city_statistics import CityStatisticsStore
+from historical_weather_data import HistoricalWeatherDataCollector
+
+OBSERVATIONS = [
+    ("Kars", "2022-01-05", "Snow", -8.5),
+    ("Kars", "2023-01-05", "Snow", -11.0),
+    ("Kars", "2024-01-06", "Clear", -4.0),
+    ("Kars", "2024-07-10", "Clear", 24.5),
+    ("Antalya", "2024-01-05", "Rain", 14.2),
+    ("Antalya", "2024-07-20", "Clear", 61.27),  # Histogram aralığının dışında
+    ("Antalya", "2023-07-20", "Clear", 38.04),
+    ("Antalya", "2022-07-20", "Clear", None),
+]
+
+
+@pytest.fixture
+def seed_observations():
+    return OBSERVATIONS
+
+
+def test_in_place_temperature_change_by_another_writer_changes_fingerprint(collector, weather_rows):
+    store = CityStatisticsStore(collector, refresh_interval=0)
+    fingerprint = store.fingerprint
+    assert store.get_city_statistics("Kars")["temperature_stats"]["avg_temp"] == 0.25
+
+    # Başka bir süreç (dinleyicisi olmayan toplayıcı) aynı günü aynı hava durumuyla yerinde günceller
+    other = HistoricalWeatherDataCollector(api_key="test-key")
+    assert other._save_weather_batch(weather_rows([("Kars", "2023-01-05", "Snow", -3.0)])) == 1
+
+    store.ensure_fresh()
+    assert store.fingerprint != fingerprint  # ETag epoch'u bu parmak izinden türetilir
+    assert store.get_city_statistics("Kars")["temperature_stats"]["avg_temp"] == 2.25
+
+
+def test_rebuild_keeps_exact_extremes_and_matches_sql(collector):
+    store = CityStatisticsStore(collector)
+    for city in ("Kars", "Antalya"):
+        stats = store.get_city_statistics(city)
+        expected = collector.get_city_statistics(city)
+        assert stats["total_records"] == expected["total_records"]
+        assert {(row["weather_main"], row["count"]) for row in stats["weather_distribution"]} == \
+               {(row["weather_main"], row["count"]) for row in expected["weather_distribution"]}
+        assert stats["temperature_stats"]["min_temp"] == expected["temperature_stats"]["min_temp"]
+        assert stats["temperature_stats"]["max_temp"] == expected["temperature_stats"]["max_temp"]
+        assert stats["temperature_stats"]["avg_temp"] == pytest.approx(expected["temperature_stats"]["avg_temp"], abs=0.005)
+
+    july = store.get_city_statistics("Antalya")["monthly"][1]
+    assert (july["month"], july["records"]) == (7, 3)
+    assert (july["temperature_stats"]["min_temp"], july["temperature_stats"]["max_temp"]) == (38.04, 61.27)
+    assert july["temperature_percentiles"]["p90"] == 60.0  # Yüzdelikler histogramdan (kenar kutusu)
+
+
+def test_saved_batches_are_applied_as_deltas(collector, monkeypatch, weather_rows):
+    store = CityStatisticsStore(collector)
+    monkeypatch.setattr(store, "reload", lambda *args: pytest.fail("batch tam yeniden yüklemeye düştü"))
+
+    # Ocak ayının minimumu (-11.0) yerinde değişir, yeni gün ve yeni sınıf eklenir
+    collector._save_weather_batch(weather_rows([("Kars", "2023-01-05", "Snow", -2.5), ("Kars", "2025-01-07", "Fog", -6.25),
+                                         ("Antalya", "2024-07-20", "Clear", 40.0)]))
+    store.ensure_fresh()
+    assert store.fingerprint == collector.storage.query("data_fingerprint")[0]
+
+    rebuilt = CityStatisticsStore(collector)
+    for city in ("Kars", "Antalya"):
+        assert store.get_city_statistics(city) == rebuilt.get_city_statistics(city)
+    january = store.get_city_statistics("Kars")["monthly"][0]["temperature_stats"]
+    assert (january["min_temp"], january["max_temp"]) == (-8.5, -2.5)
+
+
+def test_rebuild_without_listener_reloads_on_next_read(collector, monkeypatch):
+    store = CityStatisticsStore(collector, refresh_interval=3600)
+    reloads = []
+    reload = store.reload
+    monkeypatch.setattr(store, "reload", lambda *args: (reloads.append(args), reload(*args)))
+
+    store.ensure_fresh()
+    assert reloads == []
+    collector._calculate_daily_probabilities()
+    store.ensure_fresh()
+    assert len(reloads) == 1 and store.fingerprint == collector.storage.query("data_fingerprint")[0]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Bellek içi klimatoloji küpü testleri (yerel SQLite ile)"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from climatology_cube import ClimatologyCube, day_of_year_index
+from historical_weather_data import HistoricalWeatherDataCollector
+
+OBSERVATIONS = [
+    ("Kars", "2022-01-05", "Snow"),
+    ("Kars", "2023-01-05", "Snow"),
+    ("Kars", "2024-01-05", "Clear"),
+    ("Kars", "2024-02-29", "Snow"),
+    ("Antalya", "2024-01-05", "Rain"),
+]
+DAYS = [("Kars", 1, 5), ("Kars", 2, 29), ("Antalya", 1, 5), ("Rize", 1, 5)]
+
+
+@pytest.fixture
+def seed_observations():
+    return OBSERVATIONS
+
+
+def _assert_matches_sql(cube, collector):
+    for city, month, day in DAYS:
+        expected = collector.get_daily_weather_probability(city, month, day)
+        result = cube.get_daily_weather_probability(city, month, day)
+        assert result["most_likely"] == expected["most_likely"]
+        assert result["sample_count"] == expected["sample_count"]
+        assert {name: (pytest.approx(value["probability"]), value["sample_count"])
+                for name, value in result["weather_probabilities"].items()} == \
+               {name: (value["probability"], value["sample_count"])
+                for name, value in expected["weather_probabilities"].items()}
+
+
+def test_cube_is_built_from_probabilities_and_looked_up_per_route(collector):
+    cube = ClimatologyCube(collector)
+    assert day_of_year_index(2, 29) == 59 and day_of_year_index(12, 31) == 365
+    _assert_matches_sql(cube, collector)
+
+    route = cube.lookup_route(["Kars", "Rize", "Antalya"], 1, 5)
+    assert [route["classes"][k] for k in route["most_likely_index"][[0, 2]]] == ["Snow", "Rain"]
+    assert route["sample_count"].tolist() == [3, 0, 1]
+    assert route["confidence"][0] == pytest.approx(2 / 3) and route["confidence"][1] == 0.0
+
+
+def test_saved_batches_are_applied_without_reloading(collector, monkeypatch, weather_rows):
+    cube = ClimatologyCube(collector)
+    reloads = []
+    monkeypatch.setattr(cube, "reload", lambda *args: reloads.append(args))
+
+    # Yeni gün, yerinde sınıf değişimi ve aynı sınıfla güncelleme tek batch'te
+    collector._save_weather_batch(weather_rows([("Kars", "2025-01-05", "Clear"), ("Kars", "2022-01-05", "Clear"),
+                                         ("Antalya", "2024-01-05", "Rain")]))
+    cube.ensure_fresh()
+    assert reloads == []
+    assert cube.fingerprint == collector.storage.query("data_fingerprint")[0]
+    monkeypatch.undo()
+    _assert_matches_sql(cube, collector)
+
+
+def test_other_writers_and_rebuilds_invalidate_the_cube(collector, weather_rows):
+    cube = ClimatologyCube(collector, refresh_interval=0)
+    fingerprint = cube.fingerprint
+
+    # Başka bir süreç (dinleyicisi olmayan toplayıcı) yazar: parmak izi değişir, küp yeniden yüklenir
+    other = HistoricalWeatherDataCollector(api_key="test-key")
+    other._save_weather_batch(weather_rows([("Kars", "2021-01-05", "Rain"), ("Deneme", "2024-01-05", "Snow")]))
+    cube.ensure_fresh()
+    assert cube.fingerprint != fingerprint and cube.cities[-1] == "Deneme"
+    _assert_matches_sql(cube, collector)
+
+    # Tam yeniden hesaplama epoch'u artırır
+    epoch = collector.data_epoch
+    collector._calculate_daily_probabilities()
+    assert collector.data_epoch == epoch + 1
+    cube.ensure_fresh()
+    assert cube.fingerprint == collector.storage.query("data_fingerprint")[0]
+    _assert_matches_sql(cube, collector)
+
+
+def test_readers_never_see_a_half_applied_batch(collector, monkeypatch, weather_rows):
+    cube = ClimatologyCube(collector, refresh_interval=3600)
+    monkeypatch.setattr(cube, "reload", lambda *args: pytest.fail("batch tam yeniden yüklemeye düştü"))
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        # Her okumada sayılar ile olasılıklar aynı sürüme ait olmalı
+        while not stop.is_set():
+            for result in cube.get_route_probabilities(["Kars", "Antalya"], 1, 5):
+                values = result["weather_probabilities"].values()
+                if any(abs(value["probability"] - value["sample_count"] / result["sample_count"]) > 1e-9
+                       for value in values):
+                    errors.append(result)
+                    return
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    try:
+        for year in range(1990, 2020):
+            weather = ("Snow", "Clear", "Rain")[year % 3]
+            assert collector._save_weather_batch(weather_rows([("Kars", f"{year}-01-05", weather),
+                                                               ("Antalya", f"{year}-01-05", weather)])) == 2
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join(5)
+
+    assert errors == []
+    monkeypatch.undo()
+    _assert_matches_sql(cube, collector)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Önceden hesaplanmış tahmin deposu testleri"""
+import os
+import sys
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from forecast_store import ForecastStore
+
+CITIES = ["Kars", "Antalya"]
+CLASSES = ["Clear", "Rain", "Snow"]
+FINGERPRINT = (12, 40, "2025-01-05 10:00:00")
+
+
+def _saved_store(tmp_path):
+    # (şehir, gün, sınıf): Kars karlı, Antalya yağmurlu; 3 gün
+    probabilities = np.zeros((2, 3, 3))
+    probabilities[0, :, 2] = 0.7
+    probabilities[0, :, 0] = 0.3
+    probabilities[1, :, 1] = 0.55
+    probabilities[1, :, 0] = 0.45
+    temperature = np.array([[-8.04, -9.26, -7.5], [14.2, 15.06, 13.9]])
+
+    store = ForecastStore(str(tmp_path / "forecasts.npz"))
+    store.save(date(2025, 1, 5), CITIES, CLASSES, probabilities, temperature, "v1", FINGERPRINT)
+    return store
+
+
+def test_lookup_serves_saved_forecasts(tmp_path):
+    store = _saved_store(tmp_path)
+    forecast = store.lookup(["Antalya", "Kars"], date(2025, 1, 6), "v1", FINGERPRINT)
+
+    assert list(forecast["weather"]) == ["Rain", "Snow"]
+    assert forecast["confidence"].tolist() == [0.55, 0.7]
+    assert [round(value, 1) for value in forecast["temperature"]] == [15.1, -9.3]
+
+
+def test_lookup_misses_when_stale_or_out_of_range(tmp_path):
+    store = _saved_store(tmp_path)
+
+    assert store.lookup(CITIES, date(2025, 1, 6), "v2", FINGERPRINT) is None
+    assert store.lookup(CITIES, date(2025, 1, 6), "v1", (13, 41, "2025-01-06 10:00:00")) is None
+    assert store.lookup(CITIES, date(2025, 1, 8), "v1", FINGERPRINT) is None
+    assert store.lookup(CITIES, date(2025, 1, 4), "v1", FINGERPRINT) is None
+    assert store.lookup(["Kars", "Van"], date(2025, 1, 6), "v1", FINGERPRINT) is None
+    assert ForecastStore(str(tmp_path / "missing.npz")).lookup(CITIES, date(2025, 1, 6), "v1", FINGERPRINT) is None
+
+
+def test_lookup_pairs_indexes_each_city_on_its_own_day(tmp_path):
+    store = _saved_store(tmp_path)
+    forecast = store.lookup_pairs(["Kars", "Antalya", "Kars"], [date(2025, 1, 5), date(2025, 1, 7), date(2025, 1, 7)],
+                                  "v1", FINGERPRINT)
+
+    assert [round(value, 1) for value in forecast["temperature"]] == [-8.0, 13.9, -7.5]
+    assert store.lookup_pairs(["Kars", "Antalya"], [date(2025, 1, 5), date(2025, 1, 8)], "v1", FINGERPRINT) is None
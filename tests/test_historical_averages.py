@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Son 3 yıl ortalamaları okuma katmanı testleri (önbellek → city_statistics → tek sorgu)"""
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from advanced_weather_data import MLWeatherDatabase
+from historical_averages import (
+    HistoricalAverageStore, init_statistics_tables, read_statistics, window_statistics, window_years,
+    write_statistics
+)
+
+
+def _database(tmp_path):
+    db_path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE weather_data (id INTEGER PRIMARY KEY AUTOINCREMENT, city TEXT, date TEXT, weather_condition TEXT, temperature REAL,
+                                   humidity REAL, wind_speed REAL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                                   UNIQUE(city, date))
+    """)
+    conn.execute("""
+        CREATE TABLE city_statistics (city TEXT, month INTEGER, day INTEGER, avg_temperature REAL,
+                                      avg_humidity REAL, avg_wind_speed REAL, weather_probabilities TEXT,
+                                      sample_count INTEGER, last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                                      UNIQUE(city, month, day))
+    """)
+    rows = [("Kars", f"{year}-12-12", condition, temperature, 80.0, 5.0, "2020-01-01 00:00:00")
+            for year, condition, temperature in zip(window_years(), ["kar", "bulut", "kar"], [-10.0, -4.0, -7.0])]
+    init_statistics_tables(conn.cursor())
+    conn.executemany("INSERT INTO weather_data (city, date, weather_condition, temperature, humidity, wind_speed, "
+                     "created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    return db_path, conn
+
+
+def test_reads_observations_once_then_memory(tmp_path):
+    db_path, _ = _database(tmp_path)
+    store = HistoricalAverageStore(db_path)
+
+    result = store.get("Kars", 12, 12)
+    assert result["avg_temperature"] == -7.0
+    assert result["weather_probabilities"] == {"kar": 2 / 3, "bulut": 1 / 3}
+    assert result["most_likely_weather"] == "kar" and result["sample_count"] == 3
+    assert store.get("Kars", 12, 12) == result
+    assert store.get("Van", 1, 1)["most_likely_weather"] == "veri_yok"
+
+    stats = store.stats()
+    assert (stats["memory_hits"], stats["statistics_hits"], stats["misses"]) == (1, 0, 2)
+
+
+def test_uses_city_statistics_only_when_newer_than_observations(tmp_path):
+    db_path, conn = _database(tmp_path)
+    write_statistics(conn, [("Kars", 12, 12, -1.5, 70.0, 3.0, 2, "kar", 0.5)],
+                     [("Kars", 12, 12, "kar", 0.5), ("Kars", 12, 12, "güneş", 0.5)])
+    # Eski biçimde (yalnızca JSON) yazılmış satır kullanılmaz
+    conn.execute("INSERT INTO city_statistics (city, month, day, avg_temperature, weather_probabilities, sample_count) "
+                 "VALUES ('Kars', 12, 13, 1.0, '{\"kar\": 1.0}', 1)")
+    conn.commit()
+
+    store = HistoricalAverageStore(db_path)
+    result = store.get("Kars", 12, 12)
+    assert result["avg_temperature"] == -1.5 and result["most_likely_weather"] == "kar"
+    assert result["weather_probabilities"] == {"kar": 0.5, "güneş": 0.5}
+    store.get("Kars", 12, 13)
+    assert (store.stats()["statistics_hits"], store.stats()["misses"]) == (1, 1)
+
+    # Özetten sonra yeni gözlem: özet bayat, gözlemlerden hesaplanır
+    conn.execute("UPDATE weather_data SET created_at = datetime('now', '+1 hour')")
+    conn.commit()
+    store.invalidate()
+    assert store.get("Kars", 12, 12)["avg_temperature"] == -7.0
+    assert store.stats()["misses"] == 2
+
+
+def test_window_statistics_covers_full_calendar_and_supports_filters(tmp_path):
+    db_path, conn = _database(tmp_path)
+    conn.execute("INSERT INTO weather_data (city, date, weather_condition, temperature, humidity, wind_speed) "
+                 "VALUES ('Kars', ?, 'güneş', 21.5, 40.0, 2.0)", (f"{window_years()[0]}-07-31",))
+    conn.commit()
+
+    statistics, probabilities = window_statistics(conn, ["Kars", "Van"], window_years())
+    rows = {row[:3]: row[3:] for row in statistics}
+    assert len(rows) == 2 * 366 and ("Van", 2, 29) in rows
+    assert rows[("Kars", 12, 12)] == (-7.0, 80.0, 5.0, 3, "kar", 2 / 3)
+    assert rows[("Kars", 7, 31)][3:] == (1, "güneş", 1.0)
+    assert rows[("Van", 1, 1)][3] == 0
+
+    write_statistics(conn, statistics, probabilities)
+    result = read_statistics(conn.cursor(), "Kars", 12, 12)
+    assert result["weather_probabilities"] == {"kar": 2 / 3, "bulut": 1 / 3}
+    assert read_statistics(conn.cursor(), "Van", 1, 1)["most_likely_weather"] == "veri_yok"
+
+    db = MLWeatherDatabase.__new__(MLWeatherDatabase)
+    db.db_path = db_path
+    assert db.get_days_with_weather_probability("kar", 0.3) == [
+        {"city": "Kars", "month": 12, "day": 12, "probability": 2 / 3}
+    ]
+    assert db.get_days_with_weather_probability("güneş", 0.3, city="Van") == []
+
+
+def test_result_of_a_query_overtaken_by_invalidate_is_not_cached(tmp_path, monkeypatch):
+    db_path, conn = _database(tmp_path)
+    store = HistoricalAverageStore(db_path)
+    from_observations = store._from_observations
+
+    def invalidated_during_query(*args):
+        # Sorgu sürerken bu süreçte yeni gözlem yazılır ve önbellek boşaltılır
+        result = from_observations(*args)
+        conn.execute("UPDATE weather_data SET temperature = temperature + 3")
+        conn.commit()
+        store.invalidate()
+        return result
+
+    monkeypatch.setattr(store, "_from_observations", invalidated_during_query)
+    assert store.get("Kars", 12, 12)["avg_temperature"] == -7.0
+    monkeypatch.undo()
+
+    assert store.stats()["entries"] == 0
+    assert store.get("Kars", 12, 12)["avg_temperature"] == -4.0
+    assert (store.stats()["memory_hits"], store.stats()["misses"]) == (0, 2)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tahmin servisi uç nokta testleri (Flask test istemcisi, geçici SQLite üzerinde eğitilmiş modeller)"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from historical_weather_data import HistoricalWeatherDataCollector
+from sqlite_access import sqlite_access
+
+CITIES = ["Kars", "Antalya", "Ankara"]
+WEATHER = ["Snow", "Clear", "Rain", "Clouds"]
+
+
+def _observations():
+    """Üç şehir × dört yıl × Ocak ayı için sabit (tekrarlanabilir) gözlemler"""
+    return [(city, f"{year}-01-{day:02d}", WEATHER[(i * 7 + year * 3 + day) % len(WEATHER)], float(day - 10 * i))
+            for i, city in enumerate(CITIES) for year in range(2021, 2025) for day in range(1, 32)]
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory, weather_rows):
+    """Servis modülü tahmin nesnesini import sırasında oluşturur: ortam ve çalışma dizini önceden ayarlanır"""
+    root = tmp_path_factory.mktemp("predictor")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.delenv("WEATHER_DB_CONNECTION_STRING", raising=False)
+        mp.delenv("WEATHER_MODEL_SHARDING", raising=False)
+        mp.setenv("WEATHER_DB_BACKEND", "sqlite")
+        mp.setenv("WEATHER_SQLITE_PATH", str(root / "historical_weather.db"))
+        mp.setenv("WEATHER_SNAPSHOT_DIR", str(root / "weather_snapshot"))
+        mp.setenv("WEATHER_FORECAST_MONTHS", "0")
+        mp.setenv("OPENWEATHER_API_KEY", "test-key")
+        # Modeller ve tahmin dosyası '../models' altına yazılır
+        (root / "service").mkdir()
+        mp.chdir(root / "service")
+
+        observations = _observations()
+        collector = HistoricalWeatherDataCollector(api_key="test-key")
+        assert collector._save_weather_batch(weather_rows(observations)) == len(observations)
+        import historical_weather_predictor
+        assert historical_weather_predictor.predictor.models is not None
+        yield historical_weather_predictor
+    sqlite_access(str(root / "historical_weather.db")).close()
+
+
+@pytest.fixture
+def client(service):
+    return service.app.test_client()
+
+
+@pytest.mark.parametrize("fields", [None, ["historical_probabilities", "sample_count"]])
+def test_route_response_matches_the_per_city_path(service, client, monkeypatch, fields):
+    body = {"cities": CITIES + ["Rize"], "date": "2025-01-15", "fields": fields}
+    batched = client.post("/predict_route", json=body)
+    assert batched.status_code == 200
+
+    # Toplu yol başarısız olursa şehir şehir tahmin edilir: yanıt bayt bayt aynı olmalı
+    predict_cities = service.predictor._predict_cities
+
+    def single_city_only(cities, *args):
+        if len(cities) > 1:
+            raise RuntimeError("toplu yol devre dışı")
+        return predict_cities(cities, *args)
+
+    monkeypatch.setattr(service.predictor, "_predict_cities", single_city_only)
+    per_city = client.post("/predict_route", json=body)
+    assert per_city.status_code == 200
+    assert per_city.get_data() == batched.get_data()
+
+
+@pytest.mark.parametrize("request_args", [
+    ("get", "/predict?city=Kars&date=2025-01-15&fields=sample_count,bogus", None),
+    ("post", "/predict", {"city": "Kars", "date": "2025-01-15", "fields": ["bogus"]}),
+    ("post", "/predict_route", {"cities": CITIES, "date": "2025-01-15", "fields": ["predicted_weather", "bogus"]}),
+    ("post", "/predict_range", {"cities": CITIES, "start_date": "2025-01-15", "fields": "bogus"}),
+    ("post", "/predict", {"city": "Kars", "date": "2025-01-15", "fields": 5}),
+])
+def test_unknown_fields_are_rejected(client, request_args):
+    method, url, body = request_args
+    response = getattr(client, method)(url, json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_fields_without_model_outputs_do_not_score(service, client, monkeypatch):
+    predictor = service.predictor
+    monkeypatch.setattr(predictor.models, "score", lambda *args: pytest.fail("model puanlandı"))
+    monkeypatch.setattr(predictor, "_route_features", lambda *args: pytest.fail("özellik matrisi kuruldu"))
+
+    response = client.get("/predict?city=Kars&date=2025-01-15&fields=historical_probabilities,sample_count")
+    assert response.status_code == 200
+    assert sorted(response.get_json()) == ["city", "date", "historical_probabilities", "sample_count"]
+    assert response.get_json()["sample_count"] == 4
+
+    # Açıklama geçmiş örneklerden üretilir, model gerektirmez
+    response = client.post("/predict", json={"city": "Ankara", "date": "2025-01-03", "fields": ["explanation"]})
+    assert response.status_code == 200
+    assert sorted(response.get_json()) == ["city", "date", "explanation"]
+
+
+@pytest.mark.parametrize("body", [
+    {"cities": CITIES, "start_date": "2025-01-01", "end_date": "2025-02-01"},  # 32 gün
+    {"cities": CITIES, "start_date": "2025-01-10", "end_date": "2025-01-09"},
+    {"cities": CITIES, "start_date": "2025-02-30"},
+    {"cities": CITIES, "start_date": "15.01.2025"},
+    {"cities": CITIES},
+    {"cities": [], "start_date": "2025-01-15"},
+    {"cities": CITIES, "arrival_dates": ["2025-01-15", "2025-01-16"]},
+    {"cities": CITIES, "arrival_dates": {"Kars": "2025-01-15", "Antalya": "2025-13-01", "Ankara": "2025-01-16"}},
+    {"cities": [f"Şehir {i}" for i in range(162)], "start_date": "2025-01-01", "end_date": "2025-01-31"},
+])
+def test_invalid_ranges_are_rejected(client, body):
+    response = client.post("/predict_range", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_range_limits_are_inclusive(service):
+    parse = service.HistoricalWeatherPredictor.parse_range_pairs
+    pairs = parse({"cities": ["Kars"], "start_date": "2025-01-01", "end_date": "2025-01-31"})
+    assert len(pairs) == service.MAX_RANGE_DAYS and pairs[-1] == ("Kars", "2025-01-31")
+    with pytest.raises(ValueError, match=f"{service.MAX_RANGE_DAYS} gün"):
+        parse({"cities": ["Kars"], "start_date": "2025-01-01", "end_date": "2025-02-01"})
+
+    cities = [f"Şehir {i}" for i in range(service.MAX_RANGE_PAIRS)]
+    assert len(parse({"cities": cities, "arrival_dates": ["2025-01-15"] * len(cities)})) == service.MAX_RANGE_PAIRS
+    with pytest.raises(ValueError, match=str(service.MAX_RANGE_PAIRS)):
+        parse({"cities": cities + ["Kars"], "arrival_dates": ["2025-01-15"] * (len(cities) + 1)})
+
+
+@pytest.mark.parametrize("fields", [None, ["predicted_weather", "sample_count"]])
+def test_range_cells_match_single_predictions(client, fields):
+    response = client.post("/predict_range", json={"cities": CITIES + ["Rize"], "start_date": "2025-01-30",
+                                                   "end_date": "2025-02-02", "fields": fields})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["cities"] == CITIES + ["Rize"]
+    assert result["dates"] == ["2025-01-30", "2025-01-31", "2025-02-01", "2025-02-02"]
+    assert result["summary"]["total_predictions"] == 16
+
+    for city in result["cities"]:
+        for date in result["dates"]:
+            single = client.post("/predict", json={"city": city, "date": date, "fields": fields})
+            assert json.dumps(result["grid"][city][date], sort_keys=True) == json.dumps(single.get_json(), sort_keys=True)
+
+
+def test_get_predict_revalidates_with_etags(service, client, monkeypatch, weather_rows):
+    url = "/predict?city=Kars&date=2025-03-10&fields=predicted_weather,sample_count"
+    first = client.get(url)
+    assert first.status_code == 200 and first.get_json()["sample_count"] == 0
+    etag = first.headers["ETag"]
+    assert etag and first.headers["Cache-Control"] == "no-cache"
+
+    # Eşleşen If-None-Match: gövdesiz 304, aynı ETag
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.get_data() == b""
+    assert cached.headers["ETag"] == etag
+    assert client.get(url.replace("Kars", "Ankara"), headers={"If-None-Match": etag}).status_code == 200
+
+    # Veri alımı veri sürümünü artırır: eski ETag artık eşleşmez
+    collector = service.predictor.collector
+    assert collector._save_weather_batch(weather_rows([("Kars", "2020-03-10", "Snow", -2.0)])) == 1
+    updated = client.get(url, headers={"If-None-Match": etag})
+    assert updated.status_code == 200 and updated.get_json()["sample_count"] == 1
+    assert updated.headers["ETag"] != etag
+    etag = updated.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # Model değişimi de tahmin ETag'ini değiştirir
+    monkeypatch.setattr(service.predictor, "model_version", "yeni-model")
+    retrained = client.get(url, headers={"If-None-Match": etag})
+    assert retrained.status_code == 200 and retrained.headers["ETag"] != etag
+
+
+def test_statistics_revalidate_with_etags(client):
+    first = client.get("/statistics/Antalya")
+    assert first.status_code == 200
+    cached = client.get("/statistics/Antalya", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+
+
+def test_post_predict_is_never_conditional(client):
+    etag = client.get("/predict?city=Kars&date=2025-01-15").headers["ETag"]
+    for if_none_match in (etag, "*"):
+        response = client.post("/predict", json={"city": "Kars", "date": "2025-01-15"},
+                               headers={"If-None-Match": if_none_match})
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
+        assert response.get_json()["city"] == "Kars"
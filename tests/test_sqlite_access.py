@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""WAL kipinde SQLite erişim katmanı testleri (okuyucular yazıcıyı beklemez)"""
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from sqlite_access import sqlite_access
+from weather_storage import SQLiteWeatherStorage
+
+
+def test_wal_readers_are_read_only_and_writer_rolls_back(tmp_path):
+    access = sqlite_access(str(tmp_path / "weather.db"))
+    assert sqlite_access(str(tmp_path / "." / "weather.db")) is access
+
+    with access.writer() as conn:
+        conn.execute("CREATE TABLE weather_data (city TEXT, temperature REAL)")
+        conn.execute("INSERT INTO weather_data VALUES ('Kars', -8.5)")
+    assert access.journal_mode == "wal"
+
+    reader = access.reader()
+    assert reader is access.reader()
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("DELETE FROM weather_data")
+
+    with pytest.raises(ValueError):
+        with access.writer() as conn:
+            conn.execute("INSERT INTO weather_data VALUES ('Van', -3.0)")
+            raise ValueError("yarıda kesildi")
+    assert reader.execute("SELECT COUNT(*) FROM weather_data").fetchone() == (1,)
+    access.close()
+
+
+def test_readers_do_not_wait_for_open_write_transaction(tmp_path):
+    access = sqlite_access(str(tmp_path / "weather.db"))
+    with access.writer() as conn:
+        conn.execute("CREATE TABLE weather_data (city TEXT, temperature REAL)")
+        conn.execute("INSERT INTO weather_data VALUES ('Kars', -8.5)")
+
+    counts = []
+    with access.writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("INSERT INTO weather_data VALUES (?, ?)", [("Rize", 9.0)] * 100)
+        # Yazma transaction'ı açıkken başka iş parçacığı son commit edilmiş görüntüyü okur
+        thread = threading.Thread(target=lambda: counts.append(
+            access.reader().execute("SELECT COUNT(*) FROM weather_data").fetchone()[0]))
+        thread.start()
+        thread.join(timeout=2)
+    assert counts == [1]
+    assert access.reader().execute("SELECT COUNT(*) FROM weather_data").fetchone() == (101,)
+    access.close()
+
+
+def test_weather_storage_reads_from_readers_and_writes_through_single_writer(tmp_path):
+    storage = SQLiteWeatherStorage(str(tmp_path / "historical_weather.db"))
+    access = sqlite_access(storage.db_path)
+
+    with access.writer() as writer:
+        with storage.write_connection() as conn:
+            assert conn is writer
+            storage.create_schema(conn)
+            cursor = conn.cursor()
+            storage.begin_write(cursor)
+            storage.executemany(cursor, "upsert_observation",
+                                [("Kars", "2024-01-05", "Snow", "light snow", -8.5, 80, 3.1)])
+
+    # Okumalar iş parçacığının salt okunur okuyucusundan yapılır
+    assert storage.connection() is access.reader()
+    with storage.read_connection() as conn:
+        assert conn is access.reader()
+    assert storage.query("city_record_count", ("Kars",)) == [(1,)]
+    with pytest.raises(sqlite3.OperationalError):
+        storage.connection().execute("DELETE FROM historical_weather")
+
+    storage.reset_connection()
+    assert storage.connection() is access.reader()
+    access.close()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Köprü/otoyol ücret tarifesi motoru testleri (ad eşleştirme, araç sınıfları, vektörel hesap)"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from toll_tariffs import TollTariff
+
+TARIFF = {
+    "currency": "TRY",
+    "vehicle_classes": [{"id": 1, "name": "Otomobil"}, {"id": 2, "name": "Kamyonet"}],
+    "bridges": [{"name": "Fatih Sultan Mehmet Köprüsü", "aliases": ["FSM Köprüsü"], "fees": [59.0, 75.0]}],
+    "motorways": [{"name": "TEM Otoyolu", "aliases": ["O-4"], "length_km": 100, "per_km": [0.5, 1.0]}],
+    "fallbacks": [
+        {"keywords": ["köprü", "bridge"], "type": "bridge", "name": "Bilinmeyen köprü", "fees": [200.0, 250.0]},
+        {"keywords": ["otoyol", "highway"], "type": "motorway", "name": "Bilinmeyen otoyol", "per_km": [0.15, 0.2]},
+    ],
+}
+
+
+def test_normalized_names_fallbacks_and_route_cost():
+    tariff = TollTariff(TARIFF)
+    assert tariff.match("fsm köprüsü") == tariff.match("FSM KÖPRÜSÜ") == 0
+    assert tariff.match("o 4") == tariff.match("TEM-Otoyolu") == 1
+    assert tariff.names[tariff.match("Haliç Köprüsü")] == "Bilinmeyen köprü"
+    assert tariff.match("D-100") is None
+
+    # TEM ücreti kesim uzunluğuyla sınırlı, yedek otoyol tüm mesafe boyunca
+    result = tariff.route_cost(300, ["FSM Köprüsü", "O-4", "Çevre Highway", "D-100"], vehicle_class=2)
+    assert [detail["cost"] for detail in result["toll_details"]] == [75.0, 100.0, 60.0]
+    assert result["toll_details"][0]["type"] == "köprü"
+    assert result["total_cost"] == 235.0
+    assert result["cost_per_km"] == round(235.0 / 300, 2)
+
+
+def test_vectorized_costs_match_route_cost_for_every_class():
+    tariff = TollTariff(TARIFF)
+    distances = [50, 300, 0]
+    routes = [["TEM Otoyolu", "FSM Köprüsü", "FSM Köprüsü"], ["bridge x", "otoyol"], []]
+    costs = tariff.costs(distances, routes)
+    assert costs.shape == (3, 2)
+    expected = [[tariff.route_cost(d, r, c)["total_cost"] for c in (1, 2)] for d, r in zip(distances, routes)]
+    assert np.allclose(costs, expected)
+    assert np.allclose(tariff.costs(distances, routes, [2]), costs[:, 1:])
+
+    with pytest.raises(ValueError):
+        tariff.costs(distances, routes, [7])
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Toplu trafik çarpanı ve önceden hesaplanmış tablo testleri (küçük orman, sentetik özellikler)"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from traffic_multipliers import TrafficMultiplierTable, calculate_traffic_multipliers
+
+CITIES = {
+    "Ankara": {"lat": 39.93, "lon": 32.86, "elevation": 938, "population": 5639076},
+    "Kars": {"lat": 40.60, "lon": 43.10, "elevation": 1768, "population": 284923},
+}
+
+
+def _models():
+    rng = np.random.default_rng(0)
+    rows = 400
+    static = np.array([list(CITIES[city].values()) for city in rng.choice(list(CITIES), rows)])
+    days = rng.integers(1, 367, rows)
+    X = np.column_stack([static, (days - 1) // 31 + 1, rng.integers(0, 7, rows), days]).astype(np.float64)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestRegressor(n_estimators=3, max_depth=4, random_state=0)
+    model.fit(scaler.transform(X), 1.0 + X[:, 6] / 366 + 0.1 * X[:, 5])
+    return scaler, model
+
+
+def _single(scaler, model, city, date_str):
+    # Eski calculate_traffic_multiplier: tek satırlık dizi + tek predict
+    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+    data = CITIES[city]
+    features = np.array([[data["lat"], data["lon"], data["elevation"], data["population"],
+                          date_obj.month, date_obj.weekday(), date_obj.timetuple().tm_yday]])
+    return round(model.predict(scaler.transform(features))[0], 2)
+
+
+def test_batch_and_table_match_single_row_model():
+    scaler, model = _models()
+    # 29 Şubat / 1 Mart: aynı yılın günü artık yılda farklı aya düşer
+    dates = ["2024-02-29", "2024-03-01", "2025-03-01", "2024-12-31", "2025-07-15"]
+    pairs = [(city, date) for city in CITIES for date in dates]
+    expected = [_single(scaler, model, city, date) for city, date in pairs]
+
+    assert calculate_traffic_multipliers(CITIES, scaler, model, pairs) == expected
+    table = TrafficMultiplierTable.build(CITIES, scaler, model)
+    assert calculate_traffic_multipliers(CITIES, scaler, model, pairs, table) == expected
+
+
+def test_unknown_city_bad_date_and_stale_table():
+    scaler, model = _models()
+    table = TrafficMultiplierTable.build(CITIES, scaler, model)
+    pairs = [("Bilinmeyen", "2025-01-01"), ("ankara", "2025-13-40"), ("ankara", "2025-01-01")]
+    result = calculate_traffic_multipliers(CITIES, scaler, model, pairs, table)
+    assert result[:2] == [1.0, 1.0]
+    assert result[2] == _single(scaler, model, "Ankara", "2025-01-01")
+
+    # Model değişince tablo kullanılmaz, yeni model ile canlı hesaplanır
+    _, other = _models()
+    other.fit(scaler.transform(np.zeros((10, 7))), np.full(10, 3.0))
+    assert calculate_traffic_multipliers(CITIES, scaler, other, pairs[2:], table) == [3.0]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Vektörel eğitim verisi oluşturucu ve soğuk başlangıç eğitimi testleri"""
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from advanced_weather_data import MLWeatherDatabase
+from training_set import FEATURE_COLUMNS, build_training_set, fit_forests
+
+CITIES = {
+    "Ankara": {"lat": 39.93, "lon": 32.86, "elevation": 938, "population": 5639076},
+    "Kars": {"lat": 40.60, "lon": 43.10, "elevation": 1768, "population": 284923},
+}
+
+
+def _rows(count):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2023-01-01", periods=400).strftime("%Y-%m-%d")
+    return pd.DataFrame({
+        "city": rng.choice(list(CITIES), count),
+        "date": rng.choice(dates, count),
+        "weather_condition": rng.choice(["clear", "rain", "snow", "clouds"], count),
+        "temperature": rng.normal(10, 8, count).round(1),
+    })
+
+
+def test_chunked_features_match_row_wise_join():
+    raw = _rows(300)
+    raw.loc[5, "city"] = "Atlantis"
+    raw.loc[7, "date"] = "2023-02-30"
+    chunks = [raw.iloc[i:i + 64] for i in range(0, len(raw), 64)]
+    X, classes, labels, temperature, traffic = build_training_set(chunks, CITIES).arrays()
+
+    valid = raw.drop(index=[5, 7])
+    expected = []
+    for row in valid.itertuples():
+        city, date_obj = CITIES[row.city], datetime.strptime(row.date, "%Y-%m-%d")
+        expected.append([city["lat"], city["lon"], city["elevation"], city["population"],
+                         date_obj.month, date_obj.weekday(), date_obj.timetuple().tm_yday])
+    assert np.array_equal(X, np.array(expected, dtype=np.float32))
+    assert np.array_equal(temperature, valid["temperature"].to_numpy())
+
+    encoder = LabelEncoder()
+    assert np.array_equal(labels, encoder.fit_transform(valid["weather_condition"]))
+    assert list(classes) == list(encoder.classes_)
+
+    # Kars (< 1M) Pazartesi açık hava 1.0; Ankara Cumartesi karlı 1.3 × 1.1 × 1.3
+    sunny = (valid["city"] == "Kars").to_numpy() & (valid["weather_condition"] == "clear").to_numpy() \
+        & (X[:, 5] == 0) & ~np.isin(X[:, 4], [7, 8])
+    snowy = (valid["city"] == "Ankara").to_numpy() & (valid["weather_condition"] == "snow").to_numpy() \
+        & (X[:, 5] == 5) & ~np.isin(X[:, 4], [7, 8])
+    assert set(traffic[sunny]) == {1.0}
+    assert set(traffic[snowy]) == {round(1.3 * 1.1 * 1.3, 2)}
+
+
+def test_parallel_fit_matches_sequential_and_resets_n_jobs():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(500, len(FEATURE_COLUMNS)))
+    y = X[:, 0] * 2 + rng.normal(size=500)
+    sequential = {name: (RandomForestRegressor(n_estimators=4, random_state=42), y) for name in "ab"}
+    parallel = {name: (RandomForestRegressor(n_estimators=4, random_state=42), y) for name in "ab"}
+    fit_forests(sequential, X, workers=1)
+    seconds = fit_forests(parallel, X, workers=2)
+    assert set(seconds) == {"a", "b"}
+    assert np.array_equal(sequential["a"][0].predict(X), parallel["a"][0].predict(X))
+    assert parallel["b"][0].n_jobs is None
+
+
+def test_cold_start_trains_from_weather_data(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "historical_weather.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE weather_data (city TEXT, date TEXT, weather_condition TEXT, temperature REAL)")
+    conn.executemany("INSERT INTO weather_data VALUES (?, ?, ?, ?)", _rows(600).itertuples(index=False))
+    conn.commit()
+    conn.close()
+
+    db = MLWeatherDatabase.__new__(MLWeatherDatabase)
+    db.cities_data, db.db_path = dict(CITIES), db_path
+    db.scaler, db.weather_encoder, db.traffic_table = StandardScaler(), LabelEncoder(), None
+
+    (tmp_path / "service").mkdir()
+    monkeypatch.chdir(tmp_path / "service")
+    db.train_models(chunksize=128)
+
+    assert db.training_report["rows"] == 600
+    assert sorted(os.listdir(tmp_path / "models")) == [
+        "scaler.pkl", "temperature_model.pkl", "traffic_model.pkl", "weather_encoder.pkl", "weather_model.pkl"]
+    assert set(db.weather_encoder.classes_) == {"clear", "clouds", "rain", "snow"}
+    assert db.generate_training_data().shape[0] == 600
+    assert db.calculate_traffic_multipliers([("Ankara", "2025-07-05")])[0] > 1.0
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Eşzamanlı veri toplama motoru testleri (yerel taklit sunucu ile, ağ gerekmez)"""
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from collection_checkpoint import JOURNAL_DDL_SQLITE, find_missing_days, record_journal_entries
+from fake_openweather_server import CURRENT_WEATHER_PATH, TIMEMACHINE_PATH, start_fake_server
+from weather_ingestion import ConcurrentWeatherIngestor, IngestionJob, TokenBucket
+
+
+def _sqlite_writer(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS historical_weather (
+            city TEXT NOT NULL, date TEXT NOT NULL, weather_main TEXT NOT NULL,
+            weather_description TEXT, temperature REAL, humidity INTEGER, wind_speed REAL,
+            UNIQUE(city, date)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+    batch_sizes = []
+
+    def write_batch(rows):
+        batch_sizes.append(len(rows))
+        conn = sqlite3.connect(db_path)
+        conn.executemany(
+            "INSERT OR REPLACE INTO historical_weather VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(r["city"], r["date"], r["weather_main"], r["weather_description"],
+              r["temperature"], r["humidity"], r["wind_speed"]) for r in rows]
+        )
+        conn.commit()
+        conn.close()
+        return len(rows)
+
+    return write_batch, batch_sizes
+
+
+def _jobs(days=20):
+    cities = [("Kars", 40.6013, 43.0975), ("Antalya", 36.8969, 30.7133), ("Rize", 41.0201, 40.5234)]
+    return [IngestionJob(city, f"2023-01-{day:02d}", lat, lon)
+            for city, lat, lon in cities for day in range(1, days + 1)]
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    # İlk token hazır, kalan 10 token 50/sn hızla en az ~0.2 sn sürer
+    assert time.perf_counter() - start >= 0.18
+
+
+def test_ingestor_saves_all_rows_in_batches(tmp_path):
+    server, base_url = start_fake_server(latency=0.01)
+    write_batch, batch_sizes = _sqlite_writer(str(tmp_path / "hw.db"))
+    try:
+        ingestor = ConcurrentWeatherIngestor(base_url + TIMEMACHINE_PATH, "test-key", write_batch,
+                                             requests_per_second=1000, max_concurrency=8, batch_size=25)
+        stats = ingestor.run(_jobs())
+        ingestor.close()
+    finally:
+        server.shutdown()
+
+    assert stats["jobs"] == 60
+    assert stats["saved"] == 60
+    assert stats["failed"] == 0
+    assert max(batch_sizes) == 25 and len(batch_sizes) == 3
+
+    conn = sqlite3.connect(str(tmp_path / "hw.db"))
+    count, cities = conn.execute("SELECT COUNT(*), COUNT(DISTINCT city) FROM historical_weather").fetchone()
+    conn.close()
+    assert (count, cities) == (60, 3)
+
+
+def test_ingestor_retries_transient_failures(tmp_path):
+    # Her 4. istek 503 döner; tek bağlantıda yeniden deneme bir sonraki istektir
+    server, base_url = start_fake_server(fail_every=4, fail_status=503)
+    write_batch, _ = _sqlite_writer(str(tmp_path / "hw.db"))
+    try:
+        ingestor = ConcurrentWeatherIngestor(base_url + TIMEMACHINE_PATH, "test-key", write_batch,
+                                             requests_per_second=1000, max_concurrency=1,
+                                             backoff_base=0.001)
+        stats = ingestor.run(_jobs(days=10))
+        ingestor.close()
+    finally:
+        server.shutdown()
+
+    assert stats["saved"] == 30
+    assert stats["retries"] == stats["requests"] // 4
+    assert stats["requests"] == stats["saved"] + stats["retries"]
+
+
+def test_ingestor_gives_up_after_max_retries(tmp_path):
+    server, base_url = start_fake_server(fail_every=1, fail_status=500)
+    write_batch, _ = _sqlite_writer(str(tmp_path / "hw.db"))
+    try:
+        ingestor = ConcurrentWeatherIngestor(base_url + TIMEMACHINE_PATH, "test-key", write_batch,
+                                             requests_per_second=1000, max_retries=2,
+                                             backoff_base=0.001)
+        stats = ingestor.run(_jobs(days=2))
+        ingestor.close()
+    finally:
+        server.shutdown()
+
+    assert stats["failed"] == 6
+    assert stats["saved"] == 0
+    assert stats["requests"] == 6 * 3
+
+
+def test_failed_days_are_journaled_and_resumed(tmp_path):
+    db_path = str(tmp_path / "hw.db")
+    server, base_url = start_fake_server(fail_every=5, fail_status=400)
+    write_batch, _ = _sqlite_writer(db_path)
+    failures = []
+    try:
+        ingestor = ConcurrentWeatherIngestor(base_url + TIMEMACHINE_PATH, "test-key", write_batch,
+                                             requests_per_second=1000, max_concurrency=1,
+                                             on_failure=lambda job, status, error: failures.append(
+                                                 (job.city, job.date, status, error)))
+        stats = ingestor.run(_jobs(days=10))
+        ingestor.close()
+    finally:
+        server.shutdown()
+
+    assert stats["failed"] == len(failures) == 6
+    conn = sqlite3.connect(db_path)
+    conn.execute(JOURNAL_DDL_SQLITE)
+    cities = ["Kars", "Antalya", "Rize"]
+
+    # Yalnızca başarısız günler eksik kalır
+    missing = find_missing_days(conn, "historical_weather", cities, "2023-01-01", "2023-01-10")
+    assert sorted(missing) == sorted((city, date) for city, date, _, _ in failures)
+
+    # max_attempts'a ulaşan günler bir daha denenmez
+    record_journal_entries(conn, failures)
+    assert len(find_missing_days(conn, "historical_weather", cities, "2023-01-01", "2023-01-10",
+                                 max_attempts=2)) == 6
+    record_journal_entries(conn, failures)
+    assert find_missing_days(conn, "historical_weather", cities, "2023-01-01", "2023-01-10",
+                             max_attempts=2) == []
+    conn.close()
+
+
+def test_ml_database_collects_all_cities_in_one_run(tmp_path, monkeypatch):
+    from advanced_weather_data import CITIES_GEOGRAPHIC_DATA, MLWeatherDatabase
+    from historical_averages import HistoricalAverageStore
+
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test-key")
+    # Her 7. istek 404: "veri yok" olarak günlüğe yazılır, yeniden denenmez
+    server, base_url = start_fake_server(fail_every=7, fail_status=404)
+    db = MLWeatherDatabase.__new__(MLWeatherDatabase)
+    db.cities_data = {city: CITIES_GEOGRAPHIC_DATA[city] for city in ("Kars", "Antalya", "Rize")}
+    db.db_path = str(tmp_path / "weather.db")
+    db.base_url = base_url + CURRENT_WEATHER_PATH
+    db._init_database()
+    db.historical_averages = HistoricalAverageStore(db.db_path)
+    try:
+        db.collect_all_cities_data("2023-01-01", "2023-01-10", requests_per_minute=60_000, batch_size=8)
+        requests_made = server.request_count
+    finally:
+        server.shutdown()
+
+    conn = sqlite3.connect(db.db_path)
+    saved = conn.execute("SELECT COUNT(*) FROM weather_data").fetchone()[0]
+    conditions = {row[0] for row in conn.execute("SELECT DISTINCT weather_condition FROM weather_data")}
+    journal = conn.execute("SELECT status, COUNT(*) FROM collection_journal GROUP BY status").fetchall()
+    missing = find_missing_days(conn, "weather_data", db.cities_data, "2023-01-01", "2023-01-10")
+    conn.close()
+    assert requests_made == 30
+    assert journal == [("no_data", 4)] and saved == 26
+    assert conditions <= {"clear", "clouds", "rain", "snow", "mist"}
+    assert missing == []
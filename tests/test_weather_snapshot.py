@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Parquet anlık görüntüsü testleri (pyarrow kurulu değilse atlanır)"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from sqlite_access import sqlite_access
+from weather_snapshot import WeatherSnapshot
+from weather_storage import SQLiteWeatherStorage
+
+OBSERVATIONS = [
+    ("İstanbul", "2023-12-15", "Rain", "light rain", 9.5, 81, 4.2),
+    ("İstanbul", "2024-12-15", "Clouds", "overcast clouds", 11.0, None, 3.0),
+    ("Kars", "2023-01-05", "Snow", "light snow", -11.0, 85, 2.0),
+    ("Kars", "2024-01-05", "Snow", "heavy snow", None, 90, 5.0),
+]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteWeatherStorage(str(tmp_path / "historical_weather.db"))
+    conn = storage.connect()
+    storage.create_schema(conn)
+    conn.close()
+    _write(storage, OBSERVATIONS)
+    yield storage
+    sqlite_access(storage.db_path).close()
+
+
+def _write(storage, rows):
+    with storage.write_connection() as conn:
+        cursor = conn.cursor()
+        storage.begin_write(cursor)
+        storage.executemany(cursor, "upsert_observation", rows)
+    storage.rebuild_daily_probabilities()
+
+
+def test_export_is_partitioned_and_fresh_until_data_changes(storage, tmp_path):
+    snapshot = WeatherSnapshot(str(tmp_path / "snapshot"))
+    manifest = snapshot.export(storage, chunksize=3)
+
+    assert manifest["rows"] == {"historical_weather": 4, "daily_probabilities": 3}
+    assert manifest["cities"] == ["Kars", "İstanbul"]
+    assert len(snapshot.dataset("historical_weather").files) == 4  # şehir × yıl
+    assert snapshot.is_fresh(storage.query("data_fingerprint")[0])
+
+    _write(storage, [("Kars", "2022-01-05", "Clear", "clear sky", -4.0, 60, 1.5)])
+    assert not snapshot.is_fresh(storage.query("data_fingerprint")[0])
+
+
+def test_training_chunks_match_sql(storage, tmp_path):
+    snapshot = WeatherSnapshot(str(tmp_path / "snapshot"))
+    snapshot.export(storage)
+
+    chunks = list(snapshot.iter_training_chunks(chunksize=3))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+
+    actual = pd.concat(chunks, ignore_index=True)
+    actual["date"] = actual["date"].dt.strftime("%Y-%m-%d")
+    expected = pd.DataFrame(storage.query("training_data"), columns=list(actual.columns))
+    actual, expected = (df.astype({"city": str, "weather_main": str}).sort_values(["city", "date"])
+                        .reset_index(drop=True) for df in (actual, expected))
+
+    for column in ("city", "date", "weather_main"):
+        assert actual[column].tolist() == expected[column].tolist()
+    numeric = ["month", "day", "temperature", "humidity", "wind_speed", "probability", "sample_count"]
+    assert np.allclose(actual[numeric].to_numpy(float), expected[numeric].to_numpy(float), equal_nan=True)
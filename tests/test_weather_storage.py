@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Veritabanı lehçe adaptörü uyumluluk (conformance) testleri (yerel SQLite ile)"""
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from sqlite_access import sqlite_access
+from weather_storage import (
+    CITY_DAY_INDEX_SQLSERVER, DIALECT_STATEMENTS, SQLiteWeatherStorage, SqlServerWeatherStorage, create_storage, parameter_count,
+    resolve_connection_string
+)
+
+OBSERVATIONS = [
+    ("Kars", "2022-01-05", "Snow", "light snow", -8.5, 80, 3.1),
+    ("Kars", "2023-01-05", "Snow", "light snow", -11.0, 85, 2.0),
+    ("Kars", "2024-01-05", "Clear", "clear sky", -4.0, 60, 1.5),
+    ("Antalya", "2024-01-05", "Rain", "light rain", 14.2, 70, 4.4),
+]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteWeatherStorage(str(tmp_path / "historical_weather.db"))
+    conn = storage.connect()
+    storage.create_schema(conn)
+    conn.close()
+    yield storage
+    sqlite_access(storage.db_path).close()
+
+
+def _write(storage, name, rows):
+    with storage.write_connection() as conn:
+        cursor = conn.cursor()
+        storage.begin_write(cursor)
+        storage.executemany(cursor, name, rows)
+
+
+@pytest.mark.parametrize("name", sorted(DIALECT_STATEMENTS))
+def test_dialects_share_statement_names_and_parameter_order(name):
+    sqlite = SQLiteWeatherStorage(":memory:")
+    sqlserver = SqlServerWeatherStorage("Driver={ODBC Driver 17 for SQL Server};Server=test;")
+    assert set(sqlite.statements) == set(sqlserver.statements)
+    assert parameter_count(sqlite.sql(name)) == parameter_count(sqlserver.sql(name))
+
+
+def test_sqlserver_index_does_not_repeat_key_columns_in_include():
+    match = re.search(r"ON historical_weather \(([^)]*)\)\s*INCLUDE \(([^)]*)\)", CITY_DAY_INDEX_SQLSERVER)
+    keys, included = ({col.strip() for col in group.split(",")} for group in match.groups())
+    assert keys == {"city", "month", "day", "date"}
+    assert not keys & included
+    assert {"weather_main", "temperature"} <= included
+
+
+def test_upsert_observation_updates_in_place(storage):
+    _write(storage, "upsert_observation", OBSERVATIONS)
+    _write(storage, "upsert_observation", [("Kars", "2024-01-05", "Snow", "heavy snow", -9.0, 90, 5.0)])
+
+    rows = storage.query("historical_examples", ("Kars", 1, 5, 10))
+    assert [row[0] for row in rows] == ["2024-01-05", "2023-01-05", "2022-01-05"]
+    assert rows[0][1:3] == ("Snow", "heavy snow")
+
+    # Güncelleme satırı silip yeniden eklemez; yıl/ay/gün tarihten türetilir
+    assert storage.query("city_record_count", ("Kars",)) == [(3,)]
+    conn = storage.connection()
+    assert conn.execute("SELECT id, year, month, day FROM historical_weather "
+                        "WHERE city = 'Kars' AND date = '2024-01-05'").fetchone() == (3, 2024, 1, 5)
+
+
+def test_previous_observations_are_fetched_per_key_set(storage, monkeypatch):
+    _write(storage, "upsert_observation", OBSERVATIONS)
+    monkeypatch.setattr(storage, "KEYS_PER_QUERY", 2)  # Birden çok parçaya bölünmeyi de sına
+    keys = [("Kars", "2023-01-05"), ("Van", "2023-01-05"), ("Antalya", "2024-01-05"), ("Kars", "2023-01-05")]
+
+    previous = storage.query_previous_observations(storage.connection().cursor(), keys)
+    assert previous == {("Kars", "2023-01-05"): ("Snow", -11.0), ("Antalya", "2024-01-05"): ("Rain", 14.2)}
+
+
+def test_historical_examples_respects_limit(storage):
+    _write(storage, "upsert_observation", OBSERVATIONS)
+    rows = storage.query("historical_examples", ("Kars", 1, 5, 2))
+    assert [row[0] for row in rows] == ["2024-01-05", "2023-01-05"]
+
+
+def test_examples_for_cities_match_single_city_query(storage):
+    _write(storage, "upsert_observation", OBSERVATIONS)
+    examples = storage.query_examples_for_cities(["Kars", "Antalya", "Van"], 1, 5, 2)
+
+    assert list(examples) == ["Kars", "Antalya", "Van"]
+    for city in ("Kars", "Antalya"):
+        assert examples[city] == [tuple(row) for row in storage.query("historical_examples", (city, 1, 5, 2))]
+    assert examples["Van"] == []
+
+
+def test_counter_upserts_accumulate_and_refresh_probabilities(storage):
+    day = ("Kars", 1, 5)
+    _write(storage, "upsert_daily_total", [day + (2,)])
+    _write(storage, "upsert_probability_count", [day + ("Snow", 2)])
+    _write(storage, "upsert_daily_total", [day + (1,)])
+    _write(storage, "upsert_probability_count", [day + ("Clear", 1), day + ("Snow", -1), day + ("Rain", 0)])
+    _write(storage, "delete_empty_probabilities", [day])
+    _write(storage, "refresh_probabilities", [day])
+
+    rows = storage.query("daily_probabilities_for_day", day)
+    assert sorted((name, count) for name, _, count in rows) == [("Clear", 1), ("Snow", 1)]
+    assert all(abs(probability - 1 / 3) < 1e-9 for _, probability, _ in rows)
+
+
+def test_rebuild_matches_observations(storage):
+    _write(storage, "upsert_observation", OBSERVATIONS)
+    storage.rebuild_daily_probabilities()
+
+    rows = storage.query("daily_probabilities_for_day", ("Kars", 1, 5))
+    assert rows[0][0] == "Snow"
+    assert [count for _, _, count in rows] == [2, 1]
+    assert abs(sum(probability for _, probability, _ in rows) - 1.0) < 1e-9
+    assert storage.query("training_data")[0][0] in {"Kars", "Antalya"}
+    assert len(storage.query("training_data")) == len(OBSERVATIONS)
+
+
+def test_rebuild_runs_in_one_transaction_on_the_single_writer(storage):
+    _write(storage, "upsert_observation", OBSERVATIONS)
+    access = sqlite_access(storage.db_path)
+    done = threading.Event()
+
+    # Yazıcı başka bir batch'te meşgulken yeniden oluşturma başlamaz, batch'in satırı da sayılır
+    with access.writer() as conn:
+        worker = threading.Thread(target=lambda: (storage.rebuild_daily_probabilities(), done.set()))
+        worker.start()
+        assert not done.wait(0.2)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(storage.sql("upsert_observation"),
+                         [("Kars", "2025-01-05", "Snow", "snow", -6.0, 75, 2.2)])
+    worker.join(5)
+
+    rows = storage.query("daily_probabilities_for_day", ("Kars", 1, 5))
+    assert [(name, count) for name, _, count in rows] == [("Snow", 3), ("Clear", 1)]
+    assert storage.query("city_record_count", ("Kars",)) == [(4,)]
+
+
+def test_schema_is_created_once_and_then_reported_current(tmp_path):
+    storage = SQLiteWeatherStorage(str(tmp_path / "new.db"))
+    conn = storage.connect()
+    assert not storage.schema_is_current(conn)
+    assert storage.create_schema(conn) is True  # Yeni veritabanında sayaçlar hesaplanmalı
+    assert storage.schema_is_current(conn)
+    conn.close()
+
+
+def test_backend_is_selected_from_configuration_without_probing(monkeypatch, tmp_path):
+    monkeypatch.delenv("WEATHER_DB_CONNECTION_STRING", raising=False)
+    monkeypatch.setenv("WEATHER_DB_BACKEND", "sqlite")
+    monkeypatch.setenv("WEATHER_SQLITE_PATH", str(tmp_path / "weather.db"))
+    storage = create_storage(resolve_connection_string())
+    assert storage.dialect == "sqlite" and storage.db_path == str(tmp_path / "weather.db")
+
+    monkeypatch.setenv("WEATHER_DB_BACKEND", "sqlserver")
+    monkeypatch.setenv("WEATHER_DB_CONNECTION_STRING", "Driver={ODBC Driver 17 for SQL Server};Server=db;Database=Weather;")
+    storage = create_storage(resolve_connection_string())
+    assert storage.dialect == "sqlserver" and storage.database_name() == "Weather"
+
+    monkeypatch.setenv("WEATHER_DB_BACKEND", "oracle")
+    with pytest.raises(ValueError):
+        resolve_connection_string()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""İklim bölgesi model parçaları testleri (küçük ormanlarla, tek süreç)"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ml_service"))
+
+from zone_models import ZoneModelRegistry, train_zone_models, zone_of_cities
+
+
+def _features(rows, rng, classes, latitude):
+    return pd.DataFrame({
+        "month": rng.integers(1, 13, rows).astype(np.float32),
+        "latitude": np.full(rows, latitude, dtype=np.float32),
+        "weather_main": rng.choice(classes, rows),
+        "temperature": rng.normal(10, 5, rows),
+    })
+
+
+def test_zone_of_cities_uses_table_then_nearest_city():
+    zones = zone_of_cities(["Kars", "Samsun", "Bilinmeyen"], {"Samsun": {"lat": 41.28, "lon": 36.33}})
+    # Samsun tabloda yok: en yakın tablo şehri Sinop; koordinatsız şehir varsayılan (39.0, 35.0) konumuna göre
+    assert zones["Kars"] == "Doğu Anadolu"
+    assert zones["Samsun"] == "İç Anadolu"
+    assert zones["Bilinmeyen"] == "İç Anadolu"
+
+
+def test_registry_loads_lazily_maps_classes_and_evicts(tmp_path):
+    rng = np.random.default_rng(0)
+    east = _features(60, rng, ["Snow", "Clear"], 40.0)
+    south = _features(60, rng, ["Rain", "Clear", "Clouds"], 37.0)
+    features = pd.concat([east, south], ignore_index=True)
+    zones = ["Doğu Anadolu"] * 60 + ["Akdeniz"] * 60
+    manifest = train_zone_models(features, zones, str(tmp_path), workers=1, n_estimators=3)
+
+    assert manifest["classes"] == ["Clear", "Clouds", "Rain", "Snow"]
+    assert manifest["zones"]["Akdeniz"]["rows"] == 60
+
+    registry = ZoneModelRegistry(str(tmp_path), memory_budget_mb=0)
+    assert registry.stats()["loaded"] == []
+
+    X = features.drop(columns=["weather_main", "temperature"]).iloc[[0, 60, 1]]
+    probabilities, temperatures = registry.score(["Doğu Anadolu", "Akdeniz", "Doğu Anadolu"], X)
+    assert np.allclose(probabilities.sum(axis=1), 1.0)
+    # Doğu parçası yalnızca Clear/Snow sınıflarını bilir
+    assert probabilities[[0, 2]][:, [1, 2]].sum() == 0
+    assert temperatures.shape == (3,)
+
+    # Bütçe sıfır: en son kullanılan parça kalır, diğeri çıkarılır
+    stats = registry.stats()
+    assert stats["loaded"] == ["Akdeniz"] and stats["evictions"] == 1
+    # Modeli olmayan bölge en çok verili bölgenin (eşitlikte ilk) modelini kullanır
+    registry.score(["Ege"], X.iloc[[0]], need_temperature=False)
+    assert registry.stats()["loaded"] == [manifest["fallback_zone"]]